@@ -1,19 +1,41 @@
-from flask import Flask
+from importlib import import_module
+
+from flask import Flask, appcontext_pushed
 from config import Config
-from .extensions import db
+from .extensions import configure_sqlite, db
 from flask_login import LoginManager
-from flask_migrate import Migrate
 
-def create_app(config_class=Config):
+# Módulos que solo registran eventos de sesión. Toda escritura ocurre dentro de
+# un contexto de la app, así que se importan con el primero y no al crearla.
+SESSION_LISTENER_MODULES = (
+    'app.revenue_cube',  # marca en cada transacción los meses del cubo de reportes afectados
+    'app.accrual',       # reescribe el ingreso devengado por noche de las estancias modificadas
+    'app.rate_plans',    # sella e invalida los planes de tarifas compilados al editarlos
+)
+
+
+def _import_session_listeners(app, **extra):
+    for module_name in SESSION_LISTENER_MODULES:
+        import_module(module_name)
+
+
+def create_app(config_class=Config, defer_blueprints=True):
+    """
+    Crea la app. Los blueprints de AJAX e inteligencia (y con ellos NumPy y
+    los motores de análisis) se registran al llegar el primer request; con
+    `defer_blueprints=False`, en pruebas (TESTING) y en `flask routes` se
+    registran al crearla.
+    """
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(config_class)
 
     # --- INICIALIZAMOS LAS EXTENSIONES ---
     db.init_app(app)
+    configure_sqlite(app)
     login_manager = LoginManager()
     login_manager.init_app(app)
     from . import models
-    migrate = Migrate(app, db)
+    appcontext_pushed.connect(_import_session_listeners, app)
 
     # --- CONFIGURAMOS FLASK-LOGIN ---
     login_manager.login_view = 'auth.login'
@@ -22,11 +44,23 @@ def create_app(config_class=Config):
     
     @login_manager.user_loader
     def load_user(user_id):
-        return models.User.query.get(int(user_id))
+        # Desde el caché de usuarios de sesión (app/user_cache.py), sin consulta por request
+        from app.user_cache import load_session_user
+        return load_session_user(user_id)
 
     # --- ¡NUEVO! REGISTRAMOS LOS COMANDOS CLI ---
     from . import commands
     app.cli.add_command(commands.seed_db_command)
+    app.cli.add_command(commands.generate_data_command)
+    app.cli.add_command(commands.benchmark_command)
+    app.cli.add_command(commands.loadtest_command)
+    app.cli.add_command(commands.startup_profile_command)
+    app.cli.add_command(commands.verify_stay_rollups_command)
+    app.cli.add_command(commands.revenue_cube_command)
+    app.cli.add_command(commands.accrual_revenue_command)
+    app.cli.add_command(commands.demand_forecast_command)
+    # Flask-Migrate se importa al ejecutar `flask db ...` (ver LazyMigrateGroup)
+    app.cli.add_command(commands.LazyMigrateGroup(app))
 
     @app.route('/test')
     def test_page():
@@ -35,8 +69,11 @@ def create_app(config_class=Config):
     # --- CONTEXT PROCESSOR PARA PERMISOS ---
     @app.context_processor
     def inject_permissions():
-        from app.decorators import check_permission
-        return dict(check_permission=check_permission)
+        from app.decorators import check_permission, current_permissions
+        from flask_wtf.csrf import generate_csrf
+        # csrf_token() lo usan plantillas con formularios manuales (close_stay, supply_packages)
+        return dict(check_permission=check_permission, permissions=current_permissions(),
+                    csrf_token=generate_csrf)
 
     # --- MIDDLEWARE DE PERMISOS Y AUDITORÍA ---
     from app.middleware import PermissionMiddleware
@@ -46,8 +83,8 @@ def create_app(config_class=Config):
     register_template_filters(app)
     
     # --- REGISTRAMOS LOS BLUEPRINTS V3.0 (AL FINAL) ---
-    from app.routes import register_blueprints
-    register_blueprints(app)
+    from app.routes import listing_routes, register_blueprints
+    register_blueprints(app, defer=defer_blueprints and not app.testing and not listing_routes())
 
     return app
 
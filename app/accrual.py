@@ -0,0 +1,251 @@
+"""
+AIRBNB MANAGER V4.0 - INGRESOS DEVENGADOS POR NOCHE
+Reconocimiento de ingresos por noche de servicio: el total pagado de cada
+estancia (Stay.paid_total, la suma de sus pagos) se reparte en partes iguales
+entre sus noches y se guarda en stay_night_revenue. Los reportes de caja
+siguen atribuyendo cada pago a su fecha de pago; los devengados atribuyen el
+ingreso a las noches en que se prestó el servicio, así una estancia larga que
+cruza meses reparte su ingreso entre ellos.
+
+    accrued(start, end, by=('month',))   # [{'month': 202501, 'total': ..., 'nights': ...}, ...]
+
+Una estancia abierta (sin check-out) devenga en su primera noche, igual que
+en las reservas y en las matrices de ocupación. Las estancias sin pagos no
+tienen filas.
+
+Las escrituras de estancias (pagos vía record_payment, fechas, habitación)
+reescriben las filas de esas estancias en la misma transacción; las
+sentencias masivas sin llaves reconstruyen la tabla completa. Recalcular todo:
+`flask accrual-revenue --rebuild`.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.day_keys import day_key
+from app.extensions import db
+from app.models import Stay, StayNightRevenue
+
+
+BATCH_SIZE = 5000
+
+# Llaves por sentencia IN (límite de parámetros de SQLite)
+_ID_CHUNK = 500
+
+DIMENSIONS = {
+    'month': StayNightRevenue.night_day // 100,
+    'night': StayNightRevenue.night_day,
+    'room_id': StayNightRevenue.room_id,
+}
+
+# Columnas de Stay que cambian las noches o el monto a repartir
+_TRACKED = ('check_in_date', 'check_out_date', 'room_id', 'paid_total')
+_TRACKED_BULK = set(_TRACKED) | {'check_in_day', 'check_out_day'}
+
+
+# === REPARTO (VECTORIZADO) ===
+
+def _keys_to_days(np, keys):
+    """Claves yyyymmdd -> días desde 1970-01-01"""
+    months = (keys // 10000 - 1970) * 12 + keys // 100 % 100 - 1
+    return months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + keys % 100 - 1
+
+
+def _days_to_keys(np, days):
+    dates = days.astype('datetime64[D]')
+    months = dates.astype('datetime64[M]')
+    month_index = months.astype(np.int64)
+    day_of_month = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    return (month_index // 12 + 1970) * 10000 + (month_index % 12 + 1) * 100 + day_of_month
+
+
+def allocate(stays: Sequence) -> List[Dict]:
+    """
+    Filas de stay_night_revenue para (id, room_id, check_in_day, check_out_day,
+    paid_total) de cada estancia: una por noche con el total pagado / noches.
+    """
+    import numpy as np
+
+    stays = [stay for stay in stays if stay[2] is not None and stay[4]]
+    if not stays:
+        return []
+    count = len(stays)
+    ids = np.fromiter((stay[0] for stay in stays), dtype=np.int64, count=count)
+    rooms = np.fromiter((stay[1] for stay in stays), dtype=np.int64, count=count)
+    check_in = _keys_to_days(np, np.fromiter((stay[2] for stay in stays), dtype=np.int64, count=count))
+    check_out_keys = np.fromiter((stay[3] or 0 for stay in stays), dtype=np.int64, count=count)
+    check_out = np.where(check_out_keys > 0, _keys_to_days(np, np.maximum(check_out_keys, 19700101)), check_in + 1)
+    nights = np.maximum(check_out - check_in, 1)
+    paid = np.fromiter((stay[4] for stay in stays), dtype=np.float64, count=count)
+
+    # Una fila por noche: índice de la estancia y desplazamiento desde su entrada
+    owner = np.repeat(np.arange(count), nights)
+    offset = np.arange(owner.size) - np.repeat(np.cumsum(nights) - nights, nights)
+    night_keys = _days_to_keys(np, check_in[owner] + offset)
+    amounts = (paid / nights)[owner]
+
+    return [
+        {'stay_id': stay_id, 'night_day': night, 'room_id': room_id, 'amount': amount}
+        for stay_id, night, room_id, amount in zip(
+            ids[owner].tolist(), night_keys.tolist(), rooms[owner].tolist(), amounts.tolist())
+    ]
+
+
+def _stay_rows(connection, criteria):
+    return connection.execute(
+        select(Stay.id, Stay.room_id, Stay.check_in_day, Stay.check_out_day, Stay.paid_total)
+        .where(criteria).order_by(Stay.id)
+    ).all()
+
+
+def _write(connection, rows: List[Dict]) -> int:
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(insert(StayNightRevenue), rows[start:start + BATCH_SIZE])
+    return len(rows)
+
+
+def _add_stays(connection, stay_ids: List[int]) -> None:
+    for start in range(0, len(stay_ids), _ID_CHUNK):
+        _write(connection, allocate(_stay_rows(connection, Stay.id.in_(stay_ids[start:start + _ID_CHUNK]))))
+
+
+def sync_stays(connection, stay_ids: Iterable[int]) -> None:
+    """Reescribe las filas de las estancias indicadas desde sus valores actuales en la base"""
+    stay_ids = sorted({stay_id for stay_id in stay_ids if stay_id is not None})
+    for start in range(0, len(stay_ids), _ID_CHUNK):
+        connection.execute(delete(StayNightRevenue).where(
+            StayNightRevenue.stay_id.in_(stay_ids[start:start + _ID_CHUNK])))
+    _add_stays(connection, stay_ids)
+
+
+def rebuild(connection=None) -> int:
+    """Recalcula la tabla completa por lotes de estancias; retorna la cantidad de filas"""
+    connection = connection or db.session.connection()
+    connection.execute(delete(StayNightRevenue))
+    written = 0
+    last_id = 0
+    while True:
+        stays = connection.execute(
+            select(Stay.id, Stay.room_id, Stay.check_in_day, Stay.check_out_day, Stay.paid_total)
+            .where(Stay.id > last_id).order_by(Stay.id).limit(BATCH_SIZE)
+        ).all()
+        if not stays:
+            return written
+        written += _write(connection, allocate(stays))
+        last_id = stays[-1][0]
+
+
+# === LECTURA ===
+
+def accrued(start=None, end=None, by: Sequence[str] = ()) -> List[Dict]:
+    """Ingresos devengados en el rango de noches [start, end] agrupados por `by`"""
+    unknown = set(by) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f'Dimensiones desconocidas: {", ".join(sorted(unknown))}')
+
+    columns = [DIMENSIONS[name] for name in by]
+    query = select(*columns, func.sum(StayNightRevenue.amount), func.count()).group_by(*columns)
+    if start:
+        query = query.where(StayNightRevenue.night_day >= day_key(start))
+    if end:
+        query = query.where(StayNightRevenue.night_day <= day_key(end))
+    return [dict(zip(by, row[:len(by)]), total=round(row[-2] or 0.0, 2), nights=row[-1])
+            for row in db.session.execute(query)]
+
+
+def accrued_total(start=None, end=None) -> float:
+    rows = accrued(start, end)
+    return rows[0]['total'] if rows else 0.0
+
+
+def find_mismatches(tolerance: float = 0.01) -> List[Dict]:
+    """Estancias cuyo devengado no suma su total pagado"""
+    accrued_by_stay = (
+        select(StayNightRevenue.stay_id, func.sum(StayNightRevenue.amount).label('amount'))
+        .group_by(StayNightRevenue.stay_id).subquery()
+    )
+    amount = func.coalesce(accrued_by_stay.c.amount, 0.0)
+    expected = func.coalesce(Stay.paid_total, 0.0)
+    rows = db.session.execute(
+        select(Stay.id, expected, amount)
+        .outerjoin(accrued_by_stay, accrued_by_stay.c.stay_id == Stay.id)
+        .where(Stay.check_in_day.isnot(None), func.abs(expected - amount) > tolerance)
+    ).all()
+    return [{'stay_id': stay_id, 'paid_total': paid, 'accrued': round(total, 2)} for stay_id, paid, total in rows]
+
+
+# === ACTUALIZACIÓN INCREMENTAL (EVENTOS DE SESIÓN) ===
+
+_PENDING_KEY = 'accrual_stays'
+
+
+def _changed(obj) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _TRACKED)
+
+
+@event.listens_for(Session, 'before_flush')
+def _before_flush(session, flush_context, instances):
+    # El historial de atributos asignados con expresiones SQL (paid_total + monto)
+    # ya no está disponible después del flush
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    pending.update(obj.id for obj in session.deleted if isinstance(obj, Stay))
+    pending.update(obj.id for obj in session.dirty if isinstance(obj, Stay) and _changed(obj))
+
+
+@event.listens_for(Session, 'after_flush')
+def _on_flush(session, flush_context):
+    stay_ids = session.info.pop(_PENDING_KEY, set())
+    stay_ids.update(obj.id for obj in session.new if isinstance(obj, Stay))
+    if stay_ids:
+        sync_stays(session.connection(), stay_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_execute(orm_execute_state):
+    """Sentencias masivas sobre stay: se ejecutan aquí y luego se reescriben las estancias afectadas"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None or table.name != Stay.__tablename__:
+        return None
+
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters] if parameters else []
+    session = orm_execute_state.session
+
+    if orm_execute_state.is_insert and rows:
+        # Estancias nuevas sin pagos no devengan nada
+        if not any(row.get('paid_total') for row in rows):
+            return None
+        returning = [column['name'] for column in orm_execute_state.statement.returning_column_descriptions]
+        if 'id' in returning:
+            # Los IDs salen del RETURNING; el resultado se congela para devolverlo intacto
+            frozen = orm_execute_state.invoke_statement().freeze()
+            stay_ids = [row.id for row in frozen()]
+            _add_stays(session.connection(), stay_ids)
+            return frozen()
+        last_id = session.connection().execute(select(func.max(Stay.id))).scalar() or 0
+        result = orm_execute_state.invoke_statement()
+        connection = session.connection()
+        _write(connection, allocate(_stay_rows(connection, Stay.id > last_id)))
+        return result
+
+    if orm_execute_state.is_update and rows and all('id' in row for row in rows):
+        # UPDATE por llave primaria (executemany): solo las estancias con columnas relevantes
+        stay_ids = [row['id'] for row in rows if _TRACKED_BULK & set(row)]
+        result = orm_execute_state.invoke_statement()
+        if stay_ids:
+            sync_stays(session.connection(), stay_ids)
+        return result
+
+    result = orm_execute_state.invoke_statement()
+    rebuild(session.connection())
+    return result
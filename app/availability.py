@@ -0,0 +1,208 @@
+"""
+AIRBNB MANAGER V4.0 - MOTOR ÚNICO DE DISPONIBILIDAD
+Consulta de ocupación compartida por las rutas AJAX, el motor de inteligencia y
+el de yield management, con una sola semántica de noches (la de
+app/reservations.py: el día de salida de una estancia puede ser el de entrada
+de otra y solo ocupan las estancias activas o pendientes de cierre).
+
+`restricted_room_ids` agrega la estadía mínima y los cierres a llegadas y
+salidas de cada habitación.
+
+Los resultados se guardan en un caché LRU por (rango de noches, tier, filtros)
+que se vacía cada vez que se escribe una estancia o una habitación, de modo que
+las consultas repetidas del formulario de reserva se sirven desde memoria.
+Los demás workers se enteran por el sello 'stays' (app/stamped_cache.py).
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.day_keys import day_key
+from app.extensions import db
+from app.models import Room, Stay
+from app.repository import get_repository
+from app.room_catalog import get_catalog
+from app.stamped_cache import StampedCache, watch_tables
+from app.reservations import night_bounds, overlap_filter
+
+
+STAYS_STAMP = 'stays'
+
+
+class AvailabilityIndex(StampedCache):
+    """Caché LRU de ocupación: el valor del caché es el diccionario de resultados"""
+
+    stamp_name = STAYS_STAMP
+
+    def __init__(self, maxsize: int = 512):
+        super().__init__()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict:
+        return {'version': self.version, 'entries': len(self._value or ()), 'hits': self.hits, 'misses': self.misses}
+
+    def _load(self, connection, stamp: int) -> OrderedDict:
+        # Los resultados se cargan por clave en _cached; aquí solo se empieza un LRU vacío
+        return OrderedDict()
+
+    # === CONSULTAS ===
+
+    def occupied_room_ids(self, check_in, check_out=None, exclude_stay_id: Optional[int] = None) -> FrozenSet[int]:
+        """IDs de habitaciones con alguna noche ocupada en [check_in, check_out)"""
+        start, end = night_bounds(check_in, check_out)
+        return self._cached(('occupied', start, end, exclude_stay_id),
+                            lambda: self._load_occupied(start, end, exclude_stay_id))
+
+    def available_room_ids(self, check_in, check_out=None, tier: Optional[str] = None,
+                           exclude_stay_id: Optional[int] = None, exclude_room_ids=()) -> Tuple[int, ...]:
+        """IDs (en orden de ID) de habitaciones libres en todo el rango, opcionalmente de un tier"""
+        start, end = night_bounds(check_in, check_out)
+        filters = (exclude_stay_id, tuple(sorted(set(exclude_room_ids))))
+        return self._cached(('available', start, end, tier, filters),
+                            lambda: self._load_available(start, end, tier, exclude_stay_id, filters[1]))
+
+    def _cached(self, key, load):
+        results = self.value()
+        with self._lock:
+            if key in results:
+                results.move_to_end(key)
+                self.hits += 1
+                return results[key]
+            self.misses += 1
+            version = self.version
+
+        value = load()
+        with self._lock:
+            # Si se escribió una estancia mientras cargábamos, el resultado ya es viejo
+            if self.version == version:
+                results[key] = value
+                while len(results) > self.maxsize:
+                    results.popitem(last=False)
+        return value
+
+    def _load_occupied(self, start: datetime, end: datetime, exclude_stay_id: Optional[int]) -> FrozenSet[int]:
+        query = select(Stay.room_id).where(*overlap_filter(start, end), Stay.room_id.isnot(None))
+        if exclude_stay_id is not None:
+            query = query.where(Stay.id != exclude_stay_id)
+        return frozenset(db.session.scalars(query.distinct()))
+
+    def _load_available(self, start: datetime, end: datetime, tier: Optional[str],
+                        exclude_stay_id: Optional[int], exclude_room_ids: Tuple[int, ...]) -> Tuple[int, ...]:
+        excluded = self.occupied_room_ids(start, end, exclude_stay_id).union(exclude_room_ids)
+        return tuple(room_id for room_id in get_catalog().ids(tier) if room_id not in excluded)
+
+
+availability_index = AvailabilityIndex()
+
+
+# === API DEL MÓDULO ===
+
+def occupied_room_ids(check_in, check_out=None, exclude_stay_id: Optional[int] = None) -> FrozenSet[int]:
+    return availability_index.occupied_room_ids(check_in, check_out, exclude_stay_id)
+
+
+def available_rooms(check_in, check_out=None, tier: Optional[str] = None,
+                    exclude_stay_id: Optional[int] = None, exclude_room_ids=()) -> List[Room]:
+    """Habitaciones libres en todo el rango, tomadas del repositorio de la petición"""
+    room_ids = availability_index.available_room_ids(check_in, check_out, tier, exclude_stay_id, exclude_room_ids)
+    repo = get_repository()
+    return [repo.room(room_id) for room_id in room_ids]
+
+
+def restricted_room_ids(check_in, check_out, room_ids=None) -> Dict[int, str]:
+    """
+    Habitaciones (de `room_ids`, o todas) que no aceptan la estancia por su
+    estadía mínima o sus cierres a llegadas/salidas, con el motivo
+    (calendario de huecos, app/calendar_gaps.py)
+    """
+    from app.calendar_gaps import get_calendar
+
+    calendar = get_calendar()
+    restricted = {}
+    for room_id in (room_ids if room_ids is not None else get_catalog().ids()):
+        reason = calendar.restriction(room_id, check_in, check_out)
+        if reason:
+            restricted[room_id] = reason
+    return restricted
+
+
+def check_room_availability(check_in, check_out):
+    """Verifica qué habitaciones están ocupadas en el rango de fechas dado."""
+    if not check_in or not check_out:
+        return []
+    return sorted(occupied_room_ids(check_in, check_out))
+
+
+def find_booking_solutions(check_in, check_out):
+    """Encuentra soluciones de reserva para el rango de fechas dado."""
+    start, end = night_bounds(check_in, check_out)
+    unavailable_room_ids = occupied_room_ids(start, end)
+    all_rooms = get_repository().rooms()
+
+    solutions = []
+
+    # Solución 1: Habitaciones completamente libres
+    available = [room for room in all_rooms if room.id not in unavailable_room_ids]
+    if available:
+        solutions.append({
+            'type': 'available',
+            'title': 'Habitaciones Disponibles',
+            'description': f'{len(available)} habitación(es) completamente libre(s)',
+            'rooms': [{'id': r.id, 'name': r.name, 'tier': r.get_tier_display()} for r in available],
+            'priority': 'high'
+        })
+
+    # Solución 2: Habitaciones que se liberarán pronto
+    today = date.today()
+    soon_available = Stay.query.filter(
+        Stay.room_id.in_(unavailable_room_ids),
+        Stay.check_out_day <= day_key(today + timedelta(days=3)),
+        Stay.check_out_day < day_key(start)
+    ).all() if unavailable_room_ids else []
+
+    if soon_available:
+        rooms_info = []
+        for stay in soon_available:
+            rooms_info.append({
+                'id': stay.room.id,
+                'name': stay.room.name,
+                'available_date': stay.check_out_date.strftime('%d/%m/%Y'),
+                'client': stay.client.full_name
+            })
+
+        solutions.append({
+            'type': 'soon_available',
+            'title': 'Se Liberarán Pronto',
+            'description': f'{len(rooms_info)} habitación(es) se liberarán antes de la fecha',
+            'rooms': rooms_info,
+            'priority': 'medium'
+        })
+
+    # Solución 3: Sugerir fechas alternativas
+    if not available:
+        next_week = start + timedelta(days=7)
+        future_occupied = occupied_room_ids(next_week, next_week + (end - start))
+        future_available = [room for room in all_rooms if room.id not in future_occupied]
+
+        if future_available:
+            solutions.append({
+                'type': 'alternative_dates',
+                'title': 'Fechas Alternativas',
+                'description': f'Disponibilidad la próxima semana ({next_week.strftime("%d/%m/%Y")})',
+                'rooms': [{'id': r.id, 'name': r.name, 'tier': r.get_tier_display()} for r in future_available],
+                'suggested_date': next_week.strftime('%Y-%m-%d'),
+                'priority': 'low'
+            })
+
+    return solutions
+
+
+# === INVALIDACIÓN ===
+# Escribir una estancia o una habitación vacía los resultados (sello 'stays')
+
+watch_tables(availability_index, (Stay, Room))
@@ -0,0 +1,246 @@
+"""
+AIRBNB MANAGER V4.0 - ARNÉS DE BENCHMARK
+Ejecuta los endpoints principales con el cliente de pruebas de Flask y reporta
+latencias (p50/p99) y cantidad de consultas SQL en un archivo JSON comparable
+entre commits.
+"""
+
+import json
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import User, Room, Client, Stay, Payment
+
+
+def default_scenarios() -> List[Dict]:
+    """Escenarios por defecto: endpoints críticos del panel y del motor de reservas"""
+    check_in = date.today() + timedelta(days=7)
+    check_out = check_in + timedelta(days=4)
+    booking = {
+        'check_in': check_in.strftime('%Y-%m-%d'),
+        'check_out': check_out.strftime('%Y-%m-%d'),
+        'guests': 2
+    }
+    return [
+        {'name': 'panel_index', 'method': 'GET', 'url': '/'},
+        {'name': 'availability_grid', 'method': 'GET', 'url': '/ajax/get_availability_grid?days=14'},
+        {'name': 'suggest_availability', 'method': 'POST', 'url': '/intelligence/suggest_availability',
+         'json': dict(booking, preferred_tier='Queen', flexible_dates=True)},
+        {'name': 'find_booking_solutions', 'method': 'POST', 'url': '/ajax/find_booking_solutions',
+         'json': booking},
+        {'name': 'dashboard_notifications', 'method': 'GET', 'url': '/intelligence/dashboard_notifications'},
+        {'name': 'reports', 'method': 'GET', 'url': '/reports'},
+    ]
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL ejecutadas sobre un engine mientras está activo"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        return False
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (sin dependencias externas)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+@contextmanager
+def _logged_in_client(app, username: Optional[str] = None):
+    """Cliente de pruebas con sesión iniciada (por defecto, el primer dueño)"""
+    with app.app_context():
+        query = User.query.filter_by(username=username) if username else User.query.filter_by(role='dueño')
+        user = query.first()
+        if not user:
+            raise RuntimeError('No hay usuario para el benchmark; genera datos con `flask generate-data`')
+        user_id = user.id
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    yield client
+
+
+def _dataset_summary(app) -> Dict[str, int]:
+    with app.app_context():
+        return {
+            'rooms': Room.query.count(),
+            'clients': Client.query.count(),
+            'stays': Stay.query.count(),
+            'payments': Payment.query.count()
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, timeout=5)
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(app, iterations: int = 20, warmup: int = 2, username: Optional[str] = None,
+                  scenarios: Optional[List[Dict]] = None) -> Dict:
+    """
+    Ejecuta cada escenario `warmup + iterations` veces y retorna las métricas:
+    latencia p50/p99/media en milisegundos y consultas SQL por request.
+    """
+    scenarios = scenarios or default_scenarios()
+    with app.app_context():
+        engine = db.engine
+
+    results = {}
+    with _logged_in_client(app, username) as client:
+        for scenario in scenarios:
+            latencies, query_counts, statuses, errors = [], [], set(), set()
+            for i in range(warmup + iterations):
+                with QueryCounter(engine) as counter:
+                    started = time.perf_counter()
+                    try:
+                        response = client.open(scenario['url'], method=scenario['method'],
+                                               json=scenario.get('json'))
+                        status = response.status_code
+                    except Exception as e:
+                        # Con DEBUG activo las excepciones se propagan; se registran sin abortar
+                        status = 500
+                        errors.add(f'{type(e).__name__}: {e}')
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                if i < warmup:
+                    continue
+                latencies.append(elapsed_ms)
+                query_counts.append(counter.count)
+                statuses.add(status)
+
+            results[scenario['name']] = {
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+                'queries_p50': percentile(query_counts, 50),
+                'queries_max': max(query_counts) if query_counts else 0,
+                'status_codes': sorted(statuses),
+                'errors': sorted(errors)
+            }
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'iterations': iterations,
+        'dataset': _dataset_summary(app),
+        'results': results
+    }
+
+
+def compare_results(baseline: Dict, current: Dict) -> List[Dict]:
+    """Compara dos reportes y retorna las diferencias por escenario"""
+    rows = []
+    for name, metrics in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        rows.append({
+            'scenario': name,
+            'p50_before': previous['p50_ms'],
+            'p50_after': metrics['p50_ms'],
+            'p50_change_pct': _change_pct(previous['p50_ms'], metrics['p50_ms']),
+            'queries_before': previous['queries_p50'],
+            'queries_after': metrics['queries_p50']
+        })
+    return rows
+
+
+def _change_pct(before: float, after: float) -> float:
+    return round((after - before) / before * 100, 1) if before else 0.0
+
+
+def save_results(results: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# === PERFIL DE ARRANQUE ===
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+created = time.perf_counter()
+deferred_ms = None
+if {load_deferred}:
+    from app.routes import load_deferred_blueprints
+    load_deferred_blueprints(app)
+    deferred_ms = round((time.perf_counter() - created) * 1000, 1)
+print(json.dumps({{'create_app_ms': round((created - started) * 1000, 1), 'deferred_ms': deferred_ms}}))
+"""
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """Filas de `python -X importtime`: módulo, profundidad, ms propios y acumulados"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': round(int(self_us) / 1000, 2),
+            'cumulative_ms': round(int(cumulative_us) / 1000, 2)
+        })
+    return rows
+
+
+def profile_startup(load_deferred: bool = False, top: int = 15, cwd: Optional[str] = None) -> Dict:
+    """
+    Arranca `create_app()` en un proceso nuevo con `-X importtime` y reporta el
+    tiempo total y los módulos más caros de importar (los de la app aparte).
+    Con `load_deferred` también registra los blueprints diferidos.
+    """
+    import os
+    import sys
+
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             _STARTUP_SCRIPT.format(load_deferred=bool(load_deferred))],
+                            cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+    by_cumulative = sorted(modules, key=lambda row: row['cumulative_ms'], reverse=True)
+    return dict(timings, **{
+        'modules_imported': len(modules),
+        'import_ms': round(sum(row['self_ms'] for row in modules), 1),
+        'top_modules': [row for row in by_cumulative if row['depth'] <= 1][:top],
+        'app_modules': [row for row in by_cumulative if row['module'] == 'app' or row['module'].startswith('app.')][:top]
+    })
@@ -0,0 +1,328 @@
+"""
+AIRBNB MANAGER V4.0 - HUECOS DEL CALENDARIO Y RESTRICCIONES DE ESTADÍA
+Calendario de noches libres por habitación para el próximo año, armado con una
+sola consulta de estancias ordenadas por (habitación, llegada) y un barrido
+por habitación:
+
+    huecos        noches libres entre dos estancias; los de hasta
+                  ORPHAN_MAX_NIGHTS noches son huecos huérfanos (nadie los reserva
+                  si la estadía mínima es mayor y quedan vacíos)
+    free_run      noches libres consecutivas desde cada día
+    restricciones estadía mínima, cerrado a llegadas y cerrado a salidas por día
+                  (app/rate_plans.py); dentro de un hueco huérfano la estadía
+                  mínima baja al largo del hueco para poder llenarlo
+
+Con eso, saber si una habitación acepta una estancia es una búsqueda en
+arreglos (`allows`), sin consultas. Se recalcula cuando cambia la versión del
+índice de disponibilidad (escritura de estancias o habitaciones, en este
+worker o en otro a través del sello 'stays'), la compilación de los planes de
+tarifas o el día.
+
+Uso:
+    calendar = get_calendar()
+    calendar.allows(room_id, date(2025, 7, 3), date(2025, 7, 5))
+    calendar.orphan_gaps(date.today(), 30)
+"""
+
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+
+from app.availability import availability_index
+from app.day_keys import day_key, from_day_key
+from app.extensions import db
+from app.models import Stay
+from app.rate_plans import get_rate_card
+from app.reservations import OCCUPYING_STATUSES
+from app.room_catalog import get_catalog
+
+
+CALENDAR_DAYS = 365
+# Huecos entre estancias de hasta estas noches se consideran huérfanos
+ORPHAN_MAX_NIGHTS = 2
+# Descuento sugerido para vender un hueco huérfano como estancia corta
+GAP_FILL_DISCOUNT = 0.15
+
+# Motivos por los que una habitación no acepta una estancia
+VIOLATIONS = ('outside', 'occupied', 'min_stay', 'closed_to_arrival', 'closed_to_departure')
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+@dataclass(frozen=True)
+class Gap:
+    """Noches libres [start, end) de una habitación antes de una estancia"""
+    room_id: int
+    room_name: str
+    tier: str
+    start: date
+    end: date
+    before_stay_id: Optional[int]   # Estancia que sale el día `start` (None: el hueco empieza hoy)
+    after_stay_id: int              # Estancia que llega el día `end`
+    min_stay: int                   # Estadía mínima del plan para llegar el día `start`
+
+    @property
+    def nights(self) -> int:
+        return (self.end - self.start).days
+
+    @property
+    def restricted(self) -> bool:
+        """El hueco no se podría vender sin relajar la estadía mínima"""
+        return self.nights < self.min_stay
+
+    def to_dict(self) -> Dict:
+        return {
+            'room_id': self.room_id,
+            'room_name': self.room_name,
+            'tier': self.tier,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'nights': self.nights,
+            'before_stay_id': self.before_stay_id,
+            'after_stay_id': self.after_stay_id,
+            'min_stay': self.min_stay,
+            'restricted': self.restricted,
+        }
+
+
+class GapCalendar:
+    """Calendario de noches libres y restricciones por habitación desde `start`"""
+
+    def __init__(self, key: Tuple, start: date, days: int, room_ids: Tuple[int, ...], free_run: np.ndarray,
+                 min_stay: np.ndarray, closed_arrival: np.ndarray, closed_departure: np.ndarray,
+                 gaps: List[Gap]):
+        self.key = key
+        self.start = start
+        self.days = days
+        self.room_ids = room_ids
+        self._row = {room_id: row for row, room_id in enumerate(room_ids)}
+        self.free_run = free_run
+        self.min_stay = min_stay
+        self.closed_arrival = closed_arrival
+        self.closed_departure = closed_departure
+        self.gaps = gaps
+        self._orphans = {(gap.room_id, gap.start): gap for gap in gaps if gap.nights <= ORPHAN_MAX_NIGHTS}
+
+    def covers(self, check_in, check_out) -> bool:
+        first = (_as_date(check_in) - self.start).days
+        return 0 <= first and first + (_as_date(check_out) - _as_date(check_in)).days <= self.days
+
+    def violation(self, room_id: int, check_in, check_out) -> Optional[str]:
+        """Primer motivo (de VIOLATIONS) por el que la habitación no acepta la estancia, o None"""
+        row = self._row.get(room_id)
+        first = (_as_date(check_in) - self.start).days
+        nights = (_as_date(check_out) - _as_date(check_in)).days
+        if row is None or nights < 1 or first < 0 or first + nights > self.days:
+            return 'outside'
+        if self.free_run[row, first] < nights:
+            return 'occupied'
+        return self.restriction(room_id, check_in, check_out)
+
+    def restriction(self, room_id: int, check_in, check_out=None) -> Optional[str]:
+        """
+        Restricción de estadía que la estancia no cumple (min_stay,
+        closed_to_arrival o closed_to_departure), sin mirar la ocupación. None si
+        la cumple o si cae fuera del calendario; una estancia abierta (sin
+        check-out) solo se valida contra el cierre a llegadas.
+        """
+        row = self._row.get(room_id)
+        first = (_as_date(check_in) - self.start).days
+        if row is None or not 0 <= first < self.days:
+            return None
+        if check_out is None:
+            return 'closed_to_arrival' if self.closed_arrival[row, first] else None
+        nights = (_as_date(check_out) - _as_date(check_in)).days
+        if nights < 1 or first + nights > self.days:
+            return None
+        if nights < self.min_stay[row, first]:
+            return 'min_stay'
+        if self.closed_arrival[row, first]:
+            return 'closed_to_arrival'
+        if self.closed_departure[row, first + nights]:
+            return 'closed_to_departure'
+        return None
+
+    def min_nights(self, room_id: int, check_in) -> int:
+        """Estadía mínima de una llegada (1 fuera del calendario)"""
+        row = self._row.get(room_id)
+        first = (_as_date(check_in) - self.start).days
+        if row is None or not 0 <= first < self.days:
+            return 1
+        return int(self.min_stay[row, first])
+
+    def allows(self, room_id: int, check_in, check_out) -> bool:
+        return self.violation(room_id, check_in, check_out) is None
+
+    def allowed_room_ids(self, check_in, check_out, tier: Optional[str] = None) -> List[int]:
+        """IDs (en orden de ID) de habitaciones libres y sin restricciones para la estancia"""
+        first = (_as_date(check_in) - self.start).days
+        nights = (_as_date(check_out) - _as_date(check_in)).days
+        if nights < 1 or first < 0 or first + nights > self.days:
+            return []
+        rows = np.array([self._row[room_id] for room_id in get_catalog().ids(tier) if room_id in self._row],
+                        dtype=np.int64)
+        if not rows.size:
+            return []
+        allowed = (self.free_run[rows, first] >= nights) & (self.min_stay[rows, first] <= nights) & \
+            ~self.closed_arrival[rows, first] & ~self.closed_departure[rows, first + nights]
+        return [self.room_ids[row] for row in rows[allowed]]
+
+    def fills_gap(self, room_id: int, check_in, check_out) -> Optional[Gap]:
+        """Hueco huérfano que la estancia ocupa completo, si lo hay"""
+        gap = self._orphans.get((room_id, _as_date(check_in)))
+        return gap if gap is not None and gap.end == _as_date(check_out) else None
+
+    def orphan_gaps(self, start: Optional[date] = None, days: Optional[int] = None,
+                    tier: Optional[str] = None) -> List[Gap]:
+        """Huecos huérfanos que empiezan en [start, start + days), por fecha y habitación"""
+        start = start or self.start
+        end = start + timedelta(days=days if days is not None else self.days)
+        return [gap for gap in self._orphans.values()
+                if start <= gap.start < end and (tier is None or gap.tier == tier)]
+
+
+# === CONSTRUCCIÓN ===
+
+def _occupying_stays(start: date, days: int):
+    """Estancias que ocupan alguna noche de la ventana, ordenadas por habitación y llegada"""
+    return db.session.execute(
+        select(Stay.id, Stay.room_id, Stay.check_in_day, Stay.check_out_day)
+        .where(Stay.status.in_(OCCUPYING_STATUSES), Stay.room_id.isnot(None),
+               Stay.check_in_day < day_key(start + timedelta(days=days)),
+               or_(Stay.check_out_day.is_(None), Stay.check_out_day > day_key(start)))
+        .order_by(Stay.room_id, Stay.check_in_day, Stay.id)
+    ).all()
+
+
+def build_calendar(start: date, days: int = CALENDAR_DAYS, key: Tuple = ()) -> GapCalendar:
+    catalog = get_catalog()
+    rooms = catalog.rooms
+    row_of = {room.id: row for row, room in enumerate(rooms)}
+    origin = start.toordinal()
+
+    # Barrido por habitación: cada estancia cierra el hueco abierto desde la salida anterior
+    occupancy = np.zeros((len(rooms), days + 1), dtype=np.int64)
+    spans = []
+    current_room, free_from, previous_stay = None, 0, None
+    for stay_id, room_id, check_in_key, check_out_key in _occupying_stays(start, days):
+        row = row_of.get(room_id)
+        if row is None:
+            continue
+        arrival = from_day_key(check_in_key).toordinal() - origin
+        first = max(arrival, 0)
+        # Sin check-out la estancia ocupa hasta el final (igual que overlap_filter)
+        last = days if check_out_key is None else min(from_day_key(check_out_key).toordinal() - origin, days)
+        if last <= first:
+            continue
+        if room_id != current_room:
+            current_room, free_from, previous_stay = room_id, 0, None
+        if first > free_from:
+            spans.append((row, free_from, first, previous_stay, stay_id))
+        occupancy[row, first] += 1
+        occupancy[row, last] -= 1
+        if last >= free_from:
+            free_from, previous_stay = last, stay_id
+
+    occupied = np.cumsum(occupancy[:, :days], axis=1) > 0
+    # Noches libres consecutivas: distancia a la próxima noche ocupada (o al final)
+    nights = np.arange(days)
+    next_busy = np.minimum.accumulate(np.where(occupied, nights, days)[:, ::-1], axis=1)[:, ::-1]
+    free_run = np.concatenate((next_busy - nights, np.zeros((len(rooms), 1), dtype=np.int64)), axis=1)
+
+    # Restricciones del plan de cada habitación (un cálculo por plan)
+    card = get_rate_card()
+    min_stay = np.ones((len(rooms), days + 1), dtype=np.int64)
+    closed_arrival = np.zeros((len(rooms), days + 1), dtype=bool)
+    closed_departure = np.zeros((len(rooms), days + 1), dtype=bool)
+    by_plan = {}
+    for row, room in enumerate(rooms):
+        plan = card.plan_for(room)
+        if plan.key not in by_plan:
+            by_plan[plan.key] = card.restrictions(plan, start, days + 1)
+        min_stay[row], closed_arrival[row], closed_departure[row] = by_plan[plan.key]
+
+    gaps = []
+    for row, first, last, before_stay, after_stay in spans:
+        room = rooms[row]
+        gaps.append(Gap(room.id, room.name, room.tier, start + timedelta(days=first), start + timedelta(days=last),
+                        before_stay, after_stay, int(min_stay[row, first])))
+        if last - first <= ORPHAN_MAX_NIGHTS:
+            # Dentro del hueco huérfano se acepta cualquier estancia que lo llene hasta el final
+            min_stay[row, first:last] = np.minimum(min_stay[row, first:last], free_run[row, first:last])
+    gaps.sort(key=lambda gap: (gap.start, gap.room_id))
+
+    return GapCalendar(key, start, days, tuple(room.id for room in rooms), free_run, min_stay,
+                       closed_arrival, closed_departure, gaps)
+
+
+class GapCalendarCache:
+    """Último calendario construido, por (base, versión de ocupación, planes, día)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calendar: Optional[GapCalendar] = None
+        self.builds = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._calendar = None
+
+    def calendar(self) -> GapCalendar:
+        today = date.today()
+        # Escrituras de otros workers: el sello 'stays' recarga el índice y sube su versión
+        availability_index.value()
+        version = availability_index.version
+        key = (db.engine, version, get_rate_card().generation, today)
+        calendar = self._calendar
+        if calendar is not None and calendar.key == key:
+            return calendar
+
+        calendar = build_calendar(today, CALENDAR_DAYS, key)
+        with self._lock:
+            # Si se escribió una estancia mientras construíamos, no se guarda
+            if availability_index.version == version:
+                self._calendar = calendar
+                self.builds += 1
+        return calendar
+
+
+gap_calendar_cache = GapCalendarCache()
+
+
+def get_calendar() -> GapCalendar:
+    return gap_calendar_cache.calendar()
+
+
+# === SUGERENCIAS PARA LLENAR HUECOS ===
+
+def gap_fill_suggestions(start: Optional[date] = None, days: int = 30, tier: Optional[str] = None,
+                         limit: Optional[int] = None) -> List[Dict]:
+    """
+    Huecos huérfanos de los próximos `days` días con el precio del hueco, una
+    tarifa sugerida y las acciones posibles: extender la estancia anterior,
+    adelantar la llegada de la siguiente o venderlo como estancia corta.
+    """
+    from app.quotes import quote_room
+
+    calendar = get_calendar()
+    catalog = get_catalog()
+    gaps = calendar.orphan_gaps(start or date.today(), days, tier)[:limit]
+    suggestions = []
+    for gap in gaps:
+        price = quote_room(catalog.get(gap.room_id), gap.start, gap.end).total
+        actions = []
+        if gap.before_stay_id is not None:
+            actions.append({'type': 'extend_stay', 'stay_id': gap.before_stay_id, 'nights': gap.nights,
+                            'new_check_out': gap.end.isoformat()})
+        actions.append({'type': 'early_arrival', 'stay_id': gap.after_stay_id, 'nights': gap.nights,
+                        'new_check_in': gap.start.isoformat()})
+        actions.append({'type': 'short_stay', 'nights': gap.nights,
+                        'suggested_price': round(price * (1 - GAP_FILL_DISCOUNT), 2)})
+        suggestions.append(dict(gap.to_dict(), price=price, actions=actions))
+    return suggestions
@@ -1,6 +1,6 @@
 import click
 from flask.cli import with_appcontext
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from .extensions import db
 from .models import User, Room, Client, Stay, Payment, Expense, Task, Supply
@@ -33,7 +33,6 @@ def seed_db_command():
     elizabeth = User(username='elizabeth', role='empleada')
     elizabeth.set_password('clave123')
     db.session.add_all([jacob, alejandrina, elizabeth])
-    db.session.commit()
     click.echo("Usuarios creados.")
 
     # 3. Creamos las Habitaciones con jerarquía Queen/King
@@ -52,7 +51,6 @@ def seed_db_command():
     room8 = Room(name='King 302 - Vista Mar', tier='King', status='Limpia')
     
     db.session.add_all([room1, room2, room3, room4, room5, room6, room7, room8])
-    db.session.commit()
     click.echo("8 habitaciones creadas (5 Queen + 3 King).")
 
     # 4. Creamos los Clientes
@@ -61,28 +59,21 @@ def seed_db_command():
     client2 = Client(full_name='Ana García', phone_number='809-222-2222', email='ana.garcia@email.com')
     client3 = Client(full_name='Carlos Rodriguez', phone_number='809-333-3333')
     db.session.add_all([client1, client2, client3])
-    db.session.commit()
     click.echo("Clientes creados.")
 
     # 5. Creamos Estancias y sus Pagos asociados
     click.echo("Creando estancias y pagos...")
     stay1 = Stay(client=client1, room=room2, check_in_date=datetime.utcnow() - timedelta(days=10), check_out_date=datetime.utcnow() - timedelta(days=5), booking_channel='Airbnb')
     db.session.add(stay1)
-    db.session.commit()
-    payment1 = Payment(amount=5500.00, stay=stay1, method='Tarjeta')
-    db.session.add(payment1)
+    stay1.record_payment(5500.00, method='Tarjeta')
 
     stay2 = Stay(client=client2, room=room1, check_in_date=datetime.utcnow() - timedelta(days=3), booking_channel='Directo')
     db.session.add(stay2)
-    db.session.commit()
-    payment2 = Payment(amount=2500.00, stay=stay2, method='Efectivo')
-    db.session.add(payment2)
+    stay2.record_payment(2500.00, method='Efectivo')
 
     stay3 = Stay(client=client1, room=room3, check_in_date=datetime.utcnow() - timedelta(days=20), check_out_date=datetime.utcnow() - timedelta(days=18), booking_channel='Booking.com')
     db.session.add(stay3)
-    db.session.commit()
-    payment3 = Payment(amount=1800.00, stay=stay3, method='Efectivo')
-    db.session.add(payment3)
+    stay3.record_payment(1800.00, method='Efectivo')
     click.echo("Estancias y pagos creados.")
 
     # 6. Creamos Gastos de prueba
@@ -117,6 +108,276 @@ def seed_db_command():
     db.session.add_all([supply1, supply2, supply3, supply4, supply5, supply6, supply7, supply8, supply9, supply10])
     click.echo("Suministros creados (algunos con stock bajo para testing).")
 
-    # 8. Guardamos todos los cambios finales
+    # 8. Guardamos todo en una sola transacción (las relaciones resuelven los IDs al hacer flush)
     db.session.commit()
     click.echo("¡Base de datos poblada con datos de prueba!")
+
+
+@click.command('generate-data')
+@click.option('--rooms', default=20, show_default=True, help='Cantidad de habitaciones.')
+@click.option('--clients', default=500, show_default=True, help='Cantidad de clientes.')
+@click.option('--years', default=2.0, show_default=True, help='Años de historial de estancias.')
+@click.option('--future-days', default=90, show_default=True, help='Días de reservas futuras.')
+@click.option('--seed', default=42, show_default=True, help='Semilla para resultados reproducibles.')
+@click.option('--no-supply-usage', is_flag=True, help='No generar registros de uso de suministros.')
+@click.option('--reset/--no-reset', default=True, show_default=True, help='Limpiar los datos existentes antes de generar.')
+@click.option('--snapshot', default=None, help='Archivo SQLite de fixture: se restaura si existe, si no se genera y se guarda ahí.')
+@with_appcontext
+def generate_data_command(rooms, clients, years, future_days, seed, no_supply_usage, reset, snapshot):
+    """
+    Genera un conjunto de datos sintético grande con estacionalidad realista.
+    """
+    import os
+    from .revenue_cube import refresh_pending
+    from .synthetic_data import DatasetSpec, clear_data, generate_dataset, save_snapshot, restore_snapshot
+
+    if snapshot and os.path.exists(snapshot):
+        started = datetime.now()
+        restore_snapshot(snapshot)
+        elapsed = (datetime.now() - started).total_seconds()
+        click.echo(f"Snapshot {snapshot} restaurado en {elapsed:.1f}s.")
+        return
+
+    db.create_all()
+    if reset:
+        click.echo("Limpiando datos antiguos...")
+        clear_data()
+
+    spec = DatasetSpec(rooms=rooms, clients=clients, years=years, future_days=future_days,
+                       seed=seed, with_supply_usage=not no_supply_usage)
+    started = datetime.now()
+    counts = generate_dataset(spec)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    for table, count in counts.items():
+        click.echo(f"  {table}: {count:,}")
+    click.echo(f"¡Datos generados en {elapsed:.1f}s!")
+
+    # La carga marca el cubo de reportes completo: se recalcula aquí y no en la primera visita
+    refresh_pending()
+    click.echo("Cubo de reportes recalculado.")
+
+    if snapshot:
+        save_snapshot(snapshot)
+        click.echo(f"Snapshot guardado en {snapshot}.")
+
+
+@click.command('benchmark')
+@click.option('--iterations', default=20, show_default=True, help='Requests medidos por escenario.')
+@click.option('--warmup', default=2, show_default=True, help='Requests de calentamiento por escenario.')
+@click.option('--user', 'username', default=None, help='Usuario con el que se ejecutan los requests.')
+@click.option('--output', default='benchmark_results.json', show_default=True, help='Archivo JSON de resultados.')
+@click.option('--compare', 'compare_path', default=None, help='Reporte JSON previo para comparar.')
+@with_appcontext
+def benchmark_command(iterations, warmup, username, output, compare_path):
+    """
+    Mide latencia (p50/p99) y consultas SQL de los endpoints principales.
+    """
+    from flask import current_app
+    from .benchmark import run_benchmark, save_results, load_results, compare_results
+
+    results = run_benchmark(current_app._get_current_object(), iterations=iterations,
+                            warmup=warmup, username=username)
+    save_results(results, output)
+
+    click.echo(f"{'Escenario':<26}{'p50 ms':>10}{'p99 ms':>10}{'consultas':>11}")
+    for name, metrics in results['results'].items():
+        click.echo(f"{name:<26}{metrics['p50_ms']:>10}{metrics['p99_ms']:>10}{metrics['queries_p50']:>11}")
+    click.echo(f"Resultados guardados en {output}")
+
+    if compare_path:
+        click.echo("\nComparación con " + compare_path)
+        for row in compare_results(load_results(compare_path), results):
+            click.echo(f"{row['scenario']:<26}{row['p50_before']:>10} -> {row['p50_after']:<10}"
+                       f"({row['p50_change_pct']:+.1f}%)  consultas {row['queries_before']} -> {row['queries_after']}")
+
+
+@click.command('loadtest')
+@click.option('--workers', 'worker_counts', default='1,2,4', show_default=True,
+              help='Cantidades de workers a comparar, separadas por coma.')
+@click.option('--threads', default=4, show_default=True, help='Hilos por worker.')
+@click.option('--concurrency', default=16, show_default=True, help='Clientes HTTP concurrentes.')
+@click.option('--duration', default=10.0, show_default=True, help='Segundos de carga medidos por corrida.')
+@click.option('--user', 'username', default=None, help='Usuario con el que se ejecutan los requests.')
+@click.option('--output', default='loadtest_results.json', show_default=True, help='Archivo JSON de resultados.')
+@with_appcontext
+def loadtest_command(worker_counts, threads, concurrency, duration, username, output):
+    """
+    Mide cómo escala el throughput del servidor de producción con la cantidad de workers.
+    """
+    from flask import current_app
+    from .benchmark import save_results
+    from .loadtest import profile_workers
+
+    counts = [int(count) for count in worker_counts.split(',') if count.strip()]
+    results = profile_workers(current_app._get_current_object(), counts, threads=threads,
+                              concurrency=concurrency, duration=duration, username=username)
+    save_results(results, output)
+
+    click.echo(f"SQLite journal_mode={results['journal_mode']}, {concurrency} clientes, {duration:.0f}s por corrida")
+    click.echo(f"{'workers':>8}{'req/s':>10}{'x':>7}{'p50 ms':>10}{'p99 ms':>10}{'errores':>9}")
+    for row in results['results']:
+        click.echo(f"{row['workers']:>8}{row['rps']:>10}{row['speedup'] or 0:>7}{row['p50_ms']:>10}"
+                   f"{row['p99_ms']:>10}{row['errors']:>9}")
+    click.echo(f"Resultados guardados en {output}")
+
+
+
+@click.command('startup-profile')
+@click.option('--top', default=15, show_default=True, help='Módulos a mostrar.')
+@click.option('--load-deferred', is_flag=True, help='Incluir el registro de los blueprints diferidos.')
+def startup_profile_command(top, load_deferred):
+    """
+    Mide el arranque en frío de create_app() y el tiempo de importación por módulo.
+    """
+    from .benchmark import profile_startup
+
+    profile = profile_startup(load_deferred=load_deferred, top=top)
+    click.echo(f"create_app(): {profile['create_app_ms']} ms, {profile['modules_imported']} módulos importados")
+    if profile['deferred_ms'] is not None:
+        click.echo(f"Blueprints diferidos: {profile['deferred_ms']} ms")
+
+    for title, rows in (('Módulos más caros', profile['top_modules']), ('Módulos de la app', profile['app_modules'])):
+        click.echo(f"\n{title}")
+        click.echo(f"{'módulo':<48}{'propio ms':>11}{'acumulado ms':>14}")
+        for row in rows:
+            click.echo(f"{row['module']:<48}{row['self_ms']:>11}{row['cumulative_ms']:>14}")
+
+
+@click.command('verify-stay-rollups')
+@click.option('--repair', is_flag=True, help='Corregir las estancias cuyo resumen no coincide.')
+@click.option('--show', default=10, show_default=True, help='Diferencias a mostrar.')
+@with_appcontext
+def verify_stay_rollups_command(repair, show):
+    """
+    Compara paid_total, balance_due y nights de cada estancia con sus pagos y fechas.
+    """
+    from .stay_rollup import find_rollup_mismatches, repair_rollups
+
+    mismatches = find_rollup_mismatches()
+    if not mismatches:
+        click.echo("Todas las estancias están al día.")
+        return
+
+    click.echo(f"{len(mismatches)} estancias con diferencias:")
+    for mismatch in mismatches[:show]:
+        fields = ', '.join(f"{name} {mismatch['stored'][name]} -> {mismatch['expected'][name]}"
+                           for name in mismatch['fields'])
+        click.echo(f"  estancia #{mismatch['stay_id']}: {fields}")
+
+    if repair:
+        repaired = repair_rollups(mismatches)
+        db.session.commit()
+        click.echo(f"{repaired} estancias reparadas.")
+    else:
+        click.echo("Ejecuta con --repair para corregirlas.")
+        raise click.exceptions.Exit(1)
+
+
+@click.command('revenue-cube')
+@click.option('--rebuild', is_flag=True, help='Recalcular el cubo completo (tarea nocturna).')
+@with_appcontext
+def revenue_cube_command(rebuild):
+    """
+    Actualiza el cubo de ingresos y gastos de los reportes.
+    """
+    from .revenue_cube import ALL_MONTHS, rebuild_all, refresh_pending
+
+    started = datetime.now()
+    if rebuild:
+        cells = rebuild_all()
+        click.echo(f"Cubo recalculado: {cells:,} celdas")
+    else:
+        months = refresh_pending()
+        if ALL_MONTHS in months:
+            click.echo("Cubo recalculado completo")
+        else:
+            click.echo(f"Meses recalculados: {', '.join(str(m) for m in months) if months else 'ninguno pendiente'}")
+    click.echo(f"Listo en {(datetime.now() - started).total_seconds():.2f}s")
+
+
+@click.command('accrual-revenue')
+@click.option('--rebuild', is_flag=True, help='Recalcular el reparto de todas las estancias.')
+@with_appcontext
+def accrual_revenue_command(rebuild):
+    """
+    Verifica (o recalcula) los ingresos devengados por noche de las estancias.
+    """
+    from .accrual import find_mismatches, rebuild as rebuild_accrual
+
+    started = datetime.now()
+    if rebuild:
+        nights = rebuild_accrual()
+        db.session.commit()
+        click.echo(f"Ingresos devengados recalculados: {nights:,} noches")
+        click.echo(f"Listo en {(datetime.now() - started).total_seconds():.2f}s")
+        return
+
+    mismatches = find_mismatches()
+    if not mismatches:
+        click.echo("El devengado de todas las estancias coincide con su total pagado.")
+        return
+    click.echo(f"{len(mismatches)} estancias con diferencias (ejecuta con --rebuild):")
+    for mismatch in mismatches[:10]:
+        click.echo(f"  estancia #{mismatch['stay_id']}: pagado {mismatch['paid_total']} / devengado {mismatch['accrued']}")
+    raise click.exceptions.Exit(1)
+
+
+@click.command('demand-forecast')
+@click.option('--days', default=120, show_default=True, help='Noches a pronosticar desde hoy.')
+@with_appcontext
+def demand_forecast_command(days):
+    """
+    Recalcula el pronóstico de demanda por noche y tier (tarea diaria).
+    """
+    from .demand_forecast import outlook, refresh
+
+    started = datetime.now()
+    rows = refresh(horizon=days)
+    db.session.commit()
+    click.echo(f"Pronóstico de demanda: {rows:,} filas (noches × tiers)")
+    nights = outlook(date.today(), min(days, 28))
+    for first in range(0, len(nights), 7):
+        week = nights[first:first + 7]
+        rooms = sum(night['rooms'] for night in week)
+        click.echo(f"  semana del {week[0]['night'].isoformat()}: "
+                   f"{sum(night['forecast'] for night in week) / rooms:.1%} prevista "
+                   f"({sum(night['on_the_books'] for night in week) / rooms:.1%} reservada)")
+    click.echo(f"Listo en {(datetime.now() - started).total_seconds():.2f}s")
+
+
+class LazyMigrateGroup(click.Group):
+    """
+    Grupo `flask db` que importa Flask-Migrate (y Alembic) solo cuando se usa:
+    el resto de los comandos y los workers no pagan esa importación.
+    """
+
+    def __init__(self, app):
+        # Mismas opciones que el grupo original; su callback se ejecuta al invocarlo
+        params = [
+            click.Option(['-d', '--directory'], default=None,
+                         help='Directorio de scripts de migración (por defecto "migrations").'),
+            click.Option(['-x', '--x-arg'], multiple=True,
+                         help='Argumentos adicionales para env.py.'),
+        ]
+        super().__init__(name='db', help='Migraciones de base de datos (Flask-Migrate).',
+                         params=params, callback=click.pass_context(self._invoke_group))
+        self.app = app
+        self._group = None
+
+    def _invoke_group(self, ctx, **options):
+        return ctx.invoke(self._load().callback, **options)
+
+    def _load(self) -> click.Group:
+        if self._group is None:
+            from flask_migrate import Migrate
+            from flask_migrate.cli import db as db_group
+            Migrate(self.app, db)
+            self._group = db_group
+        return self._group
+
+    def list_commands(self, ctx):
+        return self._load().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._load().get_command(ctx, name)
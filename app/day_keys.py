@@ -0,0 +1,77 @@
+"""
+AIRBNB MANAGER V4.0 - CLAVES DE DÍA
+Enteros yyyymmdd que acompañan a las columnas de fecha/hora (estancias, pagos,
+gastos). Filtrar por día con `func.date(columna)` obliga a recorrer la tabla;
+con la clave de día la misma condición es una búsqueda por índice:
+
+    Stay.check_in_day == day_key(date.today())          # llegadas de hoy
+    Payment.payment_day.between(*year_bounds(2025))      # pagos del año
+
+La clave se calcula siempre de la fecha tal como se guarda en la base: los
+valores con zona horaria se pasan a UTC (así se almacenan los defaults
+`datetime.now(timezone.utc)`) y los naive se toman tal cual, igual que hacía
+`func.date()`.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+
+def day_key(value) -> Optional[int]:
+    """Clave yyyymmdd de una fecha o fecha/hora (None se conserva)"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        value = value.date()
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def from_day_key(key: Optional[int]) -> Optional[date]:
+    if key is None:
+        return None
+    return date(key // 10000, key // 100 % 100, key % 100)
+
+
+def shift_key(key: int, days: int) -> int:
+    return day_key(from_day_key(key) + timedelta(days=days))
+
+
+def month_bounds(year: int, month: int) -> Tuple[int, int]:
+    """Primera y última clave posibles del mes (para BETWEEN)"""
+    return year * 10000 + month * 100 + 1, year * 10000 + month * 100 + 31
+
+
+def year_bounds(year: int) -> Tuple[int, int]:
+    return year * 10000 + 101, year * 10000 + 1231
+
+
+def month_of(key_column):
+    """Expresión SQL con el mes (1-12) de una columna de clave de día"""
+    return (key_column // 100) % 100
+
+
+def nights_between(check_in, check_out) -> Optional[int]:
+    """Noches entre entrada y salida por fecha de calendario (None si no hay salida)"""
+    if check_in is None or check_out is None:
+        return None
+    return (from_day_key(day_key(check_out)) - from_day_key(day_key(check_in))).days
+
+
+def column_default(date_column: str):
+    """
+    Default de columna que deriva la clave del valor de `date_column` en el
+    mismo INSERT (también en inserciones masivas de Core con executemany).
+    """
+    def default(context):
+        return day_key(context.get_current_parameters().get(date_column))
+    return default
+
+
+def nights_default(check_in_column: str, check_out_column: str):
+    """Default de columna con las noches entre dos columnas de fecha del mismo INSERT"""
+    def default(context):
+        parameters = context.get_current_parameters()
+        return nights_between(parameters.get(check_in_column), parameters.get(check_out_column))
+    return default
@@ -2,6 +2,8 @@ from functools import wraps
 from flask import flash, redirect, url_for, abort
 from flask_login import current_user
 
+from app.user_cache import PERMISSIONS, resolve_permissions
+
 def role_required(*allowed_roles):
     """
     Decorador que requiere que el usuario tenga uno de los roles especificados.
@@ -49,11 +51,11 @@ def permission_required(permission_method):
                 flash('Debes iniciar sesión para acceder a esta página.', 'warning')
                 return redirect(url_for('auth.login'))
             
-            if not hasattr(current_user, permission_method):
+            if permission_method not in PERMISSIONS:
                 flash('Error de configuración de permisos.', 'danger')
                 return redirect(url_for('panel.index'))
             
-            if not getattr(current_user, permission_method)():
+            if permission_method not in current_permissions():
                 flash('No tienes permisos para realizar esta acción.', 'danger')
                 return redirect(url_for('panel.index'))
             
@@ -68,13 +70,16 @@ def check_permission(permission_method):
     Returns:
         bool: True si el usuario tiene el permiso, False en caso contrario.
     """
+    return permission_method in current_permissions()
+
+def current_permissions():
+    """
+    Conjunto inmutable de permisos del usuario actual (vacío si no inició
+    sesión). Viene precalculado en el usuario de sesión cacheado.
+    """
     if not current_user.is_authenticated:
-        return False
-    
-    if not hasattr(current_user, permission_method):
-        return False
-    
-    return getattr(current_user, permission_method)()
+        return frozenset()
+    return resolve_permissions(current_user._get_current_object())
 
 def log_user_action(action, details=None, category='INFO'):
     """
@@ -0,0 +1,256 @@
+"""
+AIRBNB MANAGER V4.0 - PRONÓSTICO DE DEMANDA POR NOCHE Y TIER
+Cuántas habitaciones de cada tier se espera vender en cada una de las
+próximas noches. Combina dos estimaciones calculadas con NumPy a partir de
+las estancias (Stay):
+
+  - Base estacional: Holt-Winters aditivo con tendencia amortiguada y
+    estacionalidad semanal sobre la demanda diaria histórica del tier (noches
+    vendidas más una fracción de las búsquedas rechazadas de
+    app/search_log.py, la demanda que no se pudo atender); con
+    un año o más de historial también se descuenta el desvío de cada mes. Los
+    parámetros se eligen por tier con una grilla que se evalúa en bloque
+    (todas las combinaciones y tiers avanzan juntos en cada día).
+  - Pickup: las reservas ya en libros de cada noche más lo que falta por
+    reservar según la curva histórica de antelación del tier (la fracción de
+    las noches vendidas que ya estaba reservada d días antes).
+
+    pronóstico = en libros + (1 - fracción reservada a d días) × base
+
+El resultado se guarda en demand_forecast y lo reescribe la tarea diaria
+`flask demand-forecast`; precios y notificaciones leen esas filas.
+
+    expected_occupancy('King', date.today(), 14)   # [0.82, 0.77, ..., None]
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, func, insert, or_, select
+
+from app.day_keys import day_key, from_day_key
+from app.extensions import db
+from app.models import TIER_HIERARCHY, DemandForecast, Stay
+from app.room_catalog import get_catalog
+from app.search_log import turned_away
+
+
+HORIZON_DAYS = 120
+HISTORY_DAYS = 365 * 2
+SEASON_LENGTH = 7
+
+# Antelación máxima de la curva de pickup (días); más lejos se usa la última
+MAX_LEAD_DAYS = 180
+
+# Grilla de parámetros (nivel, tendencia, estacionalidad) y amortiguación de la tendencia
+ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5)
+BETAS = (0.01, 0.05, 0.1)
+GAMMAS = (0.05, 0.1, 0.3)
+DAMPING = 0.9
+
+# Reservas perdidas por cada búsqueda rechazada (varias búsquedas suelen ser un mismo cliente)
+TURNED_AWAY_WEIGHT = 0.5
+
+# Precio según la ocupación prevista: PRICE_ELASTICITY por cada punto sobre/bajo la meta
+TARGET_OCCUPANCY = 0.7
+PRICE_ELASTICITY = 0.5
+PRICE_FACTOR_BOUNDS = (0.85, 1.2)
+
+
+# === MODELO ===
+
+def holt_winters(series: np.ndarray, horizon: int, season: int = SEASON_LENGTH) -> np.ndarray:
+    """
+    Pronóstico de cada fila de `series` (series × días) para los `horizon` días
+    siguientes. Cada serie usa la combinación de la grilla con menor error
+    cuadrático a un paso.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    count, length = series.shape
+    if length < 2 * season:
+        # Historial muy corto: el promedio
+        mean = series.mean(axis=1, keepdims=True) if length else np.zeros((count, 1))
+        return np.repeat(mean, horizon, axis=1)
+
+    alpha, beta, gamma = (grid.reshape(-1, 1) for grid in np.meshgrid(ALPHAS, BETAS, GAMMAS, indexing='ij'))
+    # Estados (combinaciones, series); la primera semana inicializa nivel y estacionalidad
+    first = series[:, :season].mean(axis=1)
+    shape = (alpha.shape[0], count)
+    level = np.broadcast_to(first, shape).copy()
+    trend = np.broadcast_to((series[:, season:2 * season].mean(axis=1) - first) / season, shape).copy()
+    seasonal = np.broadcast_to(series[:, :season] - first[:, None], shape + (season,)).copy()
+    squared_errors = np.zeros(shape)
+
+    for t in range(season, length):
+        slot = t % season
+        error = series[:, t] - (level + DAMPING * trend + seasonal[:, :, slot])
+        squared_errors += error ** 2
+        level = level + DAMPING * trend + alpha * error
+        trend = DAMPING * trend + alpha * beta * error
+        seasonal[:, :, slot] += gamma * (1 - alpha) * error
+
+    best = squared_errors.argmin(axis=0)
+    columns = np.arange(count)
+    level, trend, seasonal = level[best, columns], trend[best, columns], seasonal[best, columns]
+    steps = np.arange(1, horizon + 1)
+    slots = (length + steps - 1) % season
+    return level[:, None] + trend[:, None] * np.cumsum(DAMPING ** steps) + seasonal[:, slots]
+
+
+def _monthly_offsets(series: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Desvío de cada mes (1-12) respecto del promedio de cada serie; ceros con menos de un año"""
+    offsets = np.zeros((series.shape[0], 13))
+    if series.shape[1] < 365:
+        return offsets
+    one_hot = months[:, None] == np.arange(13)
+    counts = one_hot.sum(axis=0)
+    means = series @ one_hot / np.maximum(counts, 1)
+    offsets[:, counts > 0] = means[:, counts > 0] - series.mean(axis=1, keepdims=True)
+    return offsets
+
+
+def _sold_nights(tier_of: Dict[int, int], first: date, end: date):
+    """Tier, noche y día de reserva (días desde `first`) de cada noche vendida en [first, end)"""
+    first_key, end_key = day_key(first), day_key(end)
+    stays = db.session.execute(
+        select(Stay.room_id, Stay.check_in_day, Stay.check_out_day, Stay.booked_day)
+        .where(Stay.room_id.in_(list(tier_of)), Stay.check_in_day < end_key,
+               or_(Stay.check_out_day.is_(None), Stay.check_out_day > first_key))
+    ).all()
+
+    origin = first.toordinal()
+    count = len(stays)
+    tiers = np.fromiter((tier_of[room_id] for room_id, _, _, _ in stays), dtype=np.int64, count=count)
+    check_in = np.fromiter((from_day_key(key).toordinal() - origin for _, key, _, _ in stays),
+                           dtype=np.int64, count=count)
+    check_out = np.fromiter((from_day_key(key).toordinal() - origin if key else -1 for _, _, key, _ in stays),
+                            dtype=np.int64, count=count)
+    # Sin día de reserva: reservada al llegar
+    booked = np.fromiter((from_day_key(booked or key).toordinal() - origin for _, key, _, booked in stays),
+                         dtype=np.int64, count=count)
+
+    # Estancias abiertas: una noche, igual que en las matrices de ocupación
+    check_out = np.where(check_out < 0, check_in + 1, np.maximum(check_out, check_in + 1))
+    nights = check_out - check_in
+    owner = np.repeat(np.arange(count), nights)
+    night = check_in[owner] + np.arange(owner.size) - np.repeat(np.cumsum(nights) - nights, nights)
+    inside = (night >= 0) & (night < (end - first).days)
+    return tiers[owner][inside], night[inside], booked[owner][inside]
+
+
+def build(today: Optional[date] = None, horizon: int = HORIZON_DAYS,
+          history_days: int = HISTORY_DAYS) -> List[Dict]:
+    """Filas de demand_forecast de cada tier para las noches [today, today + horizon)"""
+    today = today or date.today()
+    rooms = get_catalog().rooms
+    tiers = sorted({room.tier for room in rooms}, key=lambda name: TIER_HIERARCHY.get(name, 0))
+    if not tiers or horizon <= 0:
+        return []
+    tier_of = {room.id: tiers.index(room.tier) for room in rooms}
+    capacity = np.bincount(list(tier_of.values()), minlength=len(tiers))
+
+    start = today - timedelta(days=history_days)
+    tier, night, booked = _sold_nights(tier_of, start, today + timedelta(days=horizon))
+    past = night < history_days
+
+    # Demanda diaria histórica (no restringida) desde la primera noche vendida
+    sold = np.bincount(tier[past] * history_days + night[past],
+                       minlength=len(tiers) * history_days).reshape(len(tiers), history_days)
+    sold_any = np.flatnonzero(sold.sum(axis=0))
+    begin = int(sold_any[0]) if sold_any.size else history_days
+    demand = sold + TURNED_AWAY_WEIGHT * turned_away(start, history_days, tiers, capacity)
+    occupancy = demand[:, begin:] / capacity[:, None]
+
+    months = np.array([(start + timedelta(days=i)).month for i in range(begin, history_days + horizon)])
+    observed, upcoming = months[:occupancy.shape[1]], months[occupancy.shape[1]:]
+    offsets = _monthly_offsets(occupancy, observed)
+    expected = holt_winters(occupancy - offsets[:, observed], horizon) + offsets[:, upcoming]
+    baseline = np.clip(expected, 0.0, 1.0) * capacity[:, None]
+
+    # Curva de pickup: fracción de las noches vendidas reservada con al menos d días de antelación
+    leads = np.clip(night[past] - booked[past], 0, MAX_LEAD_DAYS)
+    lead_counts = np.bincount(tier[past] * (MAX_LEAD_DAYS + 1) + leads,
+                              minlength=len(tiers) * (MAX_LEAD_DAYS + 1)).reshape(len(tiers), -1)
+    booked_share = lead_counts[:, ::-1].cumsum(axis=1)[:, ::-1] / np.maximum(lead_counts.sum(axis=1), 1)[:, None]
+    share = booked_share[:, np.minimum(np.arange(horizon), MAX_LEAD_DAYS)]
+
+    # Reservas en libros hoy de cada noche futura
+    future = ~past & (booked <= history_days)
+    on_the_books = np.bincount(tier[future] * horizon + night[future] - history_days,
+                               minlength=len(tiers) * horizon).reshape(len(tiers), horizon)
+    forecast = np.clip(on_the_books + (1 - share) * baseline, on_the_books, capacity[:, None])
+
+    generated = day_key(today)
+    nights = [day_key(today + timedelta(days=h)) for h in range(horizon)]
+    return [
+        {'night_day': nights[h], 'tier': name, 'rooms': int(capacity[k]),
+         'on_the_books': int(on_the_books[k, h]), 'baseline': round(float(baseline[k, h]), 2),
+         'forecast': round(float(forecast[k, h]), 2), 'generated_day': generated}
+        for k, name in enumerate(tiers) for h in range(horizon)
+    ]
+
+
+def refresh(today: Optional[date] = None, horizon: int = HORIZON_DAYS) -> int:
+    """Reescribe demand_forecast (quien llama confirma); retorna la cantidad de filas"""
+    rows = build(today, horizon)
+    connection = db.session.connection()
+    connection.execute(delete(DemandForecast))
+    if rows:
+        connection.execute(insert(DemandForecast), rows)
+    return len(rows)
+
+
+# === LECTURA ===
+
+def _night_range(start: date, days: int):
+    return DemandForecast.night_day.between(day_key(start), day_key(start + timedelta(days=days - 1)))
+
+
+def forecast_rows(start: date, days: int, tier: Optional[str] = None) -> List[Dict]:
+    """Pronóstico guardado de cada noche y tier desde `start`"""
+    query = select(DemandForecast).where(_night_range(start, days)) \
+        .order_by(DemandForecast.night_day, DemandForecast.tier)
+    if tier:
+        query = query.where(DemandForecast.tier == tier)
+    return [
+        {'night': from_day_key(row.night_day).isoformat(), 'tier': row.tier, 'rooms': row.rooms,
+         'on_the_books': row.on_the_books, 'baseline': row.baseline, 'forecast': row.forecast,
+         'occupancy': round(row.occupancy * 100, 1)}
+        for row in db.session.scalars(query)
+    ]
+
+
+def outlook(start: date, days: int) -> List[Dict]:
+    """Pronóstico de todos los tiers sumado por noche (solo las noches con pronóstico)"""
+    rows = db.session.execute(
+        select(DemandForecast.night_day, func.sum(DemandForecast.rooms),
+               func.sum(DemandForecast.on_the_books), func.sum(DemandForecast.forecast))
+        .where(_night_range(start, days))
+        .group_by(DemandForecast.night_day).order_by(DemandForecast.night_day)
+    ).all()
+    return [
+        {'night': from_day_key(night), 'rooms': rooms, 'on_the_books': on_the_books,
+         'forecast': round(forecast, 2), 'occupancy': forecast / rooms if rooms else 0.0}
+        for night, rooms, on_the_books, forecast in rows
+    ]
+
+
+def expected_occupancy(tier: str, start: date, days: int) -> List[Optional[float]]:
+    """Ocupación prevista (0-1) del tier en cada noche desde `start`; None donde no hay pronóstico"""
+    found = {
+        night: forecast / rooms
+        for night, forecast, rooms in db.session.execute(
+            select(DemandForecast.night_day, DemandForecast.forecast, DemandForecast.rooms)
+            .where(DemandForecast.tier == tier, _night_range(start, days)))
+        if rooms
+    }
+    return [found.get(day_key(start + timedelta(days=i))) for i in range(days)]
+
+
+def price_factor(occupancy: Optional[float]) -> float:
+    """Ajuste de precio por la ocupación prevista de la noche (1.0 sin pronóstico)"""
+    if occupancy is None:
+        return 1.0
+    low, high = PRICE_FACTOR_BOUNDS
+    return min(max(1 + (occupancy - TARGET_OCCUPANCY) * PRICE_ELASTICITY, low), high)
@@ -1,5 +1,26 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 # Creamos una instancia de SQLAlchemy, que será nuestro ORM (Object-Relational Mapper)
 # para interactuar con la base de datos.
 db = SQLAlchemy()
+
+
+def configure_sqlite(app):
+    """WAL (lectores concurrentes con un escritor) y espera ante bloqueos en cada conexión nueva"""
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+    wal = app.config.get('SQLITE_WAL', True)
+    busy_timeout = int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.close()
@@ -4,7 +4,7 @@ Sistema inteligente para análisis de disponibilidad, optimización de reservas
 """
 
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import math
@@ -12,6 +12,14 @@ from collections import defaultdict
 from sqlalchemy import func, and_, or_
 
 from app.extensions import db
+from app.availability import occupied_room_ids, available_rooms as find_available_rooms
+from app.repository import get_repository
+from app.ranking import PriorityConfidenceModel, ScoringModel, Strategy, rank_top_k, iter_ranked, strategy_pool
+from app.quotes import quote, quote_room
+from app.demand_forecast import expected_occupancy, price_factor
+from app.search_log import denial_by_night, denial_factor
+from app.rate_plans import get_rate_card
+from app.calendar_gaps import get_calendar
 from app.models import Room, Stay, Client, Payment, room_supply_defaults
 
 
@@ -31,6 +39,7 @@ class SuggestionType(Enum):
     ROOM_UPGRADE = "room_upgrade"
     EARLY_CHECKIN = "early_checkin"
     LATE_CHECKOUT = "late_checkout"
+    SHIFTED_STAY = "shifted_stay"
     SPLIT_STAY = "split_stay"
     WAITING_LIST = "waiting_list"
     PRICE_OPTIMIZATION = "price_optimization"
@@ -66,10 +75,22 @@ class AvailabilitySuggestion:
     additional_info: Dict = None
 
 
+# === MODELO DE PUNTAJE ===
+
+DEFAULT_SCORING_MODEL = PriorityConfidenceModel({
+    PriorityLevel.CRITICAL: 5,
+    PriorityLevel.HIGH: 4,
+    PriorityLevel.MEDIUM: 3,
+    PriorityLevel.LOW: 2,
+    PriorityLevel.INFO: 1
+})
+
+
 class AvailabilityEngine:
     """Motor principal de análisis de disponibilidad inteligente"""
     
-    def __init__(self):
+    def __init__(self, scoring_model: ScoringModel = None):
+        self.scoring_model = scoring_model or DEFAULT_SCORING_MODEL
         self.confidence_weights = {
             'historical_data': 0.3,
             'current_occupancy': 0.25,
@@ -78,62 +99,72 @@ class AvailabilityEngine:
             'price_sensitivity': 0.1
         }
     
-    def analyze_availability(self, request: BookingRequest) -> List[AvailabilitySuggestion]:
+    def analyze_availability(self, request: BookingRequest, limit: int = 10) -> List[AvailabilitySuggestion]:
         """
-        Análisis principal de disponibilidad con múltiples estrategias inteligentes
+        Análisis principal de disponibilidad con múltiples estrategias inteligentes.
+        Las estrategias se consumen de forma perezosa y se detienen cuando ya no
+        pueden mejorar las `limit` mejores sugerencias.
         """
-        suggestions = []
-        
-        # 1. Verificar disponibilidad directa
-        direct_availability = self._check_direct_availability(request)
-        suggestions.extend(direct_availability)
-        
-        # 2. Si no hay disponibilidad directa, buscar alternativas
-        if not any(s.suggestion_type == SuggestionType.AVAILABLE_ROOM for s in direct_availability):
-            
-            # 2.1 Fechas alternativas flexibles
-            if request.flexible_dates:
-                date_alternatives = self._find_flexible_date_alternatives(request)
-                suggestions.extend(date_alternatives)
-            
-            # 2.2 Upgrades disponibles
-            upgrade_suggestions = self._find_upgrade_opportunities(request)
-            suggestions.extend(upgrade_suggestions)
+        return rank_top_k(self._strategies(request), limit, self.scoring_model)
+    
+    def stream_availability(self, request: BookingRequest, limit: int = 10, executor=None, run=None):
+        """
+        Igual que `analyze_availability` pero en streaming: las estrategias corren
+        en un pool y se entrega cada una al terminar (ver `iter_ranked`).
+        """
+        return iter_ranked(self._strategies(request), limit, self.scoring_model,
+                           executor or strategy_pool(), run)
+    
+    def _strategies(self, request: BookingRequest) -> List[Strategy]:
+        """Estrategias en orden, con su cota de puntaje y sus dependencias"""
+        model = self.scoring_model
+        no_direct = lambda produced: not produced['direct']
+        alternatives = ('flexible_dates', 'upgrades', 'split_stay', 'timing')
+        return [
+            # 1. Verificar disponibilidad directa
+            Strategy('direct', model.upper_bound(PriorityLevel.HIGH, 1.0),
+                     lambda produced: self._check_direct_availability(request)),
             
-            # 2.3 Estancias divididas
-            split_suggestions = self._find_split_stay_options(request)
-            suggestions.extend(split_suggestions)
+            # 2. Si no hay disponibilidad directa, buscar alternativas
+            # 2.1 Fechas alternativas flexibles (penalización mínima de 0.1 por día)
+            Strategy('flexible_dates', model.upper_bound(PriorityLevel.MEDIUM, 0.9),
+                     lambda produced: self._find_flexible_date_alternatives(request),
+                     when=lambda produced: request.flexible_dates and no_direct(produced), after=('direct',)),
+            # 2.2 Upgrades disponibles (hasta +0.05 por nivel)
+            Strategy('upgrades', model.upper_bound(PriorityLevel.MEDIUM, 1.15),
+                     lambda produced: self._find_upgrade_opportunities(request), when=no_direct, after=('direct',)),
+            # 2.3 Estancias divididas (penalización de 0.2)
+            Strategy('split_stay', model.upper_bound(PriorityLevel.LOW, 0.8),
+                     lambda produced: self._find_split_stay_options(request), when=no_direct, after=('direct',)),
+            # 2.4 Check-in temprano / Check-out tardío (penalización de 0.1)
+            Strategy('timing', model.upper_bound(PriorityLevel.LOW, 0.9),
+                     lambda produced: self._find_timing_optimizations(request), when=no_direct, after=('direct',)),
             
-            # 2.4 Check-in temprano / Check-out tardío
-            timing_suggestions = self._find_timing_optimizations(request)
-            suggestions.extend(timing_suggestions)
-        
-        # 3. Optimizaciones de precio
-        price_suggestions = self._find_price_optimizations(request, suggestions)
-        suggestions.extend(price_suggestions)
-        
-        # 4. Ordenar por prioridad y confianza
-        suggestions = self._rank_suggestions(suggestions)
-        
-        return suggestions[:10]  # Limitar a las 10 mejores sugerencias
+            # 3. Optimizaciones de precio sobre lo encontrado
+            Strategy('price', model.upper_bound(PriorityLevel.INFO, 0.8),
+                     lambda produced: self._find_price_optimizations(
+                         request, [s for found in produced.values() for s in found]),
+                     after=('direct',) + alternatives),
+        ]
     
     def _check_direct_availability(self, request: BookingRequest) -> List[AvailabilitySuggestion]:
         """Verifica disponibilidad directa para las fechas exactas"""
         suggestions = []
         
         # Obtener habitaciones ocupadas en el período
-        occupied_rooms = self._get_occupied_rooms(request.check_in, request.check_out)
-        
-        # Filtrar habitaciones disponibles
-        available_rooms = Room.query.filter(~Room.id.in_(occupied_rooms)).all()
-        
-        # Aplicar filtros de preferencia
-        if request.preferred_tier:
-            available_rooms = [r for r in available_rooms if r.tier == request.preferred_tier]
+        # Filtrar habitaciones disponibles (con el tier preferido, si lo hay)
+        available_rooms = find_available_rooms(request.check_in, request.check_out, tier=request.preferred_tier)
+        # Estadía mínima y cierres a llegadas/salidas del calendario de huecos
+        calendar = get_calendar()
+        if calendar.covers(request.check_in, request.check_out):
+            available_rooms = [room for room in available_rooms
+                               if calendar.allows(room.id, request.check_in, request.check_out)]
+        # Todas las habitaciones cotizadas en una llamada
+        quotes = quote([room.id for room in available_rooms], request.check_in, request.check_out)
         
         for room in available_rooms:
             # Calcular precio estimado
-            estimated_price = self._estimate_room_price(room, request)
+            estimated_price = quotes[room.id].total
             
             # Verificar presupuesto
             if request.max_budget and estimated_price > request.max_budget:
@@ -154,16 +185,16 @@ class AvailabilityEngine:
                 additional_info={
                     'tier': room.tier,
                     'nights': (request.check_out - request.check_in).days,
-                    'tier_display': room.get_tier_display()
+                    'tier_display': room.get_tier_display(),
+                    'fills_gap': calendar.fills_gap(room.id, request.check_in, request.check_out) is not None
                 }
             )
             suggestions.append(suggestion)
         
         return suggestions
     
-    def _find_flexible_date_alternatives(self, request: BookingRequest) -> List[AvailabilitySuggestion]:
+    def _find_flexible_date_alternatives(self, request: BookingRequest) -> Iterator[AvailabilitySuggestion]:
         """Encuentra alternativas con fechas flexibles"""
-        suggestions = []
         stay_duration = (request.check_out - request.check_in).days
         
         # Buscar en un rango de días flexibles antes y después
@@ -185,8 +216,7 @@ class AvailabilityEngine:
             )
             
             # Verificar disponibilidad
-            occupied_rooms = self._get_occupied_rooms(alt_check_in, alt_check_out)
-            available_rooms = Room.query.filter(~Room.id.in_(occupied_rooms)).all()
+            available_rooms = find_available_rooms(alt_check_in, alt_check_out)
             
             if request.preferred_tier:
                 available_rooms = [r for r in available_rooms if r.tier == request.preferred_tier]
@@ -220,31 +250,24 @@ class AvailabilityEngine:
                         'original_dates': (request.check_in, request.check_out)
                     }
                 )
-                suggestions.append(suggestion)
-        
-        return suggestions
+                yield suggestion
     
-    def _find_upgrade_opportunities(self, request: BookingRequest) -> List[AvailabilitySuggestion]:
+    def _find_upgrade_opportunities(self, request: BookingRequest) -> Iterator[AvailabilitySuggestion]:
         """Encuentra oportunidades de upgrade a habitaciones superiores"""
-        suggestions = []
-        
         # Jerarquía de tiers (de menor a mayor)
         tier_hierarchy = ['Económica', 'Estándar', 'Superior', 'Suite']
         
         if not request.preferred_tier:
-            return suggestions
+            return
         
         try:
             current_tier_index = tier_hierarchy.index(request.preferred_tier)
         except ValueError:
-            return suggestions
+            return
         
         # Buscar tiers superiores disponibles
         for higher_tier in tier_hierarchy[current_tier_index + 1:]:
-            occupied_rooms = self._get_occupied_rooms(request.check_in, request.check_out)
-            upgrade_rooms = Room.query.filter(
-                and_(Room.tier == higher_tier, ~Room.id.in_(occupied_rooms))
-            ).all()
+            upgrade_rooms = find_available_rooms(request.check_in, request.check_out, tier=higher_tier)
             
             for room in upgrade_rooms:
                 base_price = self._estimate_room_price(room, request, tier=request.preferred_tier)
@@ -275,29 +298,24 @@ class AvailabilityEngine:
                         'tier_levels_up': tier_diff
                     }
                 )
-                suggestions.append(suggestion)
-        
-        return suggestions
+                yield suggestion
     
-    def _find_split_stay_options(self, request: BookingRequest) -> List[AvailabilitySuggestion]:
+    def _find_split_stay_options(self, request: BookingRequest) -> Iterator[AvailabilitySuggestion]:
         """Encuentra opciones de dividir la estancia entre múltiples habitaciones"""
-        suggestions = []
         stay_duration = (request.check_out - request.check_in).days
         
         # Solo considerar split para estancias de 3+ días
         if stay_duration < 3:
-            return suggestions
+            return
         
         # Probar dividir la estancia en 2 partes
         mid_point = request.check_in + timedelta(days=stay_duration // 2)
         
         # Primera parte
-        occupied_rooms_1 = self._get_occupied_rooms(request.check_in, mid_point)
-        available_rooms_1 = Room.query.filter(~Room.id.in_(occupied_rooms_1)).all()
+        available_rooms_1 = find_available_rooms(request.check_in, mid_point)
         
         # Segunda parte  
-        occupied_rooms_2 = self._get_occupied_rooms(mid_point, request.check_out)
-        available_rooms_2 = Room.query.filter(~Room.id.in_(occupied_rooms_2)).all()
+        available_rooms_2 = find_available_rooms(mid_point, request.check_out)
         
         # Filtrar por tier preferido
         if request.preferred_tier:
@@ -338,81 +356,54 @@ class AvailabilityEngine:
                         'price2': price2
                     }
                 )
-                suggestions.append(suggestion)
-        
-        return suggestions
+                yield suggestion
     
-    def _find_timing_optimizations(self, request: BookingRequest) -> List[AvailabilitySuggestion]:
-        """Encuentra optimizaciones de horarios (check-in temprano, check-out tardío)"""
-        suggestions = []
-        
-        # Check-in temprano (el día anterior)
-        early_checkin = request.check_in - timedelta(days=1)
-        early_checkout = request.check_out
-        
-        occupied_early = self._get_occupied_rooms(early_checkin, early_checkout)
-        available_early = Room.query.filter(~Room.id.in_(occupied_early)).all()
-        
-        if request.preferred_tier:
-            available_early = [r for r in available_early if r.tier == request.preferred_tier]
-        
-        for room in available_early[:2]:
-            extra_night_cost = self._estimate_room_price(room, request, override_dates=(early_checkin, request.check_in))
-            total_price = self._estimate_room_price(room, request) + extra_night_cost
-            
-            confidence = self._calculate_room_confidence(room, request) - 0.1
-            
-            suggestion = AvailabilitySuggestion(
-                suggestion_type=SuggestionType.EARLY_CHECKIN,
-                priority=PriorityLevel.LOW,
-                title=f"🌅 Check-in temprano - {room.name}",
-                description=f"Check-in el {early_checkin.strftime('%d/%m')} (+1 noche)",
-                room_id=room.id,
-                room_name=room.name,
-                estimated_price=total_price,
-                confidence_score=confidence,
-                additional_info={
-                    'extra_nights': 1,
-                    'extra_cost': extra_night_cost,
-                    'early_checkin_date': early_checkin
-                }
-            )
-            suggestions.append(suggestion)
-        
-        # Check-out tardío (un día después)
-        late_checkin = request.check_in
-        late_checkout = request.check_out + timedelta(days=1)
-        
-        occupied_late = self._get_occupied_rooms(late_checkin, late_checkout)
-        available_late = Room.query.filter(~Room.id.in_(occupied_late)).all()
-        
-        if request.preferred_tier:
-            available_late = [r for r in available_late if r.tier == request.preferred_tier]
-        
-        for room in available_late[:2]:
-            extra_night_cost = self._estimate_room_price(room, request, override_dates=(request.check_out, late_checkout))
-            total_price = self._estimate_room_price(room, request) + extra_night_cost
-            
-            confidence = self._calculate_room_confidence(room, request) - 0.1
+    def _find_timing_optimizations(self, request: BookingRequest) -> Iterator[AvailabilitySuggestion]:
+        """
+        Corre la estancia un día (llegada un día antes o un día después, mismas
+        noches) según el calendario de huecos: una búsqueda en memoria por
+        habitación en lugar de una consulta de ocupación por desplazamiento.
+        Primero las habitaciones donde la estancia corrida llena un hueco huérfano.
+        """
+        calendar = get_calendar()
+        repo = get_repository()
+        shifts = (
+            (-1, "🌅 Llegada un día antes"),
+            (1, "🌙 Llegada un día después"),
+        )
+        for shift, label in shifts:
+            check_in = request.check_in + timedelta(days=shift)
+            check_out = request.check_out + timedelta(days=shift)
+            if not calendar.covers(check_in, check_out):
+                continue
+            room_ids = calendar.allowed_room_ids(check_in, check_out, request.preferred_tier)
+            room_ids.sort(key=lambda room_id: calendar.fills_gap(room_id, check_in, check_out) is None)
             
-            suggestion = AvailabilitySuggestion(
-                suggestion_type=SuggestionType.LATE_CHECKOUT,
-                priority=PriorityLevel.LOW,
-                title=f"🌙 Check-out tardío - {room.name}",
-                description=f"Check-out el {late_checkout.strftime('%d/%m')} (+1 noche)",
-                room_id=room.id,
-                room_name=room.name,
-                estimated_price=total_price,
-                confidence_score=confidence,
-                additional_info={
-                    'extra_nights': 1,
-                    'extra_cost': extra_night_cost,
-                    'late_checkout_date': late_checkout
-                }
-            )
-            suggestions.append(suggestion)
-        
-        return suggestions
+            for room in (repo.room(room_id) for room_id in room_ids[:2]):
+                total_price = self._estimate_room_price(room, request, override_dates=(check_in, check_out))
+                fills_gap = calendar.fills_gap(room.id, check_in, check_out) is not None
+                
+                confidence = self._calculate_room_confidence(room, request) - 0.1
+                
+                suggestion = AvailabilitySuggestion(
+                    suggestion_type=SuggestionType.SHIFTED_STAY,
+                    priority=PriorityLevel.LOW,
+                    title=f"{label} - {room.name}",
+                    description=f"Check-in el {check_in.strftime('%d/%m')} y check-out el "
+                                f"{check_out.strftime('%d/%m')} (mismas noches)",
+                    room_id=room.id,
+                    room_name=room.name,
+                    alternative_dates=(check_in, check_out),
+                    estimated_price=total_price,
+                    confidence_score=confidence,
+                    additional_info={
+                        'shift_days': shift,
+                        'extra_cost': total_price - self._estimate_room_price(room, request),
+                        'fills_gap': fills_gap,
+                        'original_dates': (request.check_in, request.check_out)
+                    }
+                )
+                yield suggestion
     
     def _find_price_optimizations(self, request: BookingRequest, existing_suggestions: List[AvailabilitySuggestion]) -> List[AvailabilitySuggestion]:
         """Encuentra optimizaciones de precio basadas en patrones históricos"""
@@ -422,7 +413,7 @@ class AvailabilityEngine:
         if not request.client_id:
             return suggestions
         
-        client = Client.query.get(request.client_id)
+        client = get_repository().client(request.client_id)
         if not client:
             return suggestions
         
@@ -470,51 +461,15 @@ class AvailabilityEngine:
     
     def _get_occupied_rooms(self, check_in: date, check_out: date) -> List[int]:
         """Obtiene IDs de habitaciones ocupadas en el período dado"""
-        overlapping_stays = Stay.query.filter(
-            Stay.status.in_(['Activa', 'Pendiente de Cierre']),
-            Stay.check_in_date < check_out,
-            or_(
-                Stay.check_out_date.is_(None),
-                Stay.check_out_date > check_in
-            )
-        ).all()
-        
-        return [stay.room_id for stay in overlapping_stays]
+        return sorted(occupied_room_ids(check_in, check_out))
     
     def _estimate_room_price(self, room: Room, request: BookingRequest, tier: str = None, override_dates: Tuple[date, date] = None) -> float:
-        """Estima el precio de una habitación basado en tier y duración"""
-        # Precios base por tier (por noche)
-        base_prices = {
-            'Económica': 2000,
-            'Estándar': 3000,
-            'Superior': 4500,
-            'Suite': 6000
-        }
-        
-        tier_to_use = tier or room.tier
-        base_price = base_prices.get(tier_to_use, 3000)
-        
-        # Calcular duración
+        """Estima el precio de una habitación (cotización en caché de app/quotes.py)"""
         if override_dates:
             start_date, end_date = override_dates
         else:
             start_date, end_date = request.check_in, request.check_out
-        
-        nights = (end_date - start_date).days
-        
-        # Aplicar modificadores
-        
-        # Descuento por estancias largas
-        if nights >= 7:
-            base_price *= 0.9  # 10% descuento
-        elif nights >= 14:
-            base_price *= 0.85  # 15% descuento
-        
-        # Modificador estacional (ejemplo básico)
-        if start_date.month in [12, 1, 2, 7, 8]:  # Temporada alta
-            base_price *= 1.2
-        
-        return base_price * nights
+        return quote_room(room, start_date, end_date, tier=tier).total
     
     def _calculate_room_confidence(self, room: Room, request: BookingRequest) -> float:
         """Calcula score de confianza para una habitación basado en varios factores"""
@@ -555,7 +510,7 @@ class AvailabilityEngine:
         
         for stay in stays:
             stay_payments = stay.total_paid()
-            stay_nights = (stay.check_out_date.date() - stay.check_in_date.date()).days if stay.check_out_date else 1
+            stay_nights = stay.nights if stay.nights is not None else 1
             
             if stay_payments > 0 and stay_nights > 0:
                 payments.append(stay_payments)
@@ -577,20 +532,7 @@ class AvailabilityEngine:
     
     def _rank_suggestions(self, suggestions: List[AvailabilitySuggestion]) -> List[AvailabilitySuggestion]:
         """Ordena sugerencias por prioridad y confianza"""
-        priority_weights = {
-            PriorityLevel.CRITICAL: 5,
-            PriorityLevel.HIGH: 4,
-            PriorityLevel.MEDIUM: 3,
-            PriorityLevel.LOW: 2,
-            PriorityLevel.INFO: 1
-        }
-        
-        def suggestion_score(suggestion):
-            priority_score = priority_weights.get(suggestion.priority, 1)
-            confidence_score = suggestion.confidence_score
-            return (priority_score * 2) + confidence_score
-        
-        return sorted(suggestions, key=suggestion_score, reverse=True)
+        return sorted(suggestions, key=self.scoring_model.score, reverse=True)
 
 
 # === CLASE DE UTILIDAD PARA ANÁLISIS DE PATRONES ===
@@ -624,9 +566,10 @@ class BookingPatternAnalyzer:
         """Analiza demanda por tier de habitación"""
         demand_data = db.session.query(
             Room.tier,
-            func.count(Stay.id).label('bookings'),
+            func.count(func.distinct(Stay.id)).label('bookings'),
             func.avg(Payment.amount).label('avg_payment')
-        ).join(Stay).join(Payment).group_by(Room.tier).all()
+        ).select_from(Room).join(Stay, Stay.room_id == Room.id).join(Payment, Payment.stay_id == Stay.id)\
+            .group_by(Room.tier).all()
         
         return {
             row.tier: {
@@ -639,33 +582,33 @@ class BookingPatternAnalyzer:
     @staticmethod
     def predict_optimal_pricing(room: Room, target_date: date) -> float:
         """Predice precio óptimo basado en patrones históricos"""
+        return BookingPatternAnalyzer.predict_optimal_prices(room, target_date, 1)[0]
+    
+    @staticmethod
+    def predict_optimal_prices(room: Room, start: date, days: int) -> List[float]:
+        """
+        Precio óptimo de cada noche desde `start`: historial de pagos, cotización
+        del plan, ocupación prevista del tier (app/demand_forecast.py) y tasa de
+        búsquedas rechazadas de la noche (app/search_log.py)
+        """
         # Análisis básico de precios históricos para esta habitación
-        historical_data = db.session.query(
-            func.avg(Payment.amount).label('avg_payment'),
-            func.count(Stay.id).label('bookings')
-        ).join(Stay).filter(
+        avg_payment = db.session.query(func.avg(Payment.amount)).join(Stay).filter(
             Stay.room_id == room.id,
             Stay.check_in_date >= datetime.now() - timedelta(days=180)
-        ).first()
-        
-        if not historical_data.avg_payment:
-            # Fallback a precios base por tier
-            base_prices = {
-                'Económica': 2000,
-                'Estándar': 3000,
-                'Superior': 4500,
-                'Suite': 6000
-            }
-            return base_prices.get(room.tier, 3000)
-        
-        base_price = float(historical_data.avg_payment)
-        
-        # Ajuste estacional
-        if target_date.month in [12, 1, 2, 7, 8]:  # Temporada alta
-            base_price *= 1.15
-        
-        # Ajuste por demanda histórica
-        if historical_data.bookings > 20:  # Alta demanda
-            base_price *= 1.1
-        
-        return base_price
\ No newline at end of file
+        ).scalar()
+        
+        # Precio de cada noche según el plan de tarifas (temporada y día de la semana)
+        nightly = quote_room(room, start, start + timedelta(days=days)).nightly
+        # Ajuste por demanda: pronóstico precalculado de la noche y búsquedas rechazadas
+        demand = [price_factor(occupancy) * denial_factor(rate) for occupancy, rate in
+                  zip(expected_occupancy(room.tier, start, days), denial_by_night(room.tier, start, days))]
+        if not avg_payment:
+            # Sin historial: la tarifa del plan
+            return [price * factor for price, factor in zip(nightly, demand)]
+        
+        base_rate = get_rate_card().plan_for(room).base_rate
+        base_price = float(avg_payment)
+        
+        # Ajuste estacional: la noche relativa a la tarifa base del plan
+        return [(base_price * price / base_rate if base_rate else base_price) * factor
+                for price, factor in zip(nightly, demand)]
@@ -11,6 +11,10 @@ import json
 
 from app.extensions import db
 from app.models import Room, Stay, Client, Supply, Payment, Expense, SupplyUsage
+from app.loaders import USAGE_SUMMARY
+from app.room_catalog import get_catalog
+from app.demand_forecast import outlook
+from app.calendar_gaps import gap_fill_suggestions
 from app.intelligence import BookingPatternAnalyzer, AvailabilityEngine
 
 
@@ -49,6 +53,22 @@ class IntelligentNotification:
     expires_at: Optional[datetime] = None
     auto_dismiss: bool = False
 
+    def to_dict(self) -> Dict:
+        """Versión serializable a JSON (enums por su valor, fechas en ISO)"""
+        return {
+            'id': self.id,
+            'type': self.type.value,
+            'priority': self.priority.value,
+            'title': self.title,
+            'message': self.message,
+            'action_text': self.action_text,
+            'action_url': self.action_url,
+            'data': self.data or {},
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'auto_dismiss': self.auto_dismiss
+        }
+
 
 class IntelligentNotificationEngine:
     """Motor principal de notificaciones inteligentes"""
@@ -226,13 +246,16 @@ class OccupancyAnalyzer:
         # Predicciones de ocupación
         notifications.extend(self._predict_occupancy_trends())
         
+        # Huecos huérfanos entre estancias
+        notifications.extend(self._suggest_gap_fills())
+        
         return notifications
     
     def _analyze_current_occupancy(self) -> List[IntelligentNotification]:
         """Analiza la ocupación actual"""
         notifications = []
         
-        total_rooms = Room.query.count()
+        total_rooms = len(get_catalog())
         occupied_rooms = Stay.query.filter(Stay.status == 'Activa').count()
         occupancy_rate = (occupied_rooms / total_rooms) * 100 if total_rooms > 0 else 0
         
@@ -260,36 +283,78 @@ class OccupancyAnalyzer:
         return notifications
     
     def _predict_occupancy_trends(self) -> List[IntelligentNotification]:
-        """Predice tendencias de ocupación"""
+        """Ocupación prevista de la próxima semana (pronóstico de `flask demand-forecast`)"""
         notifications = []
         
-        # Verificar próximas llegadas y salidas
-        today = date.today()
-        next_week = today + timedelta(days=7)
-        
-        upcoming_checkouts = Stay.query.filter(
-            Stay.status == 'Activa',
-            db.func.date(Stay.check_out_date) >= today,
-            db.func.date(Stay.check_out_date) <= next_week
-        ).count()
-        
-        upcoming_checkins = Stay.query.filter(
-            Stay.status == 'Activa',
-            db.func.date(Stay.check_in_date) >= today,
-            db.func.date(Stay.check_in_date) <= next_week
-        ).count()
+        week = outlook(date.today(), 7)
+        rooms = sum(night['rooms'] for night in week)
+        if not rooms:
+            return notifications
         
-        net_change = upcoming_checkins - upcoming_checkouts
+        expected = sum(night['forecast'] for night in week) / rooms * 100
+        on_the_books = sum(night['on_the_books'] for night in week) / rooms * 100
+        data = {'expected_occupancy': round(expected, 1), 'on_the_books': round(on_the_books, 1),
+                'nights': len(week)}
         
-        if net_change < -5:
+        if expected < 40:
             notifications.append(IntelligentNotification(
                 id="occupancy_drop_predicted",
                 type=NotificationType.BUSINESS_OPPORTUNITY,
                 priority=NotificationPriority.MEDIUM,
                 title="📅 Caída de Ocupación Prevista",
-                message=f"Se prevé una disminución neta de {abs(net_change)} habitaciones la próxima semana. Tiempo ideal para promociones de último momento.",
+                message=f"Se prevé una ocupación del {expected:.1f}% la próxima semana ({on_the_books:.1f}% ya reservado). Tiempo ideal para promociones de último momento.",
                 action_text="Crear Ofertas",
-                data={'net_change': net_change, 'checkouts': upcoming_checkouts, 'checkins': upcoming_checkins}
+                data=data
+            ))
+        elif expected > 85:
+            notifications.append(IntelligentNotification(
+                id="high_demand_predicted",
+                type=NotificationType.BUSINESS_OPPORTUNITY,
+                priority=NotificationPriority.HIGH,
+                title="📈 Alta Demanda Prevista",
+                message=f"Se prevé una ocupación del {expected:.1f}% la próxima semana ({on_the_books:.1f}% ya reservado). Considera subir tarifas o exigir estadía mínima.",
+                action_text="Ajustar Precios",
+                data=data
+            ))
+        
+        return notifications
+
+
+    def _suggest_gap_fills(self) -> List[IntelligentNotification]:
+        """Huecos de 1-2 noches entre estancias en los próximos 30 días (calendario de huecos)"""
+        notifications = []
+        
+        suggestions = gap_fill_suggestions(date.today(), 30)
+        for suggestion in suggestions[:3]:
+            start = date.fromisoformat(suggestion['start'])
+            short_stay = suggestion['actions'][-1]
+            nights = suggestion['nights']
+            if suggestion['before_stay_id'] is not None:
+                where, offer = "entre dos estancias", "extender la estancia anterior, adelantar la llegada siguiente"
+            else:
+                where, offer = "antes de la próxima llegada", "adelantar esa llegada"
+            notifications.append(IntelligentNotification(
+                id=f"orphan_gap_{suggestion['room_id']}_{suggestion['start']}",
+                type=NotificationType.REVENUE_OPTIMIZATION,
+                priority=NotificationPriority.MEDIUM if (start - date.today()).days < 7 else NotificationPriority.LOW,
+                title=f"🧩 Hueco de {nights} noche(s) en {suggestion['room_name']}",
+                message=f"{suggestion['room_name']} queda libre del {start.strftime('%d/%m')} al "
+                        f"{date.fromisoformat(suggestion['end']).strftime('%d/%m')} {where}. "
+                        f"Ofrece {offer} o véndelo a ${short_stay['suggested_price']:,.0f}.",
+                action_text="Llenar Hueco",
+                data=suggestion
+            ))
+        
+        if len(suggestions) > 3:
+            notifications.append(IntelligentNotification(
+                id="orphan_gaps_summary",
+                type=NotificationType.REVENUE_OPTIMIZATION,
+                priority=NotificationPriority.INFO,
+                title="🧩 Huecos Sin Vender",
+                message=f"{len(suggestions)} huecos de 1-2 noches entre estancias en los próximos 30 días "
+                        f"({sum(s['nights'] for s in suggestions)} noches). Revisa la estadía mínima de esas fechas.",
+                action_text="Ver Huecos",
+                data={'gaps': len(suggestions), 'nights': sum(s['nights'] for s in suggestions)}
             ))
         
         return notifications
@@ -354,7 +419,7 @@ class InventoryAnalyzer:
         notifications = []
         
         # Buscar usos que excedan significativamente lo esperado
-        recent_usages = SupplyUsage.query.filter(
+        recent_usages = SupplyUsage.query.options(*USAGE_SUMMARY).filter(
             SupplyUsage.usage_date >= datetime.now() - timedelta(days=7),
             SupplyUsage.quantity_expected.isnot(None)
         ).all()
@@ -439,17 +504,18 @@ class ClientBehaviorAnalyzer:
         """Analiza retención de clientes VIP"""
         notifications = []
         
-        # Definir VIPs como clientes con más de 50,000 en gasto total
-        vip_clients = Client.query.all()
-        vip_clients = [c for c in vip_clients if c.total_spent() > 50000]
+        # Definir VIPs como clientes con más de 50,000 en gasto total: gasto y
+        # última llegada de todos los clientes en una sola consulta agregada
+        total_spent = db.func.coalesce(db.func.sum(Stay.paid_total), 0.0)
+        vip_clients = db.session.query(
+            Client.full_name,
+            total_spent.label('total_spent'),
+            db.func.max(Stay.check_in_date).label('last_visit')
+        ).join(Stay, Stay.client_id == Client.id).group_by(Client.id).having(total_spent > 50000).all()
         
         three_months_ago = datetime.now() - timedelta(days=90)
         
-        inactive_vips = []
-        for client in vip_clients:
-            last_visit = client.last_visit()
-            if last_visit and last_visit < three_months_ago.date():
-                inactive_vips.append(client)
+        inactive_vips = [c for c in vip_clients if c.last_visit and c.last_visit < three_months_ago]
         
         if inactive_vips:
             notifications.append(IntelligentNotification(
@@ -459,7 +525,7 @@ class ClientBehaviorAnalyzer:
                 title="👑 Clientes VIP Inactivos",
                 message=f"{len(inactive_vips)} clientes VIP no han visitado en 3+ meses. Considera campañas de reactivación.",
                 action_text="Ver Lista VIP",
-                data={'inactive_vips': [{'name': c.full_name, 'total_spent': c.total_spent()} for c in inactive_vips]}
+                data={'inactive_vips': [{'name': c.full_name, 'total_spent': c.total_spent} for c in inactive_vips]}
             ))
         
         return notifications
@@ -517,7 +583,7 @@ class OperationalAnalyzer:
         yesterday = datetime.now() - timedelta(days=1)
         
         # Esta lógica sería más compleja en un sistema real con logs de estado
-        rooms_needing_cleaning = Room.query.filter(Room.status == 'Por Limpiar').count()
+        rooms_needing_cleaning = get_catalog().count_with_status('Por Limpiar')
         
         if rooms_needing_cleaning > 2:
             notifications.append(IntelligentNotification(
@@ -592,7 +658,8 @@ def get_notifications_for_dashboard() -> Dict:
             categorized['insights'].append(notification)
     
     return {
-        'notifications': categorized,
+        'notifications': {category: [notification.to_dict() for notification in items]
+                          for category, items in categorized.items()},
         'total_count': len(notifications),
         'critical_count': len(categorized['critical']),
         'opportunities_count': len(categorized['business_opportunities'])
@@ -0,0 +1,51 @@
+"""
+AIRBNB MANAGER V4.0 - PERFILES DE CARGA DE RELACIONES
+Opciones de carga (selectinload/joinedload) agrupadas por caso de uso para que
+las vistas traigan en pocas consultas todo lo que sus plantillas van a leer,
+en lugar de una consulta por fila.
+
+Uso:
+    Stay.query.options(*STAY_LIST).order_by(...).all()
+    stay = Stay.query.options(*STAY_DETAIL).get_or_404(stay_id)
+"""
+
+from sqlalchemy.orm import configure_mappers, joinedload, selectinload
+
+from app.models import Stay, SupplyUsage
+
+# Los backrefs (Stay.client, Stay.room, Stay.supply_usages) existen solo tras configurar los mappers
+configure_mappers()
+
+
+# === PERFILES ===
+
+# Listados de estancias (panel, pendientes de cierre): cliente y habitación
+# (el total pagado es la columna desnormalizada Stay.paid_total)
+STAY_LIST = (
+    joinedload(Stay.client),
+    joinedload(Stay.room),
+)
+
+# Vista de una estancia (cierre): además, usos de suministros con su suministro
+STAY_DETAIL = STAY_LIST + (
+    selectinload(Stay.supply_usages).joinedload(SupplyUsage.supply),
+)
+
+# Listados de usos de suministros (análisis, notificaciones)
+USAGE_SUMMARY = (
+    joinedload(SupplyUsage.supply),
+    joinedload(SupplyUsage.room),
+    joinedload(SupplyUsage.stay),
+)
+
+PROFILES = {
+    'STAY_LIST': STAY_LIST,
+    'STAY_DETAIL': STAY_DETAIL,
+    'USAGE_SUMMARY': USAGE_SUMMARY,
+}
+
+
+def with_profile(query, profile):
+    """Aplica un perfil (por nombre o tupla de opciones) a una consulta"""
+    options = PROFILES[profile] if isinstance(profile, str) else profile
+    return query.options(*options)
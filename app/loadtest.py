@@ -0,0 +1,188 @@
+"""
+AIRBNB MANAGER V4.0 - PRUEBA DE CARGA MULTI-WORKER
+Levanta el servidor de producción (serve.py) con distintas cantidades de
+workers sobre la misma base SQLite en modo WAL, lo carga con clientes HTTP
+concurrentes durante un tiempo fijo y reporta throughput (req/s) y latencias
+p50/p99 por cantidad de workers.
+
+Los escenarios son los del benchmark (app/benchmark.py); la sesión se firma con
+la SECRET_KEY de la app, igual que haría el login.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.benchmark import default_scenarios, percentile
+from app.extensions import db
+from app.models import User
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def session_cookie(app, username: Optional[str] = None) -> str:
+    """Cookie de sesión firmada para el usuario indicado (por defecto, el primer dueño)"""
+    with app.app_context():
+        query = User.query.filter_by(username=username) if username else User.query.filter_by(role='dueño')
+        user = query.first()
+        if not user:
+            raise RuntimeError('No hay usuario para la prueba de carga; genera datos con `flask generate-data`')
+        serializer = app.session_interface.get_signing_serializer(app)
+        value = serializer.dumps({'_user_id': str(user.id), '_fresh': True})
+    return f"{app.config['SESSION_COOKIE_NAME']}={value}"
+
+
+def _request(base_url: str, scenario: Dict, cookie: str, timeout: float):
+    body = json.dumps(scenario['json']).encode() if scenario.get('json') is not None else None
+    headers = {'Cookie': cookie}
+    if body is not None:
+        headers['Content-Type'] = 'application/json'
+    request = urllib.request.Request(base_url + scenario['url'], data=body, headers=headers,
+                                     method=scenario['method'])
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+def run_load(base_url: str, cookie: str, scenarios: Optional[List[Dict]] = None, concurrency: int = 8,
+             duration: float = 10.0, timeout: float = 30.0) -> Dict:
+    """
+    `concurrency` clientes recorren los escenarios en ronda durante `duration`
+    segundos. Retorna requests completados, errores, req/s y latencias.
+    """
+    scenarios = scenarios or default_scenarios()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            scenario = scenarios[i % len(scenarios)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                status = _request(base_url, scenario, cookie, timeout)
+                error = None if status < 400 else f'HTTP {status}'
+            except urllib.error.HTTPError as e:
+                error = f'HTTP {e.code}'
+            except Exception as e:
+                error = type(e).__name__
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                if error:
+                    errors[f"{scenario['name']}: {error}"] = errors.get(f"{scenario['name']}: {error}", 0) + 1
+                else:
+                    latencies.append(elapsed_ms)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors.values()),
+        'error_detail': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+# === SERVIDOR BAJO PRUEBA ===
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(base_url: str, process, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'El servidor terminó al iniciar (código {process.returncode})')
+        try:
+            with urllib.request.urlopen(base_url + '/healthz', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            # URLError, conexión rechazada o timeout mientras el worker calienta sus cachés
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('El servidor no respondió /healthz a tiempo')
+
+
+def start_server(workers: int, threads: int, port: Optional[int] = None):
+    """Lanza serve.py en un subproceso y espera a que responda /healthz (log del servidor en un temporal)"""
+    port = port or _free_port()
+    command = [sys.executable, os.path.join(PROJECT_ROOT, 'serve.py'), '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--threads', str(threads)]
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=log)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_healthy(base_url, process)
+    except Exception as e:
+        stop_server(process)
+        log.seek(0)
+        tail = log.read().decode(errors='replace')[-2000:]
+        raise RuntimeError(f'{e}\n{tail}') from e
+    return process, base_url
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def profile_workers(app, worker_counts: List[int], threads: int = 4, concurrency: int = 16,
+                    duration: float = 10.0, warmup: float = 2.0, username: Optional[str] = None) -> Dict:
+    """Corre la misma carga contra el servidor con cada cantidad de workers"""
+    cookie = session_cookie(app, username)
+    rows = []
+    for workers in worker_counts:
+        process, base_url = start_server(workers, threads)
+        try:
+            if warmup:
+                run_load(base_url, cookie, concurrency=concurrency, duration=warmup)
+            result = run_load(base_url, cookie, concurrency=concurrency, duration=duration)
+        finally:
+            stop_server(process)
+        rows.append(dict(result, workers=workers, threads=threads))
+
+    baseline = rows[0]['rps'] if rows and rows[0]['rps'] else None
+    for row in rows:
+        row['speedup'] = round(row['rps'] / baseline, 2) if baseline else None
+
+    with app.app_context():
+        journal_mode = db.session.execute(text('PRAGMA journal_mode')).scalar() \
+            if db.engine.dialect.name == 'sqlite' else None
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'],
+        'journal_mode': journal_mode,
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'results': rows
+    }
@@ -2,8 +2,13 @@ from app.extensions import db
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin 
 from datetime import datetime, timezone
-from sqlalchemy import func
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.sql import ColumnElement
 from calendar import monthrange
+from app.day_keys import column_default, day_key, month_bounds, nights_between, nights_default
+
+# Jerarquía numérica de tiers (mayor = mejor habitación)
+TIER_HIERARCHY = {'Queen': 1, 'King': 2}
 
 # FASE 4.0 V4.0: Tabla de asociación para paquetes de suministros (CORREGIDA)
 room_supply_defaults = db.Table('room_supply_defaults',
@@ -100,8 +105,7 @@ class Room(db.Model):
     
     def get_tier_hierarchy_value(self):
         """Retorna valor numérico para jerarquía de habitaciones"""
-        hierarchy = {'Queen': 1, 'King': 2}
-        return hierarchy.get(self.tier, 0)
+        return TIER_HIERARCHY.get(self.tier, 0)
     
     def is_better_than(self, other_room):
         """Compara si esta habitación es mejor que otra"""
@@ -113,64 +117,194 @@ class Room(db.Model):
         """Obtiene habitaciones a las que esta puede hacer upgrade"""
         if self.tier != 'Queen':
             return []
-        return Room.query.filter_by(tier='King').all()
+        from app.repository import get_repository
+        return get_repository().rooms(tier='King')
     
     # === V4.0 MÉTODOS PARA GESTIÓN DE PAQUETES DE SUMINISTROS (ACTUALIZADOS) ===
+    # Se leen del caché de paquetes (app/package_cache.py): una consulta para todas las habitaciones
+    def get_room_package(self):
+        """Obtiene el paquete precalculado (items, costo y conteos) de esta habitación"""
+        from app.package_cache import package_cache
+        return package_cache.get(self.id)
+    
     def get_supply_package(self):
         """Obtiene el paquete completo de suministros para esta habitación"""
-        from sqlalchemy import text
-        query = text("""
-            SELECT s.*, rsd.quantity, rsd.is_mandatory, rsd.usage_type, rsd.notes
-            FROM supply s
-            JOIN room_supply_defaults rsd ON s.id = rsd.supply_id
-            WHERE rsd.room_id = :room_id
-        """)
-        return db.session.execute(query, {'room_id': self.id}).fetchall()
+        return list(self.get_room_package().items)
     
     def get_mandatory_supplies(self):
         """Obtiene solo los suministros obligatorios"""
-        from sqlalchemy import text
-        query = text("""
-            SELECT s.*, rsd.quantity, rsd.is_mandatory, rsd.usage_type, rsd.notes
-            FROM supply s
-            JOIN room_supply_defaults rsd ON s.id = rsd.supply_id
-            WHERE rsd.room_id = :room_id AND rsd.is_mandatory = 1
-        """)
-        return db.session.execute(query, {'room_id': self.id}).fetchall()
+        return list(self.get_room_package().mandatory)
     
     def has_supply_package(self):
         """Verifica si la habitación tiene paquete de suministros configurado"""
-        return len(self.supply_packages) > 0
+        return bool(self.get_room_package().items)
     
     def calculate_package_cost(self):
         """Calcula el costo total del paquete de suministros"""
-        package_items = self.get_supply_package()
-        total_cost = 0.0
-        for item in package_items:
-            if hasattr(item, 'unit_price') and item.unit_price:
-                total_cost += item.quantity * item.unit_price
-        return total_cost
+        return self.get_room_package().total_cost
     
     def get_package_summary(self):
         """Obtiene un resumen del paquete de suministros"""
-        package = self.get_supply_package()
-        if not package:
-            return None
-            
-        mandatory_count = sum(1 for item in package if item.is_mandatory)
-        optional_count = len(package) - mandatory_count
-            
-        return {
-            'total_items': len(package),
-            'mandatory_items': mandatory_count,
-            'optional_items': optional_count,
-            'total_cost': self.calculate_package_cost(),
-            'items': package
-        }
+        return self.get_room_package().summary()
 
     def __repr__(self):
         return f'<Room {self.name}>'
 
+class CacheVersion(db.Model):
+    """Sello de versión de un caché de proceso, compartido entre workers a través de la base de datos"""
+    __tablename__ = 'cache_version'
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}={self.version}>'
+
+class RevenueCubeCell(db.Model):
+    """
+    Celda del cubo de ingresos y gastos (app/revenue_cube.py): totales por mes
+    (yyyymm) y dimensiones. Las dimensiones que no aplican a un tipo de hecho
+    se guardan como 0 / '' para que formen parte de la llave primaria.
+    """
+    __tablename__ = 'revenue_cube'
+    month = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), primary_key=True)  # 'income', 'expense', 'stay'
+    room_id = db.Column(db.Integer, primary_key=True, default=0)
+    channel = db.Column(db.String(64), primary_key=True, default='')
+    category = db.Column(db.String(64), primary_key=True, default='')
+    payer_role = db.Column(db.String(50), primary_key=True, default='')
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    nights = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RevenueCubeCell {self.month} {self.kind} {self.total}>'
+
+class RevenueCubePending(db.Model):
+    """Mes del cubo a recalcular (month = 0: todo el cubo); `mark` cambia con cada escritura"""
+    __tablename__ = 'revenue_cube_pending'
+    month = db.Column(db.Integer, primary_key=True)
+    mark = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<RevenueCubePending {self.month}>'
+
+class StayNightRevenue(db.Model):
+    """
+    Ingreso devengado de una noche de estancia (app/accrual.py): el total
+    pagado de la estancia repartido entre sus noches. Base de los reportes
+    por noche de servicio, junto a los de caja (por fecha de pago).
+    """
+    __tablename__ = 'stay_night_revenue'
+    __table_args__ = (
+        db.Index('ix_stay_night_revenue_night_room', 'night_day', 'room_id'),
+    )
+    stay_id = db.Column(db.Integer, db.ForeignKey('stay.id'), primary_key=True)
+    night_day = db.Column(db.Integer, primary_key=True)  # Clave yyyymmdd de la noche
+    room_id = db.Column(db.Integer, nullable=False)
+    amount = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<StayNightRevenue {self.stay_id} {self.night_day} {self.amount}>'
+
+class RatePlan(db.Model):
+    """
+    Tarifa base por noche de una habitación (room_id) o de un tier; la de la
+    habitación tiene prioridad y un plan sin ninguno de los dos es el general.
+    Se compila en precios por noche con sus temporadas y descuentos (app/rate_plans.py).
+    """
+    __tablename__ = 'rate_plan'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), index=True)
+    tier = db.Column(db.String(50), index=True)
+    base_rate = db.Column(db.Float, nullable=False)
+    # Factores por día de la semana (lunes a domingo) separados por comas
+    weekday_factors = db.Column(db.String(64), nullable=False, default='1,1,1,1,1,1,1')
+    min_stay = db.Column(db.Integer, nullable=False, default=1)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+
+    def __repr__(self):
+        return f'<RatePlan {self.name} {self.base_rate}>'
+
+class RateSeason(db.Model):
+    """
+    Temporada: factor sobre la tarifa base (y estadía mínima opcional) entre dos
+    fechas inclusive. Con repeats_yearly solo cuentan mes y día (puede cruzar
+    fin de año). rate_plan_id = None aplica a todos los planes.
+    closed_to_arrival / closed_to_departure cierran las llegadas / salidas en
+    esos días (factor 1.0 para una restricción sin cambio de precio).
+    """
+    __tablename__ = 'rate_season'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    rate_plan_id = db.Column(db.Integer, db.ForeignKey('rate_plan.id'), index=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    repeats_yearly = db.Column(db.Boolean, nullable=False, default=True)
+    factor = db.Column(db.Float, nullable=False, default=1.0)
+    min_stay = db.Column(db.Integer)
+    closed_to_arrival = db.Column(db.Boolean, nullable=False, default=False)
+    closed_to_departure = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        return f'<RateSeason {self.name} x{self.factor}>'
+
+class LengthOfStayDiscount(db.Model):
+    """Descuento (fracción, 0.10 = 10%) desde `min_nights` noches; rate_plan_id = None aplica a todos"""
+    __tablename__ = 'rate_los_discount'
+    id = db.Column(db.Integer, primary_key=True)
+    rate_plan_id = db.Column(db.Integer, db.ForeignKey('rate_plan.id'), index=True)
+    min_nights = db.Column(db.Integer, nullable=False)
+    discount = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<LengthOfStayDiscount {self.min_nights}+ -{self.discount:.0%}>'
+
+class DemandForecast(db.Model):
+    """
+    Pronóstico de demanda de una noche para un tier (app/demand_forecast.py):
+    habitaciones ya reservadas al generarlo, base del modelo estacional y
+    habitaciones que se espera vender. Lo reescribe `flask demand-forecast`.
+    """
+    __tablename__ = 'demand_forecast'
+    night_day = db.Column(db.Integer, primary_key=True)  # Clave yyyymmdd de la noche
+    tier = db.Column(db.String(50), primary_key=True)
+    rooms = db.Column(db.Integer, nullable=False)
+    on_the_books = db.Column(db.Integer, nullable=False, default=0)
+    baseline = db.Column(db.Float, nullable=False, default=0.0)
+    forecast = db.Column(db.Float, nullable=False, default=0.0)
+    generated_day = db.Column(db.Integer, nullable=False)
+
+    @property
+    def occupancy(self):
+        return self.forecast / self.rooms if self.rooms else 0.0
+
+    def __repr__(self):
+        return f'<DemandForecast {self.night_day} {self.tier} {self.forecast:.1f}/{self.rooms}>'
+
+class AvailabilitySearch(db.Model):
+    """
+    Búsqueda de disponibilidad (app/search_log.py): fechas, tier y huéspedes
+    pedidos y su resultado ('perfect', 'alternative' o 'none'). Solo se
+    agregan filas, por lotes desde un hilo aparte.
+    """
+    __tablename__ = 'availability_search'
+    __table_args__ = (
+        db.Index('ix_availability_search_stay_days', 'check_in_day', 'check_out_day'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    searched_at = db.Column(db.DateTime, nullable=False)
+    source = db.Column(db.String(32), nullable=False)
+    check_in_day = db.Column(db.Integer, nullable=False)
+    check_out_day = db.Column(db.Integer, nullable=False)
+    tier = db.Column(db.String(50))  # None: cualquier tier
+    guests = db.Column(db.Integer)
+    outcome = db.Column(db.String(16), nullable=False)
+    options = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<AvailabilitySearch {self.check_in_day}-{self.check_out_day} {self.tier} {self.outcome}>'
+
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(256), nullable=False)
@@ -193,7 +327,9 @@ class Client(db.Model):
         return self.stays.count()
     
     def total_spent(self):
-        return sum(stay.total_paid() for stay in self.stays)
+        # Suma de los totales desnormalizados de sus estancias (una consulta)
+        return db.session.query(func.coalesce(func.sum(Stay.paid_total), 0.0))\
+            .filter(Stay.client_id == self.id).scalar()
     
     def last_visit(self):
         last_stay = self.stays.order_by(Stay.check_in_date.desc()).first()
@@ -206,47 +342,50 @@ class Client(db.Model):
     @staticmethod
     def get_top_clients(limit=5):
         """Obtiene los clientes que más han gastado"""
-        all_clients = Client.query.all()
-        return sorted(all_clients, key=lambda x: x.total_spent(), reverse=True)[:limit]
+        # Una sola consulta agregada en lugar de total_spent() por cliente y estancia
+        spent = func.coalesce(func.sum(Stay.paid_total), 0.0)
+        return Client.query.outerjoin(Stay, Stay.client_id == Client.id)\
+            .group_by(Client.id).order_by(spent.desc(), Client.id).limit(limit).all()
     
     @staticmethod
     def get_relevant_clients_by_category(category='current'):
         """Obtiene clientes por categoría de relevancia"""
         from datetime import date, timedelta
-        today = date.today()
+        # Claves de día (índice) en lugar de func.date() sobre las fechas
+        today = day_key(date.today())
         
         if category == 'current':
             # Clientes actualmente hospedados
             return Stay.query.filter(
                 Stay.status == 'Activa',
-                func.date(Stay.check_in_date) <= today,
-                or_(
-                    Stay.check_out_date.is_(None),
-                    func.date(Stay.check_out_date) > today
+                Stay.check_in_day <= today,
+                db.or_(
+                    Stay.check_out_day.is_(None),
+                    Stay.check_out_day > today
                 )
             ).join(Client).order_by(Client.full_name).all()
             
         elif category == 'arriving':
             # Clientes que llegan hoy
             return Stay.query.filter(
-                func.date(Stay.check_in_date) == today,
+                Stay.check_in_day == today,
                 Stay.status == 'Activa'
             ).join(Client).order_by(Stay.check_in_date).all()
             
         elif category == 'departing':
             # Clientes que salen hoy
             return Stay.query.filter(
-                func.date(Stay.check_out_date) == today,
+                Stay.check_out_day == today,
                 Stay.status.in_(['Activa', 'Pendiente de Cierre'])
             ).join(Client).order_by(Stay.check_out_date).all()
             
         elif category == 'recent':
             # Clientes que se fueron recientemente (últimos 7 días)
-            week_ago = today - timedelta(days=7)
+            week_ago = day_key(date.today() - timedelta(days=7))
             return Stay.query.filter(
                 Stay.status == 'Finalizada',
-                func.date(Stay.check_out_date) >= week_ago,
-                func.date(Stay.check_out_date) < today
+                Stay.check_out_day >= week_ago,
+                Stay.check_out_day < today
             ).join(Client).order_by(Stay.check_out_date.desc()).limit(15).all()
         
         return []
@@ -255,18 +394,73 @@ class Client(db.Model):
         return f'<Client {self.full_name}>'
 
 class Stay(db.Model):
+    # Índice de ocupación: búsquedas de solapamiento por habitación y rango de fechas
+    __table_args__ = (
+        db.Index('ix_stay_room_dates', 'room_id', 'check_in_date', 'check_out_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     check_in_date = db.Column(db.DateTime, index=True, default=lambda: datetime.now(timezone.utc))
     check_out_date = db.Column(db.DateTime, index=True)
+    # Claves de día yyyymmdd (app/day_keys.py) para filtros por día con índice
+    check_in_day = db.Column(db.Integer, index=True, default=column_default('check_in_date'))
+    check_out_day = db.Column(db.Integer, index=True, default=column_default('check_out_date'))
+    nights = db.Column(db.Integer, default=nights_default('check_in_date', 'check_out_date'))
+    # Día en que se tomó la reserva (antelación para las curvas de pickup de app/demand_forecast.py)
+    booked_day = db.Column(db.Integer, index=True, default=lambda: day_key(datetime.now(timezone.utc)))
     client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
     room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
     booking_channel = db.Column(db.String(64), nullable=False, default='Directo')
     status = db.Column(db.String(50), nullable=False, default='Activa')  # 'Activa', 'Pendiente de Cierre', 'Finalizada'
+    # Resumen financiero desnormalizado: se actualiza con record_payment() en la
+    # misma transacción que el pago (verificar/reparar con `flask verify-stay-rollups`)
+    agreed_total = db.Column(db.Float)  # Precio acordado (None = sin precio registrado)
+    paid_total = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    balance_due = db.Column(db.Float, nullable=False, default=0.0, server_default='0', index=True)
     payments = db.relationship('Payment', backref='stay', lazy='dynamic')
 
     def total_paid(self):
-        total = db.session.query(func.sum(Payment.amount)).filter(Payment.stay_id == self.id).scalar()
-        return total or 0.0
+        return self.paid_total or 0.0
+
+    def record_payment(self, amount, method='Efectivo', payment_date=None):
+        """
+        Registra un pago y actualiza paid_total/balance_due en la misma
+        transacción. En estancias ya guardadas el incremento se hace en SQL
+        (paid_total = paid_total + monto), así dos pagos simultáneos no se pisan.
+        """
+        payment = Payment(stay=self, amount=amount, method=method,
+                          payment_date=payment_date or datetime.now())
+        db.session.add(payment)
+        if inspect(self).persistent:
+            # Si ya hay un incremento pendiente (dos pagos antes del flush) se acumula sobre él
+            paid = self.paid_total if isinstance(self.paid_total, ColumnElement) else Stay.paid_total
+            self.paid_total = paid + amount
+            self.balance_due = 0.0 if self.agreed_total is None else \
+                Stay.balance_expression(db.literal(self.agreed_total), self.paid_total)
+        else:
+            self.paid_total = (self.paid_total or 0.0) + amount
+            self.balance_due = Stay.balance_for(self.agreed_total, self.paid_total)
+        return payment
+
+    @staticmethod
+    def balance_for(agreed_total, paid_total):
+        """Saldo pendiente: lo acordado menos lo pagado, nunca negativo"""
+        if agreed_total is None:
+            return 0.0
+        return round(max(agreed_total - (paid_total or 0.0), 0.0), 2)
+
+    @staticmethod
+    def balance_expression(agreed_total, paid_total):
+        """balance_for() como expresión SQL (con un precio acordado)"""
+        return case((agreed_total > paid_total, agreed_total - paid_total), else_=0.0)
+
+    @staticmethod
+    def get_stays_with_balance(limit=None):
+        """Estancias con saldo pendiente, mayor saldo primero (usa el índice de balance_due)"""
+        from app.loaders import STAY_LIST
+        query = Stay.query.options(*STAY_LIST).filter(Stay.balance_due > 0)\
+            .order_by(Stay.balance_due.desc(), Stay.id)
+        return query.limit(limit).all() if limit else query.all()
     
     def get_status_display(self):
         status_icons = {
@@ -286,8 +480,8 @@ class Stay(db.Model):
         return [usage for usage in self.supply_usages if usage.usage_type == 'Automático']
     
     def get_supply_usage_summary(self):
-        """Obtiene resumen completo del uso de suministros"""
-        return SupplyUsage.get_stay_usage_summary(self.id)
+        """Obtiene resumen completo del uso de suministros (reutiliza los usos ya cargados)"""
+        return SupplyUsage.summarize_usages(self.supply_usages)
     
     def has_supply_usage(self):
         """Verifica si la estancia tiene uso de suministros registrado"""
@@ -355,6 +549,7 @@ class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.DateTime, index=True, default=lambda: datetime.now(timezone.utc))
+    payment_day = db.Column(db.Integer, index=True, default=column_default('payment_date'))
     method = db.Column(db.String(64), default='Efectivo')
     stay_id = db.Column(db.Integer, db.ForeignKey('stay.id'), nullable=False)
 
@@ -367,6 +562,7 @@ class Expense(db.Model):
     amount = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(64), index=True)
     expense_date = db.Column(db.DateTime, index=True, default=lambda: datetime.now(timezone.utc))
+    expense_day = db.Column(db.Integer, index=True, default=column_default('expense_date'))
     paid_by_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     payment_method = db.Column(db.String(32), nullable=False, default='Efectivo')
     
@@ -441,9 +637,16 @@ class Expense(db.Model):
         
         total_expenses = elizabeth_expenses + alejandrina_expenses + owner_expenses
         monthly_profit = monthly_income - total_expenses
+
+        # Ingresos devengados: noches del mes ya pagadas, sin importar cuándo se cobraron
+        first_night, last_night = month_bounds(current_date.year, current_date.month)
+        monthly_accrued_income = db.session.query(func.sum(StayNightRevenue.amount)).filter(
+            StayNightRevenue.night_day.between(first_night, last_night)
+        ).scalar() or 0.0
         
         return {
             'monthly_income': monthly_income,
+            'monthly_accrued_income': monthly_accrued_income,
             'elizabeth_expenses': elizabeth_expenses,
             'alejandrina_expenses': alejandrina_expenses,
             'owner_expenses': owner_expenses,
@@ -694,7 +897,11 @@ class SupplyUsage(db.Model):
     def get_stay_usage_summary(stay_id):
         """Obtiene resumen de uso de suministros para una estancia"""
         usages = SupplyUsage.query.filter_by(stay_id=stay_id).all()
-        
+        return SupplyUsage.summarize_usages(usages)
+    
+    @staticmethod
+    def summarize_usages(usages):
+        """Resume una lista de usos ya cargada (sin consultas adicionales)"""
         return {
             'total_items': len(usages),
             'total_cost': sum(usage.calculate_cost() for usage in usages),
@@ -734,6 +941,43 @@ class SupplyUsage(db.Model):
         return f'<SupplyUsage {self.supply.name if self.supply else "Unknown"}: {self.quantity_used} ({self.usage_type})>'
 
 
+# === CLAVES DE DÍA ===
+# Al asignar una fecha por el ORM se actualiza su clave; en los INSERT sin
+# asignación (defaults o inserciones masivas) la calcula el default de columna.
+
+def _keep_day_key(date_attribute, key_attribute):
+    @event.listens_for(date_attribute, 'set')
+    def _set_day_key(target, value, oldvalue, initiator):
+        setattr(target, key_attribute, day_key(value))
+
+_keep_day_key(Stay.check_in_date, 'check_in_day')
+_keep_day_key(Stay.check_out_date, 'check_out_day')
+_keep_day_key(Payment.payment_date, 'payment_day')
+_keep_day_key(Expense.expense_date, 'expense_day')
+
+
+# === RESUMEN FINANCIERO DE ESTANCIAS ===
+# Noches y saldo se recalculan al asignar las fechas o el precio acordado.
+
+@event.listens_for(Stay.check_in_date, 'set')
+def _check_in_nights(target, value, oldvalue, initiator):
+    target.nights = nights_between(value, target.check_out_date)
+
+
+@event.listens_for(Stay.check_out_date, 'set')
+def _check_out_nights(target, value, oldvalue, initiator):
+    target.nights = nights_between(target.check_in_date, value)
+
+
+@event.listens_for(Stay.agreed_total, 'set')
+def _agreed_total_balance(target, value, oldvalue, initiator):
+    if isinstance(target.paid_total, ColumnElement) and value is not None:
+        # paid_total tiene un incremento SQL pendiente (record_payment)
+        target.balance_due = Stay.balance_expression(db.literal(value), target.paid_total)
+    else:
+        target.balance_due = Stay.balance_for(value, target.paid_total)
+
+
 # === V3.0 BUSINESS STATISTICS CLASS ===
 class DashboardStats:
     """Clase para manejar todas las estadísticas del dashboard de manera centralizada"""
@@ -741,10 +985,12 @@ class DashboardStats:
     @staticmethod
     def get_panel_statistics():
         """Obtiene todas las estadísticas necesarias para el panel de control"""
+        from app.loaders import STAY_LIST
+        
         # Estadísticas básicas
         total_clients = Client.query.count()
         active_stays = Stay.query.filter(Stay.status == 'Activa').count()
-        pending_closure_stays = Stay.query.filter(Stay.status == 'Pendiente de Cierre').all()
+        pending_closure_stays = Stay.query.options(*STAY_LIST).filter(Stay.status == 'Pendiente de Cierre').all()
         
         # Inventario
         inventory_status = Supply.get_inventory_status()
@@ -763,7 +1009,7 @@ class DashboardStats:
         supplies = Supply.query.order_by(Supply.name).all()
         
         # Datos recientes
-        recent_stays = Stay.query.order_by(Stay.check_in_date.desc()).limit(15).all()
+        recent_stays = Stay.query.options(*STAY_LIST).order_by(Stay.check_in_date.desc()).limit(15).all()
         recent_expenses = Expense.query.order_by(Expense.expense_date.desc()).limit(15).all()
         
         return {
@@ -0,0 +1,171 @@
+"""
+AIRBNB MANAGER V4.0 - MATRICES DE OCUPACIÓN (OCUPACIÓN, ADR Y REVPAR)
+Carga una sola vez las estancias de un rango de fechas y arma dos matrices
+NumPy habitaciones × noches: ocupación (noche vendida o no) e ingreso de la
+noche. Los indicadores por noche, semana, mes, habitación o tier salen de
+reducciones vectorizadas sobre esas matrices:
+
+    ocupación = noches vendidas / noches disponibles
+    ADR       = ingreso / noches vendidas
+    RevPAR    = ingreso / noches disponibles
+
+El ingreso de cada estancia es su total pagado (Stay.paid_total, el resumen de
+sus pagos) repartido en partes iguales entre sus noches. Una estancia abierta
+(sin check-out) ocupa su primera noche, igual que en las reservas.
+
+Uso:
+    matrix = OccupancyMatrix.load(date(2024, 1, 1), date(2025, 12, 31))
+    matrix.summary('month')   # [{'key': '2024-01', 'occupancy': 71.3, 'adr': ..., 'revpar': ...}, ...]
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import or_, select
+
+from app.day_keys import day_key, from_day_key
+from app.extensions import db
+from app.models import TIER_HIERARCHY, Stay
+from app.room_catalog import get_catalog
+
+
+GROUPINGS = ('night', 'week', 'month', 'room', 'tier')
+
+# Rango máximo que se acepta desde los endpoints (noches)
+MAX_RANGE_DAYS = 366 * 5
+
+
+class OccupancyMatrix:
+    """Matrices habitaciones × noches de un rango [start, end] (inclusive)"""
+
+    def __init__(self, start: date, end: date, rooms: Sequence, occupied: np.ndarray, revenue: np.ndarray):
+        self.start = start
+        self.end = end
+        self.rooms = tuple(rooms)
+        self.occupied = occupied      # bool (habitaciones, noches)
+        self.revenue = revenue        # float (habitaciones, noches)
+        self.nights = [start + timedelta(days=i) for i in range(occupied.shape[1])]
+
+    @classmethod
+    def load(cls, start: date, end: date, tier: Optional[str] = None) -> 'OccupancyMatrix':
+        """Una consulta de estancias del rango; el resto es NumPy"""
+        if end < start:
+            raise ValueError('La fecha final debe ser posterior a la inicial')
+        rooms = get_catalog().of_tier(tier)
+        row_of = {room.id: i for i, room in enumerate(rooms)}
+        night_count = (end - start).days + 1
+        first_key, last_key = day_key(start), day_key(end)
+
+        stays = db.session.execute(
+            select(Stay.room_id, Stay.check_in_day, Stay.check_out_day, Stay.paid_total)
+            .where(Stay.room_id.in_(list(row_of)), Stay.check_in_day <= last_key,
+                   or_(Stay.check_out_day.is_(None), Stay.check_out_day > first_key))
+        ).all()
+
+        origin = start.toordinal()
+        rows = np.fromiter((row_of[room_id] for room_id, _, _, _ in stays), dtype=np.int64, count=len(stays))
+        check_in = np.fromiter((from_day_key(key).toordinal() - origin for _, key, _, _ in stays),
+                               dtype=np.int64, count=len(stays))
+        check_out = np.fromiter(
+            (from_day_key(key).toordinal() - origin if key else -1 for _, _, key, _ in stays),
+            dtype=np.int64, count=len(stays))
+        paid = np.fromiter((amount or 0.0 for _, _, _, amount in stays), dtype=np.float64, count=len(stays))
+
+        # Estancias abiertas: una noche; el ingreso por noche se calcula con todas sus noches
+        check_out = np.where(check_out < 0, check_in + 1, np.maximum(check_out, check_in + 1))
+        nightly = paid / (check_out - check_in)
+        first = np.clip(check_in, 0, night_count)
+        last = np.clip(check_out, 0, night_count)
+
+        # Arreglos de diferencias: +1 al entrar, -1 al salir; la suma acumulada da cada noche
+        shape = (len(rooms), night_count + 1)
+        occupied_diff = np.zeros(shape, dtype=np.int32)
+        revenue_diff = np.zeros(shape, dtype=np.float64)
+        np.add.at(occupied_diff, (rows, first), 1)
+        np.add.at(occupied_diff, (rows, last), -1)
+        np.add.at(revenue_diff, (rows, first), nightly)
+        np.add.at(revenue_diff, (rows, last), -nightly)
+
+        occupied = np.cumsum(occupied_diff, axis=1)[:, :night_count] > 0
+        revenue = np.cumsum(revenue_diff, axis=1)[:, :night_count]
+        # Restos de punto flotante de la suma acumulada en noches libres
+        revenue[~occupied] = 0.0
+        return cls(start, end, rooms, occupied, revenue)
+
+    # === REDUCCIONES ===
+
+    @staticmethod
+    def _metrics(available, sold, revenue) -> Dict:
+        available = int(available)
+        sold = int(sold)
+        revenue = float(revenue)
+        return {
+            'available': available,
+            'sold': sold,
+            'revenue': round(revenue, 2),
+            'occupancy': round(sold / available * 100, 1) if available else 0.0,
+            'adr': round(revenue / sold, 2) if sold else 0.0,
+            'revpar': round(revenue / available, 2) if available else 0.0,
+        }
+
+    def totals(self) -> Dict:
+        return self._metrics(self.occupied.size, self.occupied.sum(), self.revenue.sum())
+
+    def _by_night_segments(self, labels: List[str]) -> List[Dict]:
+        """Agrupa noches consecutivas con la misma etiqueta (semanas, meses) con reduceat"""
+        sold_per_night = self.occupied.sum(axis=0)
+        revenue_per_night = self.revenue.sum(axis=0)
+        starts = [i for i, label in enumerate(labels) if i == 0 or label != labels[i - 1]]
+        if not starts:
+            return []
+        sold = np.add.reduceat(sold_per_night, starts)
+        revenue = np.add.reduceat(revenue_per_night, starts)
+        lengths = np.diff(starts + [len(labels)])
+        return [
+            dict(key=labels[first], **self._metrics(length * len(self.rooms), sold[i], revenue[i]))
+            for i, (first, length) in enumerate(zip(starts, lengths))
+        ]
+
+    def summary(self, by: str = 'month') -> List[Dict]:
+        """Ocupación, ADR y RevPAR agrupados por noche, semana, mes, habitación o tier"""
+        if by not in GROUPINGS:
+            raise ValueError(f'Agrupación desconocida: {by}')
+
+        if by == 'night':
+            sold = self.occupied.sum(axis=0)
+            revenue = self.revenue.sum(axis=0)
+            return [dict(key=night.isoformat(), **self._metrics(len(self.rooms), sold[i], revenue[i]))
+                    for i, night in enumerate(self.nights)]
+        if by == 'week':
+            labels = ['{}-W{:02d}'.format(*night.isocalendar()[:2]) for night in self.nights]
+            return self._by_night_segments(labels)
+        if by == 'month':
+            return self._by_night_segments([night.strftime('%Y-%m') for night in self.nights])
+
+        night_count = len(self.nights)
+        sold = self.occupied.sum(axis=1)
+        revenue = self.revenue.sum(axis=1)
+        if by == 'room':
+            return [dict(key=room.id, label=room.name, tier=room.tier,
+                         **self._metrics(night_count, sold[i], revenue[i]))
+                    for i, room in enumerate(self.rooms)]
+
+        tiers = np.array([room.tier for room in self.rooms])
+        rows = []
+        for tier in sorted({room.tier for room in self.rooms}, key=lambda name: TIER_HIERARCHY.get(name, 0)):
+            mask = tiers == tier
+            rows.append(dict(key=tier, rooms=int(mask.sum()),
+                             **self._metrics(mask.sum() * night_count, sold[mask].sum(), revenue[mask].sum())))
+        return rows
+
+    def to_dict(self, by: str = 'month') -> Dict:
+        return {
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'rooms': len(self.rooms),
+            'nights': len(self.nights),
+            'by': by,
+            'totals': self.totals(),
+            'rows': self.summary(by),
+        }
@@ -0,0 +1,161 @@
+"""
+AIRBNB MANAGER V4.0 - CACHÉ DE PAQUETES DE SUMINISTROS
+Mantiene en memoria el mapa completo habitación → items del paquete, con costos
+y conteos de obligatorios/opcionales ya calculados. Se carga con una sola
+consulta y se invalida cuando cambia `room_supply_defaults` o el precio
+unitario de un suministro; los demás workers se enteran por el sello
+'packages' (app/stamped_cache.py).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.models import Room, Supply, room_supply_defaults
+from app.stamped_cache import StampedCache, watch_tables
+
+
+PACKAGES_STAMP = 'packages'
+
+
+USAGE_TYPE_DISPLAY = {
+    'Automático': '🤖 Automático',
+    'Opcional': '🔄 Opcional',
+    'Bajo demanda': '📞 Bajo demanda'
+}
+
+
+@dataclass(frozen=True)
+class PackageSupply:
+    """Datos del suministro que necesita un item de paquete"""
+    id: int
+    name: str
+    category: str
+    unit_price: Optional[float]
+
+
+@dataclass(frozen=True)
+class PackageItem:
+    """Item de paquete de una habitación (fila de room_supply_defaults + suministro)"""
+    room_id: int
+    supply: PackageSupply
+    quantity: int
+    is_mandatory: bool
+    usage_type: str
+    notes: Optional[str]
+    total_cost: float
+
+    # Compatibilidad con las filas del antiguo JOIN crudo (`s.*`): `id` es el del suministro
+    @property
+    def id(self) -> int:
+        return self.supply.id
+
+    @property
+    def supply_id(self) -> int:
+        return self.supply.id
+
+    @property
+    def name(self) -> str:
+        return self.supply.name
+
+    @property
+    def unit_price(self) -> Optional[float]:
+        return self.supply.unit_price
+
+    def calculate_total_cost(self) -> float:
+        return self.total_cost
+
+    def get_usage_type_display(self) -> str:
+        return USAGE_TYPE_DISPLAY.get(self.usage_type, self.usage_type)
+
+
+@dataclass(frozen=True)
+class RoomPackage:
+    """Paquete completo de una habitación con totales precalculados"""
+    room_id: int
+    items: Tuple[PackageItem, ...]
+    total_cost: float
+    mandatory_items: int
+    optional_items: int
+
+    @property
+    def mandatory(self) -> Tuple[PackageItem, ...]:
+        return tuple(item for item in self.items if item.is_mandatory)
+
+    def summary(self) -> Optional[Dict]:
+        """Mismo formato que retornaba `Room.get_package_summary`"""
+        if not self.items:
+            return None
+        return {
+            'total_items': len(self.items),
+            'mandatory_items': self.mandatory_items,
+            'optional_items': self.optional_items,
+            'total_cost': self.total_cost,
+            'items': list(self.items)
+        }
+
+
+EMPTY_PACKAGE_ITEMS: Tuple[PackageItem, ...] = ()
+
+
+class SupplyPackageCache(StampedCache):
+    """Caché de proceso del mapa habitación → paquete, recargado de forma perezosa"""
+
+    stamp_name = PACKAGES_STAMP
+
+    def all_packages(self) -> Dict[int, RoomPackage]:
+        """Mapa room_id → RoomPackage (solo habitaciones con paquete)"""
+        return self.value()
+
+    def get(self, room_id: int) -> RoomPackage:
+        package = self.all_packages().get(room_id)
+        return package or RoomPackage(room_id, EMPTY_PACKAGE_ITEMS, 0.0, 0, 0)
+
+    def _load(self, connection, stamp: int) -> Dict[int, RoomPackage]:
+        rsd = room_supply_defaults
+        rows = connection.execute(
+            select(rsd.c.room_id, rsd.c.quantity, rsd.c.is_mandatory, rsd.c.usage_type, rsd.c.notes,
+                   Supply.id, Supply.name, Supply.category, Supply.unit_price)
+            .join(Supply, Supply.id == rsd.c.supply_id)
+            .order_by(rsd.c.room_id, Supply.category, Supply.name)
+        ).all()
+
+        supplies: Dict[int, PackageSupply] = {}
+        items_by_room: Dict[int, list] = {}
+        for room_id, quantity, is_mandatory, usage_type, notes, supply_id, name, category, unit_price in rows:
+            supply = supplies.get(supply_id)
+            if supply is None:
+                supply = supplies[supply_id] = PackageSupply(supply_id, name, category, unit_price)
+            items_by_room.setdefault(room_id, []).append(PackageItem(
+                room_id=room_id,
+                supply=supply,
+                quantity=quantity,
+                is_mandatory=bool(is_mandatory),
+                usage_type=usage_type,
+                notes=notes,
+                total_cost=quantity * unit_price if unit_price else 0.0
+            ))
+
+        packages = {}
+        for room_id, items in items_by_room.items():
+            mandatory = sum(1 for item in items if item.is_mandatory)
+            packages[room_id] = RoomPackage(
+                room_id=room_id,
+                items=tuple(items),
+                total_cost=sum(item.total_cost for item in items),
+                mandatory_items=mandatory,
+                optional_items=len(items) - mandatory
+            )
+        return packages
+
+
+package_cache = SupplyPackageCache()
+
+
+# === INVALIDACIÓN ===
+# Items de paquete (también por la relación Room.supply_packages) y precio
+# unitario de los suministros
+
+watch_tables(package_cache, (room_supply_defaults, Room, Supply),
+             attributes={Room: ('supply_packages',), Supply: ('unit_price',)})
@@ -0,0 +1,97 @@
+"""
+AIRBNB MANAGER V4.0 - COTIZACIONES
+Precio de varias habitaciones para unas noches en una sola llamada: desglose
+por noche, descuento por duración y total, según los planes de tarifas
+(app/rate_plans.py). Las habitaciones del mismo plan comparten la
+cotización, que se guarda en un caché LRU por compilación de los planes y
+rango de fechas; cotizar una lista completa de sugerencias son unas pocas
+búsquedas en memoria.
+
+Uso:
+    quotes = quote([1, 2, 3], date(2025, 7, 3), date(2025, 7, 10))
+    quotes[2].total, quotes[2].quote.nightly
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.rate_plans import Plan, Quote, RateCard, get_rate_card
+from app.room_catalog import get_catalog
+
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+@dataclass(frozen=True)
+class RoomQuote:
+    """Cotización de una habitación"""
+    room_id: int
+    room_name: str
+    tier: str
+    quote: Quote
+
+    @property
+    def total(self) -> float:
+        return self.quote.total
+
+    def to_dict(self) -> Dict:
+        return dict(room_id=self.room_id, room_name=self.room_name, tier=self.tier, **self.quote.to_dict())
+
+
+class QuoteCache:
+    """LRU de cotizaciones por (compilación de los planes, plan, entrada, salida)"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Tuple, Quote]' = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, card: RateCard, plan: Plan, check_in: date, check_out: date) -> Quote:
+        key = (card.generation, plan.key, check_in, check_out)
+        with self._lock:
+            found = self._entries.get(key)
+            if found is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return found
+            self.misses += 1
+        # Las compilaciones viejas no se vuelven a pedir: salen solas por antigüedad
+        result = card.quote_plan(plan, check_in, check_out, breakdown=True)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+
+quote_cache = QuoteCache()
+
+
+def quote_room(room, check_in: date, check_out: date, tier: Optional[str] = None) -> Quote:
+    """Cotización de una habitación (o como si fuera del tier indicado)"""
+    card = get_rate_card()
+    return quote_cache.get(card, card.plan_for(room, tier), check_in, check_out)
+
+
+def quote(room_ids: Optional[Iterable[int]], check_in: date, check_out: date) -> Dict[int, RoomQuote]:
+    """Cotizaciones por ID de habitación (None: todas); los IDs que no existen se omiten"""
+    catalog = get_catalog()
+    card = get_rate_card()
+    rooms = catalog.rooms if room_ids is None else [catalog.get(room_id) for room_id in room_ids]
+
+    quotes = {}
+    for room in rooms:
+        if room is None:
+            continue
+        quotes[room.id] = RoomQuote(room.id, room.name, room.tier,
+                                    quote_cache.get(card, card.plan_for(room), check_in, check_out))
+    return quotes
@@ -0,0 +1,207 @@
+"""
+AIRBNB MANAGER V4.0 - RANKING PEREZOSO DE SUGERENCIAS
+Selección top-K compartida por el motor de inteligencia y el de yield
+management. Cada estrategia es un generador con una cota superior barata del
+puntaje que pueden alcanzar sus candidatos; la mezcla con un heap deja de
+consumir una estrategia en cuanto su cota ya no supera al K-ésimo resultado,
+así las estrategias caras (split, reacomodación) no se ejecutan cuando las
+coincidencias directas ya llenan la lista.
+
+El resultado es idéntico a ordenar todos los candidatos por puntaje (estable,
+en el orden de las estrategias) y cortar en K.
+
+`iter_ranked` es la variante en streaming: ejecuta las estrategias en un pool
+de hilos (cada una en cuanto terminan las que declara en `after`) y va
+entregando los candidatos de cada estrategia a medida que termina.
+"""
+
+import heapq
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class ScoringModel(ABC):
+    """Modelo de puntaje enchufable: puntaje de un candidato y cota de una estrategia"""
+
+    @abstractmethod
+    def score(self, candidate) -> float:
+        """Puntaje del candidato (mayor es mejor)"""
+
+    @abstractmethod
+    def upper_bound(self, priority, max_confidence: float = 1.0, max_bonus: float = 0.0) -> float:
+        """Cota superior del puntaje de los candidatos de una estrategia con esa prioridad"""
+
+
+class PriorityConfidenceModel(ScoringModel):
+    """
+    Puntaje histórico de los motores: 2 × peso de la prioridad + confianza
+    (+ bono opcional, p. ej. por upgrade).
+    """
+
+    def __init__(self, priority_weights: Dict[Any, float], bonus: Optional[Callable[[Any], float]] = None,
+                 priority_factor: float = 2.0):
+        self.priority_weights = dict(priority_weights)
+        self.bonus = bonus
+        self.priority_factor = priority_factor
+
+    def _priority_score(self, priority) -> float:
+        return self.priority_weights.get(priority, 1) * self.priority_factor
+
+    def score(self, candidate) -> float:
+        value = self._priority_score(candidate.priority) + candidate.confidence_score
+        if self.bonus:
+            value += self.bonus(candidate)
+        return value
+
+    def upper_bound(self, priority, max_confidence: float = 1.0, max_bonus: float = 0.0) -> float:
+        return self._priority_score(priority) + max_confidence + max_bonus
+
+
+@dataclass
+class Strategy:
+    """
+    Fuente de candidatos. `generate` recibe lo producido hasta ahora por las
+    estrategias anteriores (nombre → lista) y retorna un iterable perezoso;
+    `when` permite condicionar la estrategia a esos resultados y `after`
+    nombra las estrategias que deben terminar antes (solo importa en streaming,
+    en modo secuencial se respeta el orden de la lista).
+    """
+    name: str
+    bound: float
+    generate: Callable[[Dict[str, List]], Iterable]
+    when: Optional[Callable[[Dict[str, List]], bool]] = None
+    after: Tuple[str, ...] = ()
+
+
+class _TopK:
+    """Heap de los K mejores; con empate gana la estrategia anterior y luego el candidato anterior"""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap = []  # (puntaje, -estrategia, -posición, candidato): la raíz es el peor
+        self._lock = threading.Lock()
+
+    def push(self, score: float, strategy_index: int, position: int, candidate):
+        entry = (score, -strategy_index, -position, candidate)
+        with self._lock:
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+            elif entry[:3] > self._heap[0][:3]:
+                heapq.heapreplace(self._heap, entry)
+
+    def cannot_improve(self, bound: float) -> bool:
+        # Con empate gana el candidato anterior, así que la cota debe superar al K-ésimo
+        with self._lock:
+            return len(self._heap) >= self.k and bound <= self._heap[0][0]
+
+    def result(self) -> List:
+        with self._lock:
+            ordered = sorted(self._heap, key=lambda entry: entry[:3], reverse=True)
+        return [entry[3] for entry in ordered]
+
+
+def _consume(strategy: Strategy, produced: Dict[str, List], stop: Callable[[Any, int], bool]) -> List:
+    """Consume una estrategia hasta agotarla o hasta que `stop(candidato, posición)` indique que ya no aporta"""
+    found = []
+    candidates = iter(strategy.generate(produced))
+    try:
+        for candidate in candidates:
+            found.append(candidate)
+            if stop(candidate, len(found) - 1):
+                break
+    finally:
+        close = getattr(candidates, 'close', None)
+        if close:
+            close()
+    return found
+
+
+def rank_top_k(strategies: List[Strategy], k: int, model: ScoringModel) -> List:
+    """Los K mejores candidatos de todas las estrategias, consumidas en orden y con corte temprano"""
+    top = _TopK(k)
+    produced: Dict[str, List] = {}
+
+    for index, strategy in enumerate(strategies):
+        if (strategy.when is not None and not strategy.when(produced)) or top.cannot_improve(strategy.bound):
+            produced[strategy.name] = []
+            continue
+
+        def stop(candidate, position, index=index, bound=strategy.bound):
+            top.push(model.score(candidate), index, position, candidate)
+            return top.cannot_improve(bound)
+
+        produced[strategy.name] = _consume(strategy, produced, stop)
+
+    return top.result()
+
+
+# === STREAMING ===
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def strategy_pool(max_workers: int = 4) -> ThreadPoolExecutor:
+    """Pool de proceso compartido por las búsquedas en streaming"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='suggestions')
+        return _pool
+
+
+def iter_ranked(strategies: List[Strategy], k: int, model: ScoringModel,
+                executor: ThreadPoolExecutor, run: Callable = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Ejecuta las estrategias en `executor` y produce ('strategy', (nombre,
+    candidatos, ms)) cada vez que una termina y ('done', top_k) al final. Una
+    estrategia arranca cuando terminan todas las de su `after`; si para
+    entonces su cota ya no mejora el top, se omite. `run(func)` envuelve la
+    ejecución en el hilo (p. ej. para abrir un app context).
+    """
+    run = run or (lambda func: func())
+    top = _TopK(k)
+    index_of = {strategy.name: index for index, strategy in enumerate(strategies)}
+    produced: Dict[str, List] = {}
+    pending = list(strategies)
+    running = {}
+    started = time.perf_counter()
+
+    def ready(strategy):
+        return all(name in produced for name in strategy.after)
+
+    def submit(strategy):
+        snapshot = dict(produced)
+        stop = lambda candidate, position: top.cannot_improve(strategy.bound)
+        return executor.submit(run, lambda: _consume(strategy, snapshot, stop))
+
+    while pending or running:
+        for strategy in [s for s in pending if ready(s)]:
+            pending.remove(strategy)
+            skip = (strategy.when is not None and not strategy.when(produced)) or top.cannot_improve(strategy.bound)
+            if skip:
+                produced[strategy.name] = []
+            else:
+                running[submit(strategy)] = strategy
+        if not running:
+            if pending:
+                # Dependencias imposibles de satisfacer: se omiten
+                for strategy in pending:
+                    produced[strategy.name] = []
+                pending = []
+            continue
+
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=lambda f: index_of[running[f].name]):
+            strategy = running.pop(future)
+            found = future.result()
+            produced[strategy.name] = found
+            for position, candidate in enumerate(found):
+                top.push(model.score(candidate), index_of[strategy.name], position, candidate)
+            yield 'strategy', (strategy.name, found, round((time.perf_counter() - started) * 1000, 1))
+
+    yield 'done', top.result()
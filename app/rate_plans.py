@@ -0,0 +1,358 @@
+"""
+AIRBNB MANAGER V4.0 - PLANES DE TARIFAS
+Precios por noche configurables en la base de datos, en lugar de los
+diccionarios `base_prices` repetidos en cada motor:
+
+    rate_plan          tarifa base por habitación o tier, factores por día de la
+                       semana y estadía mínima
+    rate_season        temporadas (factor, estadía mínima y cierres a llegadas o
+                       salidas) por rango de fechas
+    rate_los_discount  descuentos por duración de la estancia
+
+Los planes se compilan una vez por proceso en un arreglo de precios por noche
+por plan (con sumas acumuladas) sobre una ventana de fechas alrededor de hoy;
+el subtotal de cualquier estancia dentro de la ventana es una resta de dos
+sumas acumuladas. Fuera de la ventana se calcula al vuelo con las mismas reglas.
+
+Se recompila cuando se edita un plan, temporada o descuento (sello
+'rate_plans', app/stamped_cache.py). Si las
+tres tablas están vacías se usan las tarifas por defecto de abajo.
+
+Uso:
+    quote = quote_stay(room, date(2025, 7, 3), date(2025, 7, 10))
+    quote.total, quote.nights, quote.min_stay, quote.meets_min_stay
+"""
+
+import itertools
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from app.models import LengthOfStayDiscount, RatePlan, RateSeason
+from app.stamped_cache import StampedCache, watch_tables
+
+
+RATE_PLAN_STAMP = 'rate_plans'
+
+# Tarifa de una habitación sin plan propio, de su tier ni general
+FALLBACK_BASE_RATE = 3000.0
+
+# Ventana compilada: un año hacia atrás y dos hacia adelante; se recompila al mes
+WINDOW_PAST_DAYS = 366
+WINDOW_FUTURE_DAYS = 366 * 2
+RECOMPILE_AFTER_DAYS = 30
+
+# === TARIFAS POR DEFECTO (BASE DE DATOS SIN CONFIGURAR) ===
+
+DEFAULT_PLANS = (
+    {'name': 'Queen', 'tier': 'Queen', 'base_rate': 2500.0},
+    {'name': 'King', 'tier': 'King', 'base_rate': 4000.0},
+)
+# Temporada alta: diciembre a febrero y julio-agosto (mes y día; el año se ignora)
+DEFAULT_SEASONS = (
+    {'name': 'Temporada alta (invierno)', 'start': (12, 1), 'end': (2, 29), 'factor': 1.2},
+    {'name': 'Temporada alta (verano)', 'start': (7, 1), 'end': (8, 31), 'factor': 1.2},
+)
+DEFAULT_LOS_DISCOUNTS = ((7, 0.10), (14, 0.15))
+
+
+@dataclass(frozen=True)
+class Season:
+    name: str
+    start: Tuple[int, ...]    # (mes, día) si se repite cada año, si no (año, mes, día)
+    end: Tuple[int, ...]
+    factor: float
+    min_stay: Optional[int]
+    closed_to_arrival: bool = False
+    closed_to_departure: bool = False
+
+    @property
+    def repeats_yearly(self) -> bool:
+        return len(self.start) == 2
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Plan resuelto con sus temporadas y descuentos (los generales ya incluidos)"""
+    key: Tuple[str, object]   # ('room', id), ('tier', nombre), ('default', None)
+    name: str
+    base_rate: float
+    weekday_factors: Tuple[float, ...]
+    min_stay: int
+    seasons: Tuple[Season, ...]
+    discounts: Tuple[Tuple[int, float], ...]   # (noches mínimas, descuento) ascendente
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Cotización de una estancia"""
+    plan: str
+    check_in: date
+    check_out: date
+    nights: int
+    subtotal: float
+    discount_rate: float
+    total: float
+    min_stay: int
+    nightly: Tuple[float, ...] = ()   # Precio de cada noche antes del descuento por duración
+
+    @property
+    def discount(self) -> float:
+        return round(self.subtotal - self.total, 2)
+
+    @property
+    def nightly_average(self) -> float:
+        return round(self.total / self.nights, 2) if self.nights else 0.0
+
+    @property
+    def meets_min_stay(self) -> bool:
+        return self.nights >= self.min_stay
+
+    def to_dict(self) -> Dict:
+        return {
+            'plan': self.plan,
+            'check_in': self.check_in.isoformat(),
+            'check_out': self.check_out.isoformat(),
+            'nights': self.nights,
+            'subtotal': self.subtotal,
+            'discount_rate': self.discount_rate,
+            'discount': self.discount,
+            'total': self.total,
+            'nightly_average': self.nightly_average,
+            'min_stay': self.min_stay,
+            'meets_min_stay': self.meets_min_stay,
+            'breakdown': [{'date': (self.check_in + timedelta(days=offset)).isoformat(), 'price': round(price, 2)}
+                          for offset, price in enumerate(self.nightly)],
+        }
+
+
+# === COMPILACIÓN (VECTORIZADA) ===
+
+def _plan_nights(plan: Plan, start: date, count: int, restrictions: bool = False):
+    """
+    (precios, estadías mínimas por noche de llegada) del plan para `count`
+    noches desde `start`; con `restrictions` agrega las máscaras de días
+    cerrados a llegadas y a salidas.
+    """
+    import numpy as np
+
+    days = np.datetime64(start, 'D') + np.arange(count)
+    years = days.astype('datetime64[Y]')
+    months = days.astype('datetime64[M]')
+    month_day = ((months - years.astype('datetime64[M]')).astype(np.int64) + 1) * 100 + \
+        (days - months.astype('datetime64[D]')).astype(np.int64) + 1
+    day_key = (years.astype(np.int64) + 1970) * 10000 + month_day
+
+    factors = np.full(count, np.nan)
+    min_stays = np.full(count, plan.min_stay, dtype=np.int64)
+    closed_arrival = np.zeros(count, dtype=bool)
+    closed_departure = np.zeros(count, dtype=bool)
+    for season in plan.seasons:
+        if season.repeats_yearly:
+            first = season.start[0] * 100 + season.start[1]
+            last = season.end[0] * 100 + season.end[1]
+            if first <= last:
+                mask = (month_day >= first) & (month_day <= last)
+            else:
+                mask = (month_day >= first) | (month_day <= last)
+        else:
+            mask = (day_key >= season.start[0] * 10000 + season.start[1] * 100 + season.start[2]) & \
+                   (day_key <= season.end[0] * 10000 + season.end[1] * 100 + season.end[2])
+        # Si varias temporadas cubren una noche gana el factor mayor
+        factors = np.where(mask, np.fmax(factors, season.factor), factors)
+        if season.min_stay:
+            min_stays = np.where(mask, np.maximum(min_stays, season.min_stay), min_stays)
+        if season.closed_to_arrival:
+            closed_arrival |= mask
+        if season.closed_to_departure:
+            closed_departure |= mask
+
+    # 1970-01-01 fue jueves: (días + 3) % 7 da 0 = lunes
+    weekday = (days.astype(np.int64) + 3) % 7
+    prices = plan.base_rate * np.nan_to_num(factors, nan=1.0) * np.asarray(plan.weekday_factors)[weekday]
+    if restrictions:
+        return prices, min_stays, closed_arrival, closed_departure
+    return prices, min_stays
+
+
+def _discount_rate(plan: Plan, nights: int) -> float:
+    rate = 0.0
+    for min_nights, discount in plan.discounts:
+        if nights >= min_nights:
+            rate = discount
+    return rate
+
+
+_generations = itertools.count(1)
+
+
+class RateCard:
+    """Planes compilados: sumas acumuladas de precios por noche dentro de la ventana"""
+
+    def __init__(self, stamp: int, plans: Sequence[Plan], origin: date, length: int):
+        import numpy as np
+
+        # Identifica esta compilación (llave de los cachés de cotizaciones, app/quotes.py)
+        self.generation = next(_generations)
+        self.stamp = stamp
+        self.origin = origin
+        self.length = length
+        self.compiled_on = date.today()
+        self.plans = {plan.key: plan for plan in plans}
+        self._prefix = {}
+        self._min_stay = {}
+        self._restrictions = {}
+        self._discounts = {}
+        for plan in plans:
+            prices, min_stays, closed_arrival, closed_departure = _plan_nights(plan, origin, length, True)
+            self._prefix[plan.key] = np.concatenate(([0.0], np.cumsum(prices))).tolist()
+            self._min_stay[plan.key] = min_stays.tolist()
+            self._restrictions[plan.key] = (min_stays, closed_arrival, closed_departure)
+            # Descuento por cantidad de noches: lista indexada por noches (la última vale para más)
+            longest = max([min_nights for min_nights, _ in plan.discounts] or [0])
+            self._discounts[plan.key] = [_discount_rate(plan, nights) for nights in range(longest + 1)]
+
+    def plan_for(self, room=None, tier: Optional[str] = None) -> Plan:
+        """Plan de la habitación, si no el de su tier (o el indicado), si no el general"""
+        if room is not None and tier is None:
+            plan = self.plans.get(('room', room.id))
+            if plan:
+                return plan
+        tier = tier or (room.tier if room is not None else None)
+        plan = self.plans.get(('tier', tier)) or self.plans.get(('default', None))
+        if plan:
+            return plan
+        return Plan(('tier', tier), tier or 'General', FALLBACK_BASE_RATE, (1.0,) * 7, 1, (), ())
+
+    def restrictions(self, plan: Plan, start: date, count: int):
+        """
+        Arreglos (estadía mínima, cerrado a llegadas, cerrado a salidas) por día
+        desde `start`; fuera de la ventana compilada se calculan al vuelo.
+        """
+        first = (start - self.origin).days
+        if plan.key in self._restrictions and 0 <= first and first + count <= self.length:
+            return tuple(values[first:first + count] for values in self._restrictions[plan.key])
+        return _plan_nights(plan, start, count, True)[1:]
+
+    def quote(self, room, check_in: date, check_out: date, tier: Optional[str] = None,
+              breakdown: bool = False) -> Quote:
+        """Cotiza [check_in, check_out) para la habitación (o como si fuera del tier indicado)"""
+        return self.quote_plan(self.plan_for(room, tier), check_in, check_out, breakdown)
+
+    def quote_plan(self, plan: Plan, check_in: date, check_out: date, breakdown: bool = False) -> Quote:
+        """Subtotal con dos sumas acumuladas; `breakdown` agrega el precio de cada noche"""
+        nights = max((check_out - check_in).days, 0)
+        first = (check_in - self.origin).days
+        last = first + nights
+
+        if plan.key in self._prefix and 0 <= first and last <= self.length:
+            prefix = self._prefix[plan.key]
+            subtotal = prefix[last] - prefix[first]
+            min_stay = self._min_stay[plan.key][first] if first < self.length else plan.min_stay
+            discounts = self._discounts[plan.key]
+            discount_rate = discounts[min(nights, len(discounts) - 1)]
+            nightly = tuple(prefix[i + 1] - prefix[i] for i in range(first, last)) if breakdown else ()
+        else:
+            prices, min_stays = _plan_nights(plan, check_in, max(nights, 1))
+            subtotal = float(prices[:nights].sum())
+            min_stay = int(min_stays[0])
+            discount_rate = _discount_rate(plan, nights)
+            nightly = tuple(prices[:nights].tolist()) if breakdown else ()
+
+        return Quote(plan=plan.name, check_in=check_in, check_out=check_out, nights=nights,
+                     subtotal=round(subtotal, 2), discount_rate=discount_rate,
+                     total=round(subtotal * (1 - discount_rate), 2), min_stay=min_stay, nightly=nightly)
+
+    def nightly_rate(self, room, night: date, tier: Optional[str] = None) -> float:
+        """Precio de una noche sin descuentos por duración"""
+        return self.quote(room, night, night + timedelta(days=1), tier).subtotal
+
+    def season_factor(self, room, night: date, tier: Optional[str] = None) -> float:
+        """Precio de la noche relativo a la tarifa base del plan (temporada × día de la semana)"""
+        plan = self.plan_for(room, tier)
+        return self.nightly_rate(room, night, tier) / plan.base_rate if plan.base_rate else 1.0
+
+
+# === CARGA ===
+
+def _weekday_factors(text: Optional[str]) -> Tuple[float, ...]:
+    factors = tuple(float(value) for value in (text or '').split(',') if value.strip())
+    return factors if len(factors) == 7 else (1.0,) * 7
+
+
+def _season(row) -> Season:
+    if row.repeats_yearly:
+        start, end = (row.start_date.month, row.start_date.day), (row.end_date.month, row.end_date.day)
+    else:
+        start = (row.start_date.year, row.start_date.month, row.start_date.day)
+        end = (row.end_date.year, row.end_date.month, row.end_date.day)
+    return Season(row.name, start, end, row.factor, row.min_stay,
+                  bool(row.closed_to_arrival), bool(row.closed_to_departure))
+
+
+def _default_plans() -> List[Plan]:
+    seasons = tuple(Season(item['name'], item['start'], item['end'], item['factor'], None)
+                    for item in DEFAULT_SEASONS)
+    return [Plan(('tier', item['tier']), item['name'], item['base_rate'], (1.0,) * 7, 1,
+                 seasons, DEFAULT_LOS_DISCOUNTS) for item in DEFAULT_PLANS]
+
+
+def load_plans(connection) -> List[Plan]:
+    plans = connection.execute(select(RatePlan).where(RatePlan.is_active.is_(True)).order_by(RatePlan.id)).all()
+    seasons = connection.execute(select(RateSeason).order_by(RateSeason.id)).all()
+    discounts = connection.execute(
+        select(LengthOfStayDiscount).order_by(LengthOfStayDiscount.min_nights)).all()
+    if not plans and not seasons and not discounts:
+        return _default_plans()
+
+    resolved = []
+    for plan in plans:
+        if plan.room_id is not None:
+            key = ('room', plan.room_id)
+        elif plan.tier:
+            key = ('tier', plan.tier)
+        else:
+            key = ('default', None)
+        plan_seasons = tuple(_season(row) for row in seasons if row.rate_plan_id in (None, plan.id))
+        # Un descuento propio del plan reemplaza al general de la misma cantidad de noches
+        by_nights = {row.min_nights: row.discount for row in discounts if row.rate_plan_id is None}
+        by_nights.update({row.min_nights: row.discount for row in discounts if row.rate_plan_id == plan.id})
+        resolved.append(Plan(key, plan.name, plan.base_rate, _weekday_factors(plan.weekday_factors),
+                             max(plan.min_stay or 1, 1), plan_seasons, tuple(sorted(by_nights.items()))))
+    return resolved
+
+
+class RatePlanCache(StampedCache):
+    """Caché de proceso de los planes compilados"""
+
+    stamp_name = RATE_PLAN_STAMP
+
+    def card(self) -> RateCard:
+        return self.value()
+
+    def _load(self, connection, stamp: int) -> RateCard:
+        today = date.today()
+        return RateCard(stamp, load_plans(connection), today - timedelta(days=WINDOW_PAST_DAYS),
+                        WINDOW_PAST_DAYS + WINDOW_FUTURE_DAYS)
+
+    def _is_stale(self, card: RateCard) -> bool:
+        # La ventana se corre con los días: se recompila al mes
+        return (date.today() - card.compiled_on).days > RECOMPILE_AFTER_DAYS
+
+
+rate_plan_cache = RatePlanCache()
+
+
+def get_rate_card() -> RateCard:
+    return rate_plan_cache.card()
+
+
+def quote_stay(room, check_in: date, check_out: date, tier: Optional[str] = None) -> Quote:
+    return get_rate_card().quote(room, check_in, check_out, tier)
+
+
+# === INVALIDACIÓN ===
+
+watch_tables(rate_plan_cache, (RatePlan, RateSeason, LengthOfStayDiscount))
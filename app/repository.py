@@ -0,0 +1,100 @@
+"""
+AIRBNB MANAGER V4.0 - REPOSITORIO POR PETICIÓN
+Mapa de identidad por petición para las búsquedas repetidas de habitaciones y
+clientes dentro de un mismo handler:
+
+- Habitaciones: se construyen desde el catálogo de proceso
+  (app/room_catalog.py) y se incorporan a la sesión de la petición como
+  instancias persistentes, sin SELECT. Las que ya estén en la sesión se usan
+  tal cual.
+- Clientes: se memorizan por ID durante la petición.
+
+Uso:
+    repo = get_repository()
+    room = repo.room(room_id)
+    client = repo.client(client_id)
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from flask import g, has_app_context
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.extensions import db
+from app.models import Client, Room
+from app.room_catalog import CatalogRoom, CatalogSnapshot, get_catalog
+
+
+class Repository:
+    """Búsquedas de Room y Client memorizadas durante una petición"""
+
+    def __init__(self, session=None):
+        self.session = session or db.session
+        self._rooms: Optional[Dict[int, Room]] = None
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._clients: Dict[int, Optional[Client]] = {}
+
+    # === HABITACIONES ===
+
+    @property
+    def catalog(self) -> CatalogSnapshot:
+        """Instantánea inmutable del catálogo (para lo que no necesita instancias ORM)"""
+        return get_catalog()
+
+    def _room_map(self) -> Dict[int, Room]:
+        snapshot = get_catalog()
+        if self._rooms is None or self._snapshot is not snapshot:
+            self._snapshot = snapshot
+            self._rooms = {entry.id: self._attach(entry) for entry in snapshot}
+        return self._rooms
+
+    def _attach(self, entry: CatalogRoom) -> Room:
+        """Habitación del catálogo como instancia de la sesión de la petición, sin consultar la base de datos"""
+        existing = self.session.identity_map.get(inspect(Room).identity_key_from_primary_key((entry.id,)))
+        if existing is not None:
+            # Ya cargada en la sesión: su estado es al menos tan nuevo como el catálogo
+            return existing
+        room = Room(**entry.column_values())
+        make_transient_to_detached(room)
+        self.session.add(room)
+        return room
+
+    def rooms(self, tier: Optional[str] = None) -> List[Room]:
+        rooms = list(self._room_map().values())
+        if tier:
+            rooms = [room for room in rooms if room.tier == tier]
+        return rooms
+
+    def room(self, room_id) -> Optional[Room]:
+        return self._room_map().get(int(room_id)) if room_id is not None else None
+
+    # === CLIENTES ===
+
+    def client(self, client_id) -> Optional[Client]:
+        if client_id is None:
+            return None
+        client_id = int(client_id)
+        if client_id not in self._clients:
+            self._clients[client_id] = self.session.get(Client, client_id)
+        return self._clients[client_id]
+
+    def clients(self, client_ids: Iterable) -> Dict[int, Client]:
+        """Varios clientes en una sola consulta (solo los que falten)"""
+        ids = {int(client_id) for client_id in client_ids if client_id is not None}
+        missing = ids - self._clients.keys()
+        if missing:
+            found = {client.id: client for client in Client.query.filter(Client.id.in_(missing)).all()}
+            for client_id in missing:
+                self._clients[client_id] = found.get(client_id)
+        return {client_id: self._clients[client_id] for client_id in ids if self._clients[client_id]}
+
+
+def get_repository() -> Repository:
+    """Repositorio de la petición (o del app context) actual"""
+    if not has_app_context():
+        return Repository()
+    repository = g.get('_repository')
+    if repository is None:
+        repository = g._repository = Repository()
+    return repository
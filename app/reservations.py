@@ -0,0 +1,456 @@
+"""
+AIRBNB MANAGER V4.0 - CONFIRMACIÓN DE RESERVAS SIN CARRERAS
+Camino único para crear y extender estancias: toma el bloqueo de escritura
+(BEGIN IMMEDIATE en SQLite, SELECT ... FOR UPDATE sobre la habitación en otros
+motores), valida el solapamiento contra el índice de ocupación dentro de la
+misma transacción junto con la estadía mínima y los cierres a llegadas/salidas
+del calendario (app/calendar_gaps.py) y, si hay conflicto, lo reporta con
+habitaciones alternativas.
+Incluye las reservas de grupo atómicas (`reserve_group`).
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, or_, select
+
+from app.extensions import db
+from app.models import Room, Stay
+from app.repository import get_repository
+
+
+# Estados que ocupan la habitación (una estancia finalizada ya la liberó)
+OCCUPYING_STATUSES = ('Activa', 'Pendiente de Cierre')
+
+
+class ReservationConflict(Exception):
+    """
+    La habitación no acepta la estancia: está ocupada en alguna de las noches
+    (reason 'occupied') o la estancia no cumple una restricción de estadía
+    ('min_stay', 'closed_to_arrival', 'closed_to_departure').
+    """
+
+    def __init__(self, room: Room, check_in: datetime, check_out: datetime,
+                 conflicting_stays: List[Stay], alternatives: List[Room],
+                 reason: str = 'occupied', message: Optional[str] = None):
+        super().__init__(message or f'La habitación {room.name} ya está ocupada en esas fechas')
+        self.reason = reason
+        self.room = room
+        self.check_in = check_in
+        self.check_out = check_out
+        self.conflicting_stays = conflicting_stays
+        self.alternatives = alternatives
+
+    def to_dict(self) -> Dict:
+        return {
+            'reason': self.reason,
+            'room_id': self.room.id,
+            'room_name': self.room.name,
+            'check_in': self.check_in.strftime('%Y-%m-%d'),
+            'check_out': self.check_out.strftime('%Y-%m-%d'),
+            'conflicting_stays': [
+                {
+                    'stay_id': stay.id,
+                    'client_name': stay.client.full_name if stay.client else None,
+                    'check_in': stay.check_in_date.strftime('%Y-%m-%d'),
+                    'check_out': stay.check_out_date.strftime('%Y-%m-%d') if stay.check_out_date else None
+                }
+                for stay in self.conflicting_stays
+            ],
+            'alternatives': [
+                {'id': room.id, 'name': room.name, 'tier': room.tier, 'tier_display': room.get_tier_display()}
+                for room in self.alternatives
+            ]
+        }
+
+
+# === NOCHES Y SOLAPAMIENTO ===
+
+def _day_start(value) -> datetime:
+    if isinstance(value, datetime):
+        return datetime.combine(value.date(), datetime.min.time())
+    return datetime.combine(value, datetime.min.time())
+
+
+def night_bounds(check_in, check_out=None):
+    """
+    Rango de noches [inicio, fin) a medianoche. Una estancia abierta (sin
+    check-out) reserva al menos su primera noche.
+    """
+    start = _day_start(check_in)
+    end = _day_start(check_out) if check_out else start + timedelta(days=1)
+    return start, max(end, start + timedelta(days=1))
+
+
+def overlap_filter(start: datetime, end: datetime):
+    """
+    Condición sargable de solapamiento por noches contra el índice
+    (room_id, check_in_date, check_out_date): el día de salida de una estancia
+    puede ser el día de entrada de otra.
+    """
+    return (
+        Stay.status.in_(OCCUPYING_STATUSES),
+        Stay.check_in_date < end,
+        or_(Stay.check_out_date.is_(None), Stay.check_out_date >= start + timedelta(days=1))
+    )
+
+
+def find_conflicts(room_id: int, check_in, check_out=None, exclude_stay_id: Optional[int] = None) -> List[Stay]:
+    start, end = night_bounds(check_in, check_out)
+    query = Stay.query.filter(Stay.room_id == room_id, *overlap_filter(start, end))
+    if exclude_stay_id is not None:
+        query = query.filter(Stay.id != exclude_stay_id)
+    return query.order_by(Stay.check_in_date).all()
+
+
+def find_alternative_rooms(room: Room, check_in, check_out=None, limit: int = 5) -> List[Room]:
+    """
+    Habitaciones libres y sin restricciones en el mismo rango: primero el mismo
+    tier, luego upgrades y el resto
+    """
+    from app.calendar_gaps import get_calendar
+
+    start, end = night_bounds(check_in, check_out)
+    occupied = set(db.session.scalars(select(Stay.room_id).where(*overlap_filter(start, end))))
+    calendar = get_calendar()
+    repo = get_repository()
+    candidates = [entry for entry in repo.catalog if entry.id != room.id and entry.id not in occupied
+                  and calendar.restriction(entry.id, check_in, check_out) is None]
+    tier_value = room.get_tier_hierarchy_value()
+    candidates.sort(key=lambda r: (r.tier != room.tier, r.tier_value < tier_value, r.name))
+    return [repo.room(entry.id) for entry in candidates[:limit]]
+
+
+# === RESTRICCIONES DE ESTADÍA ===
+
+def stay_restriction(room: Room, check_in, check_out=None) -> Optional[Tuple[str, str]]:
+    """
+    (motivo, mensaje) si la estancia no cumple la estadía mínima o los cierres a
+    llegadas/salidas de la habitación según el calendario de huecos; si no, None.
+    """
+    from app.calendar_gaps import get_calendar
+
+    calendar = get_calendar()
+    reason = calendar.restriction(room.id, check_in, check_out)
+    if reason == 'min_stay':
+        return reason, (f'La habitación {room.name} pide una estadía mínima de '
+                        f'{calendar.min_nights(room.id, check_in)} noches con llegada el {check_in:%d/%m/%Y}')
+    if reason == 'closed_to_arrival':
+        return reason, f'La habitación {room.name} no acepta llegadas el {check_in:%d/%m/%Y}'
+    if reason == 'closed_to_departure':
+        return reason, f'La habitación {room.name} no acepta salidas el {check_out:%d/%m/%Y}'
+    return None
+
+
+# === BLOQUEO POR HABITACIÓN ===
+
+def lock_rooms_for_write(room_ids) -> Dict[int, Room]:
+    """
+    Serializa las escrituras sobre las habitaciones hasta el commit/rollback.
+    SQLite solo tiene bloqueo de escritura global: BEGIN IMMEDIATE lo toma al
+    inicio para que la validación y el INSERT vean el mismo estado. Si la
+    transacción ya escribió algo, SQLite ya tiene el bloqueo reservado. En
+    otros motores se bloquean las filas de las habitaciones en orden de ID
+    (sin interbloqueos entre grupos que comparten habitaciones).
+    """
+    room_ids = sorted(set(room_ids))
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        driver_connection = connection.connection.driver_connection
+        if not driver_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        statement = select(Room).where(Room.id.in_(room_ids))
+    else:
+        statement = select(Room).where(Room.id.in_(room_ids)).order_by(Room.id).with_for_update()
+    return {room.id: room for room in db.session.execute(statement).scalars()}
+
+
+def lock_room_for_write(room_id: int) -> Optional[Room]:
+    return lock_rooms_for_write([room_id]).get(room_id)
+
+
+# === OPERACIONES ===
+
+def reserve_stay(client_id: int, room_id: int, check_in: datetime, check_out: Optional[datetime] = None,
+                 booking_channel: str = 'Directo', status: str = 'Activa',
+                 agreed_total: Optional[float] = None) -> Stay:
+    """
+    Crea una estancia validando el solapamiento bajo el bloqueo de la habitación.
+    Deja la estancia agregada (con flush) en la transacción actual; el llamador
+    hace commit. Lanza ReservationConflict o ValueError.
+    """
+    if check_out and check_out <= check_in:
+        raise ValueError('La fecha de salida debe ser posterior a la de entrada')
+
+    room = lock_room_for_write(room_id)
+    if room is None:
+        raise ValueError('Habitación no encontrada')
+
+    conflicts = find_conflicts(room.id, check_in, check_out)
+    if conflicts:
+        raise ReservationConflict(room, check_in, check_out or night_bounds(check_in)[1], conflicts,
+                                  find_alternative_rooms(room, check_in, check_out))
+
+    restriction = stay_restriction(room, check_in, check_out)
+    if restriction:
+        reason, message = restriction
+        raise ReservationConflict(room, check_in, check_out or night_bounds(check_in)[1], [],
+                                  find_alternative_rooms(room, check_in, check_out), reason, message)
+
+    stay = Stay(
+        client_id=client_id,
+        room_id=room.id,
+        check_in_date=check_in,
+        check_out_date=check_out,
+        booking_channel=booking_channel,
+        status=status,
+        agreed_total=agreed_total
+    )
+    db.session.add(stay)
+    db.session.flush()
+    return stay
+
+
+def extend_stay(stay_id: int, new_check_out: datetime) -> Stay:
+    """Mueve el check-out validando las noches nuevas bajo el bloqueo de la habitación"""
+    stay = db.session.get(Stay, stay_id)
+    if stay is None:
+        raise ValueError('Estancia no encontrada')
+
+    room = lock_room_for_write(stay.room_id)
+    # Releer después de tomar el bloqueo: otro proceso pudo modificarla
+    db.session.refresh(stay)
+
+    if stay.check_out_date and new_check_out <= stay.check_out_date:
+        raise ValueError('La nueva fecha debe ser posterior a la actual')
+
+    conflicts = find_conflicts(room.id, stay.check_in_date, new_check_out, exclude_stay_id=stay.id)
+    if conflicts:
+        start = stay.check_out_date or stay.check_in_date
+        raise ReservationConflict(room, start, new_check_out, conflicts,
+                                  find_alternative_rooms(room, start, new_check_out))
+
+    stay.check_out_date = new_check_out
+    db.session.flush()
+    return stay
+
+
+# === RESERVAS DE GRUPO ===
+
+@dataclass
+class GroupEntry:
+    """Una línea de la reserva de grupo ya interpretada"""
+    index: int
+    client_id: Optional[int] = None
+    room_id: Optional[int] = None
+    check_in: Optional[datetime] = None
+    check_out: Optional[datetime] = None
+    booking_channel: str = 'Directo'
+    initial_payment: float = 0.0
+    payment_method: str = 'Efectivo'
+    errors: List[str] = field(default_factory=list)
+    conflict: Optional[Dict] = None
+    stay_id: Optional[int] = None
+    supplies: List[Dict] = field(default_factory=list)
+
+
+def _parse_group_entry(index: int, raw: Dict) -> GroupEntry:
+    entry = GroupEntry(index=index)
+    for name in ('client_id', 'room_id', 'check_in_date'):
+        if not raw.get(name):
+            entry.errors.append(f'Campo requerido: {name}')
+    if entry.errors:
+        return entry
+    try:
+        entry.client_id = int(raw['client_id'])
+        entry.room_id = int(raw['room_id'])
+        entry.check_in = datetime.strptime(raw['check_in_date'], '%Y-%m-%d')
+        entry.check_out = datetime.strptime(raw['check_out_date'], '%Y-%m-%d') if raw.get('check_out_date') else None
+        entry.initial_payment = float(raw.get('initial_payment') or 0)
+    except (TypeError, ValueError) as e:
+        entry.errors.append(f'Dato inválido: {e}')
+        return entry
+    entry.booking_channel = raw.get('booking_channel') or 'Directo'
+    entry.payment_method = raw.get('payment_method') or 'Efectivo'
+    if entry.check_out and entry.check_out <= entry.check_in:
+        entry.errors.append('La fecha de salida debe ser posterior a la de entrada')
+    if entry.initial_payment < 0:
+        entry.errors.append('El pago inicial no puede ser negativo')
+    return entry
+
+
+def _nights_overlap(a_start, a_end, b_start, b_end) -> bool:
+    return a_start < b_end and b_start < a_end
+
+
+def reserve_group(raw_entries: List[Dict], verified_by_user_id: Optional[int] = None) -> Dict:
+    """
+    Reserva varias estancias de forma atómica: valida todas las líneas en una
+    pasada (contra la ocupación existente y entre sí), inserta estancias, pagos
+    y usos de suministros con sentencias por lote y descuenta el stock una vez
+    por suministro. Si alguna línea falla no se escribe nada; el llamador hace
+    commit solo cuando `success` es True.
+    """
+    from app.models import Client, Payment, Supply, SupplyUsage
+    from app.package_cache import package_cache
+
+    entries = [_parse_group_entry(i, raw or {}) for i, raw in enumerate(raw_entries)]
+    valid = [entry for entry in entries if not entry.errors]
+
+    # === VALIDACIÓN EN UNA PASADA ===
+    rooms = lock_rooms_for_write(entry.room_id for entry in valid) if valid else {}
+    client_ids = {entry.client_id for entry in valid}
+    known_clients = set(db.session.scalars(select(Client.id).where(Client.id.in_(client_ids)))) if client_ids else set()
+
+    for entry in valid:
+        if entry.room_id not in rooms:
+            entry.errors.append('Habitación no encontrada')
+        if entry.client_id not in known_clients:
+            entry.errors.append('Cliente no encontrado')
+    valid = [entry for entry in valid if not entry.errors]
+
+    occupancy: Dict[int, List] = {}
+    if valid:
+        bounds = {entry.index: night_bounds(entry.check_in, entry.check_out) for entry in valid}
+        span_start = min(start for start, _ in bounds.values())
+        span_end = max(end for _, end in bounds.values())
+        existing = Stay.query.filter(
+            Stay.room_id.in_({entry.room_id for entry in valid}), *overlap_filter(span_start, span_end)
+        ).all()
+        for stay in existing:
+            occupancy.setdefault(stay.room_id, []).append(
+                (*night_bounds(stay.check_in_date, stay.check_out_date), f'estancia #{stay.id}'))
+
+        for entry in valid:
+            start, end = bounds[entry.index]
+            clashes = [label for (other_start, other_end, label) in occupancy.get(entry.room_id, [])
+                       if _nights_overlap(start, end, other_start, other_end)]
+            restriction = None if clashes else stay_restriction(rooms[entry.room_id], entry.check_in, entry.check_out)
+            if clashes:
+                entry.errors.append(f'La habitación {rooms[entry.room_id].name} ya está ocupada en esas fechas')
+                entry.conflict = {'reason': 'occupied', 'room_id': entry.room_id, 'conflicts_with': clashes}
+            elif restriction:
+                reason, message = restriction
+                entry.errors.append(message)
+                entry.conflict = {'reason': reason, 'room_id': entry.room_id, 'conflicts_with': []}
+            else:
+                # Las líneas aceptadas también ocupan la habitación para las siguientes
+                occupancy.setdefault(entry.room_id, []).append((start, end, f'línea {entry.index}'))
+
+    if any(entry.errors for entry in entries):
+        for entry in entries:
+            if entry.conflict:
+                entry.conflict['alternatives'] = [
+                    {'id': room.id, 'name': room.name, 'tier': room.tier}
+                    for room in find_alternative_rooms(rooms[entry.room_id], entry.check_in, entry.check_out)
+                ]
+        return _group_report(entries, success=False)
+
+    # === INSERCIONES POR LOTE ===
+    stay_ids = db.session.scalars(
+        insert(Stay).returning(Stay.id, sort_by_parameter_order=True),
+        [
+            {
+                'client_id': entry.client_id,
+                'room_id': entry.room_id,
+                'check_in_date': entry.check_in,
+                'check_out_date': entry.check_out,
+                'booking_channel': entry.booking_channel,
+                'status': 'Activa',
+                # Los pagos iniciales se insertan abajo en la misma transacción
+                'paid_total': entry.initial_payment
+            }
+            for entry in entries
+        ]
+    ).all()
+    for entry, stay_id in zip(entries, stay_ids):
+        entry.stay_id = stay_id
+
+    now = datetime.now()
+    payments = [
+        {'stay_id': entry.stay_id, 'amount': entry.initial_payment,
+         'method': entry.payment_method, 'payment_date': now}
+        for entry in entries if entry.initial_payment > 0
+    ]
+    if payments:
+        db.session.execute(insert(Payment), payments)
+
+    # === SUMINISTROS: DEMANDA COMBINADA, UN DESCUENTO POR SUMINISTRO ===
+    demand = []
+    for entry in entries:
+        for item in package_cache.get(entry.room_id).mandatory:
+            demand.append((entry, item))
+
+    supply_ids = {item.supply_id for _, item in demand}
+    supplies = {supply.id: supply for supply in
+                Supply.query.filter(Supply.id.in_(supply_ids)).all()} if supply_ids else {}
+    remaining = {supply_id: supply.current_stock for supply_id, supply in supplies.items()}
+
+    usages = []
+    warnings = []
+    for entry, item in demand:
+        supply = supplies.get(item.supply_id)
+        if supply is None:
+            continue
+        quantity = min(item.quantity, max(remaining[supply.id], 0))
+        if quantity < item.quantity:
+            warnings.append(f'{supply.name}: solo {quantity} de {item.quantity} disponibles para la línea {entry.index}')
+        if quantity <= 0:
+            continue
+        remaining[supply.id] -= quantity
+        unit_price = item.unit_price
+        usages.append({
+            'supply_id': supply.id,
+            'stay_id': entry.stay_id,
+            'room_id': entry.room_id,
+            'quantity_used': quantity,
+            'quantity_expected': item.quantity,
+            'usage_type': 'Automático',
+            'usage_source': 'Estancia',
+            'usage_date': now,
+            'verified_by_user_id': verified_by_user_id,
+            'cost_per_unit': unit_price,
+            'total_cost': quantity * unit_price if unit_price else 0.0,
+            'is_confirmed': False
+        })
+        entry.supplies.append({'supply_name': supply.name, 'quantity_used': quantity,
+                               'quantity_expected': item.quantity})
+    if usages:
+        db.session.execute(insert(SupplyUsage), usages)
+
+    for supply_id, supply in supplies.items():
+        used = supply.current_stock - remaining[supply_id]
+        if used:
+            supply.current_stock = remaining[supply_id]
+            supply.last_updated = now
+            if supply.is_low_stock():
+                warnings.append(f'{supply.name}: Stock bajo después de deducir ({supply.current_stock} restantes)')
+
+    db.session.flush()
+    report = _group_report(entries, success=True)
+    report['payments_created'] = len(payments)
+    report['supply_usages_created'] = len(usages)
+    report['warnings'] = warnings
+    return report
+
+
+def _group_report(entries: List[GroupEntry], success: bool) -> Dict:
+    return {
+        'success': success,
+        'created_count': sum(1 for entry in entries if entry.stay_id),
+        'error_count': sum(1 for entry in entries if entry.errors),
+        'items': [
+            {
+                'index': entry.index,
+                'success': success and not entry.errors,
+                'stay_id': entry.stay_id,
+                'room_id': entry.room_id,
+                'client_id': entry.client_id,
+                'errors': entry.errors,
+                'conflict': entry.conflict,
+                'supplies': entry.supplies
+            }
+            for entry in entries
+        ]
+    }
@@ -0,0 +1,384 @@
+"""
+AIRBNB MANAGER V4.0 - CUBO DE INGRESOS Y GASTOS
+Totales precalculados por mes y dimensión para los reportes, en lugar de
+recorrer todos los pagos y gastos en cada visita:
+
+    income   pagos por mes de pago, habitación y canal de la estancia
+    expense  gastos por mes, categoría y rol de quien pagó
+    stay     estancias y noches por mes de entrada, habitación y canal
+
+Las escrituras de pagos, gastos, estancias o roles de usuario marcan en la
+misma transacción los meses afectados (tabla revenue_cube_pending); al
+confirmar, esos meses se recalculan en una transacción propia. Las marcas
+del cubo completo (cargas masivas, cambios masivos) quedan para
+`flask revenue-cube`, y `flask revenue-cube --rebuild` recalcula todo
+(tarea nocturna). Los lectores no escriben: la vista de reportes lee el
+cubo tal como está y muestra los meses pendientes (`pending_months()`).
+
+Uso:
+    cube = CubeReader(start=date(2025, 1, 1), end=date(2025, 6, 15))
+    cube.slice('income', by=('room_id',))   # [{'room_id': 3, 'total': ..., 'count': ..., 'nights': 0}, ...]
+    cube.total('expense')
+
+Los meses completos del rango salen del cubo; los días sueltos de los
+extremos se calculan de las tablas base con las claves de día (índice).
+"""
+
+from calendar import monthrange
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, delete, event, func, insert, inspect, literal, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.day_keys import day_key
+from app.extensions import db
+from app.models import Expense, Payment, RevenueCubeCell, RevenueCubePending, Stay, User
+
+
+# Mes especial en revenue_cube_pending: recalcular el cubo completo
+ALL_MONTHS = 0
+
+DIMENSIONS = ('month', 'room_id', 'channel', 'category', 'payer_role')
+MEASURES = ('total', 'count', 'nights')
+CUBE_COLUMNS = ('month', 'kind') + DIMENSIONS[1:] + MEASURES
+
+
+# === MESES (yyyymm) ===
+
+def month_key(value) -> Optional[int]:
+    key = day_key(value)
+    return key // 100 if key else None
+
+
+def _next_month(month: int) -> int:
+    year, mon = divmod(month, 100)
+    return (year + 1) * 100 + 1 if mon == 12 else month + 1
+
+
+def _previous_month(month: int) -> int:
+    year, mon = divmod(month, 100)
+    return (year - 1) * 100 + 12 if mon == 1 else month - 1
+
+
+def _month_day_ranges(months: Iterable[int]) -> List[Tuple[int, int]]:
+    """Rangos de claves de día que cubren los meses, uniendo los consecutivos"""
+    ranges = []
+    for month in sorted(set(months)):
+        if ranges and _next_month(ranges[-1][1] // 100) == month:
+            ranges[-1] = (ranges[-1][0], month * 100 + 31)
+        else:
+            ranges.append((month * 100 + 1, month * 100 + 31))
+    return ranges
+
+
+# === HECHOS (CONSULTAS SOBRE LAS TABLAS BASE) ===
+
+def _in_ranges(column, ranges):
+    return or_(*[column.between(first, last) for first, last in ranges])
+
+
+def _income_facts(ranges=None):
+    month = Payment.payment_day // 100
+    channel = func.coalesce(Stay.booking_channel, '')
+    query = (
+        select(month, literal('income'), Stay.room_id, channel, literal(''), literal(''),
+               func.sum(Payment.amount), func.count(Payment.id), literal(0))
+        .join(Stay, Stay.id == Payment.stay_id)
+        .where(Payment.payment_day.isnot(None))
+        .group_by(month, Stay.room_id, channel)
+    )
+    return query.where(_in_ranges(Payment.payment_day, ranges)) if ranges else query
+
+
+def _expense_facts(ranges=None):
+    month = Expense.expense_day // 100
+    category = func.coalesce(Expense.category, '')
+    role = func.coalesce(User.role, '')
+    query = (
+        select(month, literal('expense'), literal(0), literal(''), category, role,
+               func.sum(Expense.amount), func.count(Expense.id), literal(0))
+        .outerjoin(User, User.id == Expense.paid_by_user_id)
+        .where(Expense.expense_day.isnot(None))
+        .group_by(month, category, role)
+    )
+    return query.where(_in_ranges(Expense.expense_day, ranges)) if ranges else query
+
+
+def _stay_facts(ranges=None):
+    month = Stay.check_in_day // 100
+    channel = func.coalesce(Stay.booking_channel, '')
+    query = (
+        select(month, literal('stay'), Stay.room_id, channel, literal(''), literal(''),
+               literal(0.0), func.count(Stay.id), func.coalesce(func.sum(Stay.nights), 0))
+        .where(Stay.check_in_day.isnot(None))
+        .group_by(month, Stay.room_id, channel)
+    )
+    return query.where(_in_ranges(Stay.check_in_day, ranges)) if ranges else query
+
+
+FACTS = {'income': _income_facts, 'expense': _expense_facts, 'stay': _stay_facts}
+
+
+# === RECÁLCULO ===
+
+def rebuild_months(connection, months: Optional[Iterable[int]] = None) -> None:
+    """Reemplaza las celdas de los meses indicados (None: todo el cubo) con INSERT ... SELECT"""
+    cells = RevenueCubeCell.__table__
+    if months is None:
+        connection.execute(delete(cells))
+        ranges = None
+    else:
+        months = sorted(set(months))
+        if not months:
+            return
+        connection.execute(delete(cells).where(cells.c.month.in_(months)))
+        ranges = _month_day_ranges(months)
+    for build in FACTS.values():
+        connection.execute(insert(cells).from_select(CUBE_COLUMNS, build(ranges)))
+
+
+def refresh_pending(months: Optional[Iterable[int]] = None) -> List[int]:
+    """
+    Recalcula los meses marcados (solo los de `months` si se indican) en una
+    conexión y transacción propias (no confirma la sesión de la petición). Una
+    marca que cambió mientras tanto (otra escritura) no se borra y se vuelve a
+    procesar en el próximo recálculo.
+    """
+    query = select(RevenueCubePending.month, RevenueCubePending.mark)
+    if months is not None:
+        query = query.where(RevenueCubePending.month.in_(set(months)))
+    with db.engine.connect() as connection:
+        pending = connection.execute(query).all()
+    if not pending:
+        return []
+    months = {month for month, _ in pending}
+    with db.engine.begin() as connection:
+        rebuild_months(connection, None if ALL_MONTHS in months else months)
+        connection.execute(delete(RevenueCubePending).where(or_(*[
+            and_(RevenueCubePending.month == month, RevenueCubePending.mark == mark) for month, mark in pending
+        ])))
+    return sorted(months)
+
+
+def pending_months() -> List[int]:
+    """Meses marcados y todavía sin recalcular (ALL_MONTHS: el cubo completo)"""
+    return list(db.session.execute(
+        select(RevenueCubePending.month).order_by(RevenueCubePending.month)).scalars())
+
+
+def rebuild_all() -> int:
+    """Recalcula el cubo completo y limpia las marcas; retorna la cantidad de celdas"""
+    with db.engine.begin() as connection:
+        rebuild_months(connection, None)
+        connection.execute(delete(RevenueCubePending))
+        return connection.execute(select(func.count()).select_from(RevenueCubeCell)).scalar()
+
+
+# === LECTURA ===
+
+class CubeReader:
+    """
+    Consultas sobre el cubo para un rango de fechas (inclusive; None = sin límite).
+    Solo lee: con refresh=True recalcula antes los meses marcados (refresh_pending;
+    para tareas y scripts, no para las vistas).
+    """
+
+    def __init__(self, start: Optional[date] = None, end: Optional[date] = None, refresh: bool = False):
+        if refresh:
+            refresh_pending()
+        self.start = start
+        self.end = end
+        self.full_months, self.partial_ranges = self._split_range(start, end)
+
+    @staticmethod
+    def _split_range(start, end):
+        """(meses completos (desde, hasta) o None, rangos de claves de día de meses parciales)"""
+        first = month_key(start) if start else None
+        last = month_key(end) if end else None
+        partial = []
+
+        if first and last and first == last and (start.day != 1 or end.day != monthrange(end.year, end.month)[1]):
+            return None, [(day_key(start), day_key(end))]
+        if start and start.day != 1:
+            partial.append((day_key(start), first * 100 + 31))
+            first = _next_month(first)
+        if end and end.day != monthrange(end.year, end.month)[1]:
+            partial.append((last * 100 + 1, day_key(end)))
+            last = _previous_month(last)
+        if first and last and first > last:
+            return None, partial
+        return (first, last), partial
+
+    def slice(self, kind: str, by: Sequence[str] = ()) -> List[Dict]:
+        """Totales del tipo de hecho agrupados por las dimensiones `by`"""
+        unknown = set(by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f'Dimensiones desconocidas: {", ".join(sorted(unknown))}')
+        if kind not in FACTS:
+            raise ValueError(f'Tipo de hecho desconocido: {kind}')
+
+        totals: Dict[Tuple, List] = {}
+
+        def add(key, total, count, nights):
+            cell = totals.setdefault(key, [0.0, 0, 0])
+            cell[0] += total or 0.0
+            cell[1] += count or 0
+            cell[2] += nights or 0
+
+        if self.full_months:
+            columns = [getattr(RevenueCubeCell, name) for name in by]
+            query = select(*columns, func.sum(RevenueCubeCell.total), func.sum(RevenueCubeCell.count),
+                           func.sum(RevenueCubeCell.nights)).where(RevenueCubeCell.kind == kind)
+            first, last = self.full_months
+            if first:
+                query = query.where(RevenueCubeCell.month >= first)
+            if last:
+                query = query.where(RevenueCubeCell.month <= last)
+            for row in db.session.execute(query.group_by(*columns)):
+                add(tuple(row[:len(by)]), *row[len(by):])
+
+        if self.partial_ranges:
+            positions = [DIMENSIONS.index(name) for name in by]
+            for row in db.session.execute(FACTS[kind](self.partial_ranges)):
+                dimensions = (row[0],) + tuple(row[2:6])
+                add(tuple(dimensions[i] for i in positions), *row[6:])
+
+        return [dict(zip(by, key), total=round(values[0], 2), count=values[1], nights=values[2])
+                for key, values in totals.items()]
+
+    def total(self, kind: str) -> float:
+        rows = self.slice(kind)
+        return rows[0]['total'] if rows else 0.0
+
+
+# === MARCAS DE MESES (EVENTOS DE SESIÓN) ===
+# Se escriben en la misma transacción que el cambio, una vez por mes y
+# transacción. Las inserciones masivas sin fechas, las actualizaciones y
+# borrados masivos marcan el cubo completo.
+
+_MARKED_KEY = 'revenue_cube_marked'
+
+# Columnas de cada modelo que alimentan el cubo
+_TRACKED = {
+    Payment: ('amount', 'payment_date', 'stay_id'),
+    Expense: ('amount', 'expense_date', 'category', 'paid_by_user_id'),
+    Stay: ('check_in_date', 'check_out_date', 'room_id', 'booking_channel'),
+    User: ('role',),
+}
+_DATE_COLUMNS = {'payment': 'payment_date', 'expense': 'expense_date', 'stay': 'check_in_date'}
+
+
+def mark_months(session, months: Iterable[Optional[int]]):
+    """Marca meses a recalcular (incrementa `mark` o crea la fila) en la transacción de la sesión"""
+    marked = session.info.setdefault(_MARKED_KEY, set())
+    connection = session.connection()
+    for month in set(months) - marked - {None}:
+        result = connection.execute(update(RevenueCubePending).where(RevenueCubePending.month == month)
+                                    .values(mark=RevenueCubePending.mark + 1))
+        if result.rowcount == 0:
+            connection.execute(insert(RevenueCubePending).values(month=month, mark=1))
+        marked.add(month)
+
+
+def _attribute_months(obj, name: str) -> Set[int]:
+    """Mes del valor actual y de los valores anteriores de un atributo de fecha"""
+    state = inspect(obj)
+    history = state.attrs[name].history
+    values = list(history.added) + list(history.deleted) + list(history.unchanged)
+    if not values and name in state.dict:
+        values = [state.dict[name]]
+    return {month_key(value) for value in values}
+
+
+def _stay_payment_months(session, stay_id) -> Set[int]:
+    if stay_id is None:
+        return set()
+    rows = session.connection().execute(
+        select(func.distinct(Payment.payment_day // 100)).where(Payment.stay_id == stay_id))
+    return {month for (month,) in rows}
+
+
+def _payer_expense_months(session, user_id) -> Set[int]:
+    rows = session.connection().execute(
+        select(func.distinct(Expense.expense_day // 100)).where(Expense.paid_by_user_id == user_id))
+    return {month for (month,) in rows}
+
+
+def _changed(obj, names) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _affected_months(session, obj, is_new_or_deleted: bool) -> Set[int]:
+    if isinstance(obj, Payment):
+        return _attribute_months(obj, 'payment_date')
+    if isinstance(obj, Expense):
+        return _attribute_months(obj, 'expense_date')
+    if isinstance(obj, Stay):
+        months = _attribute_months(obj, 'check_in_date')
+        # Cambiar habitación o canal mueve los ingresos ya cobrados de la estancia
+        if not is_new_or_deleted and _changed(obj, ('room_id', 'booking_channel')):
+            months |= _stay_payment_months(session, obj.id)
+        return months
+    if isinstance(obj, User):
+        return _payer_expense_months(session, obj.id)
+    return set()
+
+
+@event.listens_for(Session, 'after_flush')
+def _on_flush(session, flush_context):
+    months = set()
+    for obj in (*session.new, *session.deleted):
+        if type(obj) in _TRACKED and not isinstance(obj, User):
+            months |= _affected_months(session, obj, True)
+    for obj in session.dirty:
+        tracked = _TRACKED.get(type(obj))
+        if tracked and _changed(obj, tracked):
+            months |= _affected_months(session, obj, False)
+    if months:
+        mark_months(session, months)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None:
+        return
+    if table.name == User.__tablename__:
+        # Un usuario nuevo todavía no tiene gastos; cambios masivos de rol sí los mueven
+        if not orm_execute_state.is_insert:
+            mark_months(orm_execute_state.session, {ALL_MONTHS})
+        return
+    date_column = _DATE_COLUMNS.get(table.name)
+    if date_column is None:
+        return
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters] if parameters else []
+    if orm_execute_state.is_insert and rows and all(date_column in row for row in rows):
+        months = {month_key(row[date_column]) for row in rows}
+    else:
+        months = {ALL_MONTHS}
+    mark_months(orm_execute_state.session, months)
+
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit(session):
+    """Recalcula los meses que marcó la transacción; el cubo completo queda para `flask revenue-cube`"""
+    months = session.info.pop(_MARKED_KEY, set()) - {ALL_MONTHS}
+    if not months:
+        return
+    try:
+        refresh_pending(months)
+    except SQLAlchemyError as e:
+        # La escritura ya se confirmó: las marcas quedan y las recalcula el próximo refresh_pending
+        current_app.logger.warning(f'No se pudo recalcular el cubo de reportes ({sorted(months)}): {e}')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _on_rollback(session):
+    session.info.pop(_MARKED_KEY, None)
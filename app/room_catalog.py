@@ -0,0 +1,109 @@
+"""
+AIRBNB MANAGER V4.0 - CATÁLOGO DE HABITACIONES
+Instantánea inmutable de todas las habitaciones (con el valor de jerarquía del
+tier ya calculado) compartida por todo el proceso. Las funciones de
+disponibilidad y precios la leen en lugar de repetir `Room.query.all()`.
+
+La instantánea solo se reconstruye cuando se crea, edita o elimina una
+habitación (incluido el cambio de estado de `update_room_status`); los demás
+workers se enteran por el sello 'rooms' (app/stamped_cache.py).
+"""
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.models import TIER_HIERARCHY, Room
+from app.stamped_cache import StampedCache, watch_tables
+
+
+CATALOG_STAMP = 'rooms'
+
+
+@dataclass(frozen=True)
+class CatalogRoom:
+    """Datos de una habitación en el catálogo (solo lectura)"""
+    id: int
+    name: str
+    status: str
+    tier: str
+    notes: Optional[str]
+    tier_value: int
+
+    # Mismos helpers de presentación y jerarquía que el modelo
+    get_tier_display = Room.get_tier_display
+    can_upgrade_to = Room.can_upgrade_to
+    is_better_than = Room.is_better_than
+
+    def get_tier_hierarchy_value(self) -> int:
+        return self.tier_value
+
+    def column_values(self) -> Dict:
+        return {'id': self.id, 'name': self.name, 'status': self.status, 'tier': self.tier, 'notes': self.notes}
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Todas las habitaciones en orden de ID, con índices por ID y por tier"""
+    stamp: int
+    rooms: Tuple[CatalogRoom, ...]
+    by_id: Mapping[int, CatalogRoom] = field(init=False, repr=False)
+    by_tier: Mapping[str, Tuple[CatalogRoom, ...]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        by_tier: Dict[str, list] = {}
+        for room in self.rooms:
+            by_tier.setdefault(room.tier, []).append(room)
+        object.__setattr__(self, 'by_id', MappingProxyType({room.id: room for room in self.rooms}))
+        object.__setattr__(self, 'by_tier', MappingProxyType({tier: tuple(rooms) for tier, rooms in by_tier.items()}))
+
+    def __iter__(self) -> Iterator[CatalogRoom]:
+        return iter(self.rooms)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    def get(self, room_id) -> Optional[CatalogRoom]:
+        return self.by_id.get(int(room_id)) if room_id is not None else None
+
+    def of_tier(self, tier: Optional[str] = None) -> Tuple[CatalogRoom, ...]:
+        return self.by_tier.get(tier, ()) if tier else self.rooms
+
+    def ids(self, tier: Optional[str] = None) -> Tuple[int, ...]:
+        return tuple(room.id for room in self.of_tier(tier))
+
+    def count_with_status(self, status: str) -> int:
+        return sum(1 for room in self.rooms if room.status == status)
+
+
+# === CACHÉ ===
+
+class RoomCatalog(StampedCache):
+    """Caché de proceso de la instantánea del catálogo"""
+
+    stamp_name = CATALOG_STAMP
+
+    def snapshot(self) -> CatalogSnapshot:
+        return self.value()
+
+    def _load(self, connection, stamp: int) -> CatalogSnapshot:
+        rows = connection.execute(
+            select(Room.id, Room.name, Room.status, Room.tier, Room.notes).order_by(Room.id)).all()
+        rooms = tuple(CatalogRoom(id=row.id, name=row.name, status=row.status, tier=row.tier,
+                                  notes=row.notes, tier_value=TIER_HIERARCHY.get(row.tier, 0))
+                      for row in rows)
+        return CatalogSnapshot(stamp=stamp, rooms=rooms)
+
+
+room_catalog = RoomCatalog()
+
+
+def get_catalog() -> CatalogSnapshot:
+    return room_catalog.snapshot()
+
+
+# === INVALIDACIÓN ===
+# Crear, editar o eliminar una habitación (también por sentencias directas)
+watch_tables(room_catalog, (Room,))
@@ -1,22 +1,75 @@
 """
 AIRBNB MANAGER V3.0 - INICIALIZACIÓN DE BLUEPRINTS
 Registra todos los blueprints modulares de la aplicación
+
+Los blueprints de los motores de análisis (AJAX con yield management e
+inteligencia con sus notificaciones) se registran recién al llegar el primer
+request (o al calentar un worker del servidor de producción): los comandos de
+la CLI no importan NumPy ni los motores. Las pruebas (TESTING), `flask routes`
+y `create_app(defer_blueprints=False)` (test_app.py) los registran al crear la
+app, así ven todas las rutas y `url_for` funciona fuera de un request.
 """
 
-def register_blueprints(app):
-    """Registra todos los blueprints de la aplicación"""
-    
+import threading
+from importlib import import_module
+
+import click
+
+# Módulos cuyo blueprint se registra antes del primer request (no al crear la app)
+DEFERRED_BLUEPRINTS = ('app.routes.ajax_routes', 'app.routes.intelligence_routes')
+
+
+def listing_routes() -> bool:
+    """Si el proceso es `flask routes`, que lista el url_map sin pasar por un request"""
+    context = click.get_current_context(silent=True)
+    return context is not None and context.info_name == 'routes'
+
+
+def register_blueprints(app, defer: bool = True):
+    """Registra todos los blueprints de la aplicación (`defer`: los de análisis al primer request)"""
+
     # Importar blueprints
-    from app.routes import panel_routes, ajax_routes, auth_routes, supply_routes, intelligence_routes
-    
+    from app.routes import panel_routes, auth_routes, supply_routes, quote_routes
+
     # Registrar blueprints principales
     app.register_blueprint(panel_routes.bp)  # Sin url_prefix para que sea la raíz
-    app.register_blueprint(ajax_routes.bp)  # Ya tiene url_prefix='/ajax'
     app.register_blueprint(auth_routes.bp, url_prefix='/auth')
     app.register_blueprint(supply_routes.bp)  # Ya tiene url_prefix='/supply-packages'
-    app.register_blueprint(intelligence_routes.bp)  # Ya tiene url_prefix='/intelligence'
-    
+    app.register_blueprint(quote_routes.bp)  # Ya tiene url_prefix='/quotes'
+
     # Blueprint principal (mantener compatibilidad)
     # Este será eliminado gradualmente según se migran las rutas
     from app.routes.main_routes import bp as main_bp
-    app.register_blueprint(main_bp)
\ No newline at end of file
+    app.register_blueprint(main_bp)
+
+    # AJAX (url_prefix='/ajax') e inteligencia (url_prefix='/intelligence')
+    defer_blueprints(app, DEFERRED_BLUEPRINTS)
+    if not defer:
+        load_deferred_blueprints(app)
+
+
+def defer_blueprints(app, module_names):
+    """Envuelve wsgi_app para importar y registrar `module_names` justo antes del primer request"""
+    app.extensions['deferred_blueprints'] = {'modules': tuple(module_names), 'loaded': False,
+                                             'lock': threading.Lock()}
+    wsgi_app = app.wsgi_app
+
+    def lazy_wsgi_app(environ, start_response):
+        if not app.extensions['deferred_blueprints']['loaded']:
+            load_deferred_blueprints(app)
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = lazy_wsgi_app
+
+
+def load_deferred_blueprints(app):
+    """Registra los blueprints diferidos (idempotente; lo usan el primer request y el calentamiento)"""
+    state = app.extensions.get('deferred_blueprints')
+    if not state or state['loaded']:
+        return
+    with state['lock']:
+        if state['loaded']:
+            return
+        for module_name in state['modules']:
+            app.register_blueprint(import_module(module_name).bp)
+        state['loaded'] = True
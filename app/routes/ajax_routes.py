@@ -14,6 +14,11 @@ from app.extensions import db
 from app.models import (User, Room, Client, Stay, Payment, Expense, Supply, 
                        CashClosure, EmployeeDelivery, SupplyUsage, DashboardStats)
 from app.yield_management import YieldManagementEngine, BookingRequest
+from app.reservations import reserve_stay, reserve_group, extend_stay, ReservationConflict
+from app.availability import check_room_availability, find_booking_solutions, restricted_room_ids
+from app.streaming import strategy_executor, stream_events
+from app.repository import get_repository
+from app.search_log import classify, log_search, outcome_of
 from app.forms import (ClientForm, ExpenseForm, StayForm, PaymentForm, 
                       SupplyForm, UpdateStockForm, UnifiedStayForm, 
                       CashClosureForm, EmployeeDeliveryForm, MonthYearForm)
@@ -31,86 +36,6 @@ def clean_phone(phone_number):
         return ""
     return re.sub(r'[^\d]', '', phone_number)
 
-def check_room_availability(check_in, check_out):
-    """Verifica qué habitaciones están ocupadas en el rango de fechas dado."""
-    if not check_in or not check_out:
-        return []
-    
-    # Buscar estancias que se solapen con el rango de fechas
-    overlapping_stays = Stay.query.filter(
-        Stay.check_in_date < check_out,
-        or_(
-            Stay.check_out_date.is_(None),  # Estancias sin check-out
-            Stay.check_out_date > check_in
-        )
-    ).all()
-    
-    return [stay.room_id for stay in overlapping_stays]
-
-def find_booking_solutions(check_in, check_out):
-    """Encuentra soluciones de reserva para el rango de fechas dado."""
-    unavailable_room_ids = check_room_availability(check_in, check_out)
-    all_rooms = Room.query.all()
-    
-    solutions = []
-    
-    # Solución 1: Habitaciones completamente libres
-    available_rooms = [room for room in all_rooms if room.id not in unavailable_room_ids]
-    if available_rooms:
-        solutions.append({
-            'type': 'available',
-            'title': 'Habitaciones Disponibles',
-            'description': f'{len(available_rooms)} habitación(es) completamente libre(s)',
-            'rooms': [{'id': r.id, 'name': r.name, 'tier': r.get_tier_display()} for r in available_rooms],
-            'priority': 'high'
-        })
-    
-    # Solución 2: Habitaciones que se liberarán pronto
-    today = date.today()
-    soon_available = Stay.query.filter(
-        Stay.room_id.in_(unavailable_room_ids),
-        Stay.check_out_date.isnot(None),
-        func.date(Stay.check_out_date) <= today + timedelta(days=3),
-        func.date(Stay.check_out_date) < check_in.date() if isinstance(check_in, datetime) else check_in
-    ).all()
-    
-    if soon_available:
-        rooms_info = []
-        for stay in soon_available:
-            rooms_info.append({
-                'id': stay.room.id,
-                'name': stay.room.name,
-                'available_date': stay.check_out_date.strftime('%d/%m/%Y'),
-                'client': stay.client.full_name
-            })
-        
-        solutions.append({
-            'type': 'soon_available',
-            'title': 'Se Liberarán Pronto',
-            'description': f'{len(rooms_info)} habitación(es) se liberarán antes de la fecha',
-            'rooms': rooms_info,
-            'priority': 'medium'
-        })
-    
-    # Solución 3: Sugerir fechas alternativas
-    if not available_rooms:
-        # Buscar la próxima fecha disponible
-        next_week = check_in + timedelta(days=7) if isinstance(check_in, datetime) else datetime.combine(check_in, datetime.min.time()) + timedelta(days=7)
-        future_availability = check_room_availability(next_week, next_week + (check_out - check_in))
-        future_available_rooms = [room for room in all_rooms if room.id not in future_availability]
-        
-        if future_available_rooms:
-            solutions.append({
-                'type': 'alternative_dates',
-                'title': 'Fechas Alternativas',
-                'description': f'Disponibilidad la próxima semana ({next_week.strftime("%d/%m/%Y")})',
-                'rooms': [{'id': r.id, 'name': r.name, 'tier': r.get_tier_display()} for r in future_available_rooms],
-                'suggested_date': next_week.strftime('%Y-%m-%d'),
-                'priority': 'low'
-            })
-    
-    return solutions
-
 # =====================================================================
 # RUTAS AJAX PARA OBTENCIÓN DE DATOS
 # =====================================================================
@@ -124,7 +49,7 @@ def get_availability_grid():
         today = date.today()
         date_range = [today + timedelta(days=i) for i in range(days)]
         
-        rooms = Room.query.order_by(Room.name).all()
+        rooms = sorted(get_repository().rooms(), key=lambda room: room.name)
         availability_data = []
         
         for room in rooms:
@@ -223,26 +148,34 @@ def ajax_check_room_availability():
             return jsonify({'success': False, 'error': 'La fecha de salida debe ser posterior a la de entrada'})
         
         unavailable_room_ids = check_room_availability(check_in, check_out)
-        all_rooms = Room.query.all()
+        all_rooms = get_repository().rooms()
+        # Libres pero fuera de la estadía mínima o de los cierres a llegadas/salidas
+        restricted = restricted_room_ids(check_in, check_out,
+                                         [room.id for room in all_rooms if room.id not in unavailable_room_ids])
         
         rooms_data = []
         for room in all_rooms:
-            is_available = room.id not in unavailable_room_ids
+            is_available = room.id not in unavailable_room_ids and room.id not in restricted
             rooms_data.append({
                 'id': room.id,
                 'name': room.name,
                 'tier': room.get_tier_display(),
                 'available': is_available,
-                'status': 'Disponible' if is_available else 'Ocupada'
+                'status': 'Disponible' if is_available else 'Restringida' if room.id in restricted else 'Ocupada',
+                'restriction': restricted.get(room.id)
             })
         
         # Buscar soluciones si no hay habitaciones disponibles
         solutions = find_booking_solutions(check_in, check_out) if unavailable_room_ids else []
+        available_count = len([r for r in rooms_data if r['available']])
+        log_search('check_room_availability', check_in, check_out,
+                   outcome_of(available_count, available_count + len(solutions)),
+                   options=available_count + len(solutions))
         
         return jsonify({
             'success': True,
             'rooms': rooms_data,
-            'available_count': len([r for r in rooms_data if r['available']]),
+            'available_count': available_count,
             'total_count': len(rooms_data),
             'solutions': solutions
         })
@@ -269,81 +202,157 @@ def supply_alerts():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@bp.route('/outstanding_balances')
+@login_required
+def outstanding_balances():
+    """Estancias con saldo pendiente (consulta indexada sobre Stay.balance_due)"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        stays = Stay.get_stays_with_balance(limit=limit)
+
+        return jsonify({
+            'success': True,
+            'stays': [
+                {
+                    'stay_id': stay.id,
+                    'client_name': stay.client.full_name,
+                    'room_name': stay.room.name,
+                    'status': stay.status,
+                    'nights': stay.nights,
+                    'agreed_total': stay.agreed_total,
+                    'paid_total': stay.paid_total,
+                    'balance_due': stay.balance_due
+                }
+                for stay in stays
+            ]
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @bp.route('/find_booking_solutions', methods=['POST'])
 @login_required
 def ajax_find_booking_solutions():
     """FASE 4.0 V4.0: Endpoint para el Motor de Yield Management"""
     try:
-        data = request.get_json()
-        
-        # Validar datos requeridos
-        if not data.get('check_in') or not data.get('check_out'):
-            return jsonify({'success': False, 'error': 'Fechas de entrada y salida requeridas'})
-        
-        # Parsear fechas
-        check_in = datetime.strptime(data['check_in'], '%Y-%m-%d').date()
-        check_out = datetime.strptime(data['check_out'], '%Y-%m-%d').date()
-        
-        if check_in >= check_out:
-            return jsonify({'success': False, 'error': 'La fecha de salida debe ser posterior a la de entrada'})
-        
-        # Crear solicitud de reserva
-        booking_request = BookingRequest(
-            check_in=check_in,
-            check_out=check_out,
-            guests=int(data.get('guests', 2)),
-            preferred_tier=data.get('preferred_tier'),
-            max_budget=float(data['max_budget']) if data.get('max_budget') else None,
-            client_id=int(data['client_id']) if data.get('client_id') else None,
-            notes=data.get('notes')
-        )
+        booking_request, error = _parse_booking_solution_request(request.get_json() or {})
+        if error:
+            return jsonify({'success': False, 'error': error})
         
         # Ejecutar motor de yield management
         engine = YieldManagementEngine()
         solutions = engine.find_booking_solutions(booking_request)
+        _log_booking_solutions(solutions, booking_request)
         
-        # Formatear soluciones para JSON
-        formatted_solutions = []
-        for solution in solutions:
-            formatted_solution = {
-                'solution_type': solution.solution_type.value,
-                'priority': solution.priority.value,
-                'title': solution.title,
-                'description': solution.description,
-                'rooms': solution.rooms,
-                'estimated_price': solution.estimated_price,
-                'confidence_score': solution.confidence_score,
-                'additional_info': solution.additional_info or {}
-            }
-            
-            # Agregar campos opcionales
-            if solution.savings:
-                formatted_solution['savings'] = solution.savings
-            if solution.upgrade_benefit:
-                formatted_solution['upgrade_benefit'] = solution.upgrade_benefit
-            if solution.reallocation_details:
-                formatted_solution['reallocation_details'] = solution.reallocation_details
-            
-            formatted_solutions.append(formatted_solution)
-        
-        return jsonify({
-            'success': True,
-            'solutions_count': len(solutions),
-            'solutions': formatted_solutions,
-            'request_summary': {
-                'check_in': check_in.strftime('%d/%m/%Y'),
-                'check_out': check_out.strftime('%d/%m/%Y'),
-                'nights': (check_out - check_in).days,
-                'guests': booking_request.guests,
-                'preferred_tier': booking_request.preferred_tier
-            }
-        })
+        return jsonify(_booking_solutions_payload(solutions, booking_request))
         
     except ValueError as e:
         return jsonify({'success': False, 'error': f'Error en formato de datos: {str(e)}'})
     except Exception as e:
         return jsonify({'success': False, 'error': f'Error del sistema: {str(e)}'})
 
+@bp.route('/find_booking_solutions/stream', methods=['POST'])
+@login_required
+def ajax_find_booking_solutions_stream():
+    """
+    Variante en streaming (NDJSON o SSE) del motor de yield management: las
+    coincidencias perfectas se envían en cuanto están listas y las estancias
+    divididas y reacomodaciones al terminar cada estrategia; el evento 'done'
+    lleva el mismo cuerpo que /find_booking_solutions.
+    """
+    try:
+        booking_request, error = _parse_booking_solution_request(request.get_json() or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Error en formato de datos: {str(e)}'})
+    if error:
+        return jsonify({'success': False, 'error': error})
+    
+    executor, run = strategy_executor()
+    events = YieldManagementEngine().stream_booking_solutions(booking_request, executor=executor, run=run)
+    
+    def payloads():
+        for kind, value in events:
+            if kind == 'strategy':
+                name, solutions, elapsed_ms = value
+                yield {
+                    'event': 'strategy',
+                    'strategy': name,
+                    'elapsed_ms': elapsed_ms,
+                    'solutions': [_format_booking_solution(s) for s in solutions]
+                }
+            else:
+                _log_booking_solutions(value, booking_request)
+                yield dict(_booking_solutions_payload(value, booking_request), event='done')
+    
+    return stream_events(payloads())
+
+def _parse_booking_solution_request(data):
+    """Valida el cuerpo de la búsqueda; retorna (BookingRequest, None) o (None, error)"""
+    # Validar datos requeridos
+    if not data.get('check_in') or not data.get('check_out'):
+        return None, 'Fechas de entrada y salida requeridas'
+    
+    # Parsear fechas
+    check_in = datetime.strptime(data['check_in'], '%Y-%m-%d').date()
+    check_out = datetime.strptime(data['check_out'], '%Y-%m-%d').date()
+    
+    if check_in >= check_out:
+        return None, 'La fecha de salida debe ser posterior a la de entrada'
+    
+    # Crear solicitud de reserva
+    return BookingRequest(
+        check_in=check_in,
+        check_out=check_out,
+        guests=int(data.get('guests', 2)),
+        preferred_tier=data.get('preferred_tier'),
+        max_budget=float(data['max_budget']) if data.get('max_budget') else None,
+        client_id=int(data['client_id']) if data.get('client_id') else None,
+        notes=data.get('notes')
+    ), None
+
+def _log_booking_solutions(solutions, booking_request):
+    """Registra la búsqueda y su resultado (demanda no atendida, app/search_log.py)"""
+    outcome, options = classify(s.solution_type.value for s in solutions)
+    log_search('find_booking_solutions', booking_request.check_in, booking_request.check_out, outcome,
+               tier=booking_request.preferred_tier, guests=booking_request.guests, options=options)
+
+def _format_booking_solution(solution):
+    formatted_solution = {
+        'solution_type': solution.solution_type.value,
+        'priority': solution.priority.value,
+        'title': solution.title,
+        'description': solution.description,
+        'rooms': solution.rooms,
+        'estimated_price': solution.estimated_price,
+        'confidence_score': solution.confidence_score,
+        'additional_info': solution.additional_info or {}
+    }
+    
+    # Agregar campos opcionales
+    if solution.savings:
+        formatted_solution['savings'] = solution.savings
+    if solution.upgrade_benefit:
+        formatted_solution['upgrade_benefit'] = solution.upgrade_benefit
+    if solution.reallocation_details:
+        formatted_solution['reallocation_details'] = solution.reallocation_details
+    
+    return formatted_solution
+
+def _booking_solutions_payload(solutions, booking_request):
+    check_in, check_out = booking_request.check_in, booking_request.check_out
+    return {
+        'success': True,
+        'solutions_count': len(solutions),
+        'solutions': [_format_booking_solution(s) for s in solutions],
+        'request_summary': {
+            'check_in': check_in.strftime('%d/%m/%Y'),
+            'check_out': check_out.strftime('%d/%m/%Y'),
+            'nights': (check_out - check_in).days,
+            'guests': booking_request.guests,
+            'preferred_tier': booking_request.preferred_tier
+        }
+    }
+
 # =====================================================================
 # RUTAS AJAX PARA OPERACIONES CRUD
 # =====================================================================
@@ -361,37 +370,30 @@ def ajax_quick_stay():
             if not data.get(field):
                 return jsonify({'success': False, 'error': f'Campo requerido: {field}'})
         
-        # Crear la estancia
-        stay = Stay(
+        # Crear la estancia validando solapamientos bajo el bloqueo de la habitación
+        stay = reserve_stay(
             client_id=data['client_id'],
-            room_id=data['room_id'],
-            check_in_date=datetime.strptime(data['check_in_date'], '%Y-%m-%d'),
-            check_out_date=datetime.strptime(data['check_out_date'], '%Y-%m-%d') if data.get('check_out_date') else None,
+            room_id=int(data['room_id']),
+            check_in=datetime.strptime(data['check_in_date'], '%Y-%m-%d'),
+            check_out=datetime.strptime(data['check_out_date'], '%Y-%m-%d') if data.get('check_out_date') else None,
             booking_channel=data.get('booking_channel', 'Directo'),
-            status='Activa'
+            agreed_total=float(data['agreed_total']) if data.get('agreed_total') else None
         )
         
-        db.session.add(stay)
-        db.session.flush()  # Para obtener el ID
-        
         # Crear pago inicial si se proporciona
         if data.get('initial_payment') and float(data['initial_payment']) > 0:
-            payment = Payment(
-                stay_id=stay.id,
-                amount=float(data['initial_payment']),
-                method=data.get('payment_method', 'Efectivo'),
-                payment_date=datetime.now()
-            )
-            db.session.add(payment)
+            stay.record_payment(float(data['initial_payment']), method=data.get('payment_method', 'Efectivo'))
         
         # === FASE 2 V3.0: DEDUCCIÓN AUTOMÁTICA DE INVENTARIO ===
         supply_results = apply_room_package_to_stay(stay, current_user.id)
         
+        stay_id = stay.id
         db.session.commit()
         
-        # Obtener datos del cliente y habitación para la respuesta
-        client = Client.query.get(stay.client_id)
-        room = Room.query.get(stay.room_id)
+        # Obtener datos del cliente y habitación para la respuesta (memorizados en la petición)
+        repo = get_repository()
+        client = repo.client(data['client_id'])
+        room = repo.room(data['room_id'])
         
         # Preparar información de suministros aplicados
         supply_info = ""
@@ -403,12 +405,40 @@ def ajax_quick_stay():
         return jsonify({
             'success': True,
             'message': f'Estancia creada para {client.full_name} en {room.name}{supply_info}',
-            'stay_id': stay.id,
+            'stay_id': stay_id,
             'client_name': client.full_name,
             'room_name': room.name,
             'supply_results': supply_results
         })
         
+    except ReservationConflict as conflict:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(conflict), 'conflict': conflict.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/bulk_stays', methods=['POST'])
+@login_required
+def ajax_bulk_stays():
+    """Crear varias estancias (reserva de grupo) de forma atómica vía AJAX"""
+    try:
+        data = request.get_json() or {}
+        entries = data.get('stays', [])
+        if not entries:
+            return jsonify({'success': False, 'error': 'No se enviaron estancias'})
+        
+        # Valida todo el grupo; si una línea falla no se crea ninguna estancia
+        report = reserve_group(entries, current_user.id)
+        if not report['success']:
+            db.session.rollback()
+            report['error'] = f"{report['error_count']} de {len(entries)} estancias no son válidas; no se creó ninguna"
+            return jsonify(report)
+        
+        db.session.commit()
+        report['message'] = f"{report['created_count']} estancias creadas"
+        return jsonify(report)
+        
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
@@ -561,13 +591,11 @@ def ajax_extend_stay():
         if not stay_id or not new_checkout:
             return jsonify({'success': False, 'error': 'Datos requeridos faltantes'})
         
-        stay = Stay.query.get_or_404(stay_id)
+        Stay.query.get_or_404(stay_id)
         new_date = datetime.strptime(new_checkout, '%Y-%m-%d')
         
-        if stay.check_out_date and new_date <= stay.check_out_date:
-            return jsonify({'success': False, 'error': 'La nueva fecha debe ser posterior a la actual'})
-        
-        stay.check_out_date = new_date
+        # Valida las noches nuevas contra otras estancias bajo el bloqueo de la habitación
+        extend_stay(int(stay_id), new_date)
         db.session.commit()
         
         return jsonify({
@@ -576,6 +604,12 @@ def ajax_extend_stay():
             'new_date': new_date.strftime('%Y-%m-%d')
         })
         
+    except ReservationConflict as conflict:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(conflict), 'conflict': conflict.to_dict()})
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
@@ -194,6 +194,8 @@ def profile():
 def change_password():
     """Cambiar contraseña del usuario actual"""
     if request.method == 'POST':
+        # current_user es el usuario de sesión cacheado (solo lectura): se edita el modelo
+        user = current_user.to_model()
         current_password = request.form.get('current_password', '').strip()
         new_password = request.form.get('new_password', '').strip()
         confirm_password = request.form.get('confirm_password', '').strip()
@@ -203,7 +205,7 @@ def change_password():
             flash('Todos los campos son requeridos', 'error')
             return redirect(url_for('auth.change_password'))
         
-        if not current_user.check_password(current_password):
+        if not user.check_password(current_password):
             flash('La contraseña actual es incorrecta', 'error')
             return redirect(url_for('auth.change_password'))
         
@@ -217,7 +219,7 @@ def change_password():
         
         # Actualizar contraseña
         try:
-            current_user.set_password(new_password)
+            user.set_password(new_password)
             db.session.commit()
             flash('Contraseña actualizada exitosamente', 'success')
             return redirect(url_for('auth.profile'))
@@ -9,10 +9,16 @@ from datetime import datetime, date, timedelta
 from typing import Dict, List
 
 from app.extensions import db
-from app.models import Room, Stay, Client
+from app.models import Room, Stay, Client, Payment
 from app.intelligence import AvailabilityEngine, BookingRequest, BookingPatternAnalyzer
+from app.availability import occupied_room_ids as occupied_rooms, restricted_room_ids
+from app.repository import get_repository
+from app.quotes import quote
+from app.search_log import classify, log_search, outcome_of
+from app.day_keys import day_key, from_day_key
 from app.intelligence_notifications import get_notifications_for_dashboard
 from app.decorators import permission_required
+from app.streaming import strategy_executor, stream_events
 
 bp = Blueprint('intelligence', __name__, url_prefix='/intelligence')
 
@@ -27,110 +33,16 @@ def suggest_availability():
     Endpoint principal para obtener sugerencias inteligentes de disponibilidad
     """
     try:
-        data = request.get_json()
-        
-        # Validar datos requeridos
-        check_in_str = data.get('check_in')
-        check_out_str = data.get('check_out')
-        
-        if not check_in_str or not check_out_str:
-            return jsonify({
-                'success': False, 
-                'error': 'Fechas de check-in y check-out son requeridas'
-            })
-        
-        # Parsear fechas
-        try:
-            check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
-            check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({
-                'success': False, 
-                'error': 'Formato de fecha inválido (YYYY-MM-DD)'
-            })
-        
-        # Validar fechas
-        if check_in >= check_out:
-            return jsonify({
-                'success': False, 
-                'error': 'La fecha de check-out debe ser posterior al check-in'
-            })
-        
-        if check_in < date.today():
-            return jsonify({
-                'success': False, 
-                'error': 'La fecha de check-in no puede ser en el pasado'
-            })
-        
-        # Crear solicitud de reserva
-        booking_request = BookingRequest(
-            check_in=check_in,
-            check_out=check_out,
-            guests=data.get('guests', 2),
-            preferred_tier=data.get('preferred_tier'),
-            max_budget=float(data.get('max_budget')) if data.get('max_budget') else None,
-            client_id=int(data.get('client_id')) if data.get('client_id') else None,
-            flexible_dates=data.get('flexible_dates', False),
-            flexible_days=int(data.get('flexible_days', 3))
-        )
+        booking_request, error = _parse_suggestion_request(request.get_json() or {})
+        if error:
+            return jsonify({'success': False, 'error': error})
         
         # Ejecutar motor de inteligencia
         engine = AvailabilityEngine()
         suggestions = engine.analyze_availability(booking_request)
+        _log_suggestions(suggestions, booking_request)
         
-        # Formatear respuesta
-        formatted_suggestions = []
-        for suggestion in suggestions:
-            formatted_suggestion = {
-                'type': suggestion.suggestion_type.value,
-                'priority': suggestion.priority.value,
-                'title': suggestion.title,
-                'description': suggestion.description,
-                'confidence_score': round(suggestion.confidence_score, 2),
-                'room_id': suggestion.room_id,
-                'room_name': suggestion.room_name,
-                'estimated_price': suggestion.estimated_price,
-                'savings': suggestion.savings,
-                'upgrade_value': suggestion.upgrade_value
-            }
-            
-            # Agregar fechas alternativas si existen
-            if suggestion.alternative_dates:
-                formatted_suggestion['alternative_dates'] = {
-                    'check_in': suggestion.alternative_dates[0].strftime('%Y-%m-%d'),
-                    'check_out': suggestion.alternative_dates[1].strftime('%Y-%m-%d'),
-                    'check_in_display': suggestion.alternative_dates[0].strftime('%d/%m/%Y'),
-                    'check_out_display': suggestion.alternative_dates[1].strftime('%d/%m/%Y')
-                }
-            
-            # Agregar información adicional
-            if suggestion.additional_info:
-                formatted_suggestion['additional_info'] = suggestion.additional_info
-            
-            formatted_suggestions.append(formatted_suggestion)
-        
-        # Estadísticas de la consulta
-        stats = {
-            'total_suggestions': len(suggestions),
-            'high_priority_count': len([s for s in suggestions if s.priority.value == 'high']),
-            'direct_availability_count': len([s for s in suggestions if s.suggestion_type.value == 'available_room']),
-            'alternative_options_count': len(suggestions) - len([s for s in suggestions if s.suggestion_type.value == 'available_room']),
-            'nights_requested': (check_out - check_in).days
-        }
-        
-        return jsonify({
-            'success': True,
-            'suggestions': formatted_suggestions,
-            'stats': stats,
-            'request_summary': {
-                'check_in': check_in.strftime('%d/%m/%Y'),
-                'check_out': check_out.strftime('%d/%m/%Y'),
-                'nights': (check_out - check_in).days,
-                'guests': booking_request.guests,
-                'preferred_tier': booking_request.preferred_tier,
-                'flexible_dates': booking_request.flexible_dates
-            }
-        })
+        return jsonify(_suggestions_payload(suggestions, booking_request))
         
     except Exception as e:
         return jsonify({
@@ -138,6 +50,134 @@ def suggest_availability():
             'error': f'Error interno: {str(e)}'
         })
 
+@bp.route('/suggest_availability/stream', methods=['POST'])
+@login_required
+def suggest_availability_stream():
+    """
+    Variante en streaming (NDJSON o SSE): un evento 'strategy' por estrategia
+    terminada, con sus sugerencias, y un evento 'done' con el mismo cuerpo que
+    /suggest_availability. La disponibilidad directa llega primero.
+    """
+    booking_request, error = _parse_suggestion_request(request.get_json() or {})
+    if error:
+        return jsonify({'success': False, 'error': error})
+    
+    executor, run = strategy_executor()
+    events = AvailabilityEngine().stream_availability(booking_request, executor=executor, run=run)
+    
+    def payloads():
+        for kind, value in events:
+            if kind == 'strategy':
+                name, suggestions, elapsed_ms = value
+                yield {
+                    'event': 'strategy',
+                    'strategy': name,
+                    'elapsed_ms': elapsed_ms,
+                    'suggestions': [_format_suggestion(s) for s in suggestions]
+                }
+            else:
+                _log_suggestions(value, booking_request)
+                yield dict(_suggestions_payload(value, booking_request), event='done')
+    
+    return stream_events(payloads())
+
+def _parse_suggestion_request(data: Dict):
+    """Valida el cuerpo de la búsqueda; retorna (BookingRequest, None) o (None, error)"""
+    check_in_str = data.get('check_in')
+    check_out_str = data.get('check_out')
+    
+    if not check_in_str or not check_out_str:
+        return None, 'Fechas de check-in y check-out son requeridas'
+    
+    # Parsear fechas
+    try:
+        check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
+        check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
+    except ValueError:
+        return None, 'Formato de fecha inválido (YYYY-MM-DD)'
+    
+    # Validar fechas
+    if check_in >= check_out:
+        return None, 'La fecha de check-out debe ser posterior al check-in'
+    
+    if check_in < date.today():
+        return None, 'La fecha de check-in no puede ser en el pasado'
+    
+    # Crear solicitud de reserva
+    return BookingRequest(
+        check_in=check_in,
+        check_out=check_out,
+        guests=data.get('guests', 2),
+        preferred_tier=data.get('preferred_tier'),
+        max_budget=float(data.get('max_budget')) if data.get('max_budget') else None,
+        client_id=int(data.get('client_id')) if data.get('client_id') else None,
+        flexible_dates=data.get('flexible_dates', False),
+        flexible_days=int(data.get('flexible_days', 3))
+    ), None
+
+def _log_suggestions(suggestions, booking_request):
+    """Registra la búsqueda y su resultado (demanda no atendida, app/search_log.py)"""
+    outcome, options = classify(s.suggestion_type.value for s in suggestions)
+    log_search('suggest_availability', booking_request.check_in, booking_request.check_out, outcome,
+               tier=booking_request.preferred_tier, guests=booking_request.guests, options=options)
+
+def _format_suggestion(suggestion) -> Dict:
+    formatted_suggestion = {
+        'type': suggestion.suggestion_type.value,
+        'priority': suggestion.priority.value,
+        'title': suggestion.title,
+        'description': suggestion.description,
+        'confidence_score': round(suggestion.confidence_score, 2),
+        'room_id': suggestion.room_id,
+        'room_name': suggestion.room_name,
+        'estimated_price': suggestion.estimated_price,
+        'savings': suggestion.savings,
+        'upgrade_value': suggestion.upgrade_value
+    }
+    
+    # Agregar fechas alternativas si existen
+    if suggestion.alternative_dates:
+        formatted_suggestion['alternative_dates'] = {
+            'check_in': suggestion.alternative_dates[0].strftime('%Y-%m-%d'),
+            'check_out': suggestion.alternative_dates[1].strftime('%Y-%m-%d'),
+            'check_in_display': suggestion.alternative_dates[0].strftime('%d/%m/%Y'),
+            'check_out_display': suggestion.alternative_dates[1].strftime('%d/%m/%Y')
+        }
+    
+    # Agregar información adicional
+    if suggestion.additional_info:
+        formatted_suggestion['additional_info'] = suggestion.additional_info
+    
+    return formatted_suggestion
+
+def _suggestions_payload(suggestions, booking_request) -> Dict:
+    """Cuerpo de respuesta con sugerencias formateadas, estadísticas y resumen de la consulta"""
+    check_in, check_out = booking_request.check_in, booking_request.check_out
+    direct_count = len([s for s in suggestions if s.suggestion_type.value == 'available_room'])
+    
+    # Estadísticas de la consulta
+    stats = {
+        'total_suggestions': len(suggestions),
+        'high_priority_count': len([s for s in suggestions if s.priority.value == 'high']),
+        'direct_availability_count': direct_count,
+        'alternative_options_count': len(suggestions) - direct_count,
+        'nights_requested': (check_out - check_in).days
+    }
+    
+    return {
+        'success': True,
+        'suggestions': [_format_suggestion(s) for s in suggestions],
+        'stats': stats,
+        'request_summary': {
+            'check_in': check_in.strftime('%d/%m/%Y'),
+            'check_out': check_out.strftime('%d/%m/%Y'),
+            'nights': (check_out - check_in).days,
+            'guests': booking_request.guests,
+            'preferred_tier': booking_request.preferred_tier,
+            'flexible_dates': booking_request.flexible_dates
+        }
+    }
+
 @bp.route('/quick_availability_check', methods=['POST'])
 @login_required
 def quick_availability_check():
@@ -150,31 +190,21 @@ def quick_availability_check():
         check_in = datetime.strptime(data['check_in'], '%Y-%m-%d').date()
         check_out = datetime.strptime(data['check_out'], '%Y-%m-%d').date()
         
-        # Obtener habitaciones ocupadas
-        overlapping_stays = Stay.query.filter(
-            Stay.status.in_(['Activa', 'Pendiente de Cierre']),
-            Stay.check_in_date < check_out,
-            db.or_(
-                Stay.check_out_date.is_(None),
-                Stay.check_out_date > check_in
-            )
-        ).all()
-        
-        occupied_room_ids = [stay.room_id for stay in overlapping_stays]
-        
-        # Obtener habitaciones disponibles
-        available_rooms = Room.query.filter(~Room.id.in_(occupied_room_ids)).all()
-        
-        # Formatear respuesta
+        # Ocupación desde el motor de disponibilidad y habitaciones desde el repositorio
+        occupied_room_ids = occupied_rooms(check_in, check_out)
+        all_rooms = get_repository().rooms()
+        available_rooms = [room for room in all_rooms if room.id not in occupied_room_ids]
+        # Sin las que no cumplen la estadía mínima o los cierres a llegadas/salidas
+        restricted = restricted_room_ids(check_in, check_out, [room.id for room in available_rooms])
+        available_rooms = [room for room in available_rooms if room.id not in restricted]
+        log_search('quick_availability_check', check_in, check_out,
+                   outcome_of(len(available_rooms), len(available_rooms)), options=len(available_rooms))
+        
+        # Formatear respuesta (todas las habitaciones cotizadas en una llamada)
+        quotes = quote([room.id for room in available_rooms], check_in, check_out)
         rooms_data = []
         for room in available_rooms:
-            # Calcular precio estimado básico
-            nights = (check_out - check_in).days
-            base_prices = {
-                'Económica': 2000, 'Estándar': 3000, 
-                'Superior': 4500, 'Suite': 6000
-            }
-            estimated_price = base_prices.get(room.tier, 3000) * nights
+            estimated_price = quotes[room.id].total
             
             rooms_data.append({
                 'id': room.id,
@@ -190,8 +220,8 @@ def quick_availability_check():
             'success': True,
             'available_rooms': rooms_data,
             'total_available': len(available_rooms),
-            'total_rooms': Room.query.count(),
-            'occupancy_rate': round((len(occupied_room_ids) / Room.query.count()) * 100, 1)
+            'total_rooms': len(all_rooms),
+            'occupancy_rate': round((len(occupied_room_ids) / len(all_rooms)) * 100, 1) if all_rooms else 0
         })
         
     except Exception as e:
@@ -214,7 +244,7 @@ def analyze_patterns():
         tier_demand = analyzer.get_room_tier_demand()
         
         # Estadísticas generales
-        total_rooms = Room.query.count()
+        total_rooms = len(get_repository().catalog)
         active_stays = Stay.query.filter(Stay.status == 'Activa').count()
         
         # Tendencias de los últimos 30 días
@@ -265,24 +295,29 @@ def optimize_pricing(room_id):
         room = Room.query.get_or_404(room_id)
         analyzer = BookingPatternAnalyzer()
         
-        # Obtener precio optimizado para los próximos 30 días
+        # Obtener precio optimizado para los próximos 30 días (una cotización con desglose por noche)
         pricing_suggestions = []
         today = date.today()
+        optimal_prices = analyzer.predict_optimal_prices(room, today, 30)
         
-        for i in range(30):
-            target_date = today + timedelta(days=i)
-            optimal_price = analyzer.predict_optimal_pricing(room, target_date)
-            
-            # Verificar disponibilidad
-            is_available = not Stay.query.filter(
+        # Noches ocupadas de la ventana en una sola consulta (claves de día)
+        first_key, last_key = day_key(today), day_key(today + timedelta(days=29))
+        occupied_nights = set()
+        for check_in_day, check_out_day in db.session.query(Stay.check_in_day, Stay.check_out_day).filter(
                 Stay.room_id == room_id,
                 Stay.status.in_(['Activa', 'Pendiente de Cierre']),
-                Stay.check_in_date <= target_date,
-                db.or_(
-                    Stay.check_out_date.is_(None),
-                    Stay.check_out_date > target_date
-                )
-            ).first()
+                Stay.check_in_day <= last_key,
+                db.or_(Stay.check_out_day.is_(None), Stay.check_out_day > first_key)):
+            night = max(from_day_key(check_in_day), today)
+            # Sin salida: ocupa hasta el final de la ventana
+            last_night = from_day_key(check_out_day) if check_out_day else today + timedelta(days=30)
+            while night < last_night:
+                occupied_nights.add(night)
+                night += timedelta(days=1)
+        
+        for i, optimal_price in enumerate(optimal_prices):
+            target_date = today + timedelta(days=i)
+            is_available = target_date not in occupied_nights
             
             pricing_suggestions.append({
                 'date': target_date.strftime('%Y-%m-%d'),
@@ -298,7 +333,7 @@ def optimize_pricing(room_id):
             db.func.count(Stay.id).label('total_bookings'),
             db.func.avg(Payment.amount).label('avg_payment'),
             db.func.sum(Payment.amount).label('total_revenue')
-        ).join(Stay).join(Payment).filter(
+        ).select_from(Stay).join(Payment).filter(
             Stay.room_id == room_id,
             Stay.check_in_date >= datetime.now() - timedelta(days=365)
         ).first()
@@ -353,9 +388,8 @@ def client_insights(client_id):
             channel_preferences[stay.booking_channel] = channel_preferences.get(stay.booking_channel, 0) + 1
             
             # Duración de estancias
-            if stay.check_out_date:
-                duration = (stay.check_out_date.date() - stay.check_in_date.date()).days
-                duration_patterns.append(duration)
+            if stay.nights is not None:
+                duration_patterns.append(stay.nights)
         
         # Tier más usado
         preferred_tier = max(tier_preferences.items(), key=lambda x: x[1])[0] if tier_preferences else None
@@ -401,6 +435,7 @@ def client_insights(client_id):
                     'room_name': stay.room.name if stay.room else 'N/A',
                     'tier': stay.room.tier if stay.room else 'N/A',
                     'amount_paid': stay.total_paid(),
+                    'balance_due': stay.balance_due,
                     'booking_channel': stay.booking_channel
                 }
                 for stay in stays[:5]
@@ -410,6 +445,110 @@ def client_insights(client_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@bp.route('/performance')
+@login_required
+@permission_required('can_view_reports')
+def performance():
+    """
+    Ocupación, ADR y RevPAR por noche, semana, mes, habitación o tier
+    (matrices NumPy habitaciones × noches; parámetros start, end, by, tier)
+    """
+    from app.occupancy_matrix import GROUPINGS, MAX_RANGE_DAYS, OccupancyMatrix
+
+    try:
+        today = date.today()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() \
+            if request.args.get('start') else date(today.year, 1, 1)
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() \
+            if request.args.get('end') else date(today.year, 12, 31)
+        by = request.args.get('by', 'month')
+        if by not in GROUPINGS:
+            return jsonify({'success': False, 'error': f'Agrupación inválida; opciones: {", ".join(GROUPINGS)}'})
+        if (end - start).days >= MAX_RANGE_DAYS:
+            return jsonify({'success': False, 'error': f'El rango no puede superar {MAX_RANGE_DAYS} noches'})
+
+        matrix = OccupancyMatrix.load(start, end, tier=request.args.get('tier') or None)
+        return jsonify(dict(matrix.to_dict(by), success=True))
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/demand-forecast')
+@login_required
+@permission_required('can_view_reports')
+def demand_forecast():
+    """
+    Pronóstico de demanda por noche y tier desde hoy (filas precalculadas
+    por `flask demand-forecast`; parámetros days, tier)
+    """
+    from app.demand_forecast import HORIZON_DAYS, forecast_rows
+
+    try:
+        days = request.args.get('days', 30, type=int)
+        if not 1 <= days <= HORIZON_DAYS:
+            return jsonify({'success': False, 'error': f'days debe estar entre 1 y {HORIZON_DAYS}'})
+
+        rows = forecast_rows(date.today(), days, tier=request.args.get('tier') or None)
+        return jsonify({'success': True, 'days': days, 'rows': rows})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/unmet-demand')
+@login_required
+@permission_required('can_view_reports')
+def unmet_demand():
+    """
+    Búsquedas de disponibilidad por resultado y tasa de rechazo por noche,
+    tier o noche y tier (registro de app/search_log.py; parámetros start, end, by)
+    """
+    from app.occupancy_matrix import MAX_RANGE_DAYS
+    from app.search_log import GROUPINGS, denial_rates
+
+    try:
+        today = date.today()
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() \
+            if request.args.get('start') else today
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() \
+            if request.args.get('end') else today + timedelta(days=89)
+        by = request.args.get('by', 'night')
+        if by not in GROUPINGS:
+            return jsonify({'success': False, 'error': f'Agrupación inválida; opciones: {", ".join(GROUPINGS)}'})
+        if end < start:
+            return jsonify({'success': False, 'error': 'La fecha final debe ser posterior a la inicial'})
+        if (end - start).days >= MAX_RANGE_DAYS:
+            return jsonify({'success': False, 'error': f'El rango no puede superar {MAX_RANGE_DAYS} noches'})
+
+        rows = denial_rates(start, end, by)
+        return jsonify({'success': True, 'start': start.isoformat(), 'end': end.isoformat(), 'by': by,
+                        'searches': sum(row['searches'] for row in rows), 'rows': rows})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@bp.route('/orphan-gaps')
+@login_required
+@permission_required('can_view_reports')
+def orphan_gaps():
+    """
+    Huecos de 1-2 noches entre estancias de los próximos `days` días (tier
+    opcional) con su precio y las acciones para llenarlos (app/calendar_gaps.py)
+    """
+    from app.calendar_gaps import CALENDAR_DAYS, gap_fill_suggestions
+
+    try:
+        days = request.args.get('days', 30, type=int)
+        if not 1 <= days <= CALENDAR_DAYS:
+            return jsonify({'success': False, 'error': f'days debe estar entre 1 y {CALENDAR_DAYS}'})
+        tier = request.args.get('tier') or None
+
+        gaps = gap_fill_suggestions(date.today(), days, tier)
+        return jsonify({'success': True, 'days': days, 'tier': tier, 'count': len(gaps),
+                        'nights': sum(gap['nights'] for gap in gaps), 'gaps': gaps})
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @bp.route('/dashboard_notifications')
 @login_required
 def dashboard_notifications():
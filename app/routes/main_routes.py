@@ -19,6 +19,8 @@ from app.models import (User, Room, Task, Client, Expense, Stay, Payment, Supply
                        CashClosure, EmployeeDelivery, SupplyUsage)
 from app.decorators import (role_required, owner_required, management_required, 
                            permission_required, log_user_action)
+from app.loaders import STAY_DETAIL
+from app.availability import check_room_availability, find_booking_solutions
 
 bp = Blueprint('main', __name__)
 
@@ -33,42 +35,6 @@ def clean_phone(phone_number):
     import re
     return re.sub(r'[^\d]', '', phone_number)
 
-def check_room_availability(check_in, check_out):
-    """Verifica qué habitaciones están ocupadas en el rango de fechas dado."""
-    if not check_in or not check_out:
-        return []
-    
-    # Buscar estancias que se solapen con el rango de fechas
-    overlapping_stays = Stay.query.filter(
-        Stay.check_in_date < check_out,
-        or_(
-            Stay.check_out_date.is_(None),  # Estancias sin check-out
-            Stay.check_out_date > check_in
-        )
-    ).all()
-    
-    return [stay.room_id for stay in overlapping_stays]
-
-def find_booking_solutions(check_in, check_out):
-    """Encuentra soluciones de reserva para el rango de fechas dado."""
-    unavailable_room_ids = check_room_availability(check_in, check_out)
-    all_rooms = Room.query.all()
-    
-    solutions = []
-    
-    # Solución 1: Habitaciones completamente libres
-    available_rooms = [room for room in all_rooms if room.id not in unavailable_room_ids]
-    if available_rooms:
-        solutions.append({
-            'type': 'available',
-            'title': 'Habitaciones Disponibles',
-            'description': f'{len(available_rooms)} habitación(es) completamente libre(s)',
-            'rooms': [{'id': r.id, 'name': r.name, 'tier': r.get_tier_display()} for r in available_rooms],
-            'priority': 'high'
-        })
-    
-    return solutions
-
 # =====================================================================
 # RUTAS DE GESTIÓN DE PAGOS
 # =====================================================================
@@ -82,14 +48,12 @@ def add_payment(stay_id):
     
     if form.validate_on_submit():
         try:
-            payment = Payment(
-                stay_id=stay.id,
-                amount=form.amount.data,
+            # El pago y el resumen de la estancia (pagado/saldo) en la misma transacción
+            payment = stay.record_payment(
+                form.amount.data,
                 method=form.method.data,
                 payment_date=form.payment_date.data or datetime.now()
             )
-            
-            db.session.add(payment)
             db.session.commit()
             
             flash(f'Pago de DOP {payment.amount:,.2f} agregado a la estancia de {stay.client.full_name}', 'success')
@@ -369,7 +333,7 @@ def deliver_cash(closure_id):
 @login_required
 def close_stay(stay_id):
     """FASE 2 V3.0: Cerrar/finalizar una estancia con verificación completa de inventario"""
-    stay = Stay.query.get_or_404(stay_id)
+    stay = Stay.query.options(*STAY_DETAIL).get_or_404(stay_id)
     
     if request.method == 'POST':
         try:
@@ -446,8 +410,9 @@ def close_stay(stay_id):
             'message': f'{len(low_stock_supplies)} suministros quedaron con stock bajo'
         })
     
-    return render_template('close_stay_v3.html', 
+    return render_template('close_stay.html', 
                          stay=stay,
+                         automatic_usages=stay.get_automatic_supply_usages(),
                          supply_usage_summary=supply_usage_summary,
                          supply_variances=supply_variances,
                          needs_verification=needs_verification,
@@ -5,9 +5,10 @@ Contiene las rutas principales del dashboard y panel de control unificado
 
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required
-from sqlalchemy import func
+from sqlalchemy import case, func
 from datetime import datetime
 
+from app.day_keys import month_bounds
 from app.extensions import db
 from app.models import DashboardStats, Client, Stay, Room, Supply, Payment, Expense
 from app.decorators import permission_required
@@ -38,14 +39,21 @@ def index():
 @login_required
 @permission_required('can_view_reports')
 def reports():
-    """Reporte financiero completo con gráficos e análisis"""
-    from calendar import monthrange
-    from datetime import datetime
-    from sqlalchemy import extract
+    """Reporte financiero completo con gráficos e análisis (desde el cubo de ingresos y gastos)"""
+    from datetime import date
     from flask import current_app
-    
-    total_income_dop = db.session.query(func.sum(Payment.amount)).scalar() or 0.0
-    total_expenses_dop = db.session.query(func.sum(Expense.amount)).scalar() or 0.0
+    from app.accrual import accrued
+    from app.revenue_cube import ALL_MONTHS, CubeReader, pending_months
+    from app.room_catalog import get_catalog
+
+    # Totales históricos (unos cientos de celdas del cubo, no todos los pagos y gastos).
+    # La vista no recalcula: los meses aún marcados se muestran como pendientes
+    stale_months = pending_months()
+    cube_rebuild_pending = ALL_MONTHS in stale_months
+    stale_month_labels = [f'{month // 100}-{month % 100:02d}' for month in stale_months if month != ALL_MONTHS]
+    cube = CubeReader()
+    total_income_dop = cube.total('income')
+    total_expenses_dop = cube.total('expense')
     profit_dop = total_income_dop - total_expenses_dop
     
     exchange_rate = current_app.config.get('TASA_CAMBIO_DOP_USD', 1.0)
@@ -53,59 +61,84 @@ def reports():
     total_expenses_usd = total_expenses_dop / exchange_rate if exchange_rate > 0 else 0
     profit_usd = profit_dop / exchange_rate if exchange_rate > 0 else 0
 
+    catalog = get_catalog()
+
+    def room_name(room_id):
+        room = catalog.get(room_id)
+        return room.name if room else f'Habitación #{room_id}'
+
     # Ingresos por habitación
-    income_by_room_query = db.session.query(
-        Room.name, 
-        func.sum(Payment.amount).label('total_generated')
-    ).select_from(Payment).join(Stay).join(Room)\
-     .group_by(Room.name).order_by(func.sum(Payment.amount).desc()).all()
+    income_by_room_query = sorted(
+        ({'name': room_name(row['room_id']), 'total_generated': row['total']}
+         for row in cube.slice('income', by=('room_id',))),
+        key=lambda row: row['total_generated'], reverse=True)
     
-    income_chart_labels = [row.name for row in income_by_room_query]
-    income_chart_data = [row.total_generated for row in income_by_room_query]
+    income_chart_labels = [row['name'] for row in income_by_room_query]
+    income_chart_data = [row['total_generated'] for row in income_by_room_query]
 
     # Gastos por categoría
-    expenses_by_category_query = db.session.query(
-        Expense.category, 
-        func.sum(Expense.amount).label('total_spent')
-    ).group_by(Expense.category).order_by(func.sum(Expense.amount).desc()).all()
+    expenses_by_category_query = sorted(cube.slice('expense', by=('category',)),
+                                        key=lambda row: row['total'], reverse=True)
     
-    expense_chart_labels = [row.category for row in expenses_by_category_query]
-    expense_chart_data = [row.total_spent for row in expenses_by_category_query]
+    expense_chart_labels = [row['category'] or 'Sin categoría' for row in expenses_by_category_query]
+    expense_chart_data = [row['total'] for row in expenses_by_category_query]
+
+    # Gastos por rol de quien pagó (la empleada afecta el cuadre de caja)
+    expenses_by_role = {row['payer_role']: row['total'] for row in cube.slice('expense', by=('payer_role',))}
+    elizabeth_expenses_dop = expenses_by_role.get('empleada', 0.0)
+    alejandrina_expenses_dop = expenses_by_role.get('socia', 0.0)
+    owner_expenses_dop = expenses_by_role.get('dueño', 0.0)
+
+    # Estancias por canal de reserva
+    channels = sorted(cube.slice('stay', by=('channel',)), key=lambda row: row['count'], reverse=True)
+    total_channel_stays = sum(row['count'] for row in channels)
+    channel_labels = [row['channel'] or 'Sin canal' for row in channels]
+    channel_data = [row['count'] for row in channels]
+    channel_percentages = [round(row['count'] / total_channel_stays * 100, 1) if total_channel_stays else 0
+                           for row in channels]
 
     # Datos mensuales del año actual
     current_year = datetime.utcnow().year
     monthly_labels = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", 
                      "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
-    
-    income_by_month_query = db.session.query(
-        extract('month', Payment.payment_date).label('month'), 
-        func.sum(Payment.amount)
-    ).filter(extract('year', Payment.payment_date) == current_year)\
-     .group_by('month').all()
+    year_cube = CubeReader(date(current_year, 1, 1), date(current_year, 12, 31))
     
     monthly_income_data = [0] * 12
-    for row in income_by_month_query: 
-        monthly_income_data[row.month - 1] = row[1]
-
-    expense_by_month_query = db.session.query(
-        extract('month', Expense.expense_date).label('month'), 
-        func.sum(Expense.amount)
-    ).filter(extract('year', Expense.expense_date) == current_year)\
-     .group_by('month').all()
-    
+    for row in year_cube.slice('income', by=('month',)):
+        monthly_income_data[row['month'] % 100 - 1] = row['total']
+
     monthly_expense_data = [0] * 12
-    for row in expense_by_month_query: 
-        monthly_expense_data[row.month - 1] = row[1]
+    for row in year_cube.slice('expense', by=('month',)):
+        monthly_expense_data[row['month'] % 100 - 1] = row['total']
 
     monthly_profit_data = [(inc - exp) for inc, exp in zip(monthly_income_data, monthly_expense_data)]
-    
-    # Frecuencia de clientes
-    client_frequency = db.session.query(
-        Client.full_name, 
-        func.count(Stay.id).label('stay_count')
-    ).join(Stay).group_by(Client.full_name)\
-     .order_by(func.count(Stay.id).desc()).all()
 
+    # Ingresos devengados: lo pagado repartido entre las noches de cada estancia (app/accrual.py)
+    monthly_accrued_data = [0] * 12
+    for row in accrued(date(current_year, 1, 1), date(current_year, 12, 31), by=('month',)):
+        monthly_accrued_data[row['month'] % 100 - 1] = row['total']
+
+    # Ocupación por habitación en lo que va del año
+    today = date.today()
+    elapsed_nights = (today - date(current_year, 1, 1)).days + 1
+    to_date = CubeReader(date(current_year, 1, 1), today)
+    nights_by_room = {row['room_id']: row['nights'] for row in to_date.slice('stay', by=('room_id',))}
+    income_to_date = {row['room_id']: row['total'] for row in to_date.slice('income', by=('room_id',))}
+    accrued_to_date = {row['room_id']: row['total'] for row in accrued(date(current_year, 1, 1), today, by=('room_id',))}
+    room_metrics = []
+    for room in catalog.rooms:
+        nights = min(nights_by_room.get(room.id, 0), elapsed_nights)
+        income = income_to_date.get(room.id, 0.0)
+        room_metrics.append({
+            'room_name': room.name,
+            'total_nights': nights,
+            'occupancy_rate': round(nights / elapsed_nights * 100, 1),
+            'empty_nights': elapsed_nights - nights,
+            'adr': income / nights if nights else 0.0,
+            'total_income': income,
+            'accrued_income': accrued_to_date.get(room.id, 0.0)
+        })
+    
     return render_template('reports.html', 
         title='Reporte Financiero',
         total_income_dop=total_income_dop,
@@ -119,13 +152,66 @@ def reports():
         income_chart_data=income_chart_data,
         expense_chart_labels=expense_chart_labels,
         expense_chart_data=expense_chart_data,
+        elizabeth_expenses_dop=elizabeth_expenses_dop,
+        alejandrina_expenses_dop=alejandrina_expenses_dop,
+        owner_expenses_dop=owner_expenses_dop,
+        channel_labels=channel_labels,
+        channel_data=channel_data,
+        channel_percentages=channel_percentages,
+        room_metrics=room_metrics,
         monthly_labels=monthly_labels,
         monthly_income_data=monthly_income_data,
         monthly_expense_data=monthly_expense_data,
         monthly_profit_data=monthly_profit_data,
-        client_frequency=client_frequency
+        monthly_accrued_data=monthly_accrued_data,
+        cube_rebuild_pending=cube_rebuild_pending,
+        stale_month_labels=stale_month_labels,
+        **_client_analytics(today)
     )
 
+
+def _client_analytics(today):
+    """
+    Métricas por cliente del reporte (fuera de las dimensiones del cubo): frecuencia,
+    mejores clientes, distribución de visitas y clientes nuevos/recurrentes del mes.
+    """
+    stay_count = func.count(Stay.id)
+    client_frequency = db.session.query(
+        Client.full_name, 
+        stay_count.label('stay_count')
+    ).join(Stay).group_by(Client.full_name)\
+     .order_by(stay_count.desc()).all()
+
+    # Totales pagados desnormalizados en Stay.paid_total
+    spent = func.coalesce(func.sum(Stay.paid_total), 0.0)
+    top_clients = db.session.query(
+        Client.full_name, Client.phone_number,
+        stay_count.label('visit_count'), spent.label('total_spent')
+    ).join(Stay).group_by(Client.id).order_by(spent.desc()).limit(5).all()
+
+    visits = db.session.query(stay_count.label('visits')).select_from(Client)\
+        .join(Stay).group_by(Client.id).subquery()
+    bucket = case((visits.c.visits == 1, 1), (visits.c.visits == 2, 2), (visits.c.visits <= 5, 3), else_=4)
+    buckets = dict(db.session.query(bucket, func.count()).group_by(bucket).all())
+    visit_labels = ['1 visita', '2 visitas', '3-5 visitas', '6+ visitas']
+    visit_data = [buckets.get(i, 0) for i in range(1, 5)]
+
+    # Clientes con entrada este mes: nuevos si es su primera estancia
+    first_day, last_day = month_bounds(today.year, today.month)
+    this_month = db.session.query(Stay.client_id).filter(Stay.check_in_day.between(first_day, last_day))
+    first_visits = db.session.query(func.min(Stay.check_in_day)).filter(Stay.client_id.in_(this_month))\
+        .group_by(Stay.client_id).all()
+    new_clients_this_month = sum(1 for (first,) in first_visits if first >= first_day)
+
+    return {
+        'client_frequency': client_frequency,
+        'top_clients': top_clients,
+        'visit_labels': visit_labels,
+        'visit_data': visit_data,
+        'new_clients_this_month': new_clients_this_month,
+        'returning_clients_this_month': len(first_visits) - new_clients_this_month,
+    }
+
 @bp.route('/monthly_report')
 @login_required
 @permission_required('can_view_monthly_report')
@@ -0,0 +1,54 @@
+"""
+AIRBNB MANAGER V4.0 - RUTAS DE COTIZACIONES
+API de cotizaciones por noche de varias habitaciones (app/quotes.py)
+"""
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required
+from datetime import datetime
+
+from app.quotes import quote
+
+bp = Blueprint('quotes', __name__, url_prefix='/quotes')
+
+# Noches máximas por cotización
+MAX_QUOTE_NIGHTS = 366
+
+
+@bp.route('', methods=['GET', 'POST'])
+@login_required
+def quotes():
+    """
+    Cotiza habitaciones para unas noches: desglose por noche, descuento y total.
+    GET ?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD&room_id=1&room_id=2 (sin room_id: todas)
+    POST {"check_in": ..., "check_out": ..., "room_ids": [1, 2]}
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            room_ids = data.get('room_ids')
+        else:
+            data = request.args
+            room_ids = request.args.getlist('room_id', type=int) or None
+
+        check_in = datetime.strptime(data['check_in'], '%Y-%m-%d').date()
+        check_out = datetime.strptime(data['check_out'], '%Y-%m-%d').date()
+        if check_out <= check_in:
+            return jsonify({'success': False, 'error': 'La fecha de salida debe ser posterior a la de entrada'})
+        if (check_out - check_in).days > MAX_QUOTE_NIGHTS:
+            return jsonify({'success': False, 'error': f'Máximo {MAX_QUOTE_NIGHTS} noches por cotización'})
+
+        results = quote([int(room_id) for room_id in room_ids] if room_ids is not None else None,
+                        check_in, check_out)
+        return jsonify({
+            'success': True,
+            'check_in': check_in.isoformat(),
+            'check_out': check_out.isoformat(),
+            'nights': (check_out - check_in).days,
+            'quotes': [room_quote.to_dict() for room_quote in results.values()]
+        })
+
+    except KeyError as e:
+        return jsonify({'success': False, 'error': f'Falta el campo {e}'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
@@ -5,12 +5,13 @@ Contiene las rutas para gestionar paquetes de suministros por habitación
 
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import func, select, exists, literal
 from datetime import datetime
 
 from app.extensions import db
 from app.models import Room, Supply, SupplyUsage, room_supply_defaults
 from app.decorators import permission_required, management_required
+from app.package_cache import package_cache
 
 bp = Blueprint('supply_packages', __name__, url_prefix='/supply-packages')
 
@@ -69,10 +70,12 @@ def room_package(room_id):
 def analytics():
     """Panel de análisis de uso de paquetes de suministros"""
     
-    # Estadísticas generales
-    total_packages = db.session.query(func.count(room_supply_defaults.c.room_id)).scalar() or 0
-    rooms_with_packages = db.session.query(func.count(func.distinct(room_supply_defaults.c.room_id))).scalar() or 0
-    total_rooms = Room.query.count()
+    # Estadísticas generales (desde el caché de paquetes)
+    packages = package_cache.all_packages()
+    total_packages = sum(len(package.items) for package in packages.values())
+    rooms_with_packages = len(packages)
+    rooms = Room.query.all()
+    total_rooms = len(rooms)
     
     # Top suministros más usados
     supply_usage_stats = db.session.query(
@@ -86,14 +89,14 @@ def analytics():
     
     # Costos promedio por habitación
     room_costs = []
-    for room in Room.query.all():
-        cost = room.calculate_package_cost()
-        if cost > 0:
+    for room in rooms:
+        package = packages.get(room.id)
+        if package and package.total_cost > 0:
             room_costs.append({
                 'room_name': room.name,
                 'tier': room.get_tier_display(),
-                'package_cost': cost,
-                'item_count': len(room.get_supply_package())
+                'package_cost': package.total_cost,
+                'item_count': len(package.items)
             })
     
     room_costs.sort(key=lambda x: x['package_cost'], reverse=True)
@@ -248,7 +251,11 @@ def templates():
 @login_required
 @management_required
 def ajax_apply_template():
-    """Aplicar una plantilla a múltiples habitaciones"""
+    """
+    Aplicar una plantilla a múltiples habitaciones con operaciones por conjuntos:
+    una lectura del estado actual, un DELETE masivo (modo overwrite) y un único
+    INSERT ... SELECT con anti-join para los pares (habitación, suministro) faltantes.
+    """
     try:
         data = request.get_json()
         template_room_id = data.get('template_room_id')
@@ -256,53 +263,112 @@ def ajax_apply_template():
         overwrite = data.get('overwrite', False)
         
         template_room = Room.query.get_or_404(template_room_id)
-        template_package = template_room.get_supply_package()
+        rsd = room_supply_defaults
+        
+        template_items = {
+            row.supply_id: row for row in db.session.execute(
+                select(rsd.c.supply_id, rsd.c.quantity, rsd.c.is_mandatory, rsd.c.usage_type)
+                .where(rsd.c.room_id == template_room.id)
+            )
+        }
         
-        if not template_package:
+        if not template_items:
             return jsonify({'success': False, 'error': 'La plantilla no tiene paquete configurado'})
         
-        applied_count = 0
-        for target_room_id in target_room_ids:
-            target_room = Room.query.get(target_room_id)
-            if not target_room:
+        # Habitaciones destino válidas (la plantilla nunca se aplica sobre sí misma)
+        requested_ids = {int(room_id) for room_id in target_room_ids} - {template_room.id}
+        target_rooms = {
+            room_id: name for room_id, name in db.session.execute(
+                select(Room.id, Room.name).where(Room.id.in_(requested_ids))
+            )
+        } if requested_ids else {}
+        
+        # Estado actual de todos los destinos en una sola consulta
+        existing = {}
+        if target_rooms:
+            for room_id, supply_id, quantity in db.session.execute(
+                select(rsd.c.room_id, rsd.c.supply_id, rsd.c.quantity).where(rsd.c.room_id.in_(target_rooms))
+            ):
+                existing.setdefault(room_id, {})[supply_id] = quantity
+        
+        # === DIFERENCIAS POR HABITACIÓN ===
+        room_diffs = []
+        apply_ids = []
+        for room_id, room_name in sorted(target_rooms.items(), key=lambda item: item[1]):
+            current = existing.get(room_id, {})
+            if current and not overwrite:
+                room_diffs.append({'room_id': room_id, 'room_name': room_name, 'status': 'skipped',
+                                   'added': [], 'removed': [], 'changed': []})
                 continue
             
-            # Verificar si ya tiene paquete
-            if not overwrite and target_room.has_supply_package():
-                continue
+            apply_ids.append(room_id)
+            room_diffs.append({
+                'room_id': room_id,
+                'room_name': room_name,
+                'status': 'applied',
+                'added': sorted(set(template_items) - set(current)),
+                'removed': sorted(set(current) - set(template_items)),
+                'changed': sorted(
+                    supply_id for supply_id in set(current) & set(template_items)
+                    if current[supply_id] != template_items[supply_id].quantity
+                )
+            })
+        
+        if apply_ids:
+            now = datetime.now()
             
-            # Eliminar paquete existente si overwrite
+            # Overwrite: un solo DELETE para todas las habitaciones
             if overwrite:
-                RoomSupplyDefault.query.filter_by(room_id=target_room_id).delete()
-            
-            # Copiar items
-            for template_item in template_package:
-                existing = RoomSupplyDefault.query.filter_by(
-                    room_id=target_room_id,
-                    supply_id=template_item.supply_id
-                ).first()
-                
-                if not existing:
-                    new_item = RoomSupplyDefault(
-                        room_id=target_room_id,
-                        supply_id=template_item.supply_id,
-                        quantity=template_item.quantity,
-                        is_mandatory=template_item.is_mandatory,
-                        usage_type=template_item.usage_type,
-                        notes=f"Aplicado desde plantilla: {template_room.name}"
-                    )
-                    db.session.add(new_item)
+                db.session.execute(rsd.delete().where(rsd.c.room_id.in_(apply_ids)))
             
-            applied_count += 1
+            # Un solo INSERT ... SELECT con anti-join contra lo que ya existe
+            template = rsd.alias('template')
+            existing_item = rsd.alias('existing_item')
+            missing_pairs = select(
+                Room.id,
+                template.c.supply_id,
+                template.c.quantity,
+                template.c.is_mandatory,
+                template.c.usage_type,
+                literal(f"Aplicado desde plantilla: {template_room.name}"),
+                literal(now),
+                literal(now)
+            ).select_from(Room).join(template, template.c.room_id == template_room.id).where(
+                Room.id.in_(apply_ids),
+                ~exists().where(
+                    (existing_item.c.room_id == Room.id) &
+                    (existing_item.c.supply_id == template.c.supply_id)
+                )
+            )
+            db.session.execute(rsd.insert().from_select(
+                ['room_id', 'supply_id', 'quantity', 'is_mandatory', 'usage_type',
+                 'notes', 'created_at', 'updated_at'],
+                missing_pairs
+            ))
         
         db.session.commit()
         
+        # Nombres de los suministros que aparecen en las diferencias (una consulta)
+        diff_supply_ids = {supply_id for diff in room_diffs
+                           for key in ('added', 'removed', 'changed') for supply_id in diff[key]}
+        supply_names = dict(db.session.execute(
+            select(Supply.id, Supply.name).where(Supply.id.in_(diff_supply_ids))
+        ).all()) if diff_supply_ids else {}
+        for diff in room_diffs:
+            for key in ('added', 'removed', 'changed'):
+                diff[key] = [{'supply_id': supply_id, 'name': supply_names.get(supply_id)}
+                             for supply_id in diff[key]]
+        
+        applied_count = len(apply_ids)
         return jsonify({
             'success': True,
             'message': f'Plantilla aplicada a {applied_count} habitaciones',
-            'applied_count': applied_count
+            'applied_count': applied_count,
+            'skipped_count': len(room_diffs) - applied_count,
+            'not_found': sorted(requested_ids - set(target_rooms)),
+            'rooms': room_diffs
         })
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'success': False, 'error': str(e)})
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)})
@@ -125,19 +125,8 @@ def clean_phone(phone_number):
 
 def check_room_availability(check_in, check_out):
     """Verifica qué habitaciones están ocupadas en el rango de fechas dado."""
-    if not check_in or not check_out:
-        return []
-    
-    # Buscar estancias que se solapen con el rango de fechas
-    overlapping_stays = Stay.query.filter(
-        Stay.check_in_date < check_out,
-        or_(
-            Stay.check_out_date.is_(None),  # Estancias sin check-out
-            Stay.check_out_date > check_in
-        )
-    ).all()
-    
-    return [stay.room_id for stay in overlapping_stays]
+    from app.availability import check_room_availability as occupied_rooms
+    return occupied_rooms(check_in, check_out)
 
 def find_booking_solutions(check_in, check_out):
     """Encuentra soluciones de reserva para el rango de fechas dado."""
@@ -0,0 +1,247 @@
+"""
+AIRBNB MANAGER V4.0 - REGISTRO DE BÚSQUEDAS DE DISPONIBILIDAD (DEMANDA NO ATENDIDA)
+Cada búsqueda de disponibilidad (sugerencias, soluciones de reserva,
+verificaciones rápidas) queda registrada con sus fechas, tier, huéspedes y
+resultado:
+
+    perfect      había habitación para todo el pedido
+    alternative  solo alternativas (otras fechas, estancia dividida, reacomodación)
+    none         nada: demanda rechazada
+
+El endpoint solo agrega la fila a un búfer en memoria; un hilo aparte la
+escribe por lotes cada SEARCH_LOG_FLUSH_SECONDS (o al llenarse un lote) con
+su propia conexión, fuera de la transacción de la petición. Con 0 segundos no
+hay hilo y las filas esperan a `search_log.flush()`.
+
+La tasa de rechazo por noche y tier (`denial_rates`) alimenta el pronóstico de
+demanda (demanda no restringida) y el precio de las noches con rechazos.
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import insert, select
+
+from app.day_keys import day_key, from_day_key
+from app.extensions import db
+from app.models import TIER_HIERARCHY, AvailabilitySearch
+
+
+OUTCOMES = ('perfect', 'alternative', 'none')
+GROUPINGS = ('night', 'tier', 'night_tier')
+
+DEFAULT_FLUSH_SECONDS = 2.0
+BATCH_SIZE = 500
+# Filas en espera como máximo; si la base no responde se descartan las más viejas
+MAX_PENDING = 50000
+
+# Recargo de precio por noche con toda su demanda rechazada (proporcional a la tasa)
+DENIAL_PREMIUM = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+# Tipos de sugerencia / solución que ofrecen la habitación pedida o no ofrecen ninguna
+PERFECT_TYPES = {'available_room', 'perfect_match'}
+NO_ROOM_TYPES = {'waiting_list', 'price_optimization'}
+
+
+def outcome_of(perfect: int, options: int) -> str:
+    """Resultado de una búsqueda según sus coincidencias perfectas y el total de opciones"""
+    if perfect:
+        return 'perfect'
+    return 'alternative' if options else 'none'
+
+
+def classify(types: Iterable[str]) -> Tuple[str, int]:
+    """Resultado y cantidad de opciones a partir de los tipos de sugerencias o soluciones"""
+    options = [kind for kind in types if kind not in NO_ROOM_TYPES]
+    return outcome_of(sum(kind in PERFECT_TYPES for kind in options), len(options)), len(options)
+
+
+# === ESCRITURA POR LOTES ===
+
+class SearchLogWriter:
+    """Búfer de filas en memoria y escritor en segundo plano"""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, max_pending: int = MAX_PENDING):
+        self.batch_size = batch_size
+        self._pending = deque(maxlen=max_pending)
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self.written = 0
+
+    def record(self, engine, row: Dict, flush_seconds: float = DEFAULT_FLUSH_SECONDS):
+        """Agrega la fila al búfer (sin E/S); el hilo se inicia con la primera"""
+        self._pending.append((engine, row))
+        if flush_seconds <= 0:
+            return
+        if self._thread is None:
+            self._start(flush_seconds)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _start(self, flush_seconds: float):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self.flush_seconds = flush_seconds
+            # Un hilo por proceso: se crea después del fork de cada worker
+            self._thread = threading.Thread(target=self._run, name='search-log-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Escribe todas las filas en espera; retorna cuántas se escribieron"""
+        with self._flush_lock:
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return 0
+            by_engine = {}
+            for engine, row in batch:
+                by_engine.setdefault(engine, []).append(row)
+            written = 0
+            for engine, rows in by_engine.items():
+                try:
+                    # Conexión propia: no toca la sesión (ni la transacción) de ninguna petición
+                    with engine.begin() as connection:
+                        for start in range(0, len(rows), self.batch_size):
+                            connection.execute(insert(AvailabilitySearch), rows[start:start + self.batch_size])
+                except Exception:
+                    # El registro es un best effort: las filas de esta base se pierden
+                    logger.exception('No se pudo escribir el registro de búsquedas (%d filas)', len(rows))
+                    continue
+                written += len(rows)
+            self.written += written
+            return written
+
+
+search_log = SearchLogWriter()
+
+
+def log_search(source: str, check_in, check_out, outcome: str, tier: Optional[str] = None,
+               guests: Optional[int] = None, options: int = 0):
+    """Registra una búsqueda (fechas date o datetime); no hace E/S en la petición"""
+    search_log.record(db.engine, {
+        'searched_at': datetime.now(timezone.utc),
+        'source': source,
+        'check_in_day': day_key(check_in),
+        'check_out_day': day_key(check_out),
+        'tier': tier or None,
+        'guests': guests,
+        'outcome': outcome,
+        'options': options,
+    }, current_app.config.get('SEARCH_LOG_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS))
+
+
+# === LECTURA (AGREGADOS POR NOCHE Y TIER) ===
+
+def _search_nights(start: date, days: int):
+    """Tier (None = cualquiera), noche (días desde `start`) y resultado de cada noche buscada"""
+    end_key = day_key(start + timedelta(days=days))
+    searches = db.session.execute(
+        select(AvailabilitySearch.tier, AvailabilitySearch.check_in_day,
+               AvailabilitySearch.check_out_day, AvailabilitySearch.outcome)
+        .where(AvailabilitySearch.check_in_day < end_key, AvailabilitySearch.check_out_day > day_key(start))
+    ).all()
+
+    origin = start.toordinal()
+    count = len(searches)
+    check_in = np.fromiter((from_day_key(key).toordinal() - origin for _, key, _, _ in searches),
+                           dtype=np.int64, count=count)
+    check_out = np.fromiter((from_day_key(key).toordinal() - origin for _, _, key, _ in searches),
+                            dtype=np.int64, count=count)
+    outcome = np.fromiter((OUTCOMES.index(outcome) for _, _, _, outcome in searches), dtype=np.int64, count=count)
+    tiers = sorted({tier for tier, _, _, _ in searches if tier}, key=lambda name: TIER_HIERARCHY.get(name, 0))
+    # Índice 0: búsquedas sin tier
+    tier = np.fromiter((tiers.index(tier) + 1 if tier else 0 for tier, _, _, _ in searches),
+                       dtype=np.int64, count=count)
+
+    nights = np.maximum(check_out - check_in, 1)
+    owner = np.repeat(np.arange(count), nights)
+    night = check_in[owner] + np.arange(owner.size) - np.repeat(np.cumsum(nights) - nights, nights)
+    inside = (night >= 0) & (night < days)
+    return [None] + tiers, tier[owner][inside], night[inside], outcome[owner][inside]
+
+
+def denial_rates(start: date, end: date, by: str = 'night') -> List[Dict]:
+    """
+    Búsquedas por resultado y tasa de rechazo (%) por noche, tier o noche y
+    tier del rango [start, end]. Cada búsqueda cuenta una vez por noche pedida.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f'Agrupación desconocida: {by}')
+    days = (end - start).days + 1
+    tiers, tier, night, outcome = _search_nights(start, days)
+
+    if by == 'night':
+        keys, labels = night, [{'night': (start + timedelta(days=i)).isoformat()} for i in range(days)]
+    elif by == 'tier':
+        keys, labels = tier, [{'tier': name} for name in tiers]
+    else:
+        keys = night * len(tiers) + tier
+        labels = [{'night': (start + timedelta(days=i)).isoformat(), 'tier': name}
+                  for i in range(days) for name in tiers]
+
+    counts = np.bincount(keys * len(OUTCOMES) + outcome,
+                         minlength=len(labels) * len(OUTCOMES)).reshape(len(labels), len(OUTCOMES))
+    rows = []
+    for key in np.flatnonzero(counts.sum(axis=1)):
+        searches = int(counts[key].sum())
+        row = dict(labels[key], searches=searches, **dict(zip(OUTCOMES, counts[key].tolist())))
+        row['denial_rate'] = round(counts[key, OUTCOMES.index('none')] / searches * 100, 1)
+        rows.append(row)
+    return rows
+
+
+def turned_away(start: date, days: int, tiers: Sequence[str], capacity: Sequence[int]) -> np.ndarray:
+    """
+    Búsquedas rechazadas por tier (en el orden de `tiers`) y noche desde
+    `start`; las que no pedían tier se reparten según la capacidad de cada uno.
+    """
+    logged, tier, night, outcome = _search_nights(start, days)
+    denied = outcome == OUTCOMES.index('none')
+    per_tier = np.bincount(tier[denied] * days + night[denied],
+                           minlength=len(logged) * days).reshape(len(logged), days).astype(np.float64)
+
+    capacity = np.asarray(capacity, dtype=np.float64)
+    result = np.outer(capacity / capacity.sum(), per_tier[0]) if capacity.sum() else np.zeros((len(tiers), days))
+    for index, name in enumerate(logged[1:], start=1):
+        if name in tiers:
+            result[list(tiers).index(name)] += per_tier[index]
+    return result
+
+
+def denial_by_night(tier: str, start: date, days: int) -> List[float]:
+    """Fracción (0-1) de búsquedas rechazadas para el tier (o sin tier) en cada noche desde `start`"""
+    logged, searched_tier, night, outcome = _search_nights(start, days)
+    relevant = np.isin(searched_tier, [0] + [i for i, name in enumerate(logged) if name == tier])
+    night, outcome = night[relevant], outcome[relevant]
+    searches = np.bincount(night, minlength=days)
+    denied = np.bincount(night[outcome == OUTCOMES.index('none')], minlength=days)
+    return (denied / np.maximum(searches, 1)).tolist()
+
+
+def denial_factor(rate: float) -> float:
+    """Recargo de precio de una noche según su tasa de rechazo (0-1)"""
+    return 1 + DENIAL_PREMIUM * rate
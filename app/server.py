@@ -0,0 +1,170 @@
+"""
+AIRBNB MANAGER V4.0 - SERVIDOR DE PRODUCCIÓN
+Lanzador con gunicorn (prefork, workers con hilos), calentamiento de cachés al
+iniciar cada worker y endpoint `/healthz`. Los ajustes de SQLite para varios
+procesos (WAL + busy_timeout) los aplica create_app (app/extensions.py).
+
+Uso:
+    python serve.py --workers 4 --threads 4 --bind 0.0.0.0:5004
+
+Recarga sin cortar conexiones: `kill -HUP <pid del master>` levanta workers
+nuevos con el código actual y deja que los viejos terminen sus requests
+(hasta SERVER_GRACEFUL_TIMEOUT). Como la app no se precarga en el master,
+cada worker importa el código y calienta sus propios cachés.
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from flask import jsonify
+from jinja2 import TemplateError
+from sqlalchemy import text
+
+from app.extensions import db
+
+
+logger = logging.getLogger('server')
+
+_started_at = time.time()
+
+
+# === CALENTAMIENTO Y SALUD ===
+
+def _warm_templates(app):
+    for name in app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateError as e:
+            # Una plantilla rota falla igual en su primer render; no impide calentar el resto
+            logger.warning('Plantilla %s no compila: %s', name, e)
+
+
+def warm_caches(app) -> Dict[str, float]:
+    """
+    Carga los cachés de proceso antes del primer request: blueprints
+    diferidos, catálogo de habitaciones, paquetes de suministros, estadísticas del panel (deja las
+    páginas de SQLite en memoria) y plantillas compiladas. Retorna los ms de
+    cada paso; un paso que falla se registra y no impide arrancar.
+    """
+    from app.models import DashboardStats
+    from app.package_cache import package_cache
+    from app.room_catalog import get_catalog
+    from app.routes import load_deferred_blueprints
+
+    steps = [
+        ('blueprints', lambda: load_deferred_blueprints(app)),
+        ('room_catalog', get_catalog),
+        ('package_cache', package_cache.all_packages),
+        ('dashboard', DashboardStats.get_panel_statistics),
+        ('templates', lambda: _warm_templates(app)),
+    ]
+    timings = {}
+    with app.app_context():
+        for name, warm in steps:
+            started = time.perf_counter()
+            try:
+                warm()
+            except Exception as e:
+                logger.warning('Calentamiento de %s falló: %s', name, e)
+                continue
+            finally:
+                db.session.remove()
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
+
+
+def register_health_check(app):
+    @app.route('/healthz')
+    def healthz():
+        """Salud del worker: base de datos accesible y versión del catálogo (sin sesión iniciada)"""
+        from app.room_catalog import get_catalog
+        try:
+            db.session.execute(text('SELECT 1'))
+            return jsonify({
+                'status': 'ok',
+                'pid': os.getpid(),
+                'uptime_s': round(time.time() - _started_at, 1),
+                'room_catalog_stamp': get_catalog().stamp
+            })
+        except Exception as e:
+            return jsonify({'status': 'error', 'pid': os.getpid(), 'error': str(e)}), 503
+
+
+# === GUNICORN ===
+
+def server_options(config, bind: Optional[str] = None, workers: Optional[int] = None,
+                   threads: Optional[int] = None, warmup: bool = True) -> Dict:
+    """Opciones de gunicorn a partir de la configuración de la app y de la línea de comandos"""
+    options = {
+        'bind': bind or config.SERVER_BIND,
+        'workers': workers or config.SERVER_WORKERS,
+        'threads': threads or config.SERVER_THREADS,
+        'worker_class': 'gthread',
+        'timeout': config.SERVER_TIMEOUT,
+        'graceful_timeout': config.SERVER_GRACEFUL_TIMEOUT,
+        # Reciclar workers de a poco evita que todos se reinicien a la vez
+        'max_requests': config.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': max(config.SERVER_MAX_REQUESTS // 10, 1) if config.SERVER_MAX_REQUESTS else 0,
+        'preload_app': False,
+        'accesslog': '-',
+    }
+    if warmup:
+        options['post_worker_init'] = _post_worker_init
+    return options
+
+
+def _post_worker_init(worker):
+    timings = warm_caches(worker.wsgi)
+    worker.log.info('Worker %s listo, cachés calientes: %s', worker.pid, timings)
+
+
+def build_server(options: Dict, config_class=None):
+    """Aplicación gunicorn que crea la app Flask en cada worker"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as e:
+        raise RuntimeError('gunicorn no está instalado: pip install gunicorn') from e
+
+    from app import create_app
+    from config import Config
+
+    class AirbnbManagerServer(BaseApplication):
+        def __init__(self):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            # Los blueprints de análisis se registran al calentar el worker (o en su primer request)
+            app = create_app(config_class or Config)
+            register_health_check(app)
+            return app
+
+    return AirbnbManagerServer()
+
+
+def main(argv: Optional[List[str]] = None):
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Servidor de producción de Airbnb Manager')
+    parser.add_argument('--bind', help=f'Dirección (por defecto {Config.SERVER_BIND})')
+    parser.add_argument('--workers', type=int, help=f'Procesos worker (por defecto {Config.SERVER_WORKERS})')
+    parser.add_argument('--threads', type=int, help=f'Hilos por worker (por defecto {Config.SERVER_THREADS})')
+    parser.add_argument('--no-warmup', action='store_true', help='No calentar los cachés al iniciar cada worker')
+    parser.add_argument('--print-config', action='store_true', help='Mostrar las opciones de gunicorn y salir')
+    args = parser.parse_args(argv)
+
+    options = server_options(Config, bind=args.bind, workers=args.workers,
+                             threads=args.threads, warmup=not args.no_warmup)
+    if args.print_config:
+        for key, value in sorted(options.items()):
+            print(f'{key} = {getattr(value, "__name__", value)}')
+        return
+    build_server(options).run()
@@ -0,0 +1,227 @@
+"""
+AIRBNB MANAGER V4.0 - CACHÉS DE PROCESO CON SELLO COMPARTIDO
+Esquema común de los cachés de proceso (catálogo de habitaciones,
+disponibilidad, paquetes de suministros, planes de tarifas, usuarios de
+sesión):
+
+    StampedCache   un valor cargado de forma perezosa. Guarda el sello de su
+                   nombre en la tabla cache_version al cargar y lo vuelve a
+                   leer como mucho cada ROOM_CATALOG_CHECK_SECONDS; si otro
+                   worker lo incrementó, recarga.
+    watch_tables   eventos de sesión: una escritura sobre las tablas del caché
+                   incrementa el sello (una vez por transacción, dentro de
+                   ella) e invalida el caché al detectarla y otra vez al
+                   confirmar o revertir, para descartar lo que otro hilo haya
+                   recargado antes del commit.
+
+Cada caché declara solo su sello, su carga y sus tablas:
+
+    class RoomCatalog(StampedCache):
+        stamp_name = 'rooms'
+
+        def _load(self, connection, stamp):
+            ...
+
+    room_catalog = RoomCatalog()
+    watch_tables(room_catalog, (Room,))
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import CacheVersion
+
+
+DEFAULT_CHECK_SECONDS = 2.0
+
+
+# === SELLO DE VERSIÓN EN LA BASE DE DATOS ===
+
+def read_stamp(connection, name: str) -> int:
+    stamp = connection.execute(
+        select(CacheVersion.version).where(CacheVersion.name == name)).scalar()
+    return stamp or 0
+
+
+def bump_stamp(connection, name: str):
+    """
+    Incrementa el sello en la transacción de `connection` (visible para otros
+    workers al confirmar). Es un upsert en una sola sentencia: dos workers que
+    escriben por primera vez a la vez no chocan en la llave primaria.
+    """
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        if connection.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        connection.execute(upsert(CacheVersion).values(name=name, version=1).on_conflict_do_update(
+            index_elements=[CacheVersion.name], set_={'version': CacheVersion.version + 1}))
+        return
+    result = connection.execute(update(CacheVersion).where(CacheVersion.name == name)
+                                .values(version=CacheVersion.version + 1))
+    if result.rowcount == 0:
+        connection.execute(insert(CacheVersion).values(name=name, version=1))
+
+
+def check_seconds() -> float:
+    if has_app_context():
+        return current_app.config.get('ROOM_CATALOG_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+    return DEFAULT_CHECK_SECONDS
+
+
+# === CACHÉ ===
+
+class StampedCache(ABC):
+    """
+    Valor de proceso con su sello. `version` cambia cada vez que cambia el
+    valor en memoria (invalidación o recarga); una carga que se cruzó con una
+    invalidación no se guarda.
+    """
+
+    stamp_name: str
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = None
+        self._engine = None
+        self._stamp: Optional[int] = None
+        self._checked_at = 0.0
+        self.version = 0
+        self.reloads = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self.version += 1
+
+    def value(self):
+        """Valor actual: recarga si falta, venció o cambió el sello"""
+        engine = db.engine
+        value = self._value
+        if value is None or self._engine is not engine or self._is_stale(value):
+            return self._reload(engine)
+
+        now = time.monotonic()
+        if now - self._checked_at >= check_seconds():
+            self._checked_at = now
+            with engine.connect() as connection:
+                if read_stamp(connection, self.stamp_name) != self._stamp:
+                    return self._reload(engine)
+        return value
+
+    def _reload(self, engine):
+        with self._lock:
+            version = self.version
+        # Conexión propia: no toca la sesión (ni la transacción) de la petición
+        with engine.connect() as connection:
+            stamp = read_stamp(connection, self.stamp_name)
+            value = self._load(connection, stamp)
+        with self._lock:
+            if self.version == version:
+                self._value = value
+                self._engine = engine
+                self._stamp = stamp
+                self._checked_at = time.monotonic()
+                self.version += 1
+                self.reloads += 1
+        return value
+
+    @abstractmethod
+    def _load(self, connection, stamp: int):
+        """Valor nuevo leído con `connection` (el sello se leyó antes en la misma conexión)"""
+
+    def _is_stale(self, value) -> bool:
+        """Vencimiento propio del valor, además del sello"""
+        return False
+
+
+# === INVALIDACIÓN POR EVENTOS DE SESIÓN ===
+
+@dataclass(frozen=True)
+class _Watch:
+    cache: StampedCache
+    tables: FrozenSet[str]
+    models: tuple
+    # Atributos que cuentan como cambio por modelo (por defecto, cualquier columna)
+    attributes: Dict[type, Sequence[str]]
+
+    def changed(self, session) -> bool:
+        for obj in (*session.new, *session.deleted):
+            if isinstance(obj, self.models):
+                return True
+        for obj in session.dirty:
+            if isinstance(obj, self.models) and self._attributes_changed(obj):
+                return True
+        return False
+
+    def _attributes_changed(self, obj) -> bool:
+        state = inspect(obj)
+        names = self.attributes.get(type(obj))
+        if names is None:
+            names = [column.key for column in state.mapper.column_attrs]
+        return any(state.attrs[name].history.has_changes() for name in names)
+
+
+_watches: List[_Watch] = []
+_PENDING_KEY = 'stamped_caches_dirty'
+
+
+def watch_tables(cache: StampedCache, tables: Iterable,
+                 attributes: Optional[Dict[type, Sequence[str]]] = None):
+    """
+    Invalida `cache` (e incrementa su sello) al escribir en `tables`: modelos o
+    tablas de Core. `attributes` restringe qué atributos de un modelo cuentan
+    como cambio en un flush (p. ej. una relación muchos a muchos).
+    """
+    tables = list(tables)
+    models = tuple(table for table in tables if isinstance(table, type))
+    names = frozenset(table.__tablename__ if isinstance(table, type) else table.name for table in tables)
+    _watches.append(_Watch(cache, names, models, dict(attributes or {})))
+
+
+def _mark_dirty(session, cache: StampedCache):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    if cache not in pending:
+        bump_stamp(session.connection(), cache.stamp_name)
+        pending.add(cache)
+    cache.invalidate()
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_execute(orm_execute_state):
+    """Sentencias directas (insert/update/delete) sobre las tablas vigiladas"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None:
+        return
+    for watch in _watches:
+        if table.name in watch.tables:
+            _mark_dirty(orm_execute_state.session, watch.cache)
+
+
+@event.listens_for(Session, 'after_flush')
+def _on_flush(session, flush_context):
+    for watch in _watches:
+        if watch.changed(session):
+            _mark_dirty(session, watch.cache)
+
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit(session):
+    for cache in session.info.pop(_PENDING_KEY, ()):
+        cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _on_rollback(session):
+    for cache in session.info.pop(_PENDING_KEY, ()):
+        cache.invalidate()
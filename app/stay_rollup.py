@@ -0,0 +1,78 @@
+"""
+AIRBNB MANAGER V4.0 - VERIFICACIÓN DEL RESUMEN FINANCIERO DE ESTANCIAS
+Stay.paid_total, Stay.balance_due y Stay.nights son copias desnormalizadas de
+los pagos y las fechas. Los caminos normales las mantienen al día
+(Stay.record_payment, listeners de fechas, defaults de columna); este módulo
+las compara contra la fuente (SUM de pagos y fechas) y repara las que difieran,
+por ejemplo tras cargas masivas o ediciones directas en la base.
+
+Uso:
+    flask verify-stay-rollups            # solo reporta
+    flask verify-stay-rollups --repair   # corrige las diferencias
+"""
+
+from typing import Dict, List
+
+from sqlalchemy import func, select, update
+
+from app.day_keys import nights_between
+from app.extensions import db
+from app.models import Payment, Stay
+
+
+# Tolerancia para comparar montos en punto flotante
+AMOUNT_TOLERANCE = 0.005
+
+
+def _paid_totals_subquery():
+    return (
+        select(Payment.stay_id, func.sum(Payment.amount).label('paid'))
+        .group_by(Payment.stay_id)
+        .subquery()
+    )
+
+
+def find_rollup_mismatches() -> List[Dict]:
+    """
+    Estancias cuyo resumen guardado no coincide con pagos y fechas (una
+    consulta con los totales agregados). Cada fila trae lo guardado y lo esperado.
+    """
+    paid = _paid_totals_subquery()
+    rows = db.session.execute(
+        select(Stay.id, Stay.check_in_date, Stay.check_out_date, Stay.agreed_total,
+               Stay.paid_total, Stay.balance_due, Stay.nights,
+               func.coalesce(paid.c.paid, 0.0).label('actual_paid'))
+        .outerjoin(paid, paid.c.stay_id == Stay.id)
+        .order_by(Stay.id)
+    ).all()
+
+    mismatches = []
+    for row in rows:
+        expected = {
+            'paid_total': round(row.actual_paid, 2),
+            'balance_due': Stay.balance_for(row.agreed_total, row.actual_paid),
+            'nights': nights_between(row.check_in_date, row.check_out_date),
+        }
+        stored = {'paid_total': row.paid_total, 'balance_due': row.balance_due, 'nights': row.nights}
+        differs = [
+            name for name in ('paid_total', 'balance_due')
+            if stored[name] is None or abs(stored[name] - expected[name]) > AMOUNT_TOLERANCE
+        ]
+        if stored['nights'] != expected['nights']:
+            differs.append('nights')
+        if differs:
+            mismatches.append({'stay_id': row.id, 'fields': differs, 'stored': stored, 'expected': expected})
+    return mismatches
+
+
+def repair_rollups(mismatches: List[Dict], batch_size: int = 1000) -> int:
+    """Escribe los valores esperados con UPDATE por lotes (executemany); el llamador hace commit"""
+    rows = [dict(mismatch['expected'], id=mismatch['stay_id']) for mismatch in mismatches]
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(update(Stay), rows[start:start + batch_size])
+    return len(rows)
+
+
+def refresh_stay_rollups() -> int:
+    """Verifica y repara todas las estancias; retorna cuántas se corrigieron"""
+    return repair_rollups(find_rollup_mismatches())
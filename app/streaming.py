@@ -0,0 +1,58 @@
+"""
+AIRBNB MANAGER V4.0 - RESPUESTAS EN STREAMING
+Serialización de eventos como NDJSON (una línea JSON por evento) o como
+Server-Sent Events cuando el cliente envía `Accept: text/event-stream`, y el
+envoltorio que abre un app context en los hilos del pool de estrategias.
+"""
+
+from typing import Callable, Dict, Iterable
+
+from flask import Response, current_app, request, stream_with_context
+
+from app.extensions import db
+from app.ranking import strategy_pool
+
+
+def strategy_executor():
+    """Pool de estrategias y función que ejecuta cada tarea dentro de un app context propio"""
+    app = current_app._get_current_object()
+
+    def run(func: Callable):
+        with app.app_context():
+            try:
+                return func()
+            finally:
+                db.session.remove()
+
+    return strategy_pool(app.config.get('SUGGESTION_WORKERS', 4)), run
+
+
+def wants_event_stream() -> bool:
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def stream_events(events: Iterable[Dict]) -> Response:
+    """
+    Respuesta en streaming a partir de un iterable de eventos (dicts con la
+    clave 'event'). Un error a mitad del stream se entrega como evento 'error'.
+    """
+    json = current_app.json
+    sse = wants_event_stream()
+
+    def encode(payload: Dict) -> str:
+        if sse:
+            return f"event: {payload.get('event', 'message')}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(payload) + '\n'
+
+    def generate():
+        try:
+            for payload in events:
+                yield encode(payload)
+        except Exception as e:
+            yield encode({'event': 'error', 'success': False, 'error': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,547 @@
+"""
+AIRBNB MANAGER V4.0 - GENERADOR DE DATOS SINTÉTICOS
+Genera conjuntos de datos grandes y realistas (habitaciones, clientes, años de
+estancias, pagos, gastos y uso de suministros) usando inserciones masivas.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterable, List
+
+from werkzeug.security import generate_password_hash
+
+from app.day_keys import day_key
+from app.extensions import db
+from app.models import (User, Room, Client, Stay, Payment, Expense, Supply,
+                        SupplyUsage, Task, CashClosure, EmployeeDelivery,
+                        StayNightRevenue, DemandForecast, AvailabilitySearch, room_supply_defaults)
+
+
+FIRST_NAMES = [
+    'Ana', 'María', 'Carmen', 'Rosa', 'Juana', 'Isabel', 'Teresa', 'Francisca', 'Esperanza', 'Luz',
+    'Carlos', 'José', 'Manuel', 'Francisco', 'Rafael', 'Antonio', 'Miguel', 'Pedro', 'Ramón', 'Luis'
+]
+
+LAST_NAMES = [
+    'García', 'Rodríguez', 'Martínez', 'Hernández', 'González', 'Pérez', 'Sánchez', 'Ramírez',
+    'Cruz', 'Vargas', 'Castillo', 'Jiménez', 'Morales', 'Ortiz', 'Delgado', 'Castro', 'Ruiz'
+]
+
+SUPPLY_CATALOG = [
+    # (nombre, categoría, precio unitario, cantidad por estancia o None si no va en paquete)
+    ('Papel Higiénico', 'Baño', 45.00, 2),
+    ('Jabón de Baño', 'Amenities', 25.00, 2),
+    ('Champú pequeño', 'Amenities', 35.00, 1),
+    ('Acondicionador', 'Amenities', 40.00, 1),
+    ('Toallas de Papel', 'Limpieza', 65.00, 1),
+    ('Café Molido', 'Cocina', 185.00, 1),
+    ('Azúcar', 'Cocina', 35.00, 1),
+    ('Bolsas de basura', 'Limpieza', 15.00, 2),
+    ('Detergente líquido', 'Limpieza', 120.00, None),
+    ('Desinfectante multiusos', 'Limpieza', 89.50, None),
+    ('Toallas de baño', 'Ropa de Cama', 450.00, None),
+    ('Sábanas matrimoniales', 'Ropa de Cama', 850.00, None),
+    ('Bombillos LED', 'Mantenimiento', 180.00, None),
+    ('Pilas AA', 'Mantenimiento', 45.00, None),
+]
+
+BOOKING_CHANNELS = [('Airbnb', 0.45), ('Booking.com', 0.25), ('Directo', 0.2), ('WhatsApp', 0.1)]
+PAYMENT_METHODS = ['Efectivo', 'Tarjeta', 'Transferencia']
+
+EXPENSE_CATEGORIES = [
+    # (categoría, rol que paga, monto mínimo, monto máximo, frecuencia mensual)
+    ('Limpieza', 'empleada', 150, 800, 6),
+    ('Mantenimiento', 'empleada', 200, 1500, 2),
+    ('Amenities', 'socia', 500, 3000, 2),
+    ('Servicios', 'socia', 1500, 4500, 3),
+    ('Marketing', 'socia', 1000, 6000, 1),
+    ('Impuestos', 'dueño', 3000, 12000, 1),
+]
+
+# Tarifa base por noche según tier y multiplicador estacional por mes
+BASE_NIGHTLY_RATE = {'Queen': 2500, 'King': 4000}
+SEASONALITY = {1: 1.25, 2: 1.2, 3: 1.05, 4: 1.0, 5: 0.85, 6: 0.9,
+               7: 1.2, 8: 1.25, 9: 0.75, 10: 0.8, 11: 0.9, 12: 1.3}
+
+# Antelación media de las reservas (días) y máxima
+MEAN_LEAD_DAYS = 21
+MAX_LEAD_DAYS = 180
+
+
+@dataclass
+class DatasetSpec:
+    """Parámetros del conjunto de datos a generar"""
+    rooms: int = 20
+    clients: int = 500
+    years: float = 2.0
+    future_days: int = 90
+    king_ratio: float = 0.35
+    seed: int = 42
+    with_supply_usage: bool = True
+    batch_size: int = 5000
+    end_date: date = field(default_factory=date.today)
+
+
+def clear_data():
+    """Elimina todos los datos de negocio respetando las llaves foráneas"""
+    for model in (SupplyUsage, EmployeeDelivery, CashClosure, Payment, StayNightRevenue, Stay,
+                  Expense, Task, Client, DemandForecast, AvailabilitySearch):
+        db.session.query(model).delete()
+    db.session.execute(room_supply_defaults.delete())
+    for model in (Room, Supply, User):
+        db.session.query(model).delete()
+    db.session.commit()
+
+
+def bulk_insert(table, rows: List[Dict], batch_size: int = 5000, commit: bool = False) -> int:
+    """
+    Inserta filas con executemany en lotes; retorna la cantidad insertada.
+
+    En SQLite las filas se pasan directo al driver (sin el procesamiento de
+    tipos por parámetro de SQLAlchemy), que es el costo dominante en volúmenes
+    grandes. Con `commit=True` se confirma cada lote para no acumular un
+    journal gigante.
+    """
+    if not rows:
+        return 0
+
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        # El camino crudo no aplica los defaults de Python (claves de día, noches, fechas)
+        rows = _with_python_defaults(table, rows)
+        columns = list(rows[0].keys())
+        quote = connection.dialect.identifier_preparer.quote
+        statement = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(table.name), ', '.join(quote(c) for c in columns), ', '.join('?' * len(columns)))
+        # Solo se convierten las columnas de fecha; el resto pasa tal cual
+        temporal = [i for i, c in enumerate(columns) if _is_temporal_column(table, c, rows)]
+        convert = _SQLiteDateFormatter()
+        for start in range(0, len(rows), batch_size):
+            batch = [tuple(row[c] for c in columns) for row in rows[start:start + batch_size]]
+            if temporal:
+                batch = [convert.row(values, temporal) for values in batch]
+            db.session.connection().exec_driver_sql(statement, batch)
+            if commit:
+                db.session.commit()
+    else:
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(table.insert(), rows[start:start + batch_size])
+            if commit:
+                db.session.commit()
+    _invalidate_process_caches()
+    return len(rows)
+
+
+def _invalidate_process_caches():
+    """Las inserciones crudas no pasan por los eventos de sesión que vacían los cachés"""
+    from app.availability import availability_index
+    from app.package_cache import package_cache
+    availability_index.invalidate()
+    package_cache.invalidate()
+
+
+# Datos derivados que dependen de cada conjunto insertado (claves como las de generate_dataset)
+_CUBE_SOURCES = {'stays', 'payments', 'expenses'}
+_ACCRUAL_SOURCES = {'stays', 'payments'}
+
+
+def refresh_derived_data(inserted: Iterable[str]) -> None:
+    """
+    Actualiza una sola vez, al final de una carga con bulk_insert, lo que las
+    inserciones crudas no marcan: el cubo de reportes y los ingresos
+    devengados por noche. `inserted` son los conjuntos con filas nuevas
+    ('stays', 'payments', 'expenses', ...); no confirma la transacción.
+    """
+    from app.accrual import rebuild
+    from app.revenue_cube import ALL_MONTHS, mark_months
+    inserted = set(inserted)
+    if inserted & _CUBE_SOURCES:
+        # El cubo de reportes se recalcula completo en el próximo refresh_pending
+        mark_months(db.session, {ALL_MONTHS})
+    if inserted & _ACCRUAL_SOURCES:
+        # Reparto vectorizado de todas las estancias
+        rebuild()
+
+
+class _RowContext:
+    """Contexto mínimo para los defaults de columna que leen los demás valores de la fila"""
+
+    def __init__(self, row: Dict):
+        self.row = row
+
+    def get_current_parameters(self, isolate_multiinsert_groups: bool = True) -> Dict:
+        return self.row
+
+
+def _with_python_defaults(table, rows: List[Dict]) -> List[Dict]:
+    """Completa las columnas ausentes con sus defaults de Python, en el orden de la tabla"""
+    missing = [column for column in table.columns
+               if column.key not in rows[0] and column.default is not None
+               and (column.default.is_callable or column.default.is_scalar)]
+    if not missing:
+        return rows
+    completed = []
+    for row in rows:
+        row = dict(row)
+        for column in missing:
+            default = column.default
+            row[column.key] = default.arg(_RowContext(row)) if default.is_callable else default.arg
+        completed.append(row)
+    return completed
+
+
+def _is_temporal_column(table, column: str, rows: List[Dict]) -> bool:
+    if column in table.c:
+        python_type = getattr(table.c[column].type, 'python_type', None)
+        try:
+            return python_type is not None and issubclass(python_type, (date, datetime))
+        except NotImplementedError:
+            pass
+    return isinstance(rows[0][column], (date, datetime))
+
+
+class _SQLiteDateFormatter:
+    """Convierte fechas al formato de almacenamiento de SQLAlchemy en SQLite (memoizado)"""
+
+    def __init__(self):
+        self._cache = {}
+
+    def value(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        formatted = self._cache.get(value)
+        if formatted is None:
+            if isinstance(value, datetime):
+                formatted = value.strftime('%Y-%m-%d %H:%M:%S.%f')
+            else:
+                formatted = value.isoformat()
+            self._cache[value] = formatted
+        return formatted
+
+    def row(self, values: tuple, positions: List[int]) -> tuple:
+        values = list(values)
+        for i in positions:
+            values[i] = self.value(values[i])
+        return tuple(values)
+
+
+# === SNAPSHOTS DE FIXTURES (SOLO SQLITE) ===
+
+def _sqlite_path() -> str:
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        raise RuntimeError('Los snapshots solo están disponibles para bases SQLite en archivo')
+    return url.database
+
+
+def save_snapshot(path: str) -> str:
+    """Copia la base de datos actual a `path` con la API de backup de SQLite"""
+    db.session.commit()
+    source = sqlite3.connect(_sqlite_path())
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return path
+
+
+def restore_snapshot(path: str) -> str:
+    """
+    Reemplaza la base de datos por el snapshot en `path` copiando el archivo;
+    restaurar un fixture ya generado toma lo que tarde la copia en disco.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'No existe el snapshot {path}')
+    db_path = _sqlite_path()
+    db.session.remove()
+    db.engine.dispose()
+    for suffix in ('-wal', '-shm', '-journal'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    shutil.copyfile(path, db_path)
+    _invalidate_process_caches()
+    return db_path
+
+
+def generate_dataset(spec: DatasetSpec = None) -> Dict[str, int]:
+    """
+    Genera un conjunto de datos completo según `spec` y retorna los conteos
+    por tabla. Asume una base de datos vacía (ver `clear_data`).
+    """
+    spec = spec or DatasetSpec()
+    rng = random.Random(spec.seed)
+    generator = _DatasetGenerator(spec, rng)
+    counts = generator.run()
+    refresh_derived_data(name for name, count in counts.items() if count)
+    db.session.commit()
+    return counts
+
+
+class _DatasetGenerator:
+    """Construye las filas en memoria con IDs explícitos y las inserta en bloque"""
+
+    def __init__(self, spec: DatasetSpec, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+        # Generador aparte para la antelación: el resto de los datos no cambia con la semilla
+        self.lead_rng = random.Random(spec.seed + 1)
+        self.start_date = spec.end_date - timedelta(days=int(spec.years * 365))
+        self.horizon_end = spec.end_date + timedelta(days=spec.future_days)
+        self.now = datetime.combine(spec.end_date, datetime.min.time()) + timedelta(hours=12)
+
+    def run(self) -> Dict[str, int]:
+        counts = {}
+        users = self._users()
+        counts['users'] = bulk_insert(User.__table__, users)
+        self.user_ids_by_role = {}
+        for user in users:
+            self.user_ids_by_role.setdefault(user['role'], []).append(user['id'])
+
+        rooms = self._rooms()
+        counts['rooms'] = bulk_insert(Room.__table__, rooms)
+
+        supplies = self._supplies()
+        counts['supplies'] = bulk_insert(Supply.__table__, supplies)
+
+        packages = self._room_packages(rooms, supplies)
+        counts['room_supply_defaults'] = bulk_insert(room_supply_defaults, packages)
+
+        clients = self._clients()
+        counts['clients'] = bulk_insert(Client.__table__, clients, self.spec.batch_size)
+
+        stays, payments = self._stays_and_payments(rooms, len(clients))
+        counts['stays'] = bulk_insert(Stay.__table__, stays, self.spec.batch_size)
+        counts['payments'] = bulk_insert(Payment.__table__, payments, self.spec.batch_size)
+
+        expenses = self._expenses()
+        counts['expenses'] = bulk_insert(Expense.__table__, expenses, self.spec.batch_size)
+
+        if self.spec.with_supply_usage:
+            usages = self._supply_usages(stays, packages, supplies)
+            counts['supply_usages'] = bulk_insert(SupplyUsage.__table__, usages, self.spec.batch_size)
+
+        return counts
+
+    # === GENERADORES POR TABLA ===
+
+    def _users(self) -> List[Dict]:
+        # Un solo hash para todos: generar hashes es deliberadamente lento
+        password_hash = generate_password_hash('clave123')
+        users = [('jacob', 'dueño'), ('alejandrina', 'socia'), ('elizabeth', 'empleada')]
+        return [
+            {'id': i + 1, 'username': username, 'role': role, 'password_hash': password_hash}
+            for i, (username, role) in enumerate(users)
+        ]
+
+    def _rooms(self) -> List[Dict]:
+        rooms = []
+        king_count = max(1, int(round(self.spec.rooms * self.spec.king_ratio)))
+        for i in range(self.spec.rooms):
+            tier = 'King' if i >= self.spec.rooms - king_count else 'Queen'
+            floor, number = divmod(i, 20)
+            rooms.append({
+                'id': i + 1,
+                'name': f'{tier} {floor + 1}{number + 1:02d}',
+                'tier': tier,
+                'status': 'Limpia',
+                'notes': None
+            })
+        return rooms
+
+    def _supplies(self) -> List[Dict]:
+        return [
+            {
+                'id': i + 1,
+                'name': name,
+                'category': category,
+                'current_stock': self.rng.randint(50, 500),
+                'minimum_stock': 20,
+                'unit_price': price,
+                'supplier': None,
+                'notes': None,
+                'last_updated': self.now
+            }
+            for i, (name, category, price, _) in enumerate(SUPPLY_CATALOG)
+        ]
+
+    def _room_packages(self, rooms: List[Dict], supplies: List[Dict]) -> List[Dict]:
+        packages = []
+        for room in rooms:
+            for supply, (_, _, _, quantity) in zip(supplies, SUPPLY_CATALOG):
+                if quantity is None:
+                    continue
+                if room['tier'] == 'King':
+                    quantity += 1
+                packages.append({
+                    'room_id': room['id'],
+                    'supply_id': supply['id'],
+                    'quantity': quantity,
+                    'is_mandatory': True,
+                    'usage_type': 'Automático',
+                    'notes': None,
+                    'created_at': self.now,
+                    'updated_at': self.now
+                })
+        return packages
+
+    def _clients(self) -> List[Dict]:
+        clients = []
+        for i in range(self.spec.clients):
+            first_name = self.rng.choice(FIRST_NAMES)
+            last_name = self.rng.choice(LAST_NAMES)
+            clients.append({
+                'id': i + 1,
+                'full_name': f'{first_name} {last_name}',
+                # Teléfono y email únicos derivados del índice
+                'phone_number': f'809-{i // 10000:03d}-{i % 10000:04d}',
+                'email': f'cliente{i + 1}@example.com' if i % 3 == 0 else None,
+                'notes': None
+            })
+        return clients
+
+    def _stays_and_payments(self, rooms: List[Dict], client_count: int):
+        stays, payments = [], []
+        channels = [c for c, _ in BOOKING_CHANNELS]
+        weights = [w for _, w in BOOKING_CHANNELS]
+        today = self.spec.end_date
+
+        for room in rooms:
+            current = self.start_date + timedelta(days=self.rng.randint(0, 5))
+            while current < self.horizon_end:
+                season = SEASONALITY[current.month]
+                # En temporada alta los huecos entre estancias son más cortos
+                gap = int(self.rng.expovariate(season / 2.5))
+                current += timedelta(days=gap)
+                nights = min(self.rng.choice([1, 2, 2, 3, 3, 4, 5, 7, 7, 10, 14]),
+                             (self.horizon_end - current).days)
+                if nights <= 0:
+                    break
+                check_in = current
+                check_out = current + timedelta(days=nights)
+
+                if check_out <= today:
+                    status = 'Finalizada'
+                else:
+                    status = 'Activa'
+                # Las reservas futuras con antelación mayor a la que falta todavía no existen
+                booked_on = self._booked_on(check_in)
+                if booked_on > today:
+                    current = check_out
+                    continue
+
+                stay_id = len(stays) + 1
+                stay = {
+                    'id': stay_id,
+                    'client_id': self.rng.randint(1, client_count),
+                    'room_id': room['id'],
+                    'check_in_date': datetime.combine(check_in, datetime.min.time()) + timedelta(hours=15),
+                    'check_out_date': datetime.combine(check_out, datetime.min.time()) + timedelta(hours=11),
+                    'booking_channel': self.rng.choices(channels, weights)[0],
+                    'status': status,
+                    'booked_day': day_key(booked_on),
+                }
+                stays.append(stay)
+
+                # Resumen financiero: las estancias iniciadas están pagadas; las futuras
+                # tienen el precio de tarifa acordado y todo el saldo pendiente
+                if check_in <= today:
+                    stay_payments = self._payments_for_stay(stay_id, room['tier'], check_in, nights, len(payments))
+                    payments.extend(stay_payments)
+                    stay['agreed_total'] = round(sum(p['amount'] for p in stay_payments), 2)
+                else:
+                    stay['agreed_total'] = round(BASE_NIGHTLY_RATE[room['tier']] * SEASONALITY[check_in.month] * nights, 2)
+                stay['paid_total'] = stay['agreed_total'] if check_in <= today else 0.0
+                stay['balance_due'] = Stay.balance_for(stay['agreed_total'], stay['paid_total'])
+
+                current = check_out
+
+        return stays, payments
+
+    def _booked_on(self, check_in: date) -> date:
+        """Día de la reserva: antelación con distribución exponencial"""
+        lead = min(int(self.lead_rng.expovariate(1 / MEAN_LEAD_DAYS)), MAX_LEAD_DAYS)
+        return check_in - timedelta(days=lead)
+
+    def _payments_for_stay(self, stay_id: int, tier: str, check_in: date, nights: int, offset: int) -> List[Dict]:
+        nightly = BASE_NIGHTLY_RATE[tier] * SEASONALITY[check_in.month] * self.rng.uniform(0.9, 1.1)
+        total = round(nightly * nights, 2)
+        installments = 1 if nights <= 3 else self.rng.randint(1, 3)
+        amounts = [round(total / installments, 2)] * installments
+        amounts[-1] = round(total - sum(amounts[:-1]), 2)
+
+        return [
+            {
+                'id': offset + i + 1,
+                'stay_id': stay_id,
+                'amount': amount,
+                'method': self.rng.choice(PAYMENT_METHODS),
+                'payment_date': datetime.combine(check_in + timedelta(days=min(i, nights - 1)),
+                                                 datetime.min.time()) + timedelta(hours=16)
+            }
+            for i, amount in enumerate(amounts)
+        ]
+
+    def _expenses(self) -> List[Dict]:
+        expenses = []
+        month_start = self.start_date.replace(day=1)
+        while month_start <= self.spec.end_date:
+            for category, role, low, high, per_month in EXPENSE_CATEGORIES:
+                payer_ids = self.user_ids_by_role.get(role) or [None]
+                for _ in range(per_month):
+                    day = month_start + timedelta(days=self.rng.randint(0, 27))
+                    if day > self.spec.end_date:
+                        continue
+                    expenses.append({
+                        'id': len(expenses) + 1,
+                        'description': f'{category} - {day.strftime("%d/%m/%Y")}',
+                        'amount': round(self.rng.uniform(low, high), 2),
+                        'category': category,
+                        'expense_date': datetime.combine(day, datetime.min.time()) + timedelta(hours=10),
+                        'paid_by_user_id': self.rng.choice(payer_ids),
+                        'payment_method': self.rng.choice(PAYMENT_METHODS)
+                    })
+            month_start = (month_start + timedelta(days=32)).replace(day=1)
+        return expenses
+
+    def _supply_usages(self, stays: List[Dict], packages: List[Dict], supplies: List[Dict]) -> List[Dict]:
+        prices = {s['id']: s['unit_price'] for s in supplies}
+        package_by_room = {}
+        for item in packages:
+            package_by_room.setdefault(item['room_id'], []).append(item)
+
+        employee_id = (self.user_ids_by_role.get('empleada') or [None])[0]
+        usages = []
+        for stay in stays:
+            if stay['check_in_date'].date() > self.spec.end_date:
+                continue
+            confirmed = stay['status'] == 'Finalizada'
+            for item in package_by_room.get(stay['room_id'], []):
+                quantity_used = item['quantity']
+                if confirmed and self.rng.random() < 0.1:
+                    quantity_used += self.rng.choice([-1, 1, 2])
+                quantity_used = max(quantity_used, 0)
+                unit_price = prices[item['supply_id']]
+                usages.append({
+                    'id': len(usages) + 1,
+                    'supply_id': item['supply_id'],
+                    'stay_id': stay['id'],
+                    'room_id': stay['room_id'],
+                    'quantity_used': quantity_used,
+                    'quantity_expected': item['quantity'],
+                    'usage_type': 'Verificado' if confirmed else 'Automático',
+                    'usage_source': 'Estancia',
+                    'usage_date': stay['check_in_date'],
+                    'verified_by_user_id': employee_id if confirmed else None,
+                    'verified_at': stay['check_out_date'] if confirmed else None,
+                    'cost_per_unit': unit_price,
+                    'total_cost': quantity_used * unit_price,
+                    'is_confirmed': confirmed,
+                    'notes': None
+                })
+        return usages
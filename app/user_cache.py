@@ -0,0 +1,133 @@
+"""
+AIRBNB MANAGER V4.0 - CACHÉ DE USUARIOS DE SESIÓN
+`load_user` se ejecuta en cada request (páginas y polls AJAX). En lugar de
+consultar la tabla de usuarios cada vez, se guarda un SessionUser inmutable
+con id, username, rol y el conjunto de permisos ya resuelto, que es lo que
+leen los decoradores, el context processor y las plantillas.
+
+Es un caché con sello compartido (app/stamped_cache.py, sello 'users'):
+escribir un usuario (editar, eliminar, cambiar contraseña o rol) incrementa
+el sello, y los demás workers descartan sus usuarios al verlo cambiar.
+"""
+
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from flask_login import UserMixin
+
+from app.extensions import db
+from app.models import User
+from app.stamped_cache import StampedCache, watch_tables
+
+
+# Métodos de permiso/rol del modelo User que se precalculan
+PERMISSIONS = (
+    'is_owner', 'is_partner', 'is_employee',
+    'can_view_reports', 'can_manage_finances', 'can_view_monthly_report',
+    'can_manage_users', 'can_delete_data', 'can_manage_supplies',
+)
+
+USERS_STAMP = 'users'
+
+
+def resolve_permissions(user) -> FrozenSet[str]:
+    """Permisos de un usuario (modelo o SessionUser) como conjunto de nombres de método"""
+    if isinstance(user, SessionUser):
+        return user.permissions
+    return frozenset(name for name in PERMISSIONS if getattr(user, name)())
+
+
+def _permission(name: str):
+    def check(self) -> bool:
+        return name in self.permissions
+    check.__name__ = name
+    return check
+
+
+@dataclass(frozen=True, eq=False)
+class SessionUser(UserMixin):
+    """
+    Usuario de la sesión (solo lectura). Solo expone lo que leen las plantillas
+    y los decoradores; para modificarlo o leer relaciones usar `to_model()`.
+    """
+    id: int
+    username: str
+    role: str
+    permissions: FrozenSet[str]
+
+    get_role_display = User.get_role_display
+    get_display_name = User.get_display_name
+
+    is_owner = _permission('is_owner')
+    is_partner = _permission('is_partner')
+    is_employee = _permission('is_employee')
+    can_view_reports = _permission('can_view_reports')
+    can_manage_finances = _permission('can_manage_finances')
+    can_view_monthly_report = _permission('can_view_monthly_report')
+    can_manage_users = _permission('can_manage_users')
+    can_delete_data = _permission('can_delete_data')
+    can_manage_supplies = _permission('can_manage_supplies')
+
+    @classmethod
+    def from_model(cls, user: User) -> 'SessionUser':
+        return cls(id=user.id, username=user.username, role=user.role, permissions=resolve_permissions(user))
+
+    def has_permission(self, name: str) -> bool:
+        return name in self.permissions
+
+    def to_model(self) -> Optional[User]:
+        """Instancia ORM del usuario en la sesión actual (una consulta si aún no está cargada)"""
+        return db.session.get(User, self.id)
+
+    def __repr__(self):
+        return f'<SessionUser {self.username} ({self.role})>'
+
+
+class UserCache(StampedCache):
+    """SessionUser por ID; el valor es el diccionario de usuarios ya cargados"""
+
+    stamp_name = USERS_STAMP
+
+    def __init__(self):
+        super().__init__()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, connection, stamp):
+        # Los usuarios se cargan uno a uno al pedirlos
+        return {}
+
+    def get(self, user_id: int) -> Optional[SessionUser]:
+        users = self.value()
+        session_user = users.get(user_id)
+        if session_user is not None:
+            self.hits += 1
+            return session_user
+        self.misses += 1
+        with self._lock:
+            version = self.version
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        session_user = SessionUser.from_model(user)
+        with self._lock:
+            if self.version == version:
+                users[user_id] = session_user
+        return session_user
+
+
+user_cache = UserCache()
+
+
+def load_session_user(user_id) -> Optional[SessionUser]:
+    """Callback de Flask-Login: usuario de la sesión desde el caché"""
+    try:
+        return user_cache.get(int(user_id))
+    except (TypeError, ValueError):
+        return None
+
+
+# === INVALIDACIÓN ===
+
+watch_tables(user_cache, (User,))
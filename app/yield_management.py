@@ -4,12 +4,17 @@ Sistema Inteligente de Optimización de Reservas con Jerarquía Queen/King
 """
 
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import math
 
 from app.extensions import db
+from app.availability import occupied_room_ids, available_rooms as find_available_rooms
+from app.repository import get_repository
+from app.ranking import PriorityConfidenceModel, ScoringModel, Strategy, rank_top_k, iter_ranked, strategy_pool
+from app.quotes import quote_room
+from app.calendar_gaps import get_calendar
 from app.models import Room, Stay, Client, Payment
 
 
@@ -57,53 +62,68 @@ class BookingSolution:
     additional_info: Dict = None
 
 
+# === MODELO DE PUNTAJE ===
+
+UPGRADE_BONUS = 0.1  # Bonus por upgrade
+
+DEFAULT_SCORING_MODEL = PriorityConfidenceModel(
+    {
+        SolutionPriority.EXCELLENT: 4,
+        SolutionPriority.GOOD: 3,
+        SolutionPriority.ACCEPTABLE: 2,
+        SolutionPriority.LAST_RESORT: 1
+    },
+    bonus=lambda solution: UPGRADE_BONUS if solution.upgrade_benefit else 0
+)
+
+
 class YieldManagementEngine:
     """Motor principal de Yield Management"""
     
-    def __init__(self):
-        self.pricing_base = {
-            'Queen': 2500,  # Precio base por noche Queen
-            'King': 4000    # Precio base por noche King
-        }
+    def __init__(self, scoring_model: ScoringModel = None):
+        self.scoring_model = scoring_model or DEFAULT_SCORING_MODEL
         self.upgrade_premium = 0.6  # 60% premium por upgrade
     
-    def find_booking_solutions(self, request: BookingRequest) -> List[BookingSolution]:
+    def find_booking_solutions(self, request: BookingRequest, limit: int = 8) -> List[BookingSolution]:
         """
-        Encuentra todas las soluciones posibles para una solicitud de reserva
+        Encuentra las mejores soluciones para una solicitud de reserva. Las
+        estrategias se consumen de forma perezosa: las caras (split y
+        reacomodación) no se ejecutan si ya no pueden entrar en el top.
         """
-        solutions = []
-        
-        # 1. Buscar solución perfecta (habitación única)
-        perfect_solutions = self._find_perfect_matches(request)
-        solutions.extend(perfect_solutions)
-        
-        # 2. Si no hay solución perfecta, buscar estancias divididas
-        if not perfect_solutions:
-            split_solutions = self._find_split_stay_solutions(request)
-            solutions.extend(split_solutions)
-        
-        # 3. Buscar oportunidades de reacomodación con upgrade
-        reallocation_solutions = self._find_reallocation_solutions(request)
-        solutions.extend(reallocation_solutions)
-        
-        # 4. Ordenar por prioridad y confianza
-        solutions = self._rank_solutions(solutions)
-        
-        return solutions[:8]  # Máximo 8 soluciones
+        return rank_top_k(self._strategies(request), limit, self.scoring_model)
+    
+    def stream_booking_solutions(self, request: BookingRequest, limit: int = 8, executor=None, run=None):
+        """Variante en streaming de `find_booking_solutions` (ver `iter_ranked`)"""
+        return iter_ranked(self._strategies(request), limit, self.scoring_model,
+                           executor or strategy_pool(), run)
+    
+    def _strategies(self, request: BookingRequest) -> List[Strategy]:
+        """Estrategias en orden; cotas: prioridad máxima + confianza fija (+ bono por upgrade)"""
+        model = self.scoring_model
+        return [
+            # 1. Solución perfecta (habitación única)
+            Strategy('perfect', model.upper_bound(SolutionPriority.EXCELLENT, 0.95),
+                     lambda produced: self._find_perfect_matches(request)),
+            # 2. Si no hay solución perfecta, estancias divididas
+            Strategy('split', model.upper_bound(SolutionPriority.GOOD, 0.8, UPGRADE_BONUS),
+                     lambda produced: self._find_split_stay_solutions(request),
+                     when=lambda produced: not produced['perfect'], after=('perfect',)),
+            # 3. Oportunidades de reacomodación con upgrade
+            Strategy('reallocation', model.upper_bound(SolutionPriority.GOOD, 0.75, UPGRADE_BONUS),
+                     lambda produced: self._find_reallocation_solutions(request), after=('perfect',)),
+        ]
     
     def _find_perfect_matches(self, request: BookingRequest) -> List[BookingSolution]:
         """Busca habitaciones únicas disponibles para todo el período"""
         solutions = []
         
-        # Obtener habitaciones ocupadas en el período
-        occupied_room_ids = self._get_occupied_rooms(request.check_in, request.check_out)
-        
-        # Buscar habitaciones disponibles
-        available_rooms = Room.query.filter(~Room.id.in_(occupied_room_ids)).all()
-        
-        # Filtrar por tier preferido si se especifica
-        if request.preferred_tier:
-            available_rooms = [r for r in available_rooms if r.tier == request.preferred_tier]
+        # Buscar habitaciones disponibles (del tier preferido si se especifica)
+        available_rooms = find_available_rooms(request.check_in, request.check_out, tier=request.preferred_tier)
+        # Estadía mínima y cierres a llegadas/salidas del calendario de huecos
+        calendar = get_calendar()
+        if calendar.covers(request.check_in, request.check_out):
+            available_rooms = [room for room in available_rooms
+                               if calendar.allows(room.id, request.check_in, request.check_out)]
         
         for room in available_rooms:
             estimated_price = self._calculate_room_price(room, request)
@@ -138,7 +158,8 @@ class YieldManagementEngine:
                 confidence_score=0.95,
                 additional_info={
                     'tier': room.tier,
-                    'is_upgrade': room.tier == 'King' and request.preferred_tier == 'Queen'
+                    'is_upgrade': room.tier == 'King' and request.preferred_tier == 'Queen',
+                    'fills_gap': calendar.fills_gap(room.id, request.check_in, request.check_out) is not None
                 }
             )
             
@@ -146,26 +167,23 @@ class YieldManagementEngine:
         
         return solutions
     
-    def _find_split_stay_solutions(self, request: BookingRequest) -> List[BookingSolution]:
+    def _find_split_stay_solutions(self, request: BookingRequest) -> Iterator[BookingSolution]:
         """Busca combinaciones de habitaciones para estancias divididas"""
-        solutions = []
         stay_duration = (request.check_out - request.check_in).days
         
         # Solo considerar split para estancias de 3+ días
         if stay_duration < 3:
-            return solutions
+            return
         
         # Probar diferentes puntos de división
         for split_day in range(1, stay_duration):
             mid_date = request.check_in + timedelta(days=split_day)
             
             # Primera parte
-            occupied_1 = self._get_occupied_rooms(request.check_in, mid_date)
-            available_1 = Room.query.filter(~Room.id.in_(occupied_1)).all()
+            available_1 = find_available_rooms(request.check_in, mid_date)
             
             # Segunda parte
-            occupied_2 = self._get_occupied_rooms(mid_date, request.check_out)
-            available_2 = Room.query.filter(~Room.id.in_(occupied_2)).all()
+            available_2 = find_available_rooms(mid_date, request.check_out)
             
             # Crear combinaciones
             for room1 in available_1[:3]:  # Limitar opciones
@@ -220,14 +238,10 @@ class YieldManagementEngine:
                         }
                     )
                     
-                    solutions.append(solution)
-        
-        return solutions
+                    yield solution
     
-    def _find_reallocation_solutions(self, request: BookingRequest) -> List[BookingSolution]:
+    def _find_reallocation_solutions(self, request: BookingRequest) -> Iterator[BookingSolution]:
         """Busca oportunidades de reacomodación con upgrade"""
-        solutions = []
-        
         # Obtener estancias actuales que podrían moverse
         current_stays = Stay.query.filter(
             Stay.status == 'Activa',
@@ -244,11 +258,7 @@ class YieldManagementEngine:
             guest_check_in = max(stay.check_in_date.date(), request.check_in)
             guest_check_out = min(stay.check_out_date.date() if stay.check_out_date else request.check_out, request.check_out)
             
-            occupied_for_guest = self._get_occupied_rooms(guest_check_in, guest_check_out, exclude_stay=stay.id)
-            available_kings = Room.query.filter(
-                Room.tier == 'King',
-                ~Room.id.in_(occupied_for_guest)
-            ).all()
+            available_kings = find_available_rooms(guest_check_in, guest_check_out, tier='King', exclude_stay_id=stay.id)
             
             for king_room in available_kings:
                 # Verificar si la Queen original quedaría disponible para el nuevo cliente
@@ -290,40 +300,19 @@ class YieldManagementEngine:
                         }
                     )
                     
-                    solutions.append(solution)
-        
-        return solutions
+                    yield solution
     
     def _get_occupied_rooms(self, check_in: date, check_out: date, exclude_stay: int = None) -> List[int]:
         """Obtiene IDs de habitaciones ocupadas en el período, opcionalmente excluyendo una estancia"""
-        query = Stay.query.filter(
-            Stay.status.in_(['Activa', 'Pendiente de Cierre']),
-            Stay.check_in_date < check_out,
-            db.or_(
-                Stay.check_out_date.is_(None),
-                Stay.check_out_date > check_in
-            )
-        )
-        
-        if exclude_stay:
-            query = query.filter(Stay.id != exclude_stay)
-        
-        overlapping_stays = query.all()
-        return [stay.room_id for stay in overlapping_stays if stay.room_id]
+        return sorted(occupied_room_ids(check_in, check_out, exclude_stay_id=exclude_stay))
     
     def _calculate_room_price(self, room: Room, request: BookingRequest) -> float:
-        """Calcula el precio estimado para una habitación"""
-        nights = (request.check_out - request.check_in).days
-        base_price = self.pricing_base.get(room.tier, 3000)
-        
-        # Aplicar modificadores estacionales, descuentos, etc.
-        return base_price * nights
+        """Calcula el precio estimado para una habitación (cotización en caché de app/quotes.py)"""
+        return quote_room(room, request.check_in, request.check_out).total
     
     def _calculate_room_price_partial(self, room: Room, check_in: date, check_out: date) -> float:
         """Calcula precio para un período parcial"""
-        nights = (check_out - check_in).days
-        base_price = self.pricing_base.get(room.tier, 3000)
-        return base_price * nights
+        return quote_room(room, check_in, check_out).total
     
     def _calculate_room_price_for_room(self, room: Room, request: BookingRequest) -> float:
         """Calcula precio específico para una habitación"""
@@ -331,30 +320,14 @@ class YieldManagementEngine:
     
     def _rank_solutions(self, solutions: List[BookingSolution]) -> List[BookingSolution]:
         """Ordena soluciones por prioridad y calidad"""
-        priority_weights = {
-            SolutionPriority.EXCELLENT: 4,
-            SolutionPriority.GOOD: 3,
-            SolutionPriority.ACCEPTABLE: 2,
-            SolutionPriority.LAST_RESORT: 1
-        }
-        
-        def solution_score(solution):
-            priority_score = priority_weights.get(solution.priority, 1)
-            confidence_score = solution.confidence_score
-            
-            # Bonus por upgrade
-            upgrade_bonus = 0.1 if solution.upgrade_benefit else 0
-            
-            return (priority_score * 2) + confidence_score + upgrade_bonus
-        
-        return sorted(solutions, key=solution_score, reverse=True)
+        return sorted(solutions, key=self.scoring_model.score, reverse=True)
 
 
 # === FUNCIONES DE UTILIDAD ===
 
 def get_availability_summary(start_date: date, days: int = 30) -> Dict:
     """Obtiene resumen de disponibilidad para un período"""
-    rooms = Room.query.all()
+    rooms = get_repository().rooms()
     summary = {
         'total_rooms': len(rooms),
         'queen_rooms': len([r for r in rooms if r.tier == 'Queen']),
@@ -1,5 +1,17 @@
 import os
 
+
+def default_server_workers(max_workers: int = 4) -> int:
+    """
+    Workers por defecto: uno por núcleo disponible, hasta `max_workers`. Las
+    peticiones son de CPU (Python y SQLite en el mismo proceso; la espera de
+    E/S la cubren los hilos de cada worker) y SQLite admite un solo escritor,
+    así que más workers que núcleos solo compiten (ver `flask loadtest`).
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    return max(1, min(cpus, max_workers))
+
+
 class Config:
     """
     Clase de configuración para la aplicación Flask.
@@ -14,3 +26,28 @@ class Config:
     # --- ¡NUEVA VARIABLE! ---
     # Tasa de cambio para la conversión. Puedes actualizar este valor cuando lo necesites.
     TASA_CAMBIO_DOP_USD = 58.50
+
+    # Hilos del pool que ejecuta las estrategias de sugerencias en streaming
+    SUGGESTION_WORKERS = int(os.environ.get('SUGGESTION_WORKERS', 4))
+
+    # Cada cuántos segundos el catálogo de habitaciones revisa el sello de versión
+    # en la base de datos (cambios hechos por otros workers)
+    ROOM_CATALOG_CHECK_SECONDS = float(os.environ.get('ROOM_CATALOG_CHECK_SECONDS', 2))
+
+    # SQLite en modo WAL: lectores concurrentes con un escritor (varios workers)
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '1') != '0'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+    # Servidor de producción (serve.py / app/server.py). Workers según los núcleos
+    # (default_server_workers); las escrituras de otro worker llegan a los cachés
+    # de proceso al revisar los sellos de cache_version (cada ROOM_CATALOG_CHECK_SECONDS)
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:5004')
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS') or default_server_workers())
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 4))
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 60))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 2000))
+
+    # Cada cuántos segundos se escriben por lotes las búsquedas de disponibilidad
+    # registradas (0: sin hilo escritor, solo con search_log.flush())
+    SEARCH_LOG_FLUSH_SECONDS = float(os.environ.get('SEARCH_LOG_FLUSH_SECONDS', 2))
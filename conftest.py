@@ -0,0 +1,65 @@
+"""
+Fixtures compartidas de las pruebas.
+
+Cada módulo de pruebas dimensiona su conjunto de datos sintéticos con una
+variable `DATASET` (DatasetSpec); el fixture `app` crea por módulo una base
+en memoria con ese conjunto. test_reservations.py arma su propia app con
+datos a mano.
+
+Ejecutar con: python -m pytest -q
+"""
+
+import pytest
+
+from config import Config
+from app import create_app
+from app.extensions import db
+from app.models import User
+from app.synthetic_data import DatasetSpec, generate_dataset
+
+
+# Scripts de verificación manual (test_app.py) o contra un servidor corriendo (test_login.py)
+collect_ignore = ['test_app.py', 'test_login.py', 'minimal_test.py']
+
+# Conjunto por defecto para los módulos que no declaran DATASET
+DEFAULT_DATASET = DatasetSpec(rooms=6, clients=30, years=0.25, future_days=30)
+
+
+class FixtureConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    # Sin revisiones periódicas de los sellos de los cachés durante el conteo de consultas
+    ROOM_CATALOG_CHECK_SECONDS = 3600
+    # Búsquedas registradas sin hilo escritor: se escriben con search_log.flush()
+    SEARCH_LOG_FLUSH_SECONDS = 0
+
+
+@pytest.fixture(scope='module')
+def app(request):
+    app = create_app(FixtureConfig)
+    with app.app_context():
+        db.create_all()
+        generate_dataset(getattr(request.module, 'DATASET', DEFAULT_DATASET))
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def engine(app):
+    with app.app_context():
+        return db.engine
+
+
+@pytest.fixture
+def client(app):
+    """Cliente de pruebas con la sesión del dueño iniciada"""
+    with app.app_context():
+        user_id = User.query.filter_by(role='dueño').first().id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
@@ -2,10 +2,15 @@
 """
 Script para poblar la base de datos con datos de prueba
 Genera clientes, productos, gastos, estancias y pagos ficticios
+
+Uso: python populate_test_data.py [--clients N] [--stays N] [--save-snapshot ARCHIVO]
+     python populate_test_data.py --restore-snapshot ARCHIVO
 """
 
+import argparse
 import os
 import sys
+import time
 from datetime import datetime, timedelta
 import random
 
@@ -14,6 +19,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app, db
 from app.models import User, Room, Client, Stay, Payment, Expense, Supply
+from app.revenue_cube import refresh_pending
+from app.synthetic_data import bulk_insert, refresh_derived_data, save_snapshot, restore_snapshot
 
 # Datos ficticios para República Dominicana
 DOMINICAN_FIRST_NAMES = [
@@ -31,8 +38,17 @@ DOMINICAN_COMPANIES = [
     'Suministros del Este', 'Importadora Dominicana', 'Grupo Empresarial', 'Distribuciones Modernas'
 ]
 
+# Por encima de este volumen solo se imprime el resumen, no cada registro
+VERBOSE_LIMIT = 50
+
+
+def _next_id(model):
+    """Siguiente ID libre para insertar con IDs explícitos"""
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
 def create_test_users():
-    """Crear usuarios de prueba si no existen"""
+    """Crear usuarios de prueba si no existen (una sola consulta para los existentes)"""
     users_data = [
         {'username': 'elizabeth', 'role': 'empleada'},
         {'username': 'alejandrina', 'role': 'socia'},
@@ -40,79 +56,95 @@ def create_test_users():
         {'username': 'propietario2', 'role': 'dueño'}
     ]
     
+    usernames = [u['username'] for u in users_data]
+    existing = {u.username: u for u in User.query.filter(User.username.in_(usernames)).all()}
+    
     created_users = []
     for user_data in users_data:
-        user = User.query.filter_by(username=user_data['username']).first()
+        user = existing.get(user_data['username'])
         if not user:
             user = User(username=user_data['username'], role=user_data['role'])
             user.set_password('password123')
             db.session.add(user)
-            created_users.append(user)
             print(f"✅ Usuario creado: {user_data['username']} ({user_data['role']})")
         else:
-            created_users.append(user)
             print(f"ℹ️  Usuario ya existe: {user_data['username']}")
+        created_users.append(user)
     
     return created_users
 
 def create_test_rooms():
-    """Crear habitaciones de prueba si no existen"""
+    """Crear habitaciones de prueba si no existen (una sola consulta para las existentes)"""
     rooms_data = [
         'Habitación 1', 'Habitación 2', 'Habitación 3', 
         'Suite Principal', 'Habitación Familiar'
     ]
     
+    existing = {r.name: r for r in Room.query.filter(Room.name.in_(rooms_data)).all()}
+    
     created_rooms = []
     for room_name in rooms_data:
-        room = Room.query.filter_by(name=room_name).first()
+        room = existing.get(room_name)
         if not room:
             room = Room(name=room_name, status=random.choice(['Limpia', 'Ocupada', 'Mantenimiento']))
             db.session.add(room)
-            created_rooms.append(room)
             print(f"✅ Habitación creada: {room_name}")
-        else:
-            created_rooms.append(room)
+        created_rooms.append(room)
     
     return created_rooms
 
-def create_test_clients():
-    """Crear 20 clientes ficticios"""
-    print("\n🧑‍🤝‍🧑 Creando clientes ficticios...")
+def create_test_clients(count=20, batch_size=5000):
+    """Crear clientes ficticios con inserción masiva; retorna dicts con id y nombre"""
+    print(f"\n🧑‍🤝‍🧑 Creando {count:,} clientes ficticios...")
+    
+    # Teléfonos y emails existentes precargados para respetar las restricciones únicas
+    used_phones = {phone for (phone,) in db.session.query(Client.phone_number)}
+    used_emails = {email for (email,) in db.session.query(Client.email).filter(Client.email.isnot(None))}
+    next_id = _next_id(Client)
+    
+    notes_options = [
+        "Cliente frecuente, muy educado",
+        "Prefiere habitación silenciosa", 
+        "Viaja por trabajo",
+        "Cliente de confianza",
+        "Familia con niños pequeños",
+        None, None  # Más probabilidad de no tener notas
+    ]
+    phone_prefixes = ['809', '829', '849']
     
     clients = []
-    for i in range(20):
+    while len(clients) < count:
         # Generar datos realistas dominicanos
         first_name = random.choice(DOMINICAN_FIRST_NAMES)
         last_name = random.choice(DOMINICAN_LAST_NAMES)
         full_name = f"{first_name} {last_name}"
         
         # Teléfonos dominicanos realistas
-        phone_prefixes = ['809', '829', '849']
         phone = f"{random.choice(phone_prefixes)}-{random.randint(200, 999)}-{random.randint(1000, 9999)}"
+        if phone in used_phones:
+            continue
+        used_phones.add(phone)
         
         # Email opcional (algunos clientes no tienen)
-        email = f"{first_name.lower()}.{last_name.lower()}@gmail.com" if random.choice([True, False, False]) else None
-        
-        notes_options = [
-            "Cliente frecuente, muy educado",
-            "Prefiere habitación silenciosa", 
-            "Viaja por trabajo",
-            "Cliente de confianza",
-            "Familia con niños pequeños",
-            None, None  # Más probabilidad de no tener notas
-        ]
-        
-        client = Client(
-            full_name=full_name,
-            phone_number=phone,
-            email=email,
-            notes=random.choice(notes_options)
-        )
+        email = None
+        if random.choice([True, False, False]):
+            email = f"{first_name.lower()}.{last_name.lower()}{next_id + len(clients)}@gmail.com"
+            if email in used_emails:
+                email = None
+            else:
+                used_emails.add(email)
         
-        clients.append(client)
-        db.session.add(client)
-        print(f"  👤 {full_name} - {phone}")
+        clients.append({
+            'id': next_id + len(clients),
+            'full_name': full_name,
+            'phone_number': phone,
+            'email': email,
+            'notes': random.choice(notes_options)
+        })
+        if count <= VERBOSE_LIMIT:
+            print(f"  👤 {full_name} - {phone}")
     
+    bulk_insert(Client.__table__, clients, batch_size)
     return clients
 
 def create_test_supplies():
@@ -154,22 +186,21 @@ def create_test_supplies():
     
     supplies = []
     for supply_data in supplies_data:
-        supply = Supply(
-            name=supply_data['name'],
-            category=supply_data['category'],
-            current_stock=supply_data['stock'],
-            minimum_stock=supply_data['min_stock'],
-            unit_price=supply_data['price'],
-            supplier=random.choice(DOMINICAN_COMPANIES) if random.choice([True, False]) else None,
-            notes=f"Proveedor confiable - {random.choice(['Entrega rápida', 'Buenos precios', 'Calidad garantizada'])}" if random.choice([True, False]) else None
-        )
-        
+        supply = {
+            'name': supply_data['name'],
+            'category': supply_data['category'],
+            'current_stock': supply_data['stock'],
+            'minimum_stock': supply_data['min_stock'],
+            'unit_price': supply_data['price'],
+            'supplier': random.choice(DOMINICAN_COMPANIES) if random.choice([True, False]) else None,
+            'notes': f"Proveedor confiable - {random.choice(['Entrega rápida', 'Buenos precios', 'Calidad garantizada'])}" if random.choice([True, False]) else None
+        }
         supplies.append(supply)
-        db.session.add(supply)
         
-        status = "🔴 STOCK BAJO" if supply.is_low_stock() else "✅ Stock OK"
+        status = "🔴 STOCK BAJO" if supply_data['stock'] <= supply_data['min_stock'] else "✅ Stock OK"
         print(f"  📦 {supply_data['name']} - Stock: {supply_data['stock']} {status}")
     
+    db.session.bulk_insert_mappings(Supply, supplies)
     return supplies
 
 def create_test_expenses(users):
@@ -209,66 +240,58 @@ def create_test_expenses(users):
     ]
     
     expenses = []
-    for i, expense_data in enumerate(expenses_data):
+    for expense_data in expenses_data:
         # Fechas aleatorias en los últimos 2 meses
         days_ago = random.randint(1, 60)
         expense_date = datetime.now() - timedelta(days=days_ago)
+        paid_by = expense_data['paid_by']
         
-        expense = Expense(
-            description=expense_data['desc'],
-            amount=expense_data['amount'],
-            category=expense_data['category'],
-            expense_date=expense_date,
-            paid_by_user_id=expense_data['paid_by'].id if expense_data['paid_by'] else None,
-            payment_method=expense_data['method']
-        )
-        
-        expenses.append(expense)
-        db.session.add(expense)
+        expenses.append({
+            'description': expense_data['desc'],
+            'amount': expense_data['amount'],
+            'category': expense_data['category'],
+            'expense_date': expense_date,
+            'paid_by_user_id': paid_by.id if paid_by else None,
+            'payment_method': expense_data['method']
+        })
         
-        paid_by_name = expense_data['paid_by'].username.title() if expense_data['paid_by'] else "N/A"
-        affects_cash = "⚠️ AFECTA CAJA" if expense_data['paid_by'] == elizabeth else "✅ No afecta"
+        paid_by_name = paid_by.username.title() if paid_by else "N/A"
+        affects_cash = "⚠️ AFECTA CAJA" if paid_by == elizabeth else "✅ No afecta"
         print(f"  💸 DOP {expense_data['amount']:,.2f} - {expense_data['desc'][:40]}... ({paid_by_name}) {affects_cash}")
     
+    db.session.bulk_insert_mappings(Expense, expenses)
     return expenses
 
-def create_test_stays_and_payments(clients, rooms):
-    """Crear estancias y pagos de prueba"""
-    print("\n🏨 Creando estancias y pagos...")
+def create_test_stays_and_payments(clients, rooms, num_stays=None, batch_size=5000):
+    """Crear estancias y pagos de prueba con inserción masiva (main() confirma todo al final)"""
+    # Crear entre 25-35 estancias en los últimos 3 meses si no se indica la cantidad
+    num_stays = num_stays or random.randint(25, 35)
+    print(f"\n🏨 Creando {num_stays:,} estancias y pagos...")
     
     booking_channels = ['Airbnb', 'Booking.com', 'Directo', 'Expedia', 'WhatsApp']
     payment_methods = ['Efectivo', 'Tarjeta', 'Transferencia']
+    room_refs = [(room.id, room.name) for room in rooms]
+    
+    # IDs explícitos: los pagos referencian la estancia sin flush por fila
+    next_stay_id = _next_id(Stay)
+    next_payment_id = _next_id(Payment)
     
     stays = []
     payments = []
-    
-    # Crear entre 25-35 estancias en los últimos 3 meses
-    num_stays = random.randint(25, 35)
+    now = datetime.now()
     
     for i in range(num_stays):
         client = random.choice(clients)
-        room = random.choice(rooms)
+        room_id, room_name = random.choice(room_refs)
         
         # Fechas aleatorias en los últimos 90 días
         days_ago = random.randint(1, 90)
-        check_in = datetime.now() - timedelta(days=days_ago)
+        check_in = now - timedelta(days=days_ago)
         
         # Estancias de 1-7 días
         stay_duration = random.randint(1, 7)
         check_out = check_in + timedelta(days=stay_duration)
         
-        stay = Stay(
-            client_id=client.id,
-            room_id=room.id,
-            check_in_date=check_in,
-            check_out_date=check_out,
-            booking_channel=random.choice(booking_channels)
-        )
-        
-        stays.append(stay)
-        db.session.add(stay)
-        db.session.flush()  # Para obtener el ID
-        
         # Crear 1-3 pagos por estancia
         num_payments = random.randint(1, 3)
         total_payment = 0
@@ -277,6 +300,22 @@ def create_test_stays_and_payments(clients, rooms):
         night_price = random.randint(1500, 4500)
         expected_total = night_price * stay_duration
         
+        # La inserción masiva no pasa por los eventos que mantienen los totales:
+        # se calculan aquí, como en app/synthetic_data.py (el último pago completa el total)
+        stay_id = next_stay_id + i
+        stays.append({
+            'id': stay_id,
+            'client_id': client['id'],
+            'room_id': room_id,
+            'check_in_date': check_in,
+            'check_out_date': check_out,
+            'booking_channel': random.choice(booking_channels),
+            'status': 'Activa',
+            'agreed_total': float(expected_total),
+            'paid_total': float(expected_total),
+            'balance_due': Stay.balance_for(expected_total, expected_total)
+        })
+        
         for j in range(num_payments):
             if j == num_payments - 1:  # Último pago
                 payment_amount = expected_total - total_payment
@@ -287,22 +326,37 @@ def create_test_stays_and_payments(clients, rooms):
             # Fecha de pago cercana al check-in
             payment_date = check_in + timedelta(days=random.randint(0, 2))
             
-            payment = Payment(
-                stay_id=stay.id,
-                amount=payment_amount,
-                payment_date=payment_date,
-                method=random.choice(payment_methods)
-            )
-            
-            payments.append(payment)
-            db.session.add(payment)
+            payments.append({
+                'id': next_payment_id + len(payments),
+                'stay_id': stay_id,
+                'amount': payment_amount,
+                'payment_date': payment_date,
+                'method': random.choice(payment_methods)
+            })
         
-        print(f"  🏨 {client.full_name} - {room.name} ({stay_duration} noches) - DOP {expected_total:,.2f}")
+        if num_stays <= VERBOSE_LIMIT:
+            print(f"  🏨 {client['full_name']} - {room_name} ({stay_duration} noches) - DOP {expected_total:,.2f}")
     
+    # Sin commits por lote: si algo falla, el rollback de main() deshace la carga completa
+    bulk_insert(Stay.__table__, stays, batch_size)
+    bulk_insert(Payment.__table__, payments, batch_size)
+    # Cubo de reportes e ingresos devengados, una sola vez para toda la carga
+    if stays or payments:
+        refresh_derived_data({'stays', 'payments'})
     return stays, payments
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description='Poblar la base de datos con datos de prueba')
+    parser.add_argument('--clients', type=int, default=20, help='Cantidad de clientes (por defecto 20)')
+    parser.add_argument('--stays', type=int, default=None, help='Cantidad de estancias (por defecto 25-35)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Filas por lote de inserción')
+    parser.add_argument('--save-snapshot', metavar='ARCHIVO', help='Guardar la base resultante como snapshot SQLite')
+    parser.add_argument('--restore-snapshot', metavar='ARCHIVO', help='Restaurar un snapshot SQLite en lugar de generar datos')
+    return parser.parse_args()
+
+def main(args=None):
     """Función principal para ejecutar la población de datos"""
+    args = args or parse_args()
     print("🚀 Iniciando población de datos de prueba...")
     print("=" * 50)
     
@@ -310,6 +364,13 @@ def main():
     app = create_app()
     
     with app.app_context():
+        if args.restore_snapshot:
+            started = time.perf_counter()
+            restore_snapshot(args.restore_snapshot)
+            print(f"✅ Snapshot {args.restore_snapshot} restaurado en {time.perf_counter() - started:.1f}s")
+            return True
+        
+        started = time.perf_counter()
         print("📊 Creando usuarios y habitaciones...")
         users = create_test_users()
         rooms = create_test_rooms()
@@ -318,43 +379,55 @@ def main():
         db.session.commit()
         
         # Crear datos de prueba
-        clients = create_test_clients()
-        supplies = create_test_supplies()
-        expenses = create_test_expenses(users)
-        stays, payments = create_test_stays_and_payments(clients, rooms)
-        
-        # Commit final
         try:
-            db.session.commit()
-            print("\n" + "=" * 50)
-            print("✅ DATOS DE PRUEBA CREADOS EXITOSAMENTE!")
-            print("=" * 50)
-            print(f"👥 Clientes: {len(clients)}")
-            print(f"🏨 Habitaciones: {len(rooms)}")
-            print(f"📦 Suministros: {len(supplies)}")
-            print(f"💸 Gastos: {len(expenses)}")
-            print(f"🛏️  Estancias: {len(stays)}")
-            print(f"💰 Pagos: {len(payments)}")
-            print("\n🎯 Ahora puedes probar el sistema con datos realistas!")
-            
-            # Mostrar resumen de gastos por persona
-            print("\n💸 RESUMEN DE GASTOS POR PERSONA:")
-            elizabeth_total = sum(e.amount for e in expenses if e.paid_by and e.paid_by.username == 'elizabeth')
-            alejandrina_total = sum(e.amount for e in expenses if e.paid_by and e.paid_by.username == 'alejandrina')
-            propietarios_total = sum(e.amount for e in expenses if e.paid_by and e.paid_by.role == 'dueño')
-            
-            print(f"👩‍💼 Elizabeth (empleada): DOP {elizabeth_total:,.2f} - ⚠️ AFECTA su cuadre de caja")
-            print(f"👩‍💼 Alejandrina (socia): DOP {alejandrina_total:,.2f} - ✅ NO afecta cuadre")
-            print(f"👑 Propietarios: DOP {propietarios_total:,.2f} - ✅ NO afecta cuadre")
-            print(f"📊 TOTAL GASTOS DEL NEGOCIO: DOP {elizabeth_total + alejandrina_total + propietarios_total:,.2f}")
+            clients = create_test_clients(args.clients, args.batch_size)
+            supplies = create_test_supplies()
+            expenses = create_test_expenses(users)
+            stays, payments = create_test_stays_and_payments(clients, rooms, args.stays, args.batch_size)
             
+            # Commit final: única confirmación de clientes, suministros, gastos, estancias y pagos
+            db.session.commit()
+            # Cubo de reportes completo (marcado por la carga), antes de guardar el snapshot
+            refresh_pending()
         except Exception as e:
             db.session.rollback()
             print(f"❌ Error al crear datos: {e}")
             return False
+        
+        print("\n" + "=" * 50)
+        print("✅ DATOS DE PRUEBA CREADOS EXITOSAMENTE!")
+        print("=" * 50)
+        print(f"👥 Clientes: {len(clients):,}")
+        print(f"🏨 Habitaciones: {len(rooms)}")
+        print(f"📦 Suministros: {len(supplies)}")
+        print(f"💸 Gastos: {len(expenses)}")
+        print(f"🛏️  Estancias: {len(stays):,}")
+        print(f"💰 Pagos: {len(payments):,}")
+        print(f"⏱️  Tiempo: {time.perf_counter() - started:.1f}s")
+        print("\n🎯 Ahora puedes probar el sistema con datos realistas!")
+        
+        # Mostrar resumen de gastos por persona (usuarios ya en memoria, sin consultas extra)
+        users_by_id = {u.id: u for u in users}
+        
+        def total_for(predicate):
+            return sum(e['amount'] for e in expenses
+                       if e['paid_by_user_id'] in users_by_id and predicate(users_by_id[e['paid_by_user_id']]))
+        
+        print("\n💸 RESUMEN DE GASTOS POR PERSONA:")
+        elizabeth_total = total_for(lambda u: u.username == 'elizabeth')
+        alejandrina_total = total_for(lambda u: u.username == 'alejandrina')
+        propietarios_total = total_for(lambda u: u.role == 'dueño')
+        
+        print(f"👩‍💼 Elizabeth (empleada): DOP {elizabeth_total:,.2f} - ⚠️ AFECTA su cuadre de caja")
+        print(f"👩‍💼 Alejandrina (socia): DOP {alejandrina_total:,.2f} - ✅ NO afecta cuadre")
+        print(f"👑 Propietarios: DOP {propietarios_total:,.2f} - ✅ NO afecta cuadre")
+        print(f"📊 TOTAL GASTOS DEL NEGOCIO: DOP {elizabeth_total + alejandrina_total + propietarios_total:,.2f}")
+        
+        if args.save_snapshot:
+            save_snapshot(args.save_snapshot)
+            print(f"\n💾 Snapshot guardado en {args.save_snapshot}")
     
     return True
 
 if __name__ == "__main__":
     success = main()
-    sys.exit(0 if success else 1)
\ No newline at end of file
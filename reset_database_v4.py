@@ -4,8 +4,15 @@
 AIRBNB MANAGER V4.0 - SCRIPT DE RESET COMPLETO DE BASE DE DATOS
 Este script elimina las migraciones existentes y crea una base de datos limpia
 con la nueva estructura corregida.
+
+Opciones rápidas:
+  --snapshot ARCHIVO       Restaura un snapshot SQLite prearmado (copia de archivo)
+  --save-snapshot ARCHIVO  Guarda la base resultante para restauraciones futuras
+  --rooms N --years N      Genera un conjunto grande con inserción masiva
+  --yes                    No pedir confirmación
 """
 
+import argparse
 import os
 import sys
 import shutil
@@ -34,20 +41,55 @@ def run_command(command, description):
         print(f"❌ Excepción: {e}")
         return False
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Reset completo de la base de datos')
+    parser.add_argument('--yes', '-y', action='store_true', help='No pedir confirmación')
+    parser.add_argument('--snapshot', metavar='ARCHIVO', help='Restaurar un snapshot SQLite prearmado')
+    parser.add_argument('--save-snapshot', metavar='ARCHIVO', help='Guardar la base resultante como snapshot')
+    parser.add_argument('--rooms', type=int, help='Generar datos sintéticos con N habitaciones en lugar del seed básico')
+    parser.add_argument('--clients', type=int, default=500, help='Clientes para los datos sintéticos')
+    parser.add_argument('--years', type=float, default=2.0, help='Años de historial para los datos sintéticos')
+    return parser.parse_args()
+
+def restore_snapshot(snapshot_path):
+    """Restaura un snapshot copiando el archivo (app.synthetic_data.restore_snapshot)"""
+    from app import create_app
+    from app.synthetic_data import restore_snapshot as restore
+
+    print(f"\n💾 Restaurando snapshot {snapshot_path}...")
+    app = create_app()
+    with app.app_context():
+        try:
+            restore(snapshot_path)
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"❌ {e}")
+            return False
+    print("✅ Snapshot restaurado")
+    return True
+
 def main():
+    args = parse_args()
     print("🚀 AIRBNB MANAGER V4.0 - RESET DE BASE DE DATOS")
     print("=" * 60)
     print("⚠️  ADVERTENCIA: Este proceso eliminará TODOS los datos existentes")
     print("📋 Se recreará la base de datos con la nueva estructura Queen/King")
     
-    response = input("\n¿Continuar? (y/N): ")
-    if response.lower() != 'y':
-        print("❌ Operación cancelada")
+    if not args.yes:
+        response = input("\n¿Continuar? (y/N): ")
+        if response.lower() != 'y':
+            print("❌ Operación cancelada")
+            return
+    
+    db_path = 'instance/app.db'
+    
+    # Camino rápido: el snapshot ya tiene esquema y datos
+    if args.snapshot:
+        if restore_snapshot(args.snapshot):
+            print("\n🎉 ¡RESET COMPLETADO DESDE SNAPSHOT!")
         return
     
     # 1. Eliminar base de datos existente
     print("\n🗄️  PASO 1: Eliminando base de datos existente...")
-    db_path = 'instance/app.db'
     if os.path.exists(db_path):
         os.remove(db_path)
         print("✅ Base de datos eliminada")
@@ -82,12 +124,21 @@ def main():
         print("❌ Error al aplicar migración")
         return
     
-    # 6. Poblar con datos de prueba
+    # 6. Poblar con datos de prueba (seed básico o conjunto sintético con inserción masiva)
     print("\n🌱 PASO 6: Poblando con datos de prueba...")
-    if not run_command("flask seed-db", "Ejecutando seed de datos"):
+    if args.rooms:
+        seed_command = (f"flask generate-data --rooms {args.rooms} --clients {args.clients} "
+                        f"--years {args.years}")
+    else:
+        seed_command = "flask seed-db"
+    if not run_command(seed_command, "Ejecutando seed de datos"):
         print("❌ Error al poblar datos")
         return
     
+    if args.save_snapshot:
+        shutil.copyfile(db_path, args.save_snapshot)
+        print(f"💾 Snapshot guardado en {args.save_snapshot}")
+    
     print("\n" + "=" * 60)
     print("🎉 ¡RESET COMPLETADO EXITOSAMENTE!")
     print("=" * 60)
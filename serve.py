@@ -0,0 +1,6 @@
+from app.server import main
+
+# Servidor de producción: gunicorn con varios workers (ver app/server.py).
+# Para desarrollo sigue usándose run.py.
+if __name__ == '__main__':
+    main()
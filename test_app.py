@@ -49,7 +49,7 @@ try:
     # Test 6: Crear la aplicación
     print("6. Creando aplicación...")
     from app import create_app
-    app = create_app()
+    app = create_app(defer_blueprints=False)
     print("   ✅ Aplicación creada correctamente")
     
     # Test 7: Verificar rutas registradas
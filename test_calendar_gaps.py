@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pruebas del calendario de huecos huérfanos y restricciones por noche
+(app/calendar_gaps.py).
+
+Ejecutar con: python -m pytest -q test_calendar_gaps.py
+"""
+
+from app.extensions import db
+from app.models import Stay
+from app.benchmark import QueryCounter
+
+
+def test_gap_calendar_finds_orphan_nights_and_applies_restrictions(app, client, engine):
+    from datetime import date, datetime, timedelta
+    from app.calendar_gaps import gap_calendar_cache, gap_fill_suggestions, get_calendar
+    from app.intelligence import AvailabilityEngine, BookingRequest, SuggestionType
+    from app.models import Client, RatePlan, RateSeason
+    from app.room_catalog import get_catalog
+
+    # Lejos de las estancias generadas: el calendario está libre
+    start = date.today() + timedelta(days=200)
+    with app.app_context():
+        room, other = get_catalog().of_tier('Queen')[:2]
+        client_id = Client.query.first().id
+        stays = [Stay(client_id=client_id, room_id=room.id, status='Activa',
+                      check_in_date=datetime.combine(start + timedelta(days=first), datetime.min.time()),
+                      check_out_date=datetime.combine(start + timedelta(days=last), datetime.min.time()))
+                 for first, last in ((0, 3), (5, 8))]
+        db.session.add_all(stays)
+        db.session.add(RatePlan(name='Queen', tier='Queen', base_rate=2500.0))
+        # Estadía mínima de 3 noches y llegadas cerradas el día 10
+        db.session.add(RateSeason(name='Mínimo 3', start_date=start, end_date=start + timedelta(days=20),
+                                  repeats_yearly=False, factor=1.0, min_stay=3))
+        db.session.add(RateSeason(name='Sin llegadas', start_date=start + timedelta(days=10),
+                                  end_date=start + timedelta(days=10), repeats_yearly=False,
+                                  closed_to_arrival=True))
+        db.session.commit()
+
+        calendar = get_calendar()
+        gap = calendar.fills_gap(room.id, start + timedelta(days=3), start + timedelta(days=5))
+        assert gap.before_stay_id == stays[0].id and gap.after_stay_id == stays[1].id
+        assert gap.nights == 2 and gap.min_stay == 3 and gap.restricted
+        assert gap in calendar.orphan_gaps(start, 30, 'Queen')
+
+        # Dentro del hueco la estadía mínima baja a lo que queda libre; afuera rige la de 3 noches
+        night = lambda offset: start + timedelta(days=offset)
+        with QueryCounter(engine) as counter:
+            assert get_calendar() is calendar
+            assert calendar.allows(room.id, night(3), night(5)) and calendar.allows(room.id, night(4), night(5))
+            assert calendar.violation(room.id, night(3), night(4)) == 'min_stay'
+            assert calendar.violation(room.id, night(2), night(5)) == 'occupied'
+            assert calendar.violation(other.id, night(3), night(5)) == 'min_stay'
+            assert calendar.violation(other.id, night(10), night(13)) == 'closed_to_arrival'
+            assert calendar.allows(other.id, night(9), night(13))
+        assert counter.count == 0
+
+        # Disponibilidad directa: solo la habitación cuyo hueco llena la estancia
+        suggestions = AvailabilityEngine().analyze_availability(
+            BookingRequest(check_in=night(3), check_out=night(5), preferred_tier='Queen'))
+        direct = [s for s in suggestions if s.suggestion_type == SuggestionType.AVAILABLE_ROOM]
+        assert [s.room_id for s in direct] == [room.id] and direct[0].additional_info['fills_gap']
+
+        # Estancia corrida un día: mismas noches y fechas nuevas; llegar el día 10 está cerrado
+        shifted = list(AvailabilityEngine()._find_timing_optimizations(
+            BookingRequest(check_in=night(11), check_out=night(14), preferred_tier='Queen')))
+        assert shifted and {s.suggestion_type for s in shifted} == {SuggestionType.SHIFTED_STAY}
+        assert {s.alternative_dates for s in shifted} == {(night(12), night(15))}
+        assert all(s.additional_info['shift_days'] == 1 for s in shifted)
+
+        filled = [s for s in gap_fill_suggestions(start, 30) if s['room_id'] == room.id]
+        assert [action['type'] for action in filled[0]['actions']] == ['extend_stay', 'early_arrival', 'short_stay']
+
+        builds = gap_calendar_cache.builds
+        for stay in stays:
+            db.session.delete(stay)
+        RateSeason.query.delete()
+        RatePlan.query.delete()
+        db.session.commit()
+        assert get_calendar().orphan_gaps(start, 30) == [] and gap_calendar_cache.builds == builds + 1
+
+    response = client.get('/intelligence/orphan-gaps?days=60').get_json()
+    assert response['success'] and response['count'] == len(response['gaps'])
+    assert not client.get('/intelligence/orphan-gaps?days=0').get_json()['success']
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Pruebas de precios: planes de tarifas compilados (app/rate_plans.py),
+cotizaciones con caché (app/quotes.py) y pronóstico de demanda
+(app/demand_forecast.py).
+
+Ejecutar con: python -m pytest -q test_pricing.py
+"""
+
+from app.extensions import db
+from app.benchmark import QueryCounter
+from app.synthetic_data import DatasetSpec
+
+
+# El pronóstico necesita historia para la estacionalidad semanal
+DATASET = DatasetSpec(rooms=12, clients=80, years=0.5, future_days=30)
+
+
+def test_rate_plans_compile_once_and_recompile_on_edit(app, engine):
+    from datetime import date, timedelta
+    from app.models import LengthOfStayDiscount, RatePlan, RateSeason
+    from app.rate_plans import get_rate_card, quote_stay, rate_plan_cache
+    from app.room_catalog import get_catalog
+
+    with app.app_context():
+        queen = get_catalog().of_tier('Queen')[0]
+        # Sin planes configurados: tarifas por defecto (temporada alta en julio, 10% desde 7 noches)
+        assert quote_stay(queen, date(2026, 7, 1), date(2026, 7, 8)).total == 2500 * 1.2 * 7 * 0.9
+
+        compilations = rate_plan_cache.reloads
+        with QueryCounter(engine) as counter:
+            card = get_rate_card()
+            for offset in range(200):
+                night = date(2026, 3, 1) + timedelta(days=offset)
+                card.quote(queen, night, night + timedelta(days=3))
+        assert counter.count == 0 and rate_plan_cache.reloads == compilations
+
+        plan = RatePlan(name='Suite 1', room_id=queen.id, base_rate=1000.0, weekday_factors='1,1,1,1,1.5,1.5,1')
+        db.session.add(plan)
+        db.session.flush()
+        db.session.add(RateSeason(name='Feria', rate_plan_id=plan.id, start_date=date(2026, 5, 1),
+                                  end_date=date(2026, 5, 10), repeats_yearly=False, factor=2.0, min_stay=3))
+        db.session.add(LengthOfStayDiscount(rate_plan_id=plan.id, min_nights=5, discount=0.2))
+        db.session.commit()
+
+        # Jueves 30 de abril a lunes 4 de mayo: 1000 + 2000 * (1.5 + 1.5 + 1)
+        quote = quote_stay(queen, date(2026, 4, 30), date(2026, 5, 4))
+        assert quote.plan == 'Suite 1' and quote.subtotal == 9000.0 and quote.min_stay == 1
+        assert quote_stay(queen, date(2026, 5, 2), date(2026, 5, 4)).meets_min_stay is False
+        # Lunes a sábado: cuatro noches a 1000 y el viernes a 1500, con 20% desde 5 noches
+        assert quote_stay(queen, date(2026, 6, 1), date(2026, 6, 6)).total == 5500.0 * 0.8
+        assert rate_plan_cache.reloads == compilations + 1
+
+        RateSeason.query.delete()
+        LengthOfStayDiscount.query.delete()
+        db.session.delete(plan)
+        db.session.commit()
+        assert quote_stay(queen, date(2026, 6, 1), date(2026, 6, 6)).total == 12500.0
+
+
+def test_quotes_share_cached_plan_quotes_and_serve_the_api(app, client, engine):
+    from datetime import date
+    from app.quotes import quote, quote_cache
+    from app.room_catalog import get_catalog
+
+    with app.app_context():
+        rooms = get_catalog().rooms
+        check_in, check_out = date(2027, 2, 26), date(2027, 3, 3)
+        quotes = quote([room.id for room in rooms] + [99999], check_in, check_out)
+        assert set(quotes) == {room.id for room in rooms}
+
+        queen = next(q for q in quotes.values() if q.tier == 'Queen')
+        # Tres noches de temporada alta (febrero) y dos normales
+        assert queen.quote.nightly == (3000.0, 3000.0, 3000.0, 2500.0, 2500.0)
+        assert queen.total == 14000.0 and queen.to_dict()['breakdown'][3] == {'date': '2027-03-01', 'price': 2500.0}
+
+        # Las habitaciones del mismo plan comparten la cotización: una entrada por tier
+        hits = quote_cache.hits
+        with QueryCounter(engine) as counter:
+            again = quote(None, check_in, check_out)
+        assert counter.count == 0 and quote_cache.hits - hits == len(rooms)
+        assert again[queen.room_id].quote is queen.quote
+
+    response = client.get(f'/quotes?check_in=2027-02-26&check_out=2027-03-03&room_id={queen.room_id}').get_json()
+    assert response['success'] and [q['total'] for q in response['quotes']] == [14000.0]
+    response = client.post('/quotes', json={'check_in': '2027-03-01', 'check_out': '2027-03-15'}).get_json()
+    assert response['success'] and len(response['quotes']) == len(rooms)
+    assert all(q['discount_rate'] == 0.15 and len(q['breakdown']) == 14 for q in response['quotes'])
+    assert not client.get('/quotes?check_in=2027-03-03&check_out=2027-03-01').get_json()['success']
+
+
+def test_demand_forecast_combines_books_and_seasonal_model(app, client):
+    from datetime import date, timedelta
+    import numpy as np
+    from app.day_keys import day_key
+    from app.demand_forecast import expected_occupancy, holt_winters, price_factor, refresh
+    from app.intelligence import BookingPatternAnalyzer
+    from app.intelligence_notifications import OccupancyAnalyzer
+    from app.models import DemandForecast
+    from app.occupancy_matrix import OccupancyMatrix
+    from app.room_catalog import get_catalog
+
+    # Patrón semanal puro: el modelo lo reproduce
+    week = np.array([0.2, 0.2, 0.3, 0.3, 0.9, 1.0, 0.5])
+    assert np.allclose(holt_winters(np.tile(week, (2, 30)), 14), np.tile(week, (2, 2)), atol=0.02)
+
+    today = date.today()
+    with app.app_context():
+        tiers = {room.tier for room in get_catalog().rooms}
+        assert refresh(horizon=30) == 30 * len(tiers)
+        db.session.commit()
+        rows = DemandForecast.query.all()
+        assert all(row.on_the_books <= row.forecast <= row.rooms for row in rows)
+        # En libros: las noches ya vendidas de las próximas dos semanas
+        sold = OccupancyMatrix.load(today, today + timedelta(days=13)).totals()['sold']
+        last = day_key(today + timedelta(days=13))
+        assert sum(row.on_the_books for row in rows if row.night_day <= last) == sold
+
+        # El precio sigue la ocupación prevista de cada noche
+        king = get_catalog().of_tier('King')[0]
+        priced = BookingPatternAnalyzer.predict_optimal_prices(king, today, 5)
+        factors = [price_factor(occupancy) for occupancy in expected_occupancy('King', today, 5)]
+        DemandForecast.query.update({DemandForecast.forecast: DemandForecast.rooms})
+        db.session.commit()
+        full = BookingPatternAnalyzer.predict_optimal_prices(king, today, 5)
+        assert [round(a / b, 6) for a, b in zip(priced, full)] == [round(f / price_factor(1.0), 6) for f in factors]
+        assert [n.id for n in OccupancyAnalyzer()._predict_occupancy_trends()] == ['high_demand_predicted']
+
+    response = client.get('/intelligence/demand-forecast?days=7&tier=King').get_json()
+    assert response['success'] and len(response['rows']) == 7
+    assert all(row['tier'] == 'King' and row['occupancy'] == 100.0 for row in response['rows'])
+    assert not client.get('/intelligence/demand-forecast?days=0').get_json()['success']
+
+    with app.app_context():
+        DemandForecast.query.delete()
+        db.session.commit()
+        assert expected_occupancy('King', today, 3) == [None, None, None]
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los cachés de proceso: repositorio por request, catálogo de
+habitaciones, usuario de sesión y los sellos compartidos (tabla
+cache_version) con los que se enteran de las escrituras de otros workers.
+
+Ejecutar con: python -m pytest -q test_process_caches.py
+"""
+
+import pytest
+
+from app.extensions import db
+from app.models import User
+from app.benchmark import QueryCounter
+
+
+def test_repository_serves_rooms_and_clients_from_memory(app):
+    from app.models import Client, Room
+    from app.repository import get_repository
+
+    with app.app_context():
+        get_repository().rooms()
+        client_id = Client.query.first().id
+
+    with app.app_context():
+        repo = get_repository()
+        with QueryCounter(db.engine) as counter:
+            rooms = repo.rooms()
+            assert repo.room(rooms[0].id) is rooms[0]
+            assert rooms[0].name
+        # Habitaciones desde el caché de proceso: sin consultas
+        assert counter.count == 0
+
+        with QueryCounter(db.engine) as counter:
+            assert repo.client(client_id) is repo.client(client_id)
+        assert counter.count == 1
+
+        room = repo.room(rooms[0].id)
+        room_id, original = room.id, room.name
+        room.name = original + ' (renombrada)'
+        db.session.commit()
+        assert get_repository().room(room.id).name == original + ' (renombrada)'
+        room.name = original
+        db.session.commit()
+
+    with app.app_context():
+        assert db.session.get(Room, room_id).name == original
+
+    # Una habitación ya cargada en la sesión no se pisa con el catálogo (que puede estar viejo)
+    with app.app_context():
+        get_repository().catalog
+        loaded = db.session.get(Room, room_id)
+        with db.engine.begin() as connection:
+            connection.execute(Room.__table__.update().where(Room.__table__.c.id == room_id)
+                               .values(name=original + ' (otro worker)'))
+        db.session.expire(loaded)
+        assert loaded.name == original + ' (otro worker)'
+        assert get_repository().room(room_id) is loaded
+        assert loaded.name == original + ' (otro worker)'
+        Room.query.filter_by(id=room_id).update({'name': original})
+        db.session.commit()
+
+
+def test_room_catalog_rebuilds_on_status_change_and_stamp(app, client, monkeypatch):
+    from dataclasses import FrozenInstanceError
+    from app.models import Room
+    from app.room_catalog import CATALOG_STAMP, get_catalog
+    from app.stamped_cache import bump_stamp, read_stamp
+
+    with app.app_context():
+        catalog = get_catalog()
+        entry = catalog.rooms[0]
+        assert entry.tier_value == db.session.get(Room, entry.id).get_tier_hierarchy_value()
+        with pytest.raises(FrozenInstanceError):
+            entry.status = 'Mantenimiento'
+        with QueryCounter(db.engine) as counter:
+            assert get_catalog() is catalog
+        assert counter.count == 0
+        stamp = catalog.stamp
+
+    new_status = 'Mantenimiento' if entry.status != 'Mantenimiento' else 'Limpia'
+    client.post(f'/update_room_status/{entry.id}', data={'status': new_status})
+
+    with app.app_context():
+        assert get_catalog().get(entry.id).status == new_status
+        assert get_catalog().stamp == stamp + 1
+
+        # Otro worker cambia una habitación: se recarga al revisar el sello
+        reloaded = get_catalog()
+        with db.engine.begin() as connection:
+            bump_stamp(connection, CATALOG_STAMP)
+            assert read_stamp(connection, CATALOG_STAMP) == stamp + 2
+        assert get_catalog() is reloaded
+        monkeypatch.setitem(app.config, 'ROOM_CATALOG_CHECK_SECONDS', 0)
+        assert get_catalog() is not reloaded
+        assert get_catalog().stamp == stamp + 2
+
+        # Sello nuevo o existente: una sola sentencia (upsert), sin carrera entre workers
+        with db.engine.begin() as connection, QueryCounter(db.engine) as counter:
+            bump_stamp(connection, 'test_stamp')
+            bump_stamp(connection, 'test_stamp')
+            assert read_stamp(connection, 'test_stamp') == 2
+        assert counter.count == 3
+
+
+def test_session_user_is_cached_and_invalidated_on_role_change(app, client, engine):
+    from app.stamped_cache import bump_stamp
+    from app.user_cache import USERS_STAMP, SessionUser, load_session_user, user_cache
+
+    # Catálogo y paquetes ya cargados: la diferencia entre requests es solo el usuario
+    assert client.get('/supply-packages/').status_code == 200
+    user_cache.invalidate()
+    counts = []
+    for _ in range(2):
+        with QueryCounter(engine) as counter:
+            assert client.get('/supply-packages/').status_code == 200
+        counts.append(counter.count)
+    # El segundo request no vuelve a leer el sello ni a cargar el usuario
+    assert counts[1] == counts[0] - 2
+
+    with app.app_context():
+        user = User.query.filter_by(role='dueño').first()
+        session_user = load_session_user(user.id)
+        assert isinstance(session_user, SessionUser)
+        assert session_user.can_manage_users() and 'can_view_reports' in session_user.permissions
+
+        # Fuera de la instantánea no hay consulta implícita al modelo
+        with QueryCounter(db.engine) as counter:
+            try:
+                session_user.tasks
+                raise AssertionError('SessionUser.tasks debería faltar')
+            except AttributeError:
+                pass
+        assert counter.count == 0
+
+        user.role = 'empleada'
+        db.session.commit()
+        assert load_session_user(user.id).permissions == frozenset(
+            {'is_employee', 'can_view_monthly_report', 'can_manage_supplies'})
+
+        # Otro worker cambia el rol: solo cambia el sello 'users' en la base
+        cached = load_session_user(user.id)
+        with db.engine.begin() as connection:
+            connection.execute(User.__table__.update().where(User.__table__.c.id == user.id)
+                               .values(role='dueño'))
+            bump_stamp(connection, USERS_STAMP)
+        assert load_session_user(user.id) is cached
+        # Un request nuevo (sesión nueva) ya con la revisión del sello vencida
+        db.session.remove()
+        app.config['ROOM_CATALOG_CHECK_SECONDS'] = 0
+        try:
+            assert load_session_user(user.id).can_manage_users()
+        finally:
+            app.config['ROOM_CATALOG_CHECK_SECONDS'] = 3600
+        User.query.filter_by(id=user.id).update({'role': 'empleada'})
+        db.session.commit()
+
+    try:
+        response = client.get('/reports')
+        assert response.status_code == 302
+    finally:
+        with app.app_context():
+            User.query.filter_by(id=user.id).update({'role': 'dueño'})
+            db.session.commit()
+
+
+def test_availability_and_package_caches_follow_other_workers(app, monkeypatch):
+    from datetime import date, timedelta
+    from app.availability import STAYS_STAMP, availability_index, available_rooms
+    from app.calendar_gaps import get_calendar
+    from app.package_cache import PACKAGES_STAMP, package_cache
+    from app.stamped_cache import bump_stamp
+
+    check_in = date.today() + timedelta(days=300)
+    with app.app_context():
+        available_rooms(check_in, check_in + timedelta(days=2))
+        packages = package_cache.all_packages()
+        calendar = get_calendar()
+
+        # Otro worker reserva y edita paquetes: solo cambian los sellos en la base
+        with db.engine.begin() as connection:
+            bump_stamp(connection, STAYS_STAMP)
+            bump_stamp(connection, PACKAGES_STAMP)
+        with QueryCounter(db.engine) as counter:
+            available_rooms(check_in, check_in + timedelta(days=2))
+            assert package_cache.all_packages() is packages
+        assert counter.count == 0
+
+        # Al vencer el intervalo de revisión se descartan los resultados viejos
+        monkeypatch.setitem(app.config, 'ROOM_CATALOG_CHECK_SECONDS', 0)
+        version = availability_index.version
+        misses = availability_index.misses
+        available_rooms(check_in, check_in + timedelta(days=2))
+        assert availability_index.version == version + 1 and availability_index.misses > misses
+        assert package_cache.all_packages() is not packages
+        assert get_calendar() is not calendar
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Pruebas de cantidad de consultas SQL por vista.
+Verifican que los perfiles de carga (app/loaders.py) y el caché de paquetes
+de suministros mantengan acotado el número de consultas sin importar cuántas
+filas muestre cada vista.
+
+Ejecutar con: python -m pytest -q test_query_counts.py
+"""
+
+import pytest
+
+from app.extensions import db
+from app.models import Stay
+from app.loaders import STAY_LIST, STAY_DETAIL
+from app.benchmark import QueryCounter
+from app.synthetic_data import DatasetSpec
+
+
+DATASET = DatasetSpec(rooms=12, clients=80, years=0.5, future_days=30)
+
+
+@pytest.fixture(scope='module')
+def app(app):
+    with app.app_context():
+        # Varias estancias pendientes de cierre para que una consulta por fila se note
+        pending = Stay.query.filter_by(status='Finalizada').order_by(Stay.id.desc()).limit(10).all()
+        for stay in pending:
+            stay.status = 'Pendiente de Cierre'
+        db.session.commit()
+    return app
+
+
+def count_queries(app, func):
+    with app.app_context():
+        with QueryCounter(db.engine) as counter:
+            func()
+        return counter.count
+
+
+def test_stay_list_profile_is_constant(app):
+    def render_rows():
+        stays = Stay.query.options(*STAY_LIST).order_by(Stay.check_in_date.desc()).limit(15).all()
+        assert len(stays) == 15
+        for stay in stays:
+            stay.client.full_name, stay.room.name, stay.total_paid()
+
+    assert count_queries(app, render_rows) == 1
+
+
+def test_stay_detail_profile_loads_usages(app):
+    with app.app_context():
+        stay_id = Stay.query.filter_by(status='Pendiente de Cierre').first().id
+
+    def render_detail():
+        stay = db.session.get(Stay, stay_id, options=STAY_DETAIL)
+        assert stay.supply_usages
+        stay.get_supply_usage_summary()
+        stay.get_supply_variances()
+        stay.needs_supply_verification()
+        stay.calculate_supply_cost()
+        [usage.supply.is_low_stock() for usage in stay.supply_usages]
+
+    assert count_queries(app, render_detail) <= 2
+
+
+def test_control_panel_query_count_is_bounded(app, client, engine):
+    with QueryCounter(engine) as counter:
+        response = client.get('/')
+    assert response.status_code == 200
+    assert counter.count <= 25
+
+
+def test_close_stay_view_query_count_is_bounded(app, client, engine):
+    with app.app_context():
+        stay_id = Stay.query.filter_by(status='Pendiente de Cierre').first().id
+    with QueryCounter(engine) as counter:
+        response = client.get(f'/close_stay/{stay_id}')
+    assert response.status_code == 200
+    assert counter.count <= 10
+
+
+def test_dashboard_notifications_query_count_is_bounded(app, client, engine):
+    from app.intelligence_notifications import IntelligentNotificationEngine
+
+    # Cada analizador corre sin error (antes fallaban 'revenue' y 'client' y se omitían)
+    with app.app_context():
+        for analyzer in IntelligentNotificationEngine().analyzers.values():
+            assert isinstance(analyzer.analyze(), list)
+
+    client.get('/intelligence/dashboard_notifications')
+    with QueryCounter(engine) as counter:
+        response = client.get('/intelligence/dashboard_notifications')
+    assert response.get_json()['success']
+    # Gasto y última visita de los clientes en una consulta, no una por cliente
+    assert counter.count <= 20
+
+
+def test_supply_packages_index_query_count_is_bounded(app, client, engine):
+    with QueryCounter(engine) as counter:
+        response = client.get('/supply-packages/')
+    assert response.status_code == 200
+    # Habitaciones, suministros y (si el caché está vacío) una carga de paquetes
+    assert counter.count <= 5
+
+
+def test_package_cache_invalidates_on_price_and_package_changes(app):
+    from app.models import Room, Supply, room_supply_defaults
+
+    with app.app_context():
+        room = Room.query.first()
+        before = room.calculate_package_cost()
+        item = room.get_supply_package()[0]
+
+        supply = db.session.get(Supply, item.supply_id)
+        supply.unit_price = supply.unit_price + 10
+        db.session.commit()
+        assert room.calculate_package_cost() == pytest.approx(before + 10 * item.quantity)
+
+        db.session.execute(room_supply_defaults.delete().where(
+            (room_supply_defaults.c.room_id == room.id) &
+            (room_supply_defaults.c.supply_id == item.supply_id)))
+        db.session.commit()
+        assert item.supply_id not in [i.supply_id for i in room.get_supply_package()]
+
+
+def test_apply_template_is_set_based(app, client, engine):
+    from app.models import Room, room_supply_defaults
+
+    with app.app_context():
+        rooms = Room.query.order_by(Room.id).all()
+        template_id = rooms[0].id
+        target_ids = [room.id for room in rooms[1:]]
+        # Una habitación sin paquete y otra con un item distinto
+        db.session.execute(room_supply_defaults.delete().where(room_supply_defaults.c.room_id == target_ids[0]))
+        db.session.commit()
+
+    with QueryCounter(engine) as counter:
+        response = client.post('/supply-packages/ajax/apply_template', json={
+            'template_room_id': template_id, 'target_room_ids': target_ids, 'overwrite': True})
+    data = response.get_json()
+    assert data['success'], data
+    assert data['applied_count'] == len(target_ids)
+    assert counter.count <= 12
+
+    with app.app_context():
+        template_supplies = {item.supply_id for item in db.session.get(Room, template_id).get_supply_package()}
+        for room_id in target_ids:
+            assert {item.supply_id for item in db.session.get(Room, room_id).get_supply_package()} == template_supplies
+    first = next(diff for diff in data['rooms'] if diff['room_id'] == target_ids[0])
+    assert {item['supply_id'] for item in first['added']} == template_supplies
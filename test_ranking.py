@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Pruebas del ranking perezoso de soluciones de reserva (app/ranking.py):
+las estrategias caras no se ejecutan cuando la cota del modelo ya no alcanza.
+
+Ejecutar con: python -m pytest -q test_ranking.py
+"""
+
+from app.extensions import db
+from app.benchmark import QueryCounter
+
+
+def test_booking_solutions_stop_before_expensive_strategies(app):
+    from datetime import date, timedelta
+    from app.ranking import PriorityConfidenceModel
+    from app.yield_management import YieldManagementEngine, BookingRequest, DEFAULT_SCORING_MODEL
+
+    class ExhaustiveModel(PriorityConfidenceModel):
+        def upper_bound(self, *args, **kwargs):
+            return float('inf')
+
+    request = BookingRequest(check_in=date.today() + timedelta(days=60), check_out=date.today() + timedelta(days=63))
+    with app.app_context():
+        lazy = YieldManagementEngine().find_booking_solutions(request, limit=3)
+        with QueryCounter(db.engine) as counter:
+            YieldManagementEngine().find_booking_solutions(request, limit=3)
+        exhaustive = YieldManagementEngine(ExhaustiveModel(
+            DEFAULT_SCORING_MODEL.priority_weights, DEFAULT_SCORING_MODEL.bonus)).find_booking_solutions(request, limit=3)
+
+    assert [s.title for s in lazy] == [s.title for s in exhaustive]
+    assert {s.solution_type.value for s in lazy} == {'perfect_match'}
+    # Disponibilidad en caché y solo la carga de habitaciones: la reacomodación no se ejecuta
+    assert counter.count <= 1
+
+
+def test_scoring_model_requires_score_and_upper_bound():
+    import pytest
+    from app.ranking import ScoringModel
+
+    class ScoreOnly(ScoringModel):
+        def score(self, candidate):
+            return 1.0
+
+    # Un modelo incompleto falla al construirse, no en medio del ranking
+    with pytest.raises(TypeError):
+        ScoreOnly()
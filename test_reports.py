@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los datos de reportes: cubo de ingresos y gastos
+(app/revenue_cube.py), matrices de ocupación (app/occupancy_matrix.py) e
+ingresos devengados por noche (app/accrual.py).
+
+Ejecutar con: python -m pytest -q test_reports.py
+"""
+
+import pytest
+
+from app.extensions import db
+from app.models import Stay
+from app.benchmark import QueryCounter
+
+
+def test_revenue_cube_refreshes_on_commit_and_reports_only_read(app, client, engine):
+    from datetime import date, datetime
+    from sqlalchemy import func
+    from app.models import Expense, Payment, RevenueCubePending
+    from app.revenue_cube import ALL_MONTHS, CubeReader, rebuild_all, refresh_pending
+
+    with app.app_context():
+        rebuild_all()
+        cube = CubeReader()
+        assert cube.total('income') == pytest.approx(db.session.query(func.sum(Payment.amount)).scalar())
+        assert cube.total('expense') == pytest.approx(db.session.query(func.sum(Expense.amount)).scalar())
+
+        # Un rango arbitrario: meses completos del cubo más los días sueltos de los extremos
+        payment_day = db.session.query(func.min(Payment.payment_day)).scalar()
+        start = date(payment_day // 10000, payment_day // 100 % 100, 10)
+        end = date.today()
+        expected = db.session.query(func.sum(Payment.amount)).filter(
+            Payment.payment_day.between(payment_day // 100 * 100 + 10, int(end.strftime('%Y%m%d')))).scalar()
+        assert CubeReader(start, end).total('income') == pytest.approx(expected)
+
+        # Un pago nuevo marca solo su mes, que se recalcula al confirmar en una transacción propia
+        stay = Stay.query.first()
+        stay.record_payment(1234.0, payment_date=datetime(2031, 3, 5, 12))
+        db.session.commit()
+        assert db.session.query(RevenueCubePending.month).count() == 0
+        march = CubeReader(date(2031, 3, 1), date(2031, 3, 31))
+        assert march.slice('income', by=('room_id',)) == [
+            {'room_id': stay.room_id, 'total': 1234.0, 'count': 1, 'nights': 0}]
+
+        Payment.query.filter_by(stay_id=stay.id, payment_day=20310305).delete()
+        stay.paid_total = Stay.paid_total - 1234.0
+        db.session.commit()
+        # Un borrado masivo marca el cubo completo: queda para `flask revenue-cube`
+        assert db.session.query(RevenueCubePending.month).all() == [(ALL_MONTHS,)]
+        assert march.total('income') == 1234.0
+
+    # Con los cachés de proceso ya cargados por el primer request
+    assert client.get('/reports').status_code == 200
+    with QueryCounter(engine) as counter:
+        response = client.get('/reports')
+    assert response.status_code == 200
+    assert counter.count <= 25
+    # La vista no recalcula: muestra el aviso y la marca sigue pendiente
+    assert 'pendientes de recálculo completo' in response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.query(RevenueCubePending.month).all() == [(ALL_MONTHS,)]
+        assert refresh_pending() == [ALL_MONTHS]
+        assert CubeReader(date(2031, 3, 1), date(2031, 3, 31)).total('income') == 0.0
+    assert 'pendientes de recálculo' not in client.get('/reports').get_data(as_text=True)
+
+
+def test_occupancy_matrix_spreads_paid_total_over_nights(app, client):
+    from datetime import date, datetime
+    from app.occupancy_matrix import OccupancyMatrix
+
+    with app.app_context():
+        template = Stay.query.first()
+        stay = Stay(client_id=template.client_id, room_id=template.room_id, status='Finalizada',
+                    check_in_date=datetime(2032, 1, 30, 15), check_out_date=datetime(2032, 2, 3, 12))
+        db.session.add(stay)
+        db.session.flush()
+        stay.record_payment(400.0, payment_date=datetime(2032, 1, 30, 15))
+        db.session.commit()
+
+        matrix = OccupancyMatrix.load(date(2032, 1, 1), date(2032, 2, 29))
+        assert matrix.occupied.sum() == 4
+        assert matrix.totals()['revenue'] == pytest.approx(400.0)
+        assert [(row['key'], row['sold'], row['revenue']) for row in matrix.summary('month')] == [
+            ('2032-01', 2, 200.0), ('2032-02', 2, 200.0)]
+        room = next(row for row in matrix.summary('room') if row['key'] == stay.room_id)
+        assert room['sold'] == 4 and room['adr'] == 100.0 and room['revpar'] == pytest.approx(400.0 / 60, abs=0.01)
+        assert sum(row['available'] for row in matrix.summary('tier')) == matrix.totals()['available']
+        assert sum(row['sold'] for row in matrix.summary('week')) == 4
+
+        response = client.get('/intelligence/performance?start=2032-01-01&end=2032-02-29&by=tier')
+        assert response.get_json()['success'] and response.get_json()['totals']['sold'] == 4
+        assert not client.get('/intelligence/performance?by=year').get_json()['success']
+
+        stay.payments.delete()
+        db.session.delete(stay)
+        db.session.commit()
+
+
+def test_accrual_spreads_payments_over_nights_and_follows_stay_changes(app):
+    from datetime import date, datetime
+    from sqlalchemy import update
+    from app.accrual import accrued, find_mismatches
+    from app.models import StayNightRevenue
+
+    def by_month():
+        return {row['month']: row['total'] for row in accrued(date(2033, 1, 1), date(2033, 12, 31), by=('month',))}
+
+    with app.app_context():
+        assert find_mismatches() == []
+
+        template = Stay.query.first()
+        stay = Stay(client_id=template.client_id, room_id=template.room_id, status='Finalizada',
+                    check_in_date=datetime(2033, 1, 30, 15), check_out_date=datetime(2033, 2, 3, 12))
+        db.session.add(stay)
+        db.session.flush()
+        stay.record_payment(400.0, payment_date=datetime(2033, 2, 3, 12))
+        db.session.commit()
+        # Cobrado en febrero, devengado mitad en enero y mitad en febrero
+        assert by_month() == {203301: 200.0, 203302: 200.0}
+
+        stay.check_out_date = datetime(2033, 2, 7, 12)
+        db.session.commit()
+        assert by_month() == pytest.approx({203301: 100.0, 203302: 300.0})
+
+        # UPDATE masivo por llave primaria (como repair_rollups)
+        db.session.execute(update(Stay), [{'id': stay.id, 'paid_total': 800.0}])
+        db.session.commit()
+        assert by_month() == pytest.approx({203301: 200.0, 203302: 600.0})
+        assert find_mismatches() == []
+
+        stay.payments.delete()
+        db.session.delete(stay)
+        db.session.commit()
+        assert by_month() == {}
+        assert StayNightRevenue.query.filter_by(stay_id=stay.id).count() == 0
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Pruebas del camino de confirmación de reservas (app/reservations.py):
+conflictos estructurados, día de salida = día de entrada, extensiones,
+creación concurrente sobre la misma habitación, reservas de grupo, el caché
+de disponibilidad (app/availability.py) y las sugerencias en streaming.
+
+Ejecutar con: python -m pytest -q test_reservations.py
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import Config
+from app import create_app
+from app.extensions import db
+from app.models import User, Room, Client, Stay, Payment, Supply, SupplyUsage, room_supply_defaults
+from app.reservations import reserve_stay, ReservationConflict
+from app.benchmark import QueryCounter
+from app.availability import occupied_room_ids, available_rooms
+
+
+def day(offset):
+    return datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=offset)
+
+
+@pytest.fixture
+def app(tmp_path):
+    class ReservationConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'reservations.db'}"
+        # Sin hilo escritor del registro de búsquedas (la base se borra al terminar)
+        SEARCH_LOG_FLUSH_SECONDS = 0
+
+    app = create_app(ReservationConfig)
+    with app.app_context():
+        db.create_all()
+        owner = User(username='jacob', role='dueño')
+        owner.set_password('clave123')
+        db.session.add(owner)
+        db.session.add_all([
+            Room(name='Queen 101', tier='Queen'),
+            Room(name='Queen 102', tier='Queen'),
+            Room(name='King 201', tier='King'),
+        ])
+        db.session.add_all([
+            Client(full_name='Ana García', phone_number='809-111-1111'),
+            Client(full_name='Juan Pérez', phone_number='809-222-2222'),
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        user_id = User.query.first().id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    return client
+
+
+def quick_stay(client, room_id, check_in, check_out, client_id=1):
+    return client.post('/ajax/quick_stay', json={
+        'client_id': client_id,
+        'room_id': room_id,
+        'check_in_date': check_in.strftime('%Y-%m-%d'),
+        'check_out_date': check_out.strftime('%Y-%m-%d'),
+    }).get_json()
+
+
+def test_overlapping_quick_stay_returns_conflict_with_alternatives(client):
+    assert quick_stay(client, 1, day(1), day(4))['success']
+
+    data = quick_stay(client, 1, day(3), day(6), client_id=2)
+    assert not data['success']
+    conflict = data['conflict']
+    assert conflict['room_id'] == 1
+    assert [s['check_in'] for s in conflict['conflicting_stays']] == [day(1).strftime('%Y-%m-%d')]
+    # Primero la otra Queen libre, luego el upgrade
+    assert [room['name'] for room in conflict['alternatives']] == ['Queen 102', 'King 201']
+
+
+def test_checkout_day_can_be_next_checkin_day(client):
+    assert quick_stay(client, 1, day(1), day(4))['success']
+    assert quick_stay(client, 1, day(4), day(6), client_id=2)['success']
+
+
+def test_extend_stay_checks_following_stay(client):
+    first = quick_stay(client, 1, day(1), day(3))
+    assert quick_stay(client, 1, day(5), day(7), client_id=2)['success']
+
+    ok = client.post('/ajax/extend_stay', json={'stay_id': first['stay_id'],
+                                                 'new_checkout_date': day(5).strftime('%Y-%m-%d')}).get_json()
+    assert ok['success']
+
+    clash = client.post('/ajax/extend_stay', json={'stay_id': first['stay_id'],
+                                                    'new_checkout_date': day(6).strftime('%Y-%m-%d')}).get_json()
+    assert not clash['success']
+    assert clash['conflict']['conflicting_stays'][0]['check_in'] == day(5).strftime('%Y-%m-%d')
+
+
+def test_concurrent_reservations_never_double_book(app):
+    barrier = threading.Barrier(6)
+    outcomes = []
+
+    def book(client_id):
+        with app.app_context():
+            barrier.wait()
+            try:
+                reserve_stay(client_id=client_id, room_id=1, check_in=day(10), check_out=day(12))
+                db.session.commit()
+                outcomes.append('ok')
+            except ReservationConflict:
+                db.session.rollback()
+                outcomes.append('conflict')
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=book, args=(1 + i % 2,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count('ok') == 1
+    assert outcomes.count('conflict') == 5
+    with app.app_context():
+        assert Stay.query.filter_by(room_id=1).count() == 1
+
+
+def group_line(room_id, check_in, check_out, client_id=1, **extra):
+    return dict(client_id=client_id, room_id=room_id, check_in_date=check_in.strftime('%Y-%m-%d'),
+                check_out_date=check_out.strftime('%Y-%m-%d'), **extra)
+
+
+def test_bulk_stays_is_all_or_nothing(app, client):
+    assert quick_stay(client, 2, day(1), day(3))['success']
+
+    data = client.post('/ajax/bulk_stays', json={'stays': [
+        group_line(1, day(1), day(3)),
+        group_line(2, day(2), day(4), client_id=2),    # choca con la estancia existente
+        group_line(3, day(1), day(3)),
+        group_line(3, day(2), day(5), client_id=2),    # choca con otra línea del grupo
+        group_line(1, day(5), day(6), client_id=99),   # cliente inexistente
+    ]}).get_json()
+
+    assert not data['success']
+    assert [item['success'] for item in data['items']] == [False] * 5
+    assert [bool(item['errors']) for item in data['items']] == [False, True, False, True, True]
+    assert data['items'][1]['conflict']['alternatives']
+    with app.app_context():
+        assert Stay.query.count() == 1
+
+
+def test_bulk_stays_batches_inserts_and_stock(app, client):
+    with app.app_context():
+        supply = Supply(name='Toallas', category='Lencería', current_stock=5, unit_price=2.0)
+        db.session.add(supply)
+        db.session.flush()
+        db.session.execute(room_supply_defaults.insert(), [
+            {'room_id': room_id, 'supply_id': supply.id, 'quantity': 2, 'is_mandatory': True}
+            for room_id in (1, 2, 3)
+        ])
+        db.session.commit()
+
+    with QueryCounter(_engine(app)) as counter:
+        data = client.post('/ajax/bulk_stays', json={'stays': [
+            group_line(1, day(1), day(3), initial_payment=100),
+            group_line(2, day(1), day(3), client_id=2, initial_payment=50),
+            group_line(3, day(1), day(3)),
+        ]}).get_json()
+
+    assert data['success'], data
+    assert data['created_count'] == 3
+    assert data['payments_created'] == 2
+    # La tercera línea solo recibe lo que queda en stock
+    assert [item['supplies'][0]['quantity_used'] for item in data['items']] == [2, 2, 1]
+    # +2: las noches devengadas de las estancias con pago inicial (app/accrual.py)
+    # +2: escribir el sello 'stays' que avisa a los demás workers (app/availability.py)
+    # y leer el sello 'packages' al recargar los paquetes (app/package_cache.py)
+    # +1: leer el sello 'users' al cargar el usuario de sesión (app/user_cache.py)
+    # +8: armar en frío el calendario de huecos para validar la estadía mínima y los
+    # cierres (sellos, planes de tarifas, catálogo y estancias; app/calendar_gaps.py)
+    # +6: recalcular al confirmar el mes marcado del cubo de reportes (app/revenue_cube.py)
+    assert counter.count <= 34
+
+    with app.app_context():
+        assert Stay.query.count() == 3
+        assert db.session.query(db.func.sum(Payment.amount)).scalar() == 150
+        assert SupplyUsage.query.count() == 3
+        assert Supply.query.filter_by(name='Toallas').one().current_stock == 0
+
+
+def test_stay_restrictions_are_enforced_on_every_booking_path(app, client):
+    from app.models import RatePlan, RateSeason
+
+    with app.app_context():
+        # Estadía mínima de 3 noches para las Queen y llegadas cerradas el día 10
+        plan = RatePlan(name='Queen', tier='Queen', base_rate=2500.0)
+        db.session.add(plan)
+        db.session.flush()
+        db.session.add(RateSeason(name='Mínimo 3', rate_plan_id=plan.id, start_date=day(1).date(),
+                                  end_date=day(20).date(), repeats_yearly=False, factor=1.0, min_stay=3))
+        db.session.add(RateSeason(name='Sin llegadas', start_date=day(10).date(), end_date=day(10).date(),
+                                  repeats_yearly=False, closed_to_arrival=True))
+        db.session.commit()
+
+    data = quick_stay(client, 1, day(1), day(3))
+    assert not data['success'] and data['conflict']['reason'] == 'min_stay'
+    assert not data['conflict']['conflicting_stays']
+    # La King no tiene estadía mínima: es la alternativa
+    assert [room['name'] for room in data['conflict']['alternatives']] == ['King 201']
+    assert quick_stay(client, 2, day(10), day(13))['conflict']['reason'] == 'closed_to_arrival'
+    with app.app_context():
+        with pytest.raises(ReservationConflict) as raised:
+            reserve_stay(1, 2, day(10), None)
+        assert raised.value.reason == 'closed_to_arrival'
+        db.session.rollback()
+
+    group = client.post('/ajax/bulk_stays', json={'stays': [
+        group_line(3, day(1), day(3)),
+        group_line(2, day(1), day(3), client_id=2),
+    ]}).get_json()
+    assert not group['success']
+    assert [item['success'] for item in group['items']] == [False, False]
+    assert [bool(item['errors']) for item in group['items']] == [False, True]
+
+    rooms = client.get('/ajax/check_room_availability', query_string={
+        'check_in': day(1).strftime('%Y-%m-%d'), 'check_out': day(3).strftime('%Y-%m-%d')}).get_json()['rooms']
+    assert [(room['available'], room['restriction']) for room in rooms] == [
+        (False, 'min_stay'), (False, 'min_stay'), (True, None)]
+    quick = client.post('/intelligence/quick_availability_check', json={
+        'check_in': day(1).strftime('%Y-%m-%d'), 'check_out': day(3).strftime('%Y-%m-%d')}).get_json()
+    assert [room['name'] for room in quick['available_rooms']] == ['King 201']
+
+    assert quick_stay(client, 1, day(1), day(4))['success']
+    with app.app_context():
+        assert Stay.query.count() == 1
+
+
+def test_availability_cache_is_served_from_memory_and_invalidated(app, client):
+    with app.app_context():
+        assert occupied_room_ids(day(1), day(3)) == frozenset()
+        with QueryCounter(db.engine) as counter:
+            assert occupied_room_ids(day(1).date(), day(3).date()) == frozenset()
+        assert counter.count == 0
+
+    assert quick_stay(client, 1, day(1), day(3))['success']
+
+    with app.app_context():
+        assert occupied_room_ids(day(1), day(3)) == {1}
+        # Mismo criterio de noches que las reservas: la salida libera el día
+        assert occupied_room_ids(day(3), day(5)) == frozenset()
+        assert [room.name for room in available_rooms(day(2), day(4), tier='Queen')] == ['Queen 102']
+
+
+def test_streamed_suggestions_match_blocking_response(client):
+    assert quick_stay(client, 1, day(1), day(5))['success']
+    body = {'check_in': day(1).strftime('%Y-%m-%d'), 'check_out': day(4).strftime('%Y-%m-%d')}
+
+    for url, key in [('/intelligence/suggest_availability', 'suggestions'),
+                     ('/ajax/find_booking_solutions', 'solutions')]:
+        blocking = client.post(url, json=body).get_json()
+        response = client.post(f'{url}/stream', json=body)
+        assert response.mimetype == 'application/x-ndjson'
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        assert events[0]['event'] == 'strategy'
+        assert events[0][key], 'la disponibilidad directa llega en el primer evento'
+        assert events[-1]['event'] == 'done'
+        assert events[-1][key] == blocking[key]
+
+    sse = client.post('/ajax/find_booking_solutions/stream', json=body,
+                      headers={'Accept': 'text/event-stream'}).get_data(as_text=True)
+    assert sse.startswith('event: strategy\ndata: ')
+    assert 'event: done' in sse
+
+
+def _engine(app):
+    with app.app_context():
+        return db.engine
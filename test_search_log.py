@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Pruebas del registro de búsquedas de disponibilidad (app/search_log.py) y
+de los reportes de demanda no atendida.
+
+Ejecutar con: python -m pytest -q test_search_log.py
+"""
+
+import pytest
+
+from app.extensions import db
+from app.benchmark import QueryCounter
+
+
+def test_search_log_buffers_searches_and_reports_denials(app, client, engine):
+    import time
+    from datetime import date, datetime, timedelta
+    from app.intelligence import BookingPatternAnalyzer
+    from app.models import AvailabilitySearch
+    from app.room_catalog import get_catalog
+    from app.search_log import SearchLogWriter, denial_by_night, denial_rates, log_search, search_log, turned_away
+
+    # Fechas lejanas: todas las habitaciones libres
+    check_in, check_out = date.today() + timedelta(days=400), date.today() + timedelta(days=403)
+    dates = {'check_in': check_in.isoformat(), 'check_out': check_out.isoformat()}
+    search_log.flush()
+    assert client.post('/intelligence/quick_availability_check', json=dates).get_json()['success']
+    assert client.get('/ajax/check_room_availability', query_string=dates).get_json()['success']
+    assert client.post('/ajax/find_booking_solutions', json=dict(dates, preferred_tier='King')).get_json()['success']
+    assert client.post('/intelligence/suggest_availability', json=dates).get_json()['success']
+    # Las peticiones solo agregan al búfer
+    assert search_log.pending() == 4
+
+    with app.app_context():
+        king = get_catalog().of_tier('King')[0]
+        before = BookingPatternAnalyzer.predict_optimal_prices(king, check_in, 3)
+        # Dos búsquedas rechazadas de la primera noche: una de King y una sin tier
+        with QueryCounter(engine) as counter:
+            log_search('test', check_in, check_in + timedelta(days=1), 'none', tier='King', guests=2)
+            log_search('test', check_in, check_in + timedelta(days=1), 'none')
+        assert counter.count == 0
+        assert search_log.flush() == 6 and AvailabilitySearch.query.count() == 6
+
+        # Conteos por noche buscada: la búsqueda de King cubre tres noches
+        by_tier = {row['tier']: row for row in denial_rates(check_in, check_out, 'tier')}
+        assert by_tier['King']['perfect'] == 3 and by_tier['King']['none'] == 1
+        assert by_tier['King']['searches'] == 4 and by_tier['King']['denial_rate'] == 25.0
+        first_night = denial_rates(check_in, check_in, 'night')[0]
+        assert first_night['searches'] == 6 and first_night['denial_rate'] == 33.3
+        assert denial_by_night('King', check_in, 3) == [pytest.approx(1 / 3), 0.0, 0.0]
+
+        # Las rechazadas sin tier se reparten por capacidad
+        capacity = [len(get_catalog().of_tier('Queen')), len(get_catalog().of_tier('King'))]
+        denied = turned_away(check_in, 3, ['Queen', 'King'], capacity)
+        assert denied[:, 1:].sum() == 0 and denied[:, 0].sum() == 2.0
+        assert denied[1, 0] == 1 + capacity[1] / sum(capacity)
+
+        # El precio de la noche con rechazos sube con su tasa
+        after = BookingPatternAnalyzer.predict_optimal_prices(king, check_in, 3)
+        assert after[0] == pytest.approx(before[0] * (1 + 0.1 / 3)) and after[1:] == before[1:]
+
+        # Escritor en segundo plano: escribe solo al vencer el intervalo
+        writer = SearchLogWriter()
+        writer.record(db.engine, dict(searched_at=datetime.now(), source='test', check_in_day=20300101,
+                                      check_out_day=20300102, outcome='perfect', options=1), flush_seconds=0.05)
+        deadline = time.monotonic() + 5
+        while writer.written == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.written == 1 and AvailabilitySearch.query.count() == 7
+
+        AvailabilitySearch.query.delete()
+        db.session.commit()
+
+    response = client.get('/intelligence/unmet-demand?by=night_tier').get_json()
+    assert response['success'] and response['searches'] == 0
+    assert not client.get('/intelligence/unmet-demand?by=week').get_json()['success']
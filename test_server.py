@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Pruebas del servidor de producción (app/server.py): calentamiento de cachés,
+/healthz y blueprints de análisis diferidos.
+
+Ejecutar con: python -m pytest -q test_server.py
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.benchmark import QueryCounter
+from app.server import register_health_check
+
+
+@pytest.fixture(scope='module')
+def app(app):
+    # /healthz lo agrega el servidor de producción (AirbnbManagerServer.load)
+    register_health_check(app)
+    return app
+
+
+def test_healthz_and_warmup(app, engine):
+    from app.server import warm_caches
+
+    timings = warm_caches(app)
+    assert {'room_catalog', 'package_cache', 'dashboard'} <= set(timings)
+
+    # Sin sesión iniciada: lo consultan el balanceador y la prueba de carga
+    with QueryCounter(engine) as counter:
+        response = app.test_client().get('/healthz')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'ok'
+    # SELECT 1; el catálogo ya está caliente
+    assert counter.count == 1
+
+
+def _run_fresh(script):
+    """Proceso nuevo: en este ya están importados por las otras pruebas"""
+    env = dict(os.environ, DATABASE_URL='sqlite://')
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stderr
+
+
+def test_default_app_leaves_analytics_and_listeners_unimported():
+    _run_fresh(
+        "import sys\n"
+        "from app import create_app\n"
+        "app = create_app()\n"
+        "heavy = ('numpy', 'app.intelligence', 'app.intelligence_notifications', 'app.yield_management',\n"
+        "         'app.revenue_cube', 'app.accrual', 'app.server', 'flask_migrate')\n"
+        "assert not [m for m in heavy if m in sys.modules], [m for m in heavy if m in sys.modules]\n"
+        "assert not any(rule.rule.startswith('/ajax/') for rule in app.url_map.iter_rules())\n"
+        # Los eventos de sesión quedan registrados antes de la primera escritura
+        "with app.app_context():\n"
+        "    assert 'app.revenue_cube' in sys.modules and 'app.accrual' in sys.modules\n"
+        "assert 'numpy' not in sys.modules\n"
+    )
+
+
+def test_analytics_blueprints_are_imported_on_first_request():
+    _run_fresh(
+        "import sys\n"
+        "from app import create_app\n"
+        "app = create_app()\n"
+        "app.test_client().get('/auth/login')\n"
+        "assert 'app.intelligence_notifications' in sys.modules\n"
+        "assert any(rule.rule.startswith('/intelligence/') for rule in app.url_map.iter_rules())\n"
+        # Sin diferir (test_app.py; las pruebas con TESTING): todas las rutas desde el inicio
+        "assert any(rule.rule.startswith('/ajax/') for rule in create_app(defer_blueprints=False).url_map.iter_rules())\n"
+    )
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las columnas derivadas de las estancias: claves de día enteras
+(app/day_keys.py) y el resumen de pagos desnormalizado (app/stay_rollup.py).
+
+Ejecutar con: python -m pytest -q test_stays.py
+"""
+
+from app.extensions import db
+from app.models import Stay
+
+
+def test_day_keys_follow_dates_and_serve_indexed_filters(app):
+    from datetime import date, datetime, timedelta
+    from sqlalchemy import insert, text
+    from app.day_keys import day_key
+    from app.models import Client, Room
+
+    today = date.today()
+    with app.app_context():
+        room = Room.query.first()
+        client = Client.query.first()
+        arriving = Stay(client_id=client.id, room_id=room.id, status='Activa',
+                        check_in_date=datetime.combine(today, datetime.min.time()).replace(hour=15))
+        db.session.add(arriving)
+        db.session.flush()
+        assert arriving.check_in_day == day_key(today) and arriving.check_out_day is None
+
+        # Actualizar la fecha mantiene la clave; una inserción masiva de Core también la calcula
+        arriving.check_out_date = datetime.combine(today + timedelta(days=2), datetime.min.time())
+        assert arriving.check_out_day == day_key(today + timedelta(days=2))
+        db.session.execute(insert(Stay), [{'client_id': client.id, 'room_id': room.id, 'status': 'Finalizada',
+                                           'check_in_date': datetime(2020, 3, 1, 15),
+                                           'check_out_date': datetime(2020, 3, 4, 11)}])
+        bulk = Stay.query.filter(Stay.check_in_day == 20200301).one()
+        assert bulk.check_out_day == 20200304
+
+        assert arriving in Client.get_relevant_clients_by_category('arriving')
+        assert arriving in Client.get_relevant_clients_by_category('current')
+
+        plan = db.session.execute(text(
+            'EXPLAIN QUERY PLAN SELECT id FROM stay WHERE check_in_day = :day'), {'day': day_key(today)}).all()
+        assert any('ix_stay_check_in_day' in row[-1] for row in plan)
+        db.session.rollback()
+
+
+def test_stay_rollup_follows_payments_and_repairs(app):
+    from datetime import datetime
+    from sqlalchemy import insert
+    from app.models import Client, Payment, Room
+    from app.stay_rollup import find_rollup_mismatches, repair_rollups
+
+    with app.app_context():
+        # Los datos sintéticos ya traen el resumen consistente
+        assert find_rollup_mismatches() == []
+
+        stay = Stay(client_id=Client.query.first().id, room_id=Room.query.first().id, status='Activa',
+                    check_in_date=datetime(2030, 1, 10, 15), check_out_date=datetime(2030, 1, 13, 11),
+                    agreed_total=9000.0)
+        db.session.add(stay)
+        db.session.commit()
+        assert (stay.nights, stay.paid_total, stay.balance_due) == (3, 0.0, 9000.0)
+
+        stay.record_payment(2000.0)
+        stay.record_payment(1500.0, method='Tarjeta')
+        db.session.commit()
+        assert (stay.paid_total, stay.balance_due) == (3500.0, 5500.0)
+        assert stay in Stay.get_stays_with_balance()
+
+        # Un pago insertado por fuera del camino normal se detecta y se repara
+        db.session.execute(insert(Payment), [{'stay_id': stay.id, 'amount': 5500.0, 'payment_date': datetime.now()}])
+        mismatches = find_rollup_mismatches()
+        assert [m['stay_id'] for m in mismatches] == [stay.id]
+        assert repair_rollups(mismatches) == 1
+        db.session.commit()
+        db.session.refresh(stay)
+        assert (stay.paid_total, stay.balance_due) == (9000.0, 0.0)
+        assert stay not in Stay.get_stays_with_balance()
+
+        Payment.query.filter_by(stay_id=stay.id).delete()
+        db.session.delete(stay)
+        db.session.commit()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Pruebas del generador de datos sintéticos (app/synthetic_data.py) y del
+arnés de benchmark (app/benchmark.py).
+
+Ejecutar con: python -m pytest -q test_synthetic_data.py
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+from conftest import FixtureConfig
+from app import create_app
+from app.extensions import db
+from app.models import Expense, Payment, Stay, SupplyUsage
+from app.benchmark import compare_results, run_benchmark
+from app.synthetic_data import DatasetSpec, bulk_insert, generate_dataset
+
+
+SPEC = DatasetSpec(rooms=4, clients=20, years=0.2, future_days=15, end_date=date(2026, 6, 30))
+
+
+def _checksums(spec):
+    """Conteos por tabla y sumas de las columnas que varían con la semilla"""
+    app = create_app(FixtureConfig)
+    with app.app_context():
+        db.create_all()
+        counts = generate_dataset(spec)
+        sums = (
+            db.session.query(func.sum(Stay.check_in_day), func.sum(Stay.nights), func.sum(Stay.paid_total)).one(),
+            db.session.query(func.sum(Payment.payment_day), func.sum(Payment.amount)).one(),
+            db.session.query(func.sum(Expense.amount)).scalar(),
+            db.session.query(func.sum(SupplyUsage.quantity_used)).scalar(),
+        )
+        db.session.remove()
+        db.drop_all()
+    return counts, tuple(sums)
+
+
+def test_generate_dataset_is_deterministic_per_seed():
+    counts, sums = _checksums(SPEC)
+    assert counts['stays'] > 0 and counts['payments'] > 0 and counts['expenses'] > 0
+    assert _checksums(SPEC) == (counts, sums)
+
+    other_counts, other_sums = _checksums(DatasetSpec(**dict(SPEC.__dict__, seed=SPEC.seed + 1)))
+    assert other_sums != sums
+
+
+def test_bulk_insert_fills_python_defaults(app):
+    with app.app_context():
+        template = Stay.query.first()
+        inserted = bulk_insert(Stay.__table__, [{
+            'client_id': template.client_id, 'room_id': template.room_id, 'status': 'Finalizada',
+            'check_in_date': datetime(2034, 1, 30, 15), 'check_out_date': datetime(2034, 2, 2, 11),
+        }])
+        assert inserted == 1
+        stay = Stay.query.filter_by(check_in_date=datetime(2034, 1, 30, 15)).one()
+        # Claves de día, noches y defaults escalares calculados como en un INSERT del ORM
+        assert (stay.check_in_day, stay.check_out_day, stay.nights) == (20340130, 20340202, 3)
+        assert (stay.booking_channel, stay.paid_total, stay.balance_due) == ('Directo', 0.0, 0.0)
+        assert stay.booked_day is not None
+        db.session.rollback()
+
+
+def test_benchmark_reports_latency_and_queries_per_scenario(app):
+    scenarios = [{'name': 'panel_index', 'method': 'GET', 'url': '/'},
+                 {'name': 'reports', 'method': 'GET', 'url': '/reports'}]
+    results = run_benchmark(app, iterations=2, warmup=1, scenarios=scenarios)
+
+    assert results['dataset']['rooms'] == 6 and results['iterations'] == 2
+    for name in ('panel_index', 'reports'):
+        metrics = results['results'][name]
+        assert metrics['status_codes'] == [200] and not metrics['errors']
+        assert 0 < metrics['p50_ms'] <= metrics['p99_ms'] and metrics['queries_max'] >= metrics['queries_p50']
+
+    rows = compare_results(results, results)
+    assert [row['scenario'] for row in rows] == ['panel_index', 'reports']
+    assert all(row['p50_change_pct'] == 0.0 for row in rows)